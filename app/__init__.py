@@ -15,6 +15,7 @@ load_dotenv()
 
 # Import configurations
 from .config import config
+from .commands import register_commands
 
 # Import database
 from models.base import db
@@ -51,6 +52,9 @@ def create_app(config_name='development'):
     # Register blueprints
     register_blueprints(app)
     
+    # Register CLI commands
+    register_commands(app)
+    
     # Setup logging
     setup_logging(app)
     
@@ -0,0 +1,70 @@
+# app/commands.py
+import click
+from flask.cli import AppGroup
+
+leaderboard_cli = AppGroup('leaderboards', help='Manage Redis class leaderboards.')
+
+@leaderboard_cli.command('rebuild')
+@click.option('--organization-id', required=True, help='Organization to rebuild boards for.')
+@click.option('--academic-year', required=True, help='Academic year, e.g. 2023-2024.')
+@click.option('--term', default='Annual', show_default=True, help='Term to rebuild.')
+@click.option('--class-name', default=None, help='Only rebuild this class.')
+def rebuild_leaderboards(organization_id, academic_year, term, class_name):
+    """Rebuild class and subject leaderboards from the database"""
+    from services.leaderboard_service import LeaderboardService
+
+    rebuilt = LeaderboardService().rebuild_organization(organization_id, academic_year, term, class_name)
+    click.echo(f"Rebuilt {rebuilt} leaderboard(s) for organization {organization_id}")
+
+artifacts_cli = AppGroup('artifacts', help='Manage generated export artifacts.')
+
+@artifacts_cli.command('cleanup')
+def cleanup_artifacts():
+    """Expire old artifacts, remove unreferenced files and requeue interrupted jobs"""
+    from services.artifact_service import ArtifactService
+
+    stats = ArtifactService.cleanup()
+    click.echo(
+        f"Expired {stats['expired']} artifact(s), removed {stats['removed_objects']} file(s), "
+        f"requeued {stats['requeued']} job(s)"
+    )
+
+results_cli = AppGroup('results', help='Load and manage results.')
+
+@results_cli.command('load-history')
+@click.argument('file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--organization-id', required=True, help='Organization to load results for.')
+@click.option('--academic-year', default=None, help='Academic year of rows without one.')
+@click.option('--term', default=None, help='Term of rows without one (default Annual).')
+@click.option('--errors', 'errors_path', default=None, type=click.Path(dir_okay=False),
+              help='Write rejected rows to this CSV.')
+def load_result_history(file, organization_id, academic_year, term, errors_path):
+    """COPY a large result CSV into the database in one transaction"""
+    from services.result_copy_loader import ResultCopyLoader
+
+    def progress(done, total):
+        if total:
+            click.echo(f"Loaded {done // 1024 ** 2} of {total // 1024 ** 2} MB ({done * 100 // total}%)")
+
+    loader = ResultCopyLoader(organization_id, academic_year=academic_year, term=term, progress=progress)
+    with open(file, 'rb') as stream:
+        if errors_path:
+            with open(errors_path, 'wb') as report:
+                result = loader.load(stream, report)
+        else:
+            result = loader.load(stream)
+
+    if not result['success']:
+        raise click.ClickException(result['error'])
+    click.echo(
+        f"Imported {result['count']} result(s) ({result['created']} new, {result['updated']} updated), "
+        f"created {result['created_students']} student(s), rejected {result['rejected']} row(s)"
+    )
+    for code, count in sorted(result['errors'].items()):
+        click.echo(f"  {code}: {count}")
+
+def register_commands(app):
+    """Register CLI commands"""
+    app.cli.add_command(leaderboard_cli)
+    app.cli.add_command(artifacts_cli)
+    app.cli.add_command(results_cli)
@@ -7,6 +7,8 @@ from logging.handlers import RotatingFileHandler
 class Config:
     # Basic Flask Config
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
+    # Site URL printed in document QR codes (e.g. https://results.example.org); the request host if unset
+    VERIFICATION_BASE_URL = os.environ.get('VERIFICATION_BASE_URL')
     
     # Logging Configuration
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
@@ -104,6 +106,39 @@ class Config:
     # Resend API Configuration
     RESEND_API_KEY = os.environ.get('RESEND_API_KEY')
     
+    # Bulk PDF Rendering Configuration
+    BULK_RENDER_WORKERS = int(os.environ.get('BULK_RENDER_WORKERS') or os.cpu_count() or 2)
+    BULK_RENDER_CHUNK_SIZE = int(os.environ.get('BULK_RENDER_CHUNK_SIZE') or 20)
+    RENDER_CACHE_DIR = os.environ.get('RENDER_CACHE_DIR', 'render_cache')
+    RENDER_CACHE_MAX_BYTES = int(os.environ.get('RENDER_CACHE_MAX_BYTES') or 512 * 1024 * 1024)  # 512MB
+    PDF_ASSET_CACHE_SIZE = int(os.environ.get('PDF_ASSET_CACHE_SIZE') or 256)
+    PDF_ASSET_DPI = int(os.environ.get('PDF_ASSET_DPI') or 300)
+    # Binary streams and downsampled, re-encoded images (see utils/pdf_output.py)
+    PDF_OPTIMIZE = os.environ.get('PDF_OPTIMIZE', 'true').lower() in ['true', 'on', '1']
+    PDF_IMAGE_QUALITY = int(os.environ.get('PDF_IMAGE_QUALITY') or 85)
+    
+    # Bulk Import Configuration
+    RESULT_IMPORT_CHUNK_SIZE = int(os.environ.get('RESULT_IMPORT_CHUNK_SIZE') or 1000)
+    STUDENT_IMPORT_CHUNK_SIZE = int(os.environ.get('STUDENT_IMPORT_CHUNK_SIZE') or 1000)
+    IMPORT_STAGING_TTL_SECONDS = int(os.environ.get('IMPORT_STAGING_TTL_SECONDS') or 60 * 60)  # Dry run to commit
+    
+    # Export Artifact Configuration
+    ARTIFACT_STORE_DIR = os.environ.get('ARTIFACT_STORE_DIR', 'artifacts')
+    ARTIFACT_TTL_SECONDS = int(os.environ.get('ARTIFACT_TTL_SECONDS') or 24 * 60 * 60)
+    ARTIFACT_TENANT_QUOTA_BYTES = int(os.environ.get('ARTIFACT_TENANT_QUOTA_BYTES') or 1024 * 1024 * 1024)  # 1GB
+    ARTIFACT_MAX_ACTIVE_JOBS = int(os.environ.get('ARTIFACT_MAX_ACTIVE_JOBS') or 5)
+    ARTIFACT_EXECUTOR = os.environ.get('ARTIFACT_EXECUTOR', 'thread')  # thread or celery
+    ARTIFACT_WORKERS = int(os.environ.get('ARTIFACT_WORKERS') or 2)
+    ARTIFACT_LEASE_SECONDS = int(os.environ.get('ARTIFACT_LEASE_SECONDS') or 600)
+    ARTIFACT_MAX_ATTEMPTS = int(os.environ.get('ARTIFACT_MAX_ATTEMPTS') or 3)
+    # Internal nginx location serving ARTIFACT_STORE_DIR; set USE_X_SENDFILE for Apache/lighttpd
+    ARTIFACT_ACCEL_REDIRECT = os.environ.get('ARTIFACT_ACCEL_REDIRECT')
+
+    # Parquet Export Configuration (requires pyarrow)
+    PARQUET_ROW_GROUP_ROWS = int(os.environ.get('PARQUET_ROW_GROUP_ROWS') or 64 * 1024)
+    PARQUET_YIELD_PER = int(os.environ.get('PARQUET_YIELD_PER') or 10000)
+    PARQUET_COMPRESSION = os.environ.get('PARQUET_COMPRESSION', 'zstd')
+    
 class DevelopmentConfig(Config):
     DEBUG = True
     TESTING = False
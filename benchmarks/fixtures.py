@@ -0,0 +1,220 @@
+"""
+Synthetic school fixtures for the PDF benchmarks
+
+A fixture is one class of a made-up school: students with marks in every
+subject, attendance and the school's organization data. The same class is
+converted into the input format of each renderer, so every template renders
+the same amount of data. Marks are deterministic for a given seed.
+"""
+import os
+import random
+from datetime import date, timedelta
+
+from PIL import Image, ImageDraw
+
+from utils.grading import calculate_class_results
+
+SUBJECT_NAMES = [
+    'English', 'Mathematics', 'Science', 'Social Studies', 'Hindi', 'Computer Science',
+    'Physics', 'Chemistry', 'Biology', 'History', 'Geography', 'Economics',
+    'Accountancy', 'Business Studies', 'Physical Education', 'Fine Arts'
+]
+FIRST_NAMES = ['Aarav', 'Diya', 'Kabir', 'Meera', 'Rohan', 'Saanvi', 'Vihaan', 'Anaya', 'Arjun', 'Isha']
+LAST_NAMES = ['Sharma', 'Verma', 'Iyer', 'Khan', 'Das', 'Patel', 'Reddy', 'Singh', 'Nair', 'Gupta']
+
+def subject_names(count):
+    """Subject names for a class, numbered once the stock names run out"""
+    return [
+        SUBJECT_NAMES[i] if i < len(SUBJECT_NAMES) else f"{SUBJECT_NAMES[i % len(SUBJECT_NAMES)]} {i // len(SUBJECT_NAMES) + 1}"
+        for i in range(count)
+    ]
+
+def synthetic_class(students=40, subjects=6, seed=0):
+    """Build a synthetic class
+
+    Args:
+        students (int): Number of students
+        subjects (int): Number of subjects
+        seed (int): Random seed for names and marks
+
+    Returns:
+        dict: cls, section, subjects, organization and graded student records
+        in the calculate_class_results format
+    """
+    rng = random.Random(seed)
+    names = subject_names(subjects)
+    roster = [
+        {
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'roll_no': str(i + 1),
+            'cls': '10',
+            'section': 'A',
+            'days_present': rng.randint(120, 200),
+            'max_days': 200
+        }
+        for i in range(students)
+    ]
+    marks = [[rng.randint(25, 100) for _ in names] for _ in roster]
+    max_marks = [[100] * len(names) for _ in roster]
+    return {
+        'cls': '10',
+        'section': 'A',
+        'academic_year': '2024-25',
+        'subjects': names,
+        'organization': {
+            'id': 'benchmark',
+            'name': 'Springfield Public School',
+            'address': '742 Evergreen Terrace, Springfield',
+            'phone': '555-0100',
+            'email': 'office@springfield.example'
+        },
+        'students': calculate_class_results(roster, names, marks, max_marks)
+    }
+
+def marksheet_students(school_class):
+    """Student data in the generate_result_pdf format"""
+    return [
+        {
+            **{key: record[key] for key in ('name', 'roll_no', 'cls', 'section', 'days_present', 'max_days')},
+            'overall_result': {
+                'subjects': [
+                    {
+                        'name': s['name'],
+                        'max_marks': s['max_marks'],
+                        'obtained_marks': s['marks'],
+                        'grade': s['grade'],
+                        'percentage': s['percentage']
+                    }
+                    for s in record['subjects']
+                ],
+                'overall_grade': record['overall_result']['overall_grade'],
+                'overall_percentage': record['overall_result']['overall_percentage'],
+                'is_pass': record['overall_result']['is_pass'],
+                'position': record['position']
+            }
+        }
+        for record in school_class['students']
+    ]
+
+def service_marksheets(school_class):
+    """(student_data, results) pairs in the PDFService.generate_marksheet format"""
+    marksheets = []
+    for record in school_class['students']:
+        student_data = {
+            'name': record['name'],
+            'roll_number': record['roll_no'],
+            'class_name': record['cls'],
+            'section': record['section'],
+            'academic_year': school_class['academic_year'],
+            'attendance': {'days_present': record['days_present'], 'total_days': record['max_days']},
+            'remarks': 'Consistent effort throughout the year.'
+        }
+        results = [
+            {
+                'subject_name': subject['name'],
+                'marks_obtained': subject['marks'],
+                'total_marks': subject['max_marks'],
+                'percentage': subject['percentage']
+            }
+            for subject in record['subjects']
+        ]
+        marksheets.append((student_data, results))
+    return marksheets
+
+def class_sheet_data(school_class):
+    """Class data in the generate_class_pdf format"""
+    return {'cls': school_class['cls'], 'section': school_class['section'], 'students': school_class['students']}
+
+def class_service_results(school_class):
+    """(class_data, students_results) in the class result service format"""
+    class_data = {
+        'name': school_class['cls'],
+        'section': school_class['section'],
+        'academic_year': school_class['academic_year'],
+        'total_students': len(school_class['students']),
+        'exam_type': 'Annual',
+        'exam_name': 'Annual Examination'
+    }
+    students_results = []
+    for record in school_class['students']:
+        students_results.append({
+            'roll_number': record['roll_no'],
+            'name': record['name'],
+            'subjects': [{'name': s['name'], 'marks': s['marks']} for s in record['subjects']],
+            'total_marks': record['total_marks'],
+            'total_percentage': record['total_percentage'],
+            'percentage': record['total_percentage'],
+            'grade': record['grade'],
+            'position': record['position'],
+            'is_pass': record['overall_result']['is_pass']
+        })
+    return class_data, students_results
+
+def write_logo(directory, size=1200):
+    """Write a school logo as uploaded from a phone: a large, full-color PNG
+
+    Args:
+        directory (str): Directory to write logo.png to
+        size (int): Width and height in pixels
+
+    Returns:
+        str: Path of the logo
+    """
+    gradient = Image.linear_gradient('L').resize((size, size))
+    logo = Image.merge('RGB', (gradient, gradient.rotate(90), Image.radial_gradient('L').resize((size, size))))
+    draw = ImageDraw.Draw(logo)
+    for i in range(12):
+        inset = i * size // 30
+        draw.ellipse((inset, inset, size - inset, size - inset), outline=(30 + i * 15, 64, 175), width=max(size // 100, 1))
+    path = os.path.join(directory, 'logo.png')
+    logo.save(path)
+    return path
+
+def certificates(school_class, count=10):
+    """Merit certificate data for the class's toppers"""
+    toppers = sorted(school_class['students'], key=lambda record: record['position'])[:count]
+    return [
+        {
+            'type': 'Certificate of Merit',
+            'recipient_name': record['name'],
+            'achievement': (
+                f"for securing position {record['position']} in Class "
+                f"{record['cls']}-{record['section']} with {record['total_percentage']:.1f}%"
+            ),
+            'date': date(2025, 3, 31).strftime('%B %d, %Y')
+        }
+        for record in toppers
+    ]
+
+def invoice(items=5, seed=0):
+    """Invoice data in the InvoicePDFService.generate_invoice format"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(items):
+        quantity = rng.randint(1, 500)
+        unit_price = rng.choice([0.5, 1.0, 2.5, 49.0])
+        rows.append({
+            'description': f"Usage item {i + 1}",
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'total': quantity * unit_price
+        })
+    subtotal = sum(row['total'] for row in rows)
+    start = date(2025, 1, 1)
+    return {
+        'invoice_number': f"INV-BENCH{seed:03d}",
+        'issue_date': start.isoformat(),
+        'due_date': (start + timedelta(days=15)).isoformat(),
+        'organization': {
+            'name': 'Springfield Public School',
+            'address': '742 Evergreen Terrace, Springfield',
+            'email': 'office@springfield.example',
+            'phone': '555-0100'
+        },
+        'billing_period': {'start_date': start.isoformat(), 'end_date': (start + timedelta(days=30)).isoformat()},
+        'subscription': {'tier': 'premium', 'billing_cycle': 'monthly', 'currency': 'USD'},
+        'items': rows,
+        'subtotal': subtotal,
+        'tax': round(subtotal * 0.18, 2),
+        'total': round(subtotal * 1.18, 2)
+    }
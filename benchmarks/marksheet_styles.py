@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-marksheet render time with and without the shared style registry
+
+Usage: python -m benchmarks.marksheet_styles [--count N]
+
+"before" clears the registry ahead of every render, so each marksheet builds
+its stylesheet and table styles from scratch as it did prior to the registry.
+"after" renders against the shared, already-built styles.
+"""
+import argparse
+import time
+
+from services.pdf_service import BasePDFService
+from utils.marksheet_pdf import _render_result_pdf
+from utils.pdf_styles import clear_style_cache
+
+def sample_student(index):
+    """Build synthetic student data for one marksheet"""
+    subjects = [
+        {
+            'name': name,
+            'max_marks': 100,
+            'obtained_marks': 55 + (index * 7 + i * 11) % 45,
+            'grade': 'A',
+            'percentage': 55 + (index * 7 + i * 11) % 45
+        }
+        for i, name in enumerate(['English', 'Maths', 'Science', 'Social Studies', 'Hindi', 'Computer'])
+    ]
+    return {
+        'name': f'Student {index}',
+        'roll_no': str(index),
+        'cls': '10',
+        'section': 'A',
+        'days_present': 180,
+        'max_days': 200,
+        'overall_result': {'subjects': subjects, 'overall_grade': 'A', 'overall_percentage': 75.0}
+    }
+
+def run(count, template, shared):
+    """Render count marksheets and return mean seconds per marksheet"""
+    customization = {'template': template, 'main_color': '#1E40AF', 'header_color': '#E5E7EB', 'include_qr': False}
+    students = [sample_student(i) for i in range(count)]
+
+    clear_style_cache()
+    start = time.perf_counter()
+    for student in students:
+        if not shared:
+            clear_style_cache()
+        # Render directly so the render cache does not serve repeats
+        _render_result_pdf(student, customization, template)
+    return (time.perf_counter() - start) / count
+
+def run_service_init(count, shared):
+    """Construct count PDF services and return mean seconds per construction"""
+    clear_style_cache()
+    start = time.perf_counter()
+    for _ in range(count):
+        if not shared:
+            clear_style_cache()
+        BasePDFService()
+    return (time.perf_counter() - start) / count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=200, help='Marksheets per run')
+    args = parser.parse_args()
+
+    print(f"{'template':<10}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+    for template in ('modern', 'classic', 'compact'):
+        before = run(args.count, template, shared=False)
+        after = run(args.count, template, shared=True)
+        print(f"{template:<10}{before * 1000:>14.2f}{after * 1000:>14.2f}{before / after:>9.2f}x")
+
+    before = run_service_init(args.count, shared=False)
+    after = run_service_init(args.count, shared=True)
+    print(f"{'service':<10}{before * 1000:>14.2f}{after * 1000:>14.2f}{before / after:>9.2f}x")
+
+if __name__ == '__main__':
+    main()
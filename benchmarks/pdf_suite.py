@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Benchmark every PDF template against synthetic school fixtures
+
+Usage: python -m benchmarks.pdf_suite [--students N] [--subjects N] [--case PATTERN] [--repeat N]
+                                      [--save-baseline PATH] [--baseline PATH] [--threshold 0.25]
+
+Each case renders a synthetic class (see benchmarks.fixtures) through one
+template in a fresh process and records seconds per page (best of --repeat
+runs, so process-wide caches are warm as in a running server), peak memory
+growth and output bytes per page. Renders bypass the render cache. The
+school's logo is a large PNG, as uploaded; each case is rendered once more
+with the output optimization off (PDF_OPTIMIZE, see utils.pdf_output) to
+report the bytes it saves per document.
+
+--save-baseline writes the results as JSON; --baseline compares against such
+a file and exits with status 1 if any metric of any case is worse than the
+baseline by more than the threshold (a fraction, 0.25 = 25%). Baselines are
+only comparable on the same machine and with the same fixture parameters.
+The exit status is also 1 if any case fails to render, baseline or not.
+"""
+import argparse
+import fnmatch
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks import fixtures
+from services.bulk_render_service import _count_pages, _peak_rss_mb
+
+# Compared against the baseline; all are "lower is better"
+METRICS = ('seconds_per_page', 'rss_growth_mb', 'bytes_per_page')
+# Differences below these are noise whatever the threshold
+METRIC_FLOORS = {'seconds_per_page': 0.001, 'rss_growth_mb': 5.0, 'bytes_per_page': 256}
+
+CUSTOMIZATION = {
+    'institute_name': 'Springfield Public School',
+    'exam_name': 'Annual Examination 2024-25',
+    'main_color': '#1E40AF',
+    'header_color': '#E5E7EB',
+    'watermark': 'SPRINGFIELD',
+    'include_qr': True,
+    'include_analytics': True
+}
+
+def _class_customization(students):
+    """CUSTOMIZATION plus the class series, as ExportService computes once per batch"""
+    from utils.charts import class_series
+    return {**CUSTOMIZATION, 'class_series': class_series(students)}
+
+def _marksheets(template):
+    def render(school_class):
+        from utils.marksheet_pdf import _render_result_pdf
+        students = fixtures.marksheet_students(school_class)
+        customization = {**_class_customization(students), 'template': template}
+        return [_render_result_pdf(student, customization, template) for student in students]
+    return render
+
+def _compiled_marksheets(school_class):
+    from utils.marksheet_templates import get_compiled_template
+    students = fixtures.marksheet_students(school_class)
+    template = get_compiled_template({**_class_customization(students), 'compiled': True})
+    return [template.render(student) for student in students]
+
+def _merged_marksheets(school_class):
+    from io import BytesIO
+    from utils.marksheet_templates import render_class_marksheets
+    students = fixtures.marksheet_students(school_class)
+    output = BytesIO()
+    render_class_marksheets(students, _class_customization(students), output)
+    return [output.getvalue()]
+
+def _service_marksheets(template):
+    def render(school_class):
+        from services.pdf_service import PDFService
+        service = PDFService()
+        organization = school_class['organization']
+        return [
+            service._render_marksheet(student_data, results, organization, template, CUSTOMIZATION).getvalue()
+            for student_data, results in fixtures.service_marksheets(school_class)
+        ]
+    return render
+
+def _class_sheet(school_class):
+    from utils.class_result_pdf import _render_class_pdf
+    return [_render_class_pdf(fixtures.class_sheet_data(school_class), CUSTOMIZATION)]
+
+def _service_class_results(template):
+    def render(school_class):
+        from services.pdf_service import PDFService
+        class_data, students_results = fixtures.class_service_results(school_class)
+        pdf = PDFService()._render_class_result(class_data, students_results, school_class['organization'], template, CUSTOMIZATION)
+        return [pdf.getvalue()]
+    return render
+
+def _class_result_service(school_class):
+    from utils.class_result_pdf import ClassResultPDFService
+    class_data, students_results = fixtures.class_service_results(school_class)
+    pdf = ClassResultPDFService()._render_class_result(class_data, students_results, school_class['organization'], CUSTOMIZATION)
+    return [pdf.getvalue()]
+
+def _certificates(school_class):
+    from utils.certificate_pdf import CertificatePDFService
+    service = CertificatePDFService()
+    return [
+        service._render_certificate(certificate, school_class['organization'], CUSTOMIZATION).getvalue()
+        for certificate in fixtures.certificates(school_class)
+    ]
+
+def _certificate_batch(school_class):
+    from io import BytesIO
+    from services.certificate_service import select_recipients
+    from utils.certificate_templates import CompiledCertificateTemplate
+    certificates = select_recipients(
+        {school_class['cls']: school_class['students']},
+        [{'rule': 'top', 'k': 10}, {'rule': 'subject_top', 'k': 1}],
+        school_class['academic_year']
+    )
+    output = BytesIO()
+    CompiledCertificateTemplate(school_class['organization'], CUSTOMIZATION).render(certificates, output)
+    return [output.getvalue()]
+
+def _invoices(school_class):
+    from services.billing_service import InvoicePDFService
+    service = InvoicePDFService()
+    return [service._render_invoice(fixtures.invoice(items=12, seed=seed)).getvalue() for seed in range(10)]
+
+# Case name -> render function taking a fixture class and returning PDFs
+CASES = {
+    'marksheet/modern': _marksheets('modern'),
+    'marksheet/classic': _marksheets('classic'),
+    'marksheet/compact': _marksheets('compact'),
+    'marksheet/compiled': _compiled_marksheets,
+    'marksheet/merged': _merged_marksheets,
+    'service-marksheet/modern': _service_marksheets('modern'),
+    'service-marksheet/classic': _service_marksheets('classic'),
+    'service-marksheet/compact': _service_marksheets('compact'),
+    'class/sheet': _class_sheet,
+    'class/result-service': _class_result_service,
+    'service-class/modern': _service_class_results('modern'),
+    'service-class/classic': _service_class_results('classic'),
+    'service-class/compact': _service_class_results('compact'),
+    'certificate/merit': _certificates,
+    'certificate/batch': _certificate_batch,
+    'invoice/subscription': _invoices,
+}
+
+def _unoptimized_bytes(name, school_class):
+    """Total output size of a case rendered with the output optimization off"""
+    from utils.pdf_output import configure
+
+    configure(optimize=False)
+    try:
+        return sum(len(pdf) for pdf in CASES[name](school_class))
+    finally:
+        configure()
+
+def run_case(name, students, subjects, seed, repeat=1):
+    """Render one case and measure it (run in a fresh process)
+
+    Returns:
+        dict: documents, pages, seconds, seconds_per_page, rss_growth_mb,
+        bytes, bytes_per_page, unoptimized_bytes, bytes_saved_per_document,
+        or error if the case failed
+    """
+    from flask import Flask
+    from app.config import Config
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    school_class = fixtures.synthetic_class(students, subjects, seed)
+
+    with tempfile.TemporaryDirectory() as assets, app.app_context():
+        logo = fixtures.write_logo(assets)
+        app.config['COMPANY_LOGO'] = logo
+        CUSTOMIZATION['logo'] = logo
+        try:
+            rss_before = _peak_rss_mb()
+            seconds = None
+            for _ in range(max(repeat, 1)):
+                start = time.perf_counter()
+                try:
+                    pdfs = CASES[name](school_class)
+                except Exception as e:
+                    return {'error': f"{type(e).__name__}: {e}"}
+                elapsed = time.perf_counter() - start
+                seconds = elapsed if seconds is None else min(seconds, elapsed)
+            rss_growth = max(0.0, _peak_rss_mb() - rss_before)
+            unoptimized = _unoptimized_bytes(name, school_class)
+        finally:
+            CUSTOMIZATION.pop('logo', None)
+
+    pages = sum(_count_pages(pdf) for pdf in pdfs)
+    size = sum(len(pdf) for pdf in pdfs)
+    return {
+        'documents': len(pdfs),
+        'pages': pages,
+        'seconds': round(seconds, 4),
+        'seconds_per_page': round(seconds / max(pages, 1), 5),
+        'rss_growth_mb': round(rss_growth, 1),
+        'bytes': size,
+        'bytes_per_page': round(size / max(pages, 1)),
+        'unoptimized_bytes': unoptimized,
+        'bytes_saved_per_document': round((unoptimized - size) / max(len(pdfs), 1))
+    }
+
+def run_suite(cases, students, subjects, seed, repeat=1):
+    """Run cases one after another, each in its own process so peak memory is its own
+
+    Returns:
+        dict: Case name -> metrics
+    """
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for name in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[name] = pool.submit(run_case, name, students, subjects, seed, repeat).result()
+    return results
+
+def compare(results, baseline, threshold):
+    """Find metrics that regressed past the threshold
+
+    Args:
+        results (dict): Case name -> metrics of this run
+        baseline (dict): Case name -> metrics of the baseline
+        threshold (float): Allowed relative increase, e.g. 0.25 for 25%
+
+    Returns:
+        list: (case, metric, baseline value, current value) for every regression,
+        including every case that fails now
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name) or {}
+        if 'error' in current:
+            regressions.append((name, 'error', previous.get('error'), current['error']))
+            continue
+        if not previous or 'error' in previous:
+            continue
+        for metric in METRICS:
+            before, after = previous.get(metric), current.get(metric)
+            if before is None or after is None:
+                continue
+            if after - before > max(before * threshold, METRIC_FLOORS[metric]):
+                regressions.append((name, metric, before, after))
+    return regressions
+
+def print_results(results, baseline=None):
+    print(f"{'case':<28}{'docs':>6}{'pages':>7}{'ms/page':>10}{'rss MB':>9}{'KB/page':>10}{'saved KB/doc':>14}{'vs base':>10}")
+    for name, metrics in results.items():
+        if 'error' in metrics:
+            print(f"{name:<28}  failed: {metrics['error']}")
+            continue
+        previous = (baseline or {}).get(name) or {}
+        change = ''
+        if previous.get('seconds_per_page'):
+            change = f"{(metrics['seconds_per_page'] / previous['seconds_per_page'] - 1) * 100:+.0f}%"
+        print(
+            f"{name:<28}{metrics['documents']:>6}{metrics['pages']:>7}"
+            f"{metrics['seconds_per_page'] * 1000:>10.2f}{metrics['rss_growth_mb']:>9.1f}"
+            f"{metrics['bytes_per_page'] / 1024:>10.1f}"
+            f"{metrics.get('bytes_saved_per_document', 0) / 1024:>14.1f}{change:>10}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=40, help='Students in the synthetic class')
+    parser.add_argument('--subjects', type=int, default=6, help='Subjects per student')
+    parser.add_argument('--seed', type=int, default=0, help='Fixture random seed')
+    parser.add_argument('--case', action='append', help='Only run cases matching this glob (repeatable)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case; the fastest is kept')
+    parser.add_argument('--baseline', help='Compare against this baseline JSON')
+    parser.add_argument('--save-baseline', help='Write the results to this baseline JSON')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed relative regression')
+    args = parser.parse_args()
+
+    cases = [name for name in CASES if not args.case or any(fnmatch.fnmatch(name, p) for p in args.case)]
+    params = {'students': args.students, 'subjects': args.subjects, 'seed': args.seed}
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored.get('params') != params:
+            print(f"Baseline was recorded with {stored.get('params')}, not {params}", file=sys.stderr)
+            return 2
+        baseline = stored['results']
+
+    results = run_suite(cases, args.students, args.subjects, args.seed, args.repeat)
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({'params': params, 'results': results}, f, indent=2, sort_keys=True)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, before, after in regressions:
+            print(f"REGRESSION {name}: {metric} {before} -> {after}", file=sys.stderr)
+        return 1 if regressions else 0
+    failed = [name for name, metrics in results.items() if 'error' in metrics]
+    if failed:
+        print(f"FAILED {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,9 @@
 import logging
-from datetime import datetime
-import os
 from celery import shared_task
 
+from services.artifact_service import ArtifactService
+from services.artifact_store import ArtifactStore
 from services.student_analytics_service import StudentAnalyticsService
-from services.pdf_service import PDFService
-from models.student import Student
-from models.base import db
 
 logger = logging.getLogger(__name__)
 
@@ -68,6 +65,8 @@ def calculate_all_student_analytics_task(organization_id, academic_year, term, c
 def generate_student_report_task(student_id, organization_id, academic_year, term):
     """Background task to generate a PDF report for student analytics
     
+    The report is stored as an export artifact; download it by artifact ID.
+    
     Args:
         student_id (str): The ID of the student
         organization_id (str): The organization ID for tenant isolation
@@ -89,49 +88,20 @@ def generate_student_report_task(student_id, organization_id, academic_year, ter
             logger.warning(f"No analytics found for student {student_id}")
             return {'status': 'no_analytics'}
         
-        # Get student details
-        student = Student.query.filter_by(id=student_id, organization_id=organization_id).first()
-        if not student:
-            logger.warning(f"Student {student_id} not found")
-            return {'status': 'student_not_found'}
-        
-        # Get comparison data
-        comparison = StudentAnalyticsService.get_student_comparison(
-            student_id, organization_id, academic_year, term
-        )
-        
-        # Get performance trends
-        trends = StudentAnalyticsService.get_student_performance_trends(
-            student_id, organization_id, period='12months'
+        record = ArtifactStore.shared().create(
+            organization_id, 'student_report',
+            {'student_id': str(student_id), 'academic_year': academic_year, 'term': term}
         )
+        record = ArtifactService.run(record['id'], organization_id)
+        if record['status'] != 'ready':
+            return {'status': 'error', 'message': record['error']}
         
-        # Prepare data for PDF
-        context = {
-            'student': student,
-            'analytics': analytics,
-            'comparison': comparison,
-            'trends': trends,
-            'academic_year': academic_year,
-            'term': term,
-            'generated_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
-            'organization_id': organization_id
-        }
-        
-        # Generate PDF
-        pdf_service = PDFService()
-        filename = f"student_report_{student.roll_no}_{academic_year}_{term}.pdf"
-        file_path = pdf_service.generate_pdf('analytics_report.html', context, filename)
-        
-        # Update student analytics with report path
-        analytics.report_path = file_path
-        db.session.commit()
-        
-        logger.info(f"Successfully generated PDF report for student {student_id}: {file_path}")
+        logger.info(f"Successfully generated PDF report for student {student_id}: {record['id']}")
         
         return {
             'status': 'success', 
-            'file_path': file_path,
-            'filename': os.path.basename(file_path)
+            'artifact_id': record['id'],
+            'filename': record['file_name']
         }
     except Exception as e:
         logger.error(f"Error generating PDF report for student {student_id}: {str(e)}")
@@ -0,0 +1,35 @@
+import logging
+from celery import shared_task
+
+from services.artifact_service import ArtifactService
+
+logger = logging.getLogger(__name__)
+
+# Acknowledged only once done, so a job whose worker dies is redelivered
+@shared_task(name='render_artifact', acks_late=True, reject_on_worker_lost=True)
+def render_artifact_task(artifact_id, organization_id):
+    """Background task to render a queued export artifact
+    
+    Args:
+        artifact_id (str): The artifact ID returned by ArtifactService.submit
+        organization_id (str): The organization ID for tenant isolation
+        
+    Returns:
+        dict: The artifact's status
+    """
+    record = ArtifactService.run(artifact_id, organization_id)
+    if record is None:
+        logger.warning(f"Artifact {artifact_id} not found")
+        return {'status': 'not_found'}
+    return {'status': record['status'], 'error': record['error']}
+
+@shared_task(name='cleanup_artifacts')
+def cleanup_artifacts_task():
+    """Scheduled task to expire old artifacts and requeue interrupted jobs
+    
+    Returns:
+        dict: Numbers of expired records, removed objects and requeued jobs
+    """
+    stats = ArtifactService.cleanup()
+    logger.info(f"Artifact cleanup: {stats}")
+    return stats
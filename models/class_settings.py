@@ -1,4 +1,5 @@
 # models/class_settings.py
+from sqlalchemy import event
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime
 import uuid
@@ -26,3 +27,11 @@ class ClassSettings(BaseModel):
     
     def __repr__(self):
         return f'<ClassSettings {self.class_name}-{self.section} ({self.academic_year})>'
+
+@event.listens_for(ClassSettings, 'after_insert')
+@event.listens_for(ClassSettings, 'after_update')
+@event.listens_for(ClassSettings, 'after_delete')
+def _invalidate_grading_scheme(mapper, connection, target):
+    """Drop the organization's compiled grading schemes (covers renamed classes)"""
+    from utils.grading import invalidate_grading_scheme
+    invalidate_grading_scheme(target.organization_id)
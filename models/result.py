@@ -31,20 +31,10 @@ class Result(BaseModel):
         return round((self.marks / self.max_marks) * 100, 2) if self.max_marks > 0 else 0
     
     def calculate_grade(self):
-        """Calculate grade based on percentage"""
-        percentage = self.percentage
-        if percentage >= 90:
-            return 'A+'
-        elif percentage >= 80:
-            return 'A'
-        elif percentage >= 70:
-            return 'B+'
-        elif percentage >= 60:
-            return 'B'
-        elif percentage >= 50:
-            return 'C+'
-        elif percentage >= 40:
-            return 'C'
-        else:
-            return 'F'
+        """Calculate grade based on percentage using the class grading scheme"""
+        from utils.grading import get_grading_scheme
+
+        class_name = self.student.class_name if self.student is not None else None
+        scheme = get_grading_scheme(self.organization_id, class_name, self.academic_year)
+        return scheme.grade(float(self.percentage))
 
@@ -50,4 +50,9 @@ class Student(BaseModel):
             status='present'
         ).count()
         
-        return round((present_days / total_days) * 100, 2)
+        return Student.attendance_percentage(total_days, present_days)
+    
+    @staticmethod
+    def attendance_percentage(total_days, present_days):
+        """Attendance percentage from counts of Attendance records"""
+        return round((present_days / total_days) * 100, 2) if total_days else 0
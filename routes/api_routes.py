@@ -1,6 +1,7 @@
 # routes/api_routes.py
 from flask import Blueprint, request, jsonify, g
-from auth.decorators import login_required
+from flask_login import current_user
+from auth.decorators import login_required, role_required
 from middleware.subscription import feature_required
 from services.result_service import ResultService
 from services.student_service import StudentService
@@ -30,6 +31,29 @@ def get_students():
         'current_page': students.page
     })
 
+@api_bp.route('/students/bulk', methods=['POST'])
+@login_required
+@role_required('admin', 'teacher')
+@feature_required('bulk_import')
+def bulk_create_students():
+    """API endpoint to create students in bulk
+    
+    The JSON body holds students (a list of student objects) and, to only
+    preview the import, dry_run: true. A preview returns a token; posting
+    {"token": ...} creates the previewed students.
+    """
+    data = request.get_json(silent=True) or {}
+    service = StudentService()
+    if data.get('token'):
+        result = service.create_staged(data['token'], current_user.id, g.organization_id)
+    elif isinstance(data.get('students'), list):
+        result = service.bulk_create(data['students'], current_user.id, g.organization_id,
+                                     dry_run=bool(data.get('dry_run')))
+    else:
+        return jsonify({'success': False, 'message': 'students must be a list'}), 400
+    
+    return jsonify(result), 200 if result['success'] else 400
+
 @api_bp.route('/results', methods=['GET'])
 @login_required
 def get_results():
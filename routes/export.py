@@ -1,85 +1,264 @@
 # routes/export.py
-from flask import Blueprint, request, jsonify, send_file, g
+from flask import Blueprint, Response, request, jsonify, send_file, g, abort, current_app, url_for, stream_with_context
+from flask_login import current_user
+from werkzeug.utils import secure_filename
 from auth.decorators import login_required, role_required
 from middleware.subscription import usage_tracked
+from services.artifact_service import ArtifactService
+from services.certificate_service import DEFAULT_RULES, CertificateService
 from services.export_service import ExportService
-import tempfile
+from services.parquet_export import ParquetExport
 import os
 
 export_bp = Blueprint('export', __name__)
 
-@export_bp.route('/marksheet/<int:student_id>')
+@export_bp.route('/marksheet/<uuid:student_id>')
 @login_required
 @usage_tracked('pdf_generation')
 def export_marksheet(student_id):
-    """Export individual marksheet"""
+    """Queue an individual marksheet; download it from /artifacts/<artifact_id>/download"""
     exam_id = request.args.get('exam_id')
     
-    result = ExportService.generate_marksheet(student_id, exam_id, g.organization_id)
-    
-    if result['success']:
-        return send_file(
-            result['file_path'],
-            as_attachment=True,
-            download_name=f"marksheet_{student_id}_{exam_id}.pdf",
-            mimetype='application/pdf'
-        )
-    else:
-        return jsonify({'error': result['error']}), 400
+    result = ArtifactService.submit(
+        'marksheet',
+        {'student_id': str(student_id), 'exam_id': exam_id, 'academic_year': request.args.get('academic_year')},
+        g.organization_id, current_user.id
+    )
+    return artifact_accepted(result)
 
 @export_bp.route('/class-result/<class_name>')
 @login_required
 @usage_tracked('pdf_generation')
 def export_class_result(class_name):
-    """Export class result sheet"""
+    """Queue a class result sheet; download it from /artifacts/<artifact_id>/download"""
     exam_type = request.args.get('exam_type')
     
-    result = ExportService.generate_class_result(class_name, exam_type, g.organization_id)
+    result = ArtifactService.submit(
+        'class_result',
+        {'class_name': class_name, 'exam_type': exam_type, 'academic_year': request.args.get('academic_year')},
+        g.organization_id, current_user.id
+    )
+    return artifact_accepted(result)
+
+@export_bp.route('/certificates', methods=['POST'])
+@login_required
+@role_required('admin', 'teacher')
+@usage_tracked('bulk_pdf_generation')
+def export_certificates():
+    """Queue a batch of certificates awarded by rules
+
+    The JSON body may hold rules (e.g. [{"rule": "top", "k": 3},
+    {"rule": "attendance", "min_percentage": 95}]), exam_type, classes and
+    academic_year. The export is a ZIP of the merged PDF and its manifest.
+    """
+    data = request.get_json(silent=True) or {}
+    rules = data.get('rules') or DEFAULT_RULES
+    error = CertificateService.validate_rules(rules)
+    if error:
+        return jsonify({'error': error}), 400
+
+    classes = data.get('classes')
+    if classes is not None and not isinstance(classes, list):
+        return jsonify({'error': 'classes must be a list'}), 400
+
+    result = ArtifactService.submit(
+        'certificates',
+        {
+            'rules': rules,
+            'exam_type': data.get('exam_type'),
+            'classes': classes,
+            'academic_year': data.get('academic_year')
+        },
+        g.organization_id, current_user.id
+    )
+    return artifact_accepted(result)
+
+@export_bp.route('/parquet', methods=['POST'])
+@login_required
+@role_required('admin')
+@usage_tracked('parquet_export')
+def export_parquet():
+    """Queue a columnar export of results, students, subjects and analytics
+
+    The JSON body may hold from_year and to_year (academic years, both
+    inclusive). The export is a ZIP of one Parquet file per table and a
+    manifest.json.
+    """
+    data = request.get_json(silent=True) or {}
+    error = ParquetExport.validate_params(data.get('from_year'), data.get('to_year'))
+    if error:
+        return jsonify({'error': error}), 400
+
+    result = ArtifactService.submit(
+        'parquet_export',
+        {'from_year': data.get('from_year'), 'to_year': data.get('to_year')},
+        g.organization_id, current_user.id
+    )
+    return artifact_accepted(result)
+
+@export_bp.route('/artifacts/<artifact_id>')
+@login_required
+def artifact_status(artifact_id):
+    """Status of a queued export"""
+    status = ArtifactService.status(artifact_id, g.organization_id)
+    if status is None:
+        abort(404, 'Export not found')
+    
+    if status['status'] == 'ready':
+        status['download_url'] = url_for('export.download_artifact', artifact_id=artifact_id)
+    return jsonify(status)
+
+@export_bp.route('/artifacts/<artifact_id>/download')
+@login_required
+def download_artifact(artifact_id):
+    """Download a finished export, with Range support for resuming
     
-    if result['success']:
-        return send_file(
-            result['file_path'],
-            as_attachment=True,
-            download_name=f"class_result_{class_name}_{exam_type}.pdf",
-            mimetype='application/pdf'
-        )
-    else:
+    With ARTIFACT_ACCEL_REDIRECT set (the internal nginx location of the
+    artifact store) or USE_X_SENDFILE enabled, the front server sends the
+    file instead of the app.
+    """
+    artifact = ArtifactService.download(artifact_id, g.organization_id)
+    if artifact is None:
+        abort(404, 'Export not found or expired')
+    
+    accel_prefix = current_app.config.get('ARTIFACT_ACCEL_REDIRECT')
+    if accel_prefix:
+        response = Response(mimetype=artifact['mimetype'])
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{artifact['relative_path']}"
+        response.headers['Content-Disposition'] = f'attachment; filename="{artifact["file_name"]}"'
+        return response
+    
+    # conditional=True answers Range / If-Range requests with 206 partial content;
+    # send_file emits X-Sendfile itself when USE_X_SENDFILE is enabled
+    return send_file(
+        artifact['path'],
+        as_attachment=True,
+        download_name=artifact['file_name'],
+        mimetype=artifact['mimetype'],
+        conditional=True,
+        etag=artifact['digest']
+    )
+
+def artifact_accepted(result):
+    """Respond 202 with where to poll a queued export"""
+    if not result['success']:
         return jsonify({'error': result['error']}), 400
+    
+    artifact_id = result['artifact_id']
+    return jsonify({
+        'artifact_id': artifact_id,
+        'status': result['status'],
+        'status_url': url_for('export.artifact_status', artifact_id=artifact_id),
+        'download_url': url_for('export.download_artifact', artifact_id=artifact_id)
+    }), 202
 
 @export_bp.route('/bulk-marksheets')
 @login_required
 @role_required('admin', 'teacher')
 @usage_tracked('bulk_pdf_generation')
 def export_bulk_marksheets():
-    """Export multiple marksheets"""
+    """Export multiple marksheets, streamed as they render
+
+    With format=pdf the class is rendered into one merged, bookmarked PDF
+    instead of a ZIP of separate marksheets, as a queued export.
+    """
     class_name = request.args.get('class')
     exam_type = request.args.get('exam')
+    academic_year = request.args.get('academic_year')
+    
+    if request.args.get('format') == 'pdf':
+        result = ArtifactService.submit(
+            'class_marksheets_pdf',
+            {'class_name': class_name, 'exam_type': exam_type, 'academic_year': academic_year},
+            g.organization_id, current_user.id
+        )
+        return artifact_accepted(result)
     
-    result = ExportService.generate_bulk_marksheets(class_name, exam_type, g.organization_id)
+    result = ExportService.stream_bulk_marksheets(class_name, exam_type, g.organization_id, academic_year)
     
     if result['success']:
-        return send_file(
-            result['file_path'],
-            as_attachment=True,
-            download_name=f"bulk_marksheets_{class_name}_{exam_type}.zip",
-            mimetype='application/zip'
+        return Response(
+            result['stream'],
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename="bulk_marksheets_{class_name}_{exam_type}.zip"',
+                # Completed archive can be re-downloaded (and resumed) from /bulk-marksheets/<artifact>
+                'X-Export-Artifact': result['artifact_name']
+            }
         )
     else:
         return jsonify({'error': result['error']}), 400
+
+@export_bp.route('/bulk-marksheets/<artifact_name>')
+@login_required
+@role_required('admin', 'teacher')
+def download_bulk_marksheets(artifact_name):
+    """Download a completed bulk marksheet archive or merged PDF, with Range support for resuming"""
+    # Validate filename to prevent directory traversal
+    if artifact_name != secure_filename(artifact_name) or not artifact_name.endswith(('.zip', '.pdf')):
+        abort(400, 'Invalid filename')
+    
+    artifacts_dir = current_app.config.get('EXPORT_ARTIFACTS_DIR', 'exports')
+    file_path = os.path.join(artifacts_dir, str(g.organization_id), artifact_name)
+    if not os.path.isfile(file_path):
+        abort(404, 'Export not found')
+    
+    # conditional=True answers Range / If-Range requests with 206 partial content
+    return send_file(
+        file_path,
+        as_attachment=True,
+        download_name=artifact_name,
+        mimetype='application/pdf' if artifact_name.endswith('.pdf') else 'application/zip',
+        conditional=True,
+        etag=True
+    )
+
+def _table_response(result):
+    """Stream a tabular export as a download"""
+    if not result['success']:
+        return jsonify({'error': result['error']}), 400
+    
+    return Response(
+        stream_with_context(result['stream']),
+        mimetype=result['mimetype'],
+        headers={'Content-Disposition': f'attachment; filename="{result["file_name"]}"'}
+    )
+
 @export_bp.route('/student-list')
 @login_required
 @role_required('admin', 'teacher')
 @usage_tracked('student_list_export')
 def export_student_list():
-    """Export student list"""
-    result = ExportService.generate_student_list(g.organization_id)
+    """Export the student list as CSV, XLSX or NDJSON (format=csv|xlsx|ndjson)"""
+    result = ExportService.generate_student_list(
+        g.organization_id, request.args.get('format'), class_name=request.args.get('class')
+    )
+    return _table_response(result)
 
-    if result['success']:
-        return send_file(
-            result['file_path'],
-            as_attachment=True,
-            download_name="student_list.csv",
-            mimetype='text/csv'
-        )
-    else:
-        return jsonify({'error': result['error']}), 400
\ No newline at end of file
+@export_bp.route('/results')
+@login_required
+@role_required('admin', 'teacher')
+@usage_tracked('result_export')
+def export_results():
+    """Export a term's results, one row per student and a column per subject"""
+    result = ExportService.generate_result_sheet(
+        g.organization_id, request.args.get('format'),
+        class_name=request.args.get('class'),
+        exam_type=request.args.get('exam'),
+        academic_year=request.args.get('academic_year')
+    )
+    return _table_response(result)
+
+@export_bp.route('/analytics')
+@login_required
+@role_required('admin', 'teacher')
+@usage_tracked('analytics_export')
+def export_analytics():
+    """Export the per-student analytics"""
+    result = ExportService.generate_analytics_export(
+        g.organization_id, request.args.get('format'),
+        class_name=request.args.get('class'),
+        academic_year=request.args.get('academic_year'),
+        term=request.args.get('term')
+    )
+    return _table_response(result)
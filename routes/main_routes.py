@@ -1,6 +1,7 @@
 # routes/main_routes.py
 from flask import Blueprint, render_template, redirect, url_for
 from flask_login import current_user
+from utils.qr import describe_claims, verify_token
 
 main_bp = Blueprint('main', __name__)
 
@@ -49,6 +50,15 @@ def terms():
 def cookies():
     """Cookie policy"""
     return render_template('shared/cookies.html')
+@main_bp.route('/V/<token>')
+def verify(token):
+    """Verification page of a marksheet or certificate QR code"""
+    # Scanners may lower-case the link; tokens are upper case base32
+    claims = verify_token(token.upper())
+    if claims is None:
+        return render_template('public/verify.html', claims=None), 404
+    return render_template('public/verify.html', claims=describe_claims(claims))
+
 @main_bp.route('/404')
 def not_found():
     """404 Not Found"""
@@ -1,12 +1,17 @@
 # routes/results.py
 from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash, g
+from flask_login import current_user
 from auth.decorators import login_required, role_required
 from middleware.subscription import feature_required, usage_tracked
+from routes.export import artifact_accepted
+from services.artifact_service import ArtifactService
+from services.artifact_store import ArtifactStore
 from services.result_service import ResultService
 from services.student_service import StudentService
 from models.result import Result
 from models.student import Student
 import json
+import os
 
 results_bp = Blueprint('results', __name__)
 
@@ -46,30 +51,79 @@ def enter_result():
 @feature_required('bulk_import')
 @usage_tracked('bulk_entry')
 def bulk_entry():
-    """Bulk result import"""
+    """Bulk result import
+    
+    With dry_run set, nothing is imported: the response is the JSON plan
+    (what would be inserted, updated or rejected) with a token. Posting the
+    token back, without a file, imports the previewed rows.
+    """
     if request.method == 'POST':
-        if 'file' not in request.files:
-            flash('No file selected', 'error')
-            return redirect(request.url)
-        
-        file = request.files['file']
-        if file.filename == '':
+        token = request.form.get('token')
+        if token:
+            result = ResultService.commit_result_import(token, g.organization_id, current_user.id)
+        elif 'file' not in request.files or request.files['file'].filename == '':
             flash('No file selected', 'error')
             return redirect(request.url)
+        elif request.files['file'].filename.endswith(('.csv', '.xlsx')):
+            dry_run = request.form.get('dry_run', '').lower() in ['true', 'on', '1']
+            result = ResultService.bulk_import_results(
+                request.files['file'], g.organization_id, current_user.id,
+                academic_year=request.form.get('academic_year'),
+                term=request.form.get('term'),
+                dry_run=dry_run
+            )
+            if dry_run:
+                return jsonify(result), 200 if result['success'] else 400
+        else:
+            result = None
+            flash('Please upload a CSV or Excel file', 'error')
         
-        if file and file.filename.endswith(('.csv', '.xlsx')):
-            result = ResultService.bulk_import_results(file, g.organization_id)
+        if result is not None:
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify(result), 200 if result['success'] else 400
             
+            if result.get('rejected'):
+                first = '; '.join(f"row {e['row']}: {e['message']}" for e in result['errors'][:5])
+                flash(f'{result["rejected"]} rows were rejected ({first})', 'warning')
             if result['success']:
                 flash(f'Successfully imported {result["count"]} results', 'success')
                 return redirect(url_for('results.view_results'))
             else:
                 flash(result['error'], 'error')
-        else:
-            flash('Please upload a CSV or Excel file', 'error')
     
     return render_template('bulk_entry.html')
 
+@results_bp.route('/import-history', methods=['POST'])
+@login_required
+@role_required('admin')
+@feature_required('bulk_import')
+@usage_tracked('bulk_entry')
+def import_history():
+    """Queue a COPY load of a large result CSV (e.g. years of history)
+
+    Poll /export/artifacts/<artifact_id> for progress and the summary; the
+    artifact is the report of rejected rows.
+    """
+    file = request.files.get('file')
+    if not file or not file.filename.endswith('.csv'):
+        return jsonify({'error': 'Please upload a CSV file'}), 400
+
+    source = ArtifactStore.shared().temp_path('.csv')
+    file.save(source)
+    result = ArtifactService.submit(
+        'result_history',
+        {
+            'source': source,
+            'user_id': str(current_user.id),
+            'academic_year': request.form.get('academic_year'),
+            'term': request.form.get('term')
+        },
+        g.organization_id, current_user.id
+    )
+    if not result['success']:
+        os.remove(source)
+    return artifact_accepted(result)
+
 @results_bp.route('/view')
 @login_required
 def view_results():
@@ -124,6 +178,7 @@ def student_detail(student_id):
 
 # routes/student.py
 from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash, g
+from flask_login import current_user
 from auth.decorators import login_required, role_required
 from services.student_service import StudentService
 from models.student import Student
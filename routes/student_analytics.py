@@ -1,13 +1,15 @@
-from flask import Blueprint, jsonify, request, render_template, current_app, abort, send_file
+from flask import Blueprint, jsonify, request, render_template, current_app, abort, send_file, url_for
 from flask_login import login_required, current_user
 import uuid
 import os
 
 from middleware.feature_required import feature_required
 from middleware.tenant_required import tenant_required
+from services.artifact_service import ArtifactService
 from services.student_analytics_service import StudentAnalyticsService
+from services.leaderboard_service import LeaderboardService
 from models.student import Student
-from jobs.analytics_jobs import calculate_student_analytics_task, generate_student_report_task
+from jobs.analytics_jobs import calculate_student_analytics_task
 
 student_analytics_bp = Blueprint('student_analytics', __name__)
 
@@ -219,15 +221,19 @@ def generate_student_report(student_id):
     academic_year = data.get('academic_year', request.form.get('academic_year', '2023'))
     term = data.get('term', request.form.get('term', 'Annual'))
     
-    # Queue report generation task
-    task = generate_student_report_task.delay(
-        str(student_id), str(current_user.organization_id), academic_year, term
+    # Queue report generation as an export artifact
+    result = ArtifactService.submit(
+        'student_report',
+        {'student_id': str(student_id), 'academic_year': academic_year, 'term': term},
+        current_user.organization_id, current_user.id
     )
+    if not result['success']:
+        return jsonify({'status': 'error', 'message': result['error']}), 400
     
     return jsonify({
         'status': 'success',
         'message': 'Report generation has been queued',
-        'task_id': str(task.id)
+        'task_id': result['artifact_id']
     })
 
 @student_analytics_bp.route('/api/report/<task_id>/status')
@@ -243,36 +249,31 @@ def check_report_status(task_id):
     Returns:
         JSON: The task status
     """
-    # Import here to avoid circular imports
-    from jobs.celery_app import celery_app
-    
-    # Check task status
-    task = celery_app.AsyncResult(task_id)
+    artifact = ArtifactService.status(task_id, current_user.organization_id)
     
-    if task.state == 'PENDING':
+    if artifact is None:
+        response = {
+            'status': 'error',
+            'message': 'Report not found'
+        }
+    elif artifact['status'] == 'queued':
         response = {
             'status': 'pending',
             'message': 'Report generation is pending'
         }
-    elif task.state == 'FAILURE':
+    elif artifact['status'] == 'failed':
         response = {
             'status': 'error',
-            'message': str(task.info.get('message', 'Unknown error'))
+            'message': artifact['error'] or 'Unknown error'
+        }
+    elif artifact['status'] == 'ready':
+        response = {
+            'status': 'success',
+            'message': 'Report generated successfully',
+            # Reports are downloaded by artifact ID
+            'filename': artifact['id'],
+            'download_url': url_for('student_analytics.download_report', filename=artifact['id'])
         }
-    elif task.state == 'SUCCESS':
-        result = task.get()
-        if result.get('status') == 'success':
-            response = {
-                'status': 'success',
-                'message': 'Report generated successfully',
-                'file_path': result.get('file_path'),
-                'filename': result.get('filename')
-            }
-        else:
-            response = {
-                'status': 'error',
-                'message': result.get('message', 'Unknown error')
-            }
     else:
         response = {
             'status': 'processing',
@@ -289,34 +290,124 @@ def download_report(filename):
     """API endpoint to download a generated report
     
     Args:
-        filename (str): The filename of the report
+        filename (str): The report's artifact ID, as returned by the status endpoint
         
     Returns:
         File: The report file
     """
-    # Validate filename to prevent directory traversal
-    if '..' in filename or '/' in filename:
-        abort(400, 'Invalid filename')
-    
-    # Get reports directory
-    reports_dir = current_app.config.get('REPORTS_DIR', 'reports')
-    file_path = os.path.join(reports_dir, str(current_user.organization_id), filename)
-    
-    # Check if file exists
-    if not os.path.isfile(file_path):
+    artifact = ArtifactService.download(filename, current_user.organization_id)
+    if artifact is None:
         abort(404, 'Report not found')
     
-    # Check if file belongs to the current organization
-    if str(current_user.organization_id) not in file_path:
-        abort(403, 'Unauthorized access to report')
-    
     return send_file(
-        file_path,
+        artifact['path'],
         as_attachment=True,
-        download_name=filename,
-        mimetype='application/pdf'
+        download_name=artifact['file_name'],
+        mimetype=artifact['mimetype'],
+        conditional=True,
+        etag=artifact['digest']
     )
 
+@student_analytics_bp.route('/api/class/<class_name>/students')
+@login_required
+@tenant_required
+@feature_required('analytics')
+def get_class_student_analytics(class_name):
+    """API endpoint to get analytics for every student in a class
+
+    Args:
+        class_name (str): The name of the class
+
+    Returns:
+        JSON: Paginated per-student analytics, rank, comparison and trend data
+    """
+    # Get parameters
+    academic_year = request.args.get('academic_year', '2023')
+    term = request.args.get('term', 'Annual')
+    section = request.args.get('section')
+    period = request.args.get('period', '12months')
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 50, type=int)
+    fields = request.args.get('fields')
+    if fields:
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+
+    # Compute (or load) the whole class in one batch
+    class_analytics = StudentAnalyticsService.get_class_analytics(
+        current_user.organization_id, class_name, section, academic_year, term,
+        page=page, per_page=per_page, fields=fields, period=period
+    )
+
+    if not class_analytics['pagination']['total']:
+        return jsonify({
+            'status': 'error',
+            'message': 'No students found for the specified class'
+        }), 404
+
+    return jsonify({
+        'status': 'success',
+        'data': class_analytics
+    })
+
+@student_analytics_bp.route('/api/class/<class_name>/leaderboard')
+@login_required
+@tenant_required
+@feature_required('analytics')
+def get_class_leaderboard(class_name):
+    """API endpoint to get live class ranks and subject toppers
+
+    Args:
+        class_name (str): The name of the class
+
+    Returns:
+        JSON: Top students, subject toppers and optionally a student's rank and neighbours
+    """
+    # Get parameters
+    academic_year = request.args.get('academic_year', '2023')
+    term = request.args.get('term', 'Annual')
+    section = request.args.get('section')
+    subject_id = request.args.get('subject_id')
+    student_id = request.args.get('student_id')
+    k = request.args.get('k', 10, type=int)
+
+    leaderboard = LeaderboardService()
+    if section:
+        board = LeaderboardService.board_key(
+            current_user.organization_id, class_name, section, academic_year, term
+        )
+    else:
+        # Boards are kept per section; rank the whole class across them
+        board = leaderboard.class_board(current_user.organization_id, class_name, academic_year, term)
+
+    top = leaderboard.get_top(board, k=k, subject_id=subject_id) if board else None
+    if top is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Leaderboards are currently unavailable'
+        }), 503
+
+    data = {
+        'top': top,
+        'subject_toppers': leaderboard.get_subject_toppers(board) or {}
+    }
+    if student_id:
+        data['rank'] = leaderboard.get_rank(board, student_id, subject_id=subject_id)
+        data['neighbors'] = leaderboard.get_neighbors(board, student_id, subject_id=subject_id) or []
+
+    # Attach names with one lookup for every student on the page
+    entries = data['top'] + list(data['subject_toppers'].values()) + data.get('neighbors', [])
+    names = dict(Student.query.with_entities(Student.id, Student.name).filter(
+        Student.organization_id == current_user.organization_id,
+        Student.id.in_({uuid.UUID(e['student_id']) for e in entries})
+    ).all()) if entries else {}
+    for entry in entries:
+        entry['name'] = names.get(uuid.UUID(entry['student_id']))
+
+    return jsonify({
+        'status': 'success',
+        'data': data
+    })
+
 @student_analytics_bp.route('/api/class/<class_name>/analytics')
 @login_required
 @tenant_required
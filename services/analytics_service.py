@@ -6,6 +6,7 @@ from models.student import Student
 from models.subject import Subject
 from models.base import db
 from services.base_service import BaseService
+from utils.grading import get_grading_scheme
 from datetime import datetime, timedelta
 
 class AnalyticsService(BaseService):
@@ -60,9 +61,10 @@ class AnalyticsService(BaseService):
         if subject:
             query = query.filter(Result.subjects.any(name=subject))
         results = query.all()
-        grade_counts = {'A+': 0, 'A': 0, 'B+': 0, 'B': 0, 'C': 0, 'D': 0, 'F': 0}
+        scheme = get_grading_scheme(organization_id, class_name)
+        grade_counts = {grade: 0 for grade in scheme.grade_order}
         for r in results:
-            grade = getattr(r, 'grade', 'F')
+            grade = getattr(r, 'grade', None) or scheme.fail_grade
             grade_counts[grade] = grade_counts.get(grade, 0) + 1
         return grade_counts
 
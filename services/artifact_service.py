@@ -0,0 +1,438 @@
+# services/artifact_service.py
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from flask import current_app
+
+from services.artifact_store import ACTIVE_STATES, FAILED, QUEUED, READY, RUNNING, ArtifactStore
+from services.render_cache import RenderCache
+from utils.config import config_value
+
+logger = logging.getLogger(__name__)
+
+# Report artifacts.
+#
+# Generating a document can take from a fraction of a second (a marksheet)
+# to minutes (every marksheet of a large class), too long to hold a request
+# open. Routes submit a job instead and get an artifact ID back at once; a
+# worker renders the document into the ArtifactStore and the client polls the
+# artifact's status and downloads it when ready. Jobs are records in the
+# store, so a job whose worker died (or that was queued in a process that
+# restarted) is picked up again by recover().
+#
+# A worker holds a job's lease for as long as it renders it: a heartbeat
+# thread renews the lease every third of ARTIFACT_LEASE_SECONDS, as does
+# every progress report, so recover() only requeues jobs whose worker has
+# stopped, however long they take.
+#
+# Renderers are registered per artifact kind with register_renderer and
+# write the document to a path they are given. Workers are threads of the
+# web process by default; with ARTIFACT_EXECUTOR = 'celery' jobs are sent to
+# the render_artifact task in jobs/report_jobs.py instead.
+
+DEFAULT_WORKERS = 2
+DEFAULT_LEASE_SECONDS = 10 * 60
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_MAX_ACTIVE_JOBS = 5
+
+_renderers: Dict[str, Callable[[Dict[str, Any], Any, str], Dict[str, Any]]] = {}
+# Kinds whose renderer takes a progress callback
+_progress_kinds = set()
+
+# Seconds between progress writes to a job record
+PROGRESS_INTERVAL = 2
+
+def register_renderer(kind: str, progress: bool = False):
+    """Register the renderer of an artifact kind
+
+    A renderer is called as renderer(params, organization_id, output_path),
+    writes the document to output_path and returns the ExportService style
+    result dict: success, error, the file_name and mimetype to download it
+    as and, optionally, a JSON-serializable summary shown with the status.
+
+    Args:
+        kind (str): Artifact kind, e.g. marksheet
+        progress (bool): Also pass progress=callback, to be called as
+            callback(done, total) while the renderer works
+
+    Returns:
+        callable: Decorator registering the function
+    """
+    def decorator(render):
+        _renderers[kind] = render
+        if progress:
+            _progress_kinds.add(kind)
+        return render
+    return decorator
+
+class ArtifactWorker:
+    """Thread pool rendering artifact jobs inside the web process"""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, app, workers: int = DEFAULT_WORKERS):
+        """Initialize the worker pool
+
+        Args:
+            app (Flask): Application whose context jobs run in
+            workers (int): Number of threads
+        """
+        self.app = app
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='artifact-worker')
+
+    @classmethod
+    def shared(cls) -> 'ArtifactWorker':
+        """Get the process-wide worker pool, picking up jobs left by a previous process"""
+        with cls._shared_lock:
+            created = cls._shared is None
+            if created:
+                cls._shared = cls(current_app._get_current_object(), config_value('ARTIFACT_WORKERS', DEFAULT_WORKERS))
+        if created:
+            cls._shared.submit(None, None)
+        return cls._shared
+
+    def submit(self, artifact_id: Optional[str], organization_id) -> None:
+        """Queue a job (or, without an ID, a recovery pass)"""
+        self.executor.submit(self._run, artifact_id, organization_id)
+
+    def _run(self, artifact_id, organization_id) -> None:
+        with self.app.app_context():
+            try:
+                if artifact_id is None:
+                    ArtifactService.recover()
+                else:
+                    ArtifactService.run(artifact_id, organization_id)
+            except Exception as e:
+                logger.error(f"Artifact worker error for {artifact_id}: {str(e)}")
+
+def _progress_callback(store: ArtifactStore, record: Dict[str, Any]) -> Callable[[int, Optional[int]], None]:
+    """Callback recording a running job's progress on its record and renewing its lease,
+    at most every PROGRESS_INTERVAL seconds"""
+    last_saved = [0.0]
+
+    def report(done: int, total: Optional[int] = None) -> None:
+        record['progress'] = {'done': done, 'total': total}
+        now = time.monotonic()
+        if now - last_saved[0] >= PROGRESS_INTERVAL or (total is not None and done >= total):
+            last_saved[0] = now
+            store.renew(record)
+            store.save(record)
+    return report
+
+class _LeaseHeartbeat:
+    """Thread renewing a job's lease while it renders, also through phases reporting no progress"""
+
+    def __init__(self, store: ArtifactStore, record: Dict[str, Any], lease: float):
+        self.store = store
+        self.record = record
+        self.interval = max(lease / 3, 0.1)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f"lease-{record['id']}", daemon=True)
+
+    def __enter__(self) -> '_LeaseHeartbeat':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _beat(self) -> None:
+        while not self._stop.wait(self.interval):
+            if not self.store.renew(self.record):
+                logger.warning(f"Lost the lease on artifact job {self.record['id']}")
+                return
+
+class ArtifactService:
+    """Submit, run and serve report artifact jobs"""
+
+    @staticmethod
+    def submit(kind: str, params: Dict[str, Any], organization_id, user_id=None) -> Dict[str, Any]:
+        """Queue the generation of an artifact
+
+        A job with the same kind and parameters that is still queued or
+        running is reused rather than rendered twice.
+
+        Args:
+            kind (str): Artifact kind with a registered renderer
+            params (dict): JSON-serializable render parameters
+            organization_id (UUID): The organization ID for tenant isolation
+            user_id (UUID, optional): User requesting the artifact
+
+        Returns:
+            dict: success, error, artifact_id and status
+        """
+        if kind not in _renderers:
+            return {'success': False, 'error': f"Unknown artifact kind: {kind}", 'artifact_id': None}
+
+        store = ArtifactStore.shared()
+        request_key = RenderCache.key('artifact', params, None, kind)
+        active = [record for record in store.records(organization_id) if record['status'] in ACTIVE_STATES]
+        for record in active:
+            if record.get('request_key') == request_key:
+                return {'success': True, 'error': None, 'artifact_id': record['id'], 'status': record['status']}
+
+        if len(active) >= config_value('ARTIFACT_MAX_ACTIVE_JOBS', DEFAULT_MAX_ACTIVE_JOBS):
+            return {
+                'success': False,
+                'error': 'Too many exports in progress, try again when they finish',
+                'artifact_id': None
+            }
+
+        record = store.create(
+            organization_id, kind, params,
+            request_key=request_key,
+            created_by=str(user_id) if user_id else None
+        )
+        ArtifactService._dispatch(record)
+        return {'success': True, 'error': None, 'artifact_id': record['id'], 'status': record['status']}
+
+    @staticmethod
+    def _dispatch(record: Dict[str, Any]) -> None:
+        """Hand a job to the configured executor"""
+        if config_value('ARTIFACT_EXECUTOR', 'thread') == 'celery':
+            from jobs.report_jobs import render_artifact_task
+            render_artifact_task.delay(record['id'], record['organization_id'])
+        else:
+            ArtifactWorker.shared().submit(record['id'], record['organization_id'])
+
+    @staticmethod
+    def run(artifact_id: str, organization_id) -> Optional[Dict[str, Any]]:
+        """Render a queued artifact (worker side)
+
+        Args:
+            artifact_id (str): The artifact ID
+            organization_id (UUID): The organization ID for tenant isolation
+
+        Returns:
+            dict: The record after the run, or None if there is no such job
+        """
+        store = ArtifactStore.shared()
+        record = store.load(organization_id, artifact_id)
+        if record is None or record['status'] not in ACTIVE_STATES:
+            return record
+
+        lease = config_value('ARTIFACT_LEASE_SECONDS', DEFAULT_LEASE_SECONDS)
+        if not store.claim(record, lease):
+            # Another worker is rendering it
+            return record
+
+        output_path = None
+        try:
+            record['status'] = RUNNING
+            record['attempts'] += 1
+            store.save(record)
+
+            output_path = store.temp_path()
+            kwargs = {}
+            if record['kind'] in _progress_kinds:
+                kwargs['progress'] = _progress_callback(store, record)
+            with _LeaseHeartbeat(store, record, lease):
+                result = _renderers[record['kind']](record['params'], organization_id, output_path, **kwargs)
+            if not result.get('success'):
+                raise RuntimeError(result.get('error') or 'Render failed')
+
+            record['digest'], record['size'] = store.put_file(output_path)
+            record['file_name'] = result.get('file_name') or f"{record['kind']}.pdf"
+            record['mimetype'] = result.get('mimetype') or 'application/pdf'
+            record['summary'] = result.get('summary')
+            record['status'] = READY
+            record['error'] = None
+            record['expires_at'] = time.time() + store.ttl
+            store.save(record)
+            store.enforce_quota(organization_id, keep=record['id'])
+        except Exception as e:
+            logger.error(f"Error rendering artifact {artifact_id} ({record['kind']}): {str(e)}")
+            record['status'] = FAILED
+            record['error'] = str(e)
+            store.save(record)
+        finally:
+            store.release(record)
+            if output_path and os.path.exists(output_path):
+                os.remove(output_path)
+        return record
+
+    @staticmethod
+    def recover() -> int:
+        """Requeue jobs that no live worker holds, e.g. after a restart
+
+        Returns:
+            int: Number of jobs requeued
+        """
+        store = ArtifactStore.shared()
+        lease = config_value('ARTIFACT_LEASE_SECONDS', DEFAULT_LEASE_SECONDS)
+        max_attempts = config_value('ARTIFACT_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+        now = time.time()
+        requeued = 0
+        for record in list(store.records()):
+            if record['status'] not in ACTIVE_STATES or store.is_claimed(record, lease):
+                continue
+            # Queued jobs get a lease's grace to be picked up where they were sent
+            if record['status'] == QUEUED and record['updated_at'] + lease > now:
+                continue
+            if record['attempts'] >= max_attempts:
+                record['status'] = FAILED
+                record['error'] = 'Export did not complete, please try again'
+                store.save(record)
+                continue
+            record['status'] = QUEUED
+            store.save(record)
+            ArtifactService._dispatch(record)
+            requeued += 1
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted artifact jobs")
+        return requeued
+
+    @staticmethod
+    def cleanup() -> Dict[str, int]:
+        """Expire old artifacts and requeue interrupted jobs
+
+        Returns:
+            dict: Numbers of expired records, removed objects and requeued jobs
+        """
+        stats = ArtifactStore.shared().cleanup()
+        stats['requeued'] = ArtifactService.recover()
+        return stats
+
+    @staticmethod
+    def status(artifact_id: str, organization_id) -> Optional[Dict[str, Any]]:
+        """Describe an artifact for the API
+
+        Args:
+            artifact_id (str): The artifact ID
+            organization_id (UUID): The organization ID for tenant isolation
+
+        Returns:
+            dict: id, kind, status, error, file_name, size, created_at,
+            expires_at, progress (done, total) and summary, or None if the
+            organization has no such artifact
+        """
+        record = ArtifactStore.shared().load(organization_id, artifact_id)
+        if record is None:
+            return None
+
+        def iso(timestamp):
+            return datetime.utcfromtimestamp(timestamp).isoformat() + 'Z' if timestamp else None
+
+        return {
+            'id': record['id'],
+            'kind': record['kind'],
+            'status': record['status'],
+            'error': record['error'],
+            'file_name': record['file_name'],
+            'size': record['size'],
+            'created_at': iso(record['created_at']),
+            'expires_at': iso(record['expires_at']),
+            'progress': record.get('progress'),
+            'summary': record.get('summary')
+        }
+
+    @staticmethod
+    def download(artifact_id: str, organization_id) -> Optional[Dict[str, Any]]:
+        """Locate a ready artifact's file
+
+        Args:
+            artifact_id (str): The artifact ID
+            organization_id (UUID): The organization ID for tenant isolation
+
+        Returns:
+            dict: path, file_name, mimetype and digest, or None if the
+            artifact is not ready (or has expired)
+        """
+        store = ArtifactStore.shared()
+        record = store.load(organization_id, artifact_id)
+        if record is None or record['status'] != READY or (record['expires_at'] or 0) <= time.time():
+            return None
+        path = store.object_path(record['digest'])
+        if not os.path.isfile(path):
+            return None
+        return {
+            'path': path,
+            'relative_path': os.path.relpath(path, store.root),
+            'file_name': record['file_name'],
+            'mimetype': record['mimetype'],
+            'digest': record['digest']
+        }
+
+# Renderers of the export artifacts
+
+@register_renderer('marksheet')
+def _render_marksheet(params, organization_id, output_path):
+    from services.export_service import ExportService
+    return ExportService.generate_marksheet(
+        params['student_id'], params.get('exam_id'), organization_id,
+        academic_year=params.get('academic_year'), output_path=output_path
+    )
+
+@register_renderer('student_report')
+def _render_student_report(params, organization_id, output_path):
+    from services.export_service import ExportService
+    return ExportService.generate_marksheet(
+        params['student_id'], params.get('term'), organization_id,
+        academic_year=params.get('academic_year'), output_path=output_path,
+        customization={'include_analytics': True}
+    )
+
+@register_renderer('class_result')
+def _render_class_result(params, organization_id, output_path):
+    from services.export_service import ExportService
+    return ExportService.generate_class_result(
+        params['class_name'], params.get('exam_type'), organization_id,
+        academic_year=params.get('academic_year'), output_path=output_path
+    )
+
+@register_renderer('bulk_marksheets')
+def _render_bulk_marksheets(params, organization_id, output_path):
+    from services.export_service import ExportService
+    return ExportService.generate_bulk_marksheets(
+        params['class_name'], params.get('exam_type'), organization_id,
+        params.get('academic_year'), output_path=output_path
+    )
+
+@register_renderer('class_marksheets_pdf')
+def _render_class_marksheets_pdf(params, organization_id, output_path):
+    from services.export_service import ExportService
+    return ExportService.generate_class_marksheets_pdf(
+        params['class_name'], params.get('exam_type'), organization_id,
+        params.get('academic_year'), output_path=output_path
+    )
+
+@register_renderer('certificates')
+def _render_certificates(params, organization_id, output_path):
+    from services.certificate_service import CertificateService
+    return CertificateService.generate_batch(
+        params['rules'], params.get('exam_type'), organization_id,
+        class_names=params.get('classes'), academic_year=params.get('academic_year'),
+        output_path=output_path
+    )
+
+@register_renderer('result_history', progress=True)
+def _render_result_history(params, organization_id, output_path, progress=None):
+    from services.result_copy_loader import ResultCopyLoader
+    loader = ResultCopyLoader(
+        organization_id, params.get('user_id'), params.get('academic_year'), params.get('term'), progress=progress
+    )
+    with open(params['source'], 'rb') as source, open(output_path, 'wb') as report:
+        result = loader.load(source, report)
+    if result['success']:
+        os.remove(params['source'])
+    return {
+        'success': result['success'],
+        'error': result.get('error'),
+        'file_name': 'result_import_errors.csv',
+        'mimetype': 'text/csv',
+        'summary': {key: value for key, value in result.items() if key not in ('success', 'error')}
+    }
+
+@register_renderer('parquet_export', progress=True)
+def _render_parquet_export(params, organization_id, output_path, progress=None):
+    from services.parquet_export import ParquetExport
+    return ParquetExport.generate(
+        organization_id, params.get('from_year'), params.get('to_year'),
+        output_path=output_path, progress=progress
+    )
@@ -0,0 +1,364 @@
+# services/artifact_store.py
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from utils.config import config_value
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = 'artifacts'
+DEFAULT_TTL_SECONDS = 24 * 60 * 60  # 1 day
+DEFAULT_TENANT_QUOTA_BYTES = 1024 * 1024 * 1024  # 1GB
+
+# Job states; queued and running jobs are "active"
+QUEUED = 'queued'
+RUNNING = 'running'
+READY = 'ready'
+FAILED = 'failed'
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+class ArtifactStore:
+    """Local store of generated report artifacts and the jobs producing them
+
+    Files live under objects/ keyed by the SHA-256 of their content, so the
+    same document generated twice (or for two requests) is stored once. Each
+    job is a small JSON record under jobs/<organization>/ that names the
+    object it produced, so job state survives restarts of the web and worker
+    processes. Ready artifacts expire after ttl seconds; objects no longer
+    named by any record are removed by cleanup(). Every tenant may keep up to
+    quota_bytes of artifacts, its oldest ones being dropped to make room.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR, ttl: int = DEFAULT_TTL_SECONDS,
+                 quota_bytes: int = DEFAULT_TENANT_QUOTA_BYTES):
+        """Initialize the store
+
+        Args:
+            root (str): Directory of the store
+            ttl (int): Seconds a ready artifact is kept
+            quota_bytes (int): Bytes of artifacts each organization may keep
+        """
+        self.root = root
+        self.ttl = ttl
+        self.quota_bytes = quota_bytes
+        self._lock = threading.Lock()
+        # Lock file path -> owner token of the leases this store holds
+        self._leases: Dict[str, str] = {}
+        self._leases_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'ArtifactStore':
+        """Get the process-wide store configured from the app (or defaults)"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(
+                    config_value('ARTIFACT_STORE_DIR', DEFAULT_STORE_DIR),
+                    config_value('ARTIFACT_TTL_SECONDS', DEFAULT_TTL_SECONDS),
+                    config_value('ARTIFACT_TENANT_QUOTA_BYTES', DEFAULT_TENANT_QUOTA_BYTES)
+                )
+            return cls._shared
+
+    # Job records
+
+    def _record_path(self, organization_id, artifact_id: str) -> str:
+        return os.path.join(self.root, 'jobs', str(organization_id), f"{artifact_id}.json")
+
+    def create(self, organization_id, kind: str, params: Dict[str, Any], **fields) -> Dict[str, Any]:
+        """Create the record of a new queued job
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            kind (str): Artifact kind
+            params (dict): Parameters of the render
+            **fields: Extra fields to store on the record
+
+        Returns:
+            dict: The record
+        """
+        now = time.time()
+        record = {
+            'id': uuid.uuid4().hex,
+            'organization_id': str(organization_id),
+            'kind': kind,
+            'params': params,
+            'status': QUEUED,
+            'attempts': 0,
+            'created_at': now,
+            'updated_at': now,
+            'digest': None,
+            'size': None,
+            'file_name': None,
+            'mimetype': None,
+            'error': None,
+            'expires_at': None,
+            **fields
+        }
+        self.save(record)
+        return record
+
+    def save(self, record: Dict[str, Any]) -> None:
+        """Write a record atomically"""
+        record['updated_at'] = time.time()
+        path = self._record_path(record['organization_id'], record['id'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f, default=str)
+        os.replace(tmp_path, path)
+
+    def load(self, organization_id, artifact_id: str) -> Optional[Dict[str, Any]]:
+        """Read a record
+
+        Args:
+            organization_id (UUID): The organization the artifact must belong to
+            artifact_id (str): The artifact ID
+
+        Returns:
+            dict: The record, or None if there is none for this organization
+        """
+        if not artifact_id or not artifact_id.isalnum():
+            return None
+        try:
+            with open(self._record_path(organization_id, artifact_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def records(self, organization_id=None) -> Iterator[Dict[str, Any]]:
+        """Iterate over the records of one organization or of all of them"""
+        jobs_dir = os.path.join(self.root, 'jobs')
+        if organization_id is not None:
+            tenants = [str(organization_id)]
+        elif os.path.isdir(jobs_dir):
+            tenants = [entry.name for entry in os.scandir(jobs_dir) if entry.is_dir()]
+        else:
+            tenants = []
+        for tenant in tenants:
+            tenant_dir = os.path.join(jobs_dir, tenant)
+            if not os.path.isdir(tenant_dir):
+                continue
+            for entry in os.scandir(tenant_dir):
+                if entry.name.endswith('.json'):
+                    record = self.load(tenant, entry.name[:-5])
+                    if record is not None:
+                        yield record
+
+    def delete(self, record: Dict[str, Any]) -> None:
+        """Remove a record (its object goes at the next cleanup)"""
+        for path in (self._record_path(record['organization_id'], record['id']), self._lock_path(record)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # Job leases
+
+    def _lock_path(self, record: Dict[str, Any]) -> str:
+        return self._record_path(record['organization_id'], record['id'])[:-5] + '.lock'
+
+    def claim(self, record: Dict[str, Any], lease: float) -> bool:
+        """Take the lease on a job so only one worker renders it
+
+        The holder keeps the lease by renewing it (see renew) while the job
+        runs; a lease not renewed for lease seconds belongs to a worker that
+        died and is taken over.
+
+        Args:
+            record (dict): The job record
+            lease (float): Seconds a lease lasts without being renewed
+
+        Returns:
+            bool: Whether the lease was taken
+        """
+        path = self._lock_path(record)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, owner.encode('ascii'))
+                os.close(fd)
+                with self._leases_lock:
+                    self._leases[path] = owner
+                return True
+            except FileExistsError:
+                try:
+                    if os.path.getmtime(path) + lease > time.time():
+                        return False
+                    os.remove(path)
+                except OSError:
+                    pass
+        return False
+
+    def _holds(self, path: str) -> bool:
+        """Whether this store took the lease at path and nobody has taken it over since"""
+        with self._leases_lock:
+            owner = self._leases.get(path)
+        if owner is None:
+            return False
+        try:
+            with open(path, 'r', encoding='ascii') as f:
+                return f.read() == owner
+        except OSError:
+            return False
+
+    def renew(self, record: Dict[str, Any]) -> bool:
+        """Extend a lease this store holds by another lease period
+
+        Returns:
+            bool: False if the lease was lost, e.g. taken over after the
+            holder stalled for longer than the lease
+        """
+        path = self._lock_path(record)
+        if not self._holds(path):
+            return False
+        try:
+            os.utime(path)
+        except OSError:
+            return False
+        return True
+
+    def is_claimed(self, record: Dict[str, Any], lease: float) -> bool:
+        """Whether a live worker holds the job's lease"""
+        try:
+            return os.path.getmtime(self._lock_path(record)) + lease > time.time()
+        except OSError:
+            return False
+
+    def release(self, record: Dict[str, Any]) -> None:
+        """Give up the lease on a job, unless another worker has taken it over"""
+        path = self._lock_path(record)
+        if self._holds(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._leases_lock:
+            self._leases.pop(path, None)
+
+    # Objects
+
+    def object_path(self, digest: str) -> str:
+        """Path of a stored object"""
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def temp_path(self, suffix: str = '') -> str:
+        """A fresh path inside the store to render into (same filesystem as the objects)"""
+        tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        return os.path.join(tmp_dir, f"{uuid.uuid4().hex}{suffix}")
+
+    def put_file(self, path: str) -> Tuple[str, int]:
+        """Move a rendered file into the store
+
+        Args:
+            path (str): The file, consumed by the call
+
+        Returns:
+            tuple: The content digest and size in bytes
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        digest = digest.hexdigest()
+        size = os.path.getsize(path)
+
+        object_path = self.object_path(digest)
+        if os.path.exists(object_path):
+            # Same content already stored
+            os.remove(path)
+            os.utime(object_path)
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            shutil.move(path, object_path)
+        return digest, size
+
+    # Quotas and expiry
+
+    def usage(self, organization_id) -> int:
+        """Bytes of ready artifacts an organization keeps"""
+        return sum(record['size'] or 0 for record in self.records(organization_id) if record['status'] == READY)
+
+    def enforce_quota(self, organization_id, keep: Optional[str] = None) -> List[str]:
+        """Drop an organization's oldest ready artifacts until it is within quota
+
+        Args:
+            organization_id (UUID): The organization ID
+            keep (str, optional): Artifact never to drop (the one just added)
+
+        Returns:
+            list: IDs of the dropped artifacts
+        """
+        ready = sorted(
+            (record for record in self.records(organization_id) if record['status'] == READY),
+            key=lambda record: record['created_at']
+        )
+        usage = sum(record['size'] or 0 for record in ready)
+        dropped = []
+        for record in ready:
+            if usage <= self.quota_bytes:
+                break
+            if record['id'] == keep:
+                continue
+            self.delete(record)
+            usage -= record['size'] or 0
+            dropped.append(record['id'])
+        if dropped:
+            logger.info(f"Dropped {len(dropped)} artifacts of organization {organization_id} to stay within quota")
+        return dropped
+
+    def cleanup(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Remove expired records, stale temporary files and unreferenced objects
+
+        Failed jobs are kept for ttl seconds so their error can be reported.
+
+        Args:
+            now (float, optional): Current time, for tests
+
+        Returns:
+            dict: Numbers of expired records and removed objects
+        """
+        now = time.time() if now is None else now
+        expired = 0
+        referenced = set()
+        for record in list(self.records()):
+            finished = record['status'] in (READY, FAILED)
+            expires_at = record.get('expires_at') or (record['updated_at'] + self.ttl)
+            if finished and expires_at <= now:
+                self.delete(record)
+                expired += 1
+            elif record.get('digest'):
+                referenced.add(record['digest'])
+
+        removed = 0
+        with self._lock:
+            objects_dir = os.path.join(self.root, 'objects')
+            if os.path.isdir(objects_dir):
+                for shard in os.scandir(objects_dir):
+                    if not shard.is_dir():
+                        continue
+                    for entry in os.scandir(shard.path):
+                        # Objects just stored may not be referenced yet
+                        if entry.name not in referenced and entry.stat().st_mtime + 60 < now:
+                            os.remove(entry.path)
+                            removed += 1
+
+            tmp_dir = os.path.join(self.root, 'tmp')
+            if os.path.isdir(tmp_dir):
+                for entry in os.scandir(tmp_dir):
+                    if entry.stat().st_mtime + self.ttl < now:
+                        os.remove(entry.path)
+
+        if expired or removed:
+            logger.info(f"Artifact cleanup removed {expired} records and {removed} objects from {self.root}")
+        return {'expired': expired, 'removed_objects': removed}
@@ -0,0 +1,284 @@
+# services/asset_cache.py
+import hashlib
+import io
+import logging
+import math
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from PIL import Image as PILImage
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader, open_for_read
+from reportlab.platypus import Image
+from utils.config import config_value
+from utils.pdf_output import output_settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_DPI = 300
+# Remote assets cannot be stat'ed for changes; re-fetch them after this long
+REMOTE_TTL = 300
+
+# Marks a source that failed to load so it is not retried on every document
+_MISSING = object()
+
+class CachedImage(Image):
+    """Image flowable drawing a shared, already decoded ImageReader"""
+
+    def __init__(self, reader: ImageReader, width: Optional[float] = None, height: Optional[float] = None,
+                 kind: str = 'direct', hAlign: str = 'CENTER'):
+        # Set before Image.__init__ so it is not re-read from a file
+        self._img = reader
+        super().__init__(io.BytesIO(), width, height, kind=kind, hAlign=hAlign)
+
+def _is_remote(source: str) -> bool:
+    return source.startswith(('http://', 'https://'))
+
+def _normalize(image: PILImage.Image, max_pixels: Tuple[int, int], quality: int) -> Tuple[str, ImageReader]:
+    """Downsample an image to its printed size and convert it to a PDF-friendly mode
+
+    Opaque images are re-encoded as JPEG, which ReportLab embeds as is;
+    images with transparency keep their alpha channel.
+
+    Returns:
+        tuple: (digest of the converted image, reader)
+    """
+    image.thumbnail(max_pixels, PILImage.LANCZOS)
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    if has_alpha:
+        image = image.convert('RGBA')
+        return hashlib.sha1(image.tobytes()).hexdigest(), ImageReader(image)
+
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, 'JPEG', quality=quality, optimize=True)
+    digest = hashlib.sha1(buffer.getvalue()).hexdigest()
+    buffer.seek(0)
+    return digest, ImageReader(buffer)
+
+class AssetCache:
+    """In-memory LRU of organization logos, signatures and watermarks for PDF rendering
+
+    Logos and signatures are often multi-megabyte photos referenced by path
+    or URL. Each is read, decoded and downsampled to the size it is printed at
+    once; documents then share the decoded ImageReader, as do sources that
+    turn out to hold the same image. Watermark drawings
+    are built once per text. Local files are keyed by modification time so a
+    replaced file is picked up; everything cached for an organization is
+    dropped from this process's cache when its school profile changes.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, dpi: int = DEFAULT_DPI):
+        """Initialize the asset cache
+
+        Args:
+            max_entries (int): Images and drawings kept in memory
+            dpi (int): Resolution images are downsampled to at their printed size
+        """
+        self.max_entries = max_entries
+        self.dpi = dpi
+        self._entries = OrderedDict()
+        # Converted images by content, alive while any cached source uses them
+        self._by_content = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'AssetCache':
+        """Get the process-wide cache configured from the app (or defaults)"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(
+                    config_value('PDF_ASSET_CACHE_SIZE', DEFAULT_MAX_ENTRIES),
+                    config_value('PDF_ASSET_DPI', DEFAULT_DPI)
+                )
+            return cls._shared
+
+    def _get(self, key: tuple, expires: bool = False) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, loaded_at = entry
+            if expires and time.monotonic() - loaded_at > REMOTE_TTL:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _put(self, key: tuple, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def image_reader(self, source: str, width: float, height: float,
+                     organization_id: Optional[Any] = None, cache: bool = True) -> Optional[ImageReader]:
+        """Get an image decoded and downsampled for a printed size
+
+        Args:
+            source (str): File path or URL of the image
+            width (float): Printed width in points
+            height (float): Printed height in points
+            organization_id (UUID, optional): Organization the asset belongs to
+            cache (bool): Keep the image for later documents; per-student images
+                such as photos are converted but not kept
+
+        Returns:
+            ImageReader: Shared reader, or None if the image cannot be loaded
+        """
+        if not source:
+            return None
+
+        remote = _is_remote(source)
+        version = None
+        if not remote:
+            try:
+                stat = os.stat(source)
+                version = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                logger.warning(f"PDF asset not found: {source}")
+                return None
+
+        settings = output_settings()
+        key = ('image', str(organization_id) if organization_id else None, source, version, width, height,
+               settings['optimize'], settings['image_quality'])
+        reader = self._get(key, expires=remote) if cache else None
+        if reader is None:
+            try:
+                reader = self._load(source, width, height, organization_id, settings, cache)
+            except Exception as e:
+                logger.warning(f"Failed to load PDF asset {source}: {str(e)}")
+                reader = _MISSING
+            if cache:
+                self._put(key, reader)
+
+        return None if reader is _MISSING else reader
+
+    def _load(self, source: str, width: float, height: float, organization_id: Optional[Any],
+              settings: dict, dedupe: bool) -> ImageReader:
+        """Read and convert an image, reusing the reader of an identical converted image"""
+        with open_for_read(source, 'b') as f:
+            image = PILImage.open(f)
+            image.load()
+        if not settings['optimize']:
+            return ImageReader(image)
+
+        max_pixels = (
+            max(1, math.ceil(width * self.dpi / 72)),
+            max(1, math.ceil(height * self.dpi / 72))
+        )
+        digest, reader = _normalize(image, max_pixels, settings['image_quality'])
+        if not dedupe:
+            return reader
+
+        # The same logo is often uploaded under several paths (or used as the
+        # signature too); such images share one reader
+        content_key = (str(organization_id) if organization_id else None, digest)
+        with self._lock:
+            return self._by_content.setdefault(content_key, reader)
+
+    def image(self, source: str, width: float, height: float,
+              organization_id: Optional[Any] = None, cache: bool = True, **kwargs) -> Optional[CachedImage]:
+        """Get an Image flowable for a cached asset
+
+        Args:
+            source (str): File path or URL of the image
+            width (float): Printed width in points
+            height (float): Printed height in points
+            organization_id (UUID, optional): Organization the asset belongs to
+            cache (bool): Keep the image for later documents
+            **kwargs: Passed to the Image flowable (e.g. hAlign)
+
+        Returns:
+            CachedImage: New flowable sharing the decoded image, or None if it cannot be loaded
+        """
+        reader = self.image_reader(source, width, height, organization_id, cache)
+        if reader is None:
+            return None
+        return CachedImage(reader, width=width, height=height, **kwargs)
+
+    def watermark(self, text: str, organization_id: Optional[Any] = None) -> Drawing:
+        """Get a full-page watermark drawing
+
+        Args:
+            text (str): Watermark text
+            organization_id (UUID, optional): Organization the watermark belongs to
+
+        Returns:
+            Drawing: New drawing sharing the prebuilt watermark shapes
+        """
+        key = ('watermark', str(organization_id) if organization_id else None, text)
+        shared = self._get(key)
+        if shared is None:
+            shared = _build_watermark(text)
+            self._put(key, shared)
+
+        # Flowables are annotated while a document is built, so every
+        # document gets its own Drawing; the shapes themselves are read-only
+        drawing = Drawing(shared.width, shared.height)
+        drawing.contents = list(shared.contents)
+        return drawing
+
+    def invalidate(self, organization_id: Optional[Any] = None) -> None:
+        """Drop cached assets of an organization, or everything
+
+        Only this process's cache is cleared; other workers and bulk render
+        processes keep their copies until local files change (they are keyed
+        by modification time), remote ones expire or the process restarts.
+        Assets loaded without an organization ID are only dropped by a full
+        invalidation.
+
+        Args:
+            organization_id (UUID, optional): Organization whose assets changed
+        """
+        with self._lock:
+            if organization_id is None:
+                self._entries.clear()
+                self._by_content.clear()
+                return
+            org = str(organization_id)
+            for key in [key for key in self._entries if key[1] == org]:
+                del self._entries[key]
+            for key in [key for key in self._by_content.keys() if key[0] == org]:
+                self._by_content.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+def _build_watermark(watermark_text: str) -> Drawing:
+    """Build the watermark drawing for a text"""
+    width, height = A4
+    drawing = Drawing(width, height)
+
+    # Create rotated text using affine transformation
+    radians = math.radians(45)
+    cos_theta = math.cos(radians)
+    sin_theta = math.sin(radians)
+
+    # Calculate center point
+    cx, cy = width/2, height/2
+
+    # Create text string with rotation around center
+    text = String(
+        cx, cy,
+        watermark_text,
+        fontSize=60,
+        fillColor=colors.Color(0, 0, 0, alpha=0.1),
+        textAnchor='middle'
+    )
+
+    # Apply rotation transformation
+    text.x = cx + (text.x - cx) * cos_theta - (text.y - cy) * sin_theta
+    text.y = cy + (text.x - cx) * sin_theta + (text.y - cy) * cos_theta
+
+    drawing.add(text)
+    return drawing
@@ -4,14 +4,20 @@ from datetime import datetime, timedelta
 import uuid
 import io
 from flask import current_app, g
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 from sqlalchemy.orm import Session
 
 from models.base import db
 from auth.models import Subscription
 from models.organization import Organization
+from services.asset_cache import AssetCache
 from services.base_service import BaseService
 from services.pdf_service import BasePDFService
 from utils.error_handlers import ResourceNotFoundError, BusinessLogicError, audit_log
+from utils.pdf_output import doc_options
 
 class BillingService(BaseService):
     """Service for billing and invoice operations"""
@@ -159,10 +165,17 @@ class InvoicePDFService(BasePDFService):
     
     def generate_invoice(self, invoice_data: Dict[str, Any]) -> io.BytesIO:
         """Generate invoice PDF"""
+        return self._render_cached(
+            'invoice', invoice_data, None,
+            lambda: self._render_invoice(invoice_data)
+        )
+    
+    def _render_invoice(self, invoice_data: Dict[str, Any]) -> io.BytesIO:
+        """Render the invoice (bypasses the render cache)"""
         buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize='A4', 
+        doc = SimpleDocTemplate(buffer, **doc_options(pagesize=A4,
                                topMargin=0.5*inch, bottomMargin=0.5*inch,
-                               leftMargin=0.5*inch, rightMargin=0.5*inch)
+                               leftMargin=0.5*inch, rightMargin=0.5*inch))
         
         # Build invoice content
         story = self._build_invoice(invoice_data)
@@ -205,15 +218,10 @@ class InvoicePDFService(BasePDFService):
         header_data = []
         
         # Logo placeholder
-        logo_cell = ""
-        try:
-            # Use app logo if available
-            logo_path = current_app.config.get('COMPANY_LOGO')
-            if logo_path:
-                logo_img = Image(logo_path, width=1.5*inch, height=1.5*inch)
-                logo_cell = logo_img
-        except Exception:
-            self.logger.warning("Failed to load company logo")
+        # Use app logo if available
+        logo_cell = AssetCache.shared().image(
+            current_app.config.get('COMPANY_LOGO'), 1.5*inch, 1.5*inch
+        ) or ""
         
         # Company info
         company_name = current_app.config.get('COMPANY_NAME', 'EduResult')
@@ -339,10 +347,10 @@ class InvoicePDFService(BasePDFService):
         elements.append(Spacer(1, 20))
         elements.append(Paragraph("Thank you for your business!", self.styles['Normal']))
         
-        # Generated timestamp
+        # Generated date (cached invoices are reused within the day, see RenderCache)
         elements.append(Spacer(1, 30))
         elements.append(Paragraph(
-            f"Generated on: {datetime.utcnow().strftime('%B %d, %Y %H:%M:%S UTC')}",
+            f"Generated on: {datetime.utcnow().strftime('%B %d, %Y')} (UTC)",
             self.styles['Normal']
         ))
         
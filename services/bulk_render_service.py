@@ -0,0 +1,231 @@
+# services/bulk_render_service.py
+import atexit
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.zip_stream import stream_zip, write_stream
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Page objects in a ReportLab PDF ("/Type /Pages" is the page tree, not a page)
+_PAGE_PATTERN = re.compile(rb'/Type\s*/Page\b')
+
+_WARMUP_STUDENT = {
+    'name': 'Warmup',
+    'roll_no': '0',
+    'cls': '-',
+    'section': '-',
+    'overall_result': {
+        'subjects': [{'name': 'Subject', 'max_marks': 100, 'obtained_marks': 50, 'grade': 'C', 'percentage': 50.0}],
+        'overall_grade': 'C'
+    }
+}
+
+def _peak_rss_mb() -> float:
+    """Peak resident memory of the current process in MB"""
+    if resource is None:
+        return 0.0
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def _count_pages(pdf: bytes) -> int:
+    """Count the pages of a rendered PDF"""
+    return len(_PAGE_PATTERN.findall(pdf))
+
+def _warm_worker():
+    """Preload ReportLab, standard font metrics and the marksheet styles"""
+    from utils.marksheet_pdf import generate_result_pdf
+
+    for template in ('modern', 'classic', 'compact'):
+        generate_result_pdf(_WARMUP_STUDENT, BytesIO(), {'template': template, 'include_qr': False})
+
+def _render_chunk(marksheets: List[Tuple[str, Dict[str, Any]]], customization: Dict[str, Any]) -> Dict[str, Any]:
+    """Render one chunk of marksheets in a worker process"""
+    from utils.marksheet_pdf import generate_result_pdf
+
+    start = time.perf_counter()
+    # Every marksheet of the batch shares one compiled static layer
+    customization = {'compiled': True, **(customization or {})}
+    rendered = []
+    for file_name, student_data in marksheets:
+        buffer = BytesIO()
+        pdf = buffer.getvalue() if generate_result_pdf(student_data, buffer, customization) else None
+        rendered.append((file_name, pdf))
+
+    return {
+        'pid': os.getpid(),
+        'rendered': rendered,
+        'seconds': time.perf_counter() - start,
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+class BulkMarksheetRenderer:
+    """Render many marksheets in parallel on a pool of warm worker processes
+
+    ReportLab rendering is CPU-bound and single-threaded, so a class worth of
+    marksheets is split into chunks rendered by separate processes. Workers
+    are spawned once, preload fonts and styles, and are reused by every bulk
+    export in this process.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 20):
+        """Initialize the renderer
+
+        Args:
+            workers (int, optional): Worker processes. Defaults to the CPU count.
+            chunk_size (int): Marksheets sent to a worker per task
+        """
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunk_size = max(1, chunk_size)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, workers: Optional[int] = None, chunk_size: int = 20) -> 'BulkMarksheetRenderer':
+        """Get the process-wide renderer, creating it on first use"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(workers, chunk_size)
+                atexit.register(cls._shared.shutdown)
+            return cls._shared
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        """Get the worker pool, starting it on first use"""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_warm_worker
+                )
+            return self._pool
+
+    def shutdown(self) -> None:
+        """Stop the worker pool"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+
+    def render(self, marksheets: List[Tuple[str, Dict[str, Any]]], customization: Dict[str, Any],
+               stats: Optional[Dict[str, Any]] = None, base_url: Optional[str] = None) -> Iterator[Tuple[str, bytes]]:
+        """Render marksheets in parallel, yielding them as chunks complete
+
+        The site URL of the verification QR codes is resolved when render is
+        called, not when the result is first iterated: a streamed response
+        is iterated after its request (and app) context is gone.
+
+        Args:
+            marksheets (list): (file_name, student_data) pairs for generate_result_pdf
+            customization (dict): Customization data shared by every marksheet
+            stats (dict, optional): Filled with throughput and memory figures once done
+            base_url (str, optional): Site URL of the QR codes. Defaults to verification_base_url().
+
+        Returns:
+            iterator: (file_name, pdf bytes) for every marksheet rendered successfully
+        """
+        from utils.qr import verification_base_url
+
+        # Workers have no app or request context to link QR codes to, and
+        # serve every tenant, so the batch carries its own site URL
+        customization = {
+            **(customization or {}),
+            'verification_base_url': verification_base_url() if base_url is None else base_url
+        }
+        return self._render(marksheets, customization, stats if stats is not None else {})
+
+    def _render(self, marksheets: List[Tuple[str, Dict[str, Any]]], customization: Dict[str, Any],
+                stats: Dict[str, Any]) -> Iterator[Tuple[str, bytes]]:
+        start = time.perf_counter()
+        pages = 0
+        failed = []
+        workers = {}
+
+        chunks = iter([marksheets[i:i + self.chunk_size] for i in range(0, len(marksheets), self.chunk_size)])
+        # Keep a bounded number of chunks in flight so memory stays flat and
+        # a slow consumer (e.g. a streaming download) applies back-pressure
+        max_in_flight = self.workers * 2
+        pending = set()
+        try:
+            while True:
+                for chunk in islice(chunks, max_in_flight - len(pending)):
+                    pending.add(self.pool.submit(_render_chunk, chunk, customization))
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    worker = workers.setdefault(result['pid'], {'marksheets': 0, 'seconds': 0.0, 'peak_rss_mb': 0.0})
+                    worker['seconds'] += result['seconds']
+                    worker['peak_rss_mb'] = max(worker['peak_rss_mb'], result['peak_rss_mb'])
+
+                    for file_name, pdf in result['rendered']:
+                        if pdf is None:
+                            failed.append(file_name)
+                            continue
+                        worker['marksheets'] += 1
+                        pages += _count_pages(pdf)
+                        yield file_name, pdf
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool next time
+            logger.error("Bulk render worker pool broke, restarting on next use")
+            with self._lock:
+                self._pool = None
+            raise
+        finally:
+            # Consumer stopped early (e.g. client disconnected)
+            for future in pending:
+                future.cancel()
+
+        seconds = time.perf_counter() - start
+        stats.update({
+            'marksheets': len(marksheets) - len(failed),
+            'failed': failed,
+            'pages': pages,
+            'seconds': round(seconds, 3),
+            'pages_per_second': round(pages / seconds, 1) if seconds > 0 else 0.0,
+            'workers': {str(pid): {**w, 'seconds': round(w['seconds'], 3)} for pid, w in workers.items()}
+        })
+        logger.info(
+            f"Rendered {stats['marksheets']} marksheets ({pages} pages) in {seconds:.2f}s "
+            f"on {len(workers)} workers: {stats['pages_per_second']} pages/sec"
+        )
+
+    def render_to_zip(self, marksheets: List[Tuple[str, Dict[str, Any]]], customization: Dict[str, Any],
+                      output) -> Dict[str, Any]:
+        """Render marksheets in parallel into a ZIP archive, streamed as they complete
+
+        Args:
+            marksheets (list): (file_name, student_data) pairs for generate_result_pdf
+            customization (dict): Customization data shared by every marksheet
+            output (str or file): Path or writable file for the ZIP
+
+        Returns:
+            dict: Throughput and per-worker memory statistics
+        """
+        stats = {}
+        chunks = stream_zip(self.render(marksheets, customization, stats))
+        if isinstance(output, str):
+            write_stream(chunks, output)
+        else:
+            for chunk in chunks:
+                output.write(chunk)
+        return stats
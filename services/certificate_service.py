@@ -0,0 +1,375 @@
+# services/certificate_service.py
+import csv
+import io
+import logging
+import os
+from collections import defaultdict
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+from flask import current_app
+from sqlalchemy import case, func
+from werkzeug.utils import secure_filename
+
+from models.base import db, Attendance
+from models.organization import Organization
+from models.result import Result
+from models.student import Student
+from models.subject import Subject
+from utils.certificate_templates import CompiledCertificateTemplate
+from utils.grading import calculate_class_results, get_grading_scheme
+from utils.zip_stream import stream_zip, write_stream
+
+logger = logging.getLogger(__name__)
+
+# Batch certificates.
+#
+# Recipients are picked by rules from graded class records: the classes'
+# results and attendance are loaded in one aggregate query, graded a class
+# at a time, and every rule yields the certificates it awards. All
+# certificates of a batch are rendered on one compiled template (border,
+# header and signatures drawn once) into a single bookmarked PDF, shipped in
+# a ZIP with a CSV manifest mapping certificate numbers to recipients and
+# pages. Batches run as artifact jobs, see services/artifact_service.py.
+
+DEFAULT_RULES = [{'rule': 'top', 'k': 3}]
+MANIFEST_FIELDS = [
+    'certificate_number', 'page', 'recipient_name', 'class', 'section', 'roll_no', 'rule', 'type', 'achievement'
+]
+
+_rules: Dict[str, Callable[[List[Dict[str, Any]], Dict[str, Any]], List[Dict[str, Any]]]] = {}
+
+def register_rule(name: str):
+    """Register a recipient selection rule
+
+    A rule is called as rule(records, options) with one class's graded
+    records (calculate_class_results records plus days_present and max_days)
+    and the rule's options, and returns certificate dicts (type,
+    recipient_name, achievement and the recipient's cls, section and
+    roll_no).
+
+    Args:
+        name (str): Rule name used in rule specs, e.g. top
+
+    Returns:
+        callable: Decorator registering the function
+    """
+    def decorator(select):
+        _rules[name] = select
+        return select
+    return decorator
+
+def _ordinal(n: int) -> str:
+    suffix = 'th' if 10 <= n % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
+    return f"{n}{suffix}"
+
+def _certificate(record: Dict[str, Any], cert_type: str, achievement: str) -> Dict[str, Any]:
+    return {
+        'type': cert_type,
+        'recipient_name': record['name'],
+        'achievement': achievement,
+        'cls': record['cls'],
+        'section': record['section'],
+        'roll_no': record['roll_no']
+    }
+
+@register_rule('top')
+def _top_in_class(records, options):
+    """Top k positions of the class (tied students share a position)"""
+    k = int(options.get('k', 3))
+    cert_type = options.get('title', 'Certificate of Merit')
+    awarded = []
+    for record in sorted(records, key=lambda r: (r['position'], r['roll_no'])):
+        if record['position'] > k:
+            break
+        awarded.append(_certificate(
+            record, cert_type,
+            f"for securing {_ordinal(record['position'])} position in Class {record['cls']} "
+            f"with {record['total_percentage']:.1f}%"
+        ))
+    return awarded
+
+@register_rule('subject_top')
+def _top_in_subject(records, options):
+    """Top k marks of every subject (or of the listed subjects) in the class"""
+    k = int(options.get('k', 1))
+    cert_type = options.get('title', 'Certificate of Excellence')
+    only = set(options.get('subjects') or [])
+
+    by_subject = defaultdict(list)
+    for record in records:
+        for subject in record['subjects']:
+            if not only or subject['name'] in only:
+                by_subject[subject['name']].append((subject['percentage'], record))
+
+    awarded = []
+    for subject_name in sorted(by_subject):
+        scores = sorted(by_subject[subject_name], key=lambda item: (-item[0], item[1]['roll_no']))
+        for percentage, record in scores:
+            # Competition ranking, as for class positions
+            rank = 1 + sum(1 for other, _ in scores if other > percentage)
+            if rank > k:
+                break
+            achievement = (
+                f"for the highest marks in {subject_name} in Class {record['cls']}" if rank == 1
+                else f"for securing {_ordinal(rank)} rank in {subject_name} in Class {record['cls']}"
+            )
+            awarded.append(_certificate(record, cert_type, achievement))
+    return awarded
+
+@register_rule('attendance')
+def _attendance_threshold(records, options):
+    """Students present on at least min_percentage of the recorded days"""
+    threshold = float(options.get('min_percentage', 95))
+    cert_type = options.get('title', 'Certificate of Attendance')
+    awarded = []
+    for record in sorted(records, key=lambda r: (r['section'], r['roll_no'])):
+        if not record.get('max_days'):
+            continue
+        percentage = record['days_present'] / record['max_days'] * 100
+        if percentage >= threshold:
+            awarded.append(_certificate(
+                record, cert_type,
+                f"for {percentage:.1f}% attendance in Class {record['cls']}-{record['section']}"
+            ))
+    return awarded
+
+def select_recipients(classes: Dict[str, List[Dict[str, Any]]], rules: List[Dict[str, Any]],
+                      academic_year: Optional[str] = None, prefix: str = 'CERT',
+                      award_date: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Apply selection rules to graded classes and number the certificates
+
+    Args:
+        classes (dict): Graded records by class name
+        rules (list): Rule specs, e.g. {'rule': 'top', 'k': 3}; see the
+            registered rules for their options (every rule takes a title)
+        academic_year (str, optional): Academic year printed on the certificates
+        prefix (str): Prefix of the certificate numbers
+        award_date (str, optional): Date printed on the certificates. Defaults to today.
+
+    Returns:
+        list: Certificate dicts in the generate_certificate format, plus
+        certificate_number, rule and the recipient's cls, section and roll_no
+    """
+    award_date = award_date or date.today().strftime('%B %d, %Y')
+    certificates = []
+    for spec in rules:
+        select = _rules[spec['rule']]
+        for class_name in sorted(classes):
+            # Students without results cannot be ranked or awarded
+            records = [record for record in classes[class_name] if record['subjects']]
+            for certificate in select(records, spec):
+                certificate.update(rule=spec['rule'], date=award_date)
+                if academic_year:
+                    certificate['details'] = f"Academic Year {academic_year}"
+                certificates.append(certificate)
+
+    year = (academic_year or '').replace('/', '-')
+    for n, certificate in enumerate(certificates, start=1):
+        certificate['certificate_number'] = '/'.join(part for part in (prefix, year, f"{n:04d}") if part)
+    return certificates
+
+def write_manifest(page_ranges) -> bytes:
+    """CSV manifest of rendered certificates
+
+    Args:
+        page_ranges (list): (certificate, first page, last page) per certificate
+
+    Returns:
+        bytes: UTF-8 CSV with a MANIFEST_FIELDS header
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=MANIFEST_FIELDS)
+    writer.writeheader()
+    for certificate, first_page, _ in page_ranges:
+        writer.writerow({
+            'certificate_number': certificate.get('certificate_number'),
+            'page': first_page,
+            'recipient_name': certificate.get('recipient_name'),
+            'class': certificate.get('cls'),
+            'section': certificate.get('section'),
+            'roll_no': certificate.get('roll_no'),
+            'rule': certificate.get('rule'),
+            'type': certificate.get('type'),
+            'achievement': certificate.get('achievement')
+        })
+    return buffer.getvalue().encode('utf-8')
+
+class CertificateService:
+    @staticmethod
+    def validate_rules(rules) -> Optional[str]:
+        """Check rule specs submitted by a client
+
+        Returns:
+            str: The error, or None if the rules are valid
+        """
+        if not isinstance(rules, list) or not rules:
+            return 'At least one rule is required'
+        for spec in rules:
+            if not isinstance(spec, dict) or spec.get('rule') not in _rules:
+                return f"Unknown rule, expected one of: {', '.join(sorted(_rules))}"
+            for option in ('k', 'min_percentage'):
+                if option in spec:
+                    try:
+                        if float(spec[option]) <= 0:
+                            return f"{option} must be positive"
+                    except (TypeError, ValueError):
+                        return f"{option} must be a number"
+        return None
+
+    @staticmethod
+    def generate_batch(rules, exam_type, organization_id, class_names=None, academic_year=None,
+                       output_path=None, customization=None):
+        """Award certificates by rule and render them into a ZIP artifact
+
+        The ZIP holds certificates.pdf, every certificate on its own page
+        and bookmarked by recipient, and manifest.csv.
+
+        Args:
+            rules (list): Rule specs, see select_recipients
+            exam_type (str): The term whose results are ranked, defaults to Annual
+            organization_id (UUID): The organization ID for tenant isolation
+            class_names (list, optional): Classes to award. Defaults to every class with results.
+            academic_year (str, optional): The academic year. Defaults to the latest with results.
+            output_path (str, optional): Where to write the ZIP. Defaults to the export artifacts directory.
+            customization (dict, optional): Overrides of the organization's certificate customization
+
+        Returns:
+            dict: success, error, file_path, file_name and mimetype of the ZIP,
+            the number of certificates and the manifest rows
+        """
+        term = exam_type or 'Annual'
+        try:
+            error = CertificateService.validate_rules(rules)
+            if error:
+                return {'success': False, 'error': error, 'file_path': None}
+
+            classes, academic_year = CertificateService._fetch_class_records(
+                class_names, term, organization_id, academic_year
+            )
+            organization = Organization.query.get(organization_id)
+            settings = (organization.settings or {}) if organization else {}
+            customization = {**(settings.get('certificate') or {}), **(customization or {})}
+
+            certificates = select_recipients(
+                classes, rules, academic_year,
+                prefix=customization.get('certificate_prefix', 'CERT'),
+                award_date=customization.get('award_date')
+            )
+            if not certificates:
+                return {'success': False, 'error': 'No students match the certificate rules', 'file_path': None}
+
+            organization_data = {
+                'id': str(organization_id),
+                'name': organization.name if organization else 'Organization Name',
+                'address': organization.address if organization else None
+            }
+            template = CompiledCertificateTemplate(organization_data, customization)
+            pdf = io.BytesIO()
+            page_ranges = template.render(certificates, pdf, title=f"Certificates {term} {academic_year or ''}".strip())
+
+            file_name = secure_filename(f"certificates_{term}_{academic_year}") + '.zip'
+            file_path = output_path or CertificateService._artifact_path(organization_id, file_name)
+            write_stream(stream_zip([
+                ('certificates.pdf', pdf.getvalue()),
+                ('manifest.csv', write_manifest(page_ranges))
+            ]), file_path)
+
+            return {
+                'success': True,
+                'error': None,
+                'file_path': file_path,
+                'file_name': file_name,
+                'mimetype': 'application/zip',
+                'certificates': len(certificates),
+                'manifest': [
+                    {'certificate_number': c['certificate_number'], 'recipient_name': c['recipient_name'], 'page': first}
+                    for c, first, _ in page_ranges
+                ]
+            }
+        except Exception as e:
+            logger.error(f"Error generating certificates for organization {organization_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': 'Failed to generate certificates',
+                'file_path': None
+            }
+
+    @staticmethod
+    def _artifact_path(organization_id, file_name: str) -> str:
+        artifacts_dir = current_app.config.get('EXPORT_ARTIFACTS_DIR', 'exports')
+        os.makedirs(os.path.join(artifacts_dir, str(organization_id)), exist_ok=True)
+        return os.path.join(artifacts_dir, str(organization_id), file_name)
+
+    @staticmethod
+    def _fetch_class_records(class_names, term: str, organization_id, academic_year: Optional[str] = None):
+        """Load and grade the results and attendance of classes in one aggregate query
+
+        Returns:
+            tuple: Graded records by class name and the academic year used
+        """
+        if academic_year is None:
+            academic_year = db.session.query(func.max(Result.academic_year)).filter(
+                Result.organization_id == organization_id,
+                Result.term == term
+            ).scalar()
+
+        attendance = db.session.query(
+            Attendance.student_id.label('student_id'),
+            func.count(Attendance.id).label('total'),
+            func.sum(case((Attendance.status == 'present', 1), else_=0)).label('present')
+        ).filter(
+            Attendance.organization_id == organization_id
+        ).group_by(Attendance.student_id).subquery()
+
+        query = db.session.query(
+            Student.id, Student.name, Student.roll_no, Student.class_name, Student.section,
+            Subject.name, Result.marks, Result.max_marks, attendance.c.present, attendance.c.total
+        ).join(
+            Result, Result.student_id == Student.id
+        ).join(
+            Subject, Subject.id == Result.subject_id
+        ).outerjoin(
+            attendance, attendance.c.student_id == Student.id
+        ).filter(
+            Student.organization_id == organization_id,
+            Student.is_active.is_(True),
+            Result.organization_id == organization_id,
+            Result.academic_year == academic_year,
+            Result.term == term
+        )
+        if class_names:
+            query = query.filter(Student.class_name.in_(list(class_names)))
+
+        return CertificateService._grade_rows(query.all(), organization_id, academic_year), academic_year
+
+    @staticmethod
+    def _grade_rows(rows, organization_id, academic_year) -> Dict[str, List[Dict[str, Any]]]:
+        """Grade (student_id, name, roll_no, class, section, subject, marks, max_marks,
+        days present, days recorded) rows a class at a time"""
+        by_class = defaultdict(list)
+        for row in rows:
+            by_class[row[3]].append(row)
+
+        classes = {}
+        for class_name, class_rows in by_class.items():
+            subjects = sorted({row[5] for row in class_rows})
+            column = {name: j for j, name in enumerate(subjects)}
+            students = {}
+            for row in class_rows:
+                students.setdefault(row[0], {
+                    'name': row[1], 'roll_no': row[2], 'cls': row[3], 'section': row[4],
+                    'days_present': int(row[8] or 0), 'max_days': int(row[9] or 0)
+                })
+            order = sorted(students, key=lambda sid: (students[sid]['section'], students[sid]['roll_no']))
+            row_of = {sid: i for i, sid in enumerate(order)}
+
+            marks = [[None] * len(subjects) for _ in order]
+            max_marks = [[100.0] * len(subjects) for _ in order]
+            for row in class_rows:
+                i, j = row_of[row[0]], column[row[5]]
+                marks[i][j] = float(row[6])
+                max_marks[i][j] = float(row[7] or 100)
+
+            scheme = get_grading_scheme(organization_id, class_name, academic_year)
+            classes[class_name] = calculate_class_results([students[sid] for sid in order], subjects, marks, max_marks, scheme)
+        return classes
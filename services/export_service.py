@@ -1,18 +1,627 @@
+# services/export_service.py
+import logging
+import os
+from decimal import Decimal
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import case, func
+from werkzeug.utils import secure_filename
+
+from models.base import db, Attendance
+from models.organization import Organization
+from models.result import Result
+from models.student import Student
+from models.student_analytics import StudentAnalytics
+from models.subject import Subject
+from services.bulk_render_service import BulkMarksheetRenderer
+from utils.charts import class_series
+from utils.class_result_pdf import generate_class_pdf
+from utils.grading import GradingScheme, calculate_class_results, get_grading_scheme
+from utils.marksheet_pdf import generate_result_pdf
+from utils.marksheet_templates import render_class_marksheets
+from utils.qr import verification_base_url
+from utils.table_stream import export_format, stream_table
+from utils.zip_stream import partial_path, stream_zip, tee_to_file
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip by tabular exports (server-side cursor)
+EXPORT_YIELD_PER = 1000
+
+STUDENT_LIST_COLUMNS = [
+    ('roll_no', 'Roll No'), ('name', 'Name'), ('class_name', 'Class'), ('section', 'Section'),
+    ('gender', 'Gender'), ('date_of_birth', 'Date of Birth'), ('admission_date', 'Admission Date'),
+    ('guardian_name', 'Guardian'), ('guardian_phone', 'Guardian Phone')
+]
+ANALYTICS_COLUMNS = [
+    ('roll_no', 'Roll No'), ('name', 'Name'), ('class_name', 'Class'), ('section', 'Section'),
+    ('academic_year', 'Academic Year'), ('term', 'Term'), ('average_marks', 'Average'),
+    ('rank_in_class', 'Rank'), ('attendance_percentage', 'Attendance %'),
+    ('improvement_percentage', 'Improvement %'), ('strengths', 'Strengths'), ('weaknesses', 'Weaknesses'),
+    ('last_calculated', 'Calculated At')
+]
+
 class ExportService:
     @staticmethod
-    def generate_marksheet(student_id, exam_id, organization_id):
-        # Placeholder implementation
+    def generate_marksheet(student_id, exam_id, organization_id, academic_year=None, output_path=None,
+                           customization=None):
+        """Render one student's marksheet
+
+        The student's whole class is loaded so the marksheet shows their
+        position in it.
+
+        Args:
+            student_id (UUID): The student ID
+            exam_id (str): The term, defaults to Annual
+            organization_id (UUID): The organization ID for tenant isolation
+            academic_year (str, optional): The academic year. Defaults to the latest with results.
+            output_path (str, optional): Where to write the PDF. Defaults to the export artifacts directory.
+            customization (dict, optional): Overrides of the organization's marksheet customization
+
+        Returns:
+            dict: success, error, file_path, file_name and mimetype of the PDF
+        """
+        term = exam_id or 'Annual'
+        try:
+            student = Student.query.filter_by(id=student_id, organization_id=organization_id).first()
+            if not student:
+                return {'success': False, 'error': 'Student not found', 'file_path': None}
+
+            marksheets, class_customization, academic_year = ExportService._fetch_bulk_marksheet_data(
+                student.class_name, term, organization_id, academic_year
+            )
+            student_data = next(
+                (
+                    data for _, data in marksheets
+                    if (data['section'], data['roll_no'], data['name']) == (student.section, student.roll_no, student.name)
+                ),
+                None
+            )
+            if student_data is None:
+                return {'success': False, 'error': 'No results found for this student', 'file_path': None}
+
+            file_name = secure_filename(f"marksheet_{student.roll_no}_{student.name}_{term}_{academic_year}") + '.pdf'
+            file_path = output_path or ExportService._artifact_path(organization_id, file_name)
+            if not generate_result_pdf(student_data, file_path, {**class_customization, **(customization or {})}):
+                return {'success': False, 'error': 'Failed to generate marksheet', 'file_path': None}
+
+            return {
+                'success': True,
+                'error': None,
+                'file_path': file_path,
+                'file_name': file_name,
+                'mimetype': 'application/pdf'
+            }
+        except Exception as e:
+            logger.error(f"Error generating marksheet for student {student_id}: {str(e)}")
+            return {
+                'success': False,
+                'error': 'Failed to generate marksheet',
+                'file_path': None
+            }
+
+    @staticmethod
+    def generate_class_result(class_name, exam_type, organization_id, academic_year=None, output_path=None):
+        """Render a class's result sheet
+
+        Args:
+            class_name (str): The class name
+            exam_type (str): The term, defaults to Annual
+            organization_id (UUID): The organization ID for tenant isolation
+            academic_year (str, optional): The academic year. Defaults to the latest with results.
+            output_path (str, optional): Where to write the PDF. Defaults to the export artifacts directory.
+
+        Returns:
+            dict: success, error, file_path, file_name and mimetype of the PDF
+        """
+        term = exam_type or 'Annual'
+        try:
+            marksheets, customization, academic_year = ExportService._fetch_bulk_marksheet_data(
+                class_name, term, organization_id, academic_year
+            )
+            if not marksheets:
+                return {
+                    'success': False,
+                    'error': 'No results found for this class',
+                    'file_path': None
+                }
+
+            file_name = secure_filename(f"class_result_{class_name}_{term}_{academic_year}") + '.pdf'
+            file_path = output_path or ExportService._artifact_path(organization_id, file_name)
+            generate_class_pdf(ExportService._class_sheet_data(class_name, marksheets), file_path, customization)
+
+            return {
+                'success': True,
+                'error': None,
+                'file_path': file_path,
+                'file_name': file_name,
+                'mimetype': 'application/pdf'
+            }
+        except Exception as e:
+            logger.error(f"Error generating class result for class {class_name}: {str(e)}")
+            return {
+                'success': False,
+                'error': 'Failed to generate class result',
+                'file_path': None
+            }
+
+    @staticmethod
+    def _artifact_path(organization_id, file_name: str) -> str:
+        """Path of a file in the organization's export artifacts directory"""
+        artifacts_dir = current_app.config.get('EXPORT_ARTIFACTS_DIR', 'exports')
+        os.makedirs(os.path.join(artifacts_dir, str(organization_id)), exist_ok=True)
+        return os.path.join(artifacts_dir, str(organization_id), file_name)
+
+    @staticmethod
+    def _class_sheet_data(class_name: str, marksheets: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Turn marksheet data into the class result sheet format"""
+        students = []
+        for _, data in marksheets:
+            overall = data['overall_result']
+            students.append({
+                **{key: data[key] for key in ('name', 'roll_no', 'cls', 'section', 'days_present', 'max_days')},
+                'overall_result': {
+                    'subject_results': [
+                        {'subject_name': s['name'], 'marks': s['obtained_marks'], 'grade': s['grade']}
+                        for s in overall['subjects']
+                    ],
+                    'overall_percentage': overall['overall_percentage'],
+                    'overall_grade': overall['overall_grade'],
+                    'is_pass': overall['is_pass']
+                }
+            })
+        sections = {student['section'] for student in students}
         return {
-            'success': False,
-            'error': 'Marksheet generation not implemented',
-            'file_path': None
+            'cls': class_name,
+            'section': sections.pop() if len(sections) == 1 else 'All',
+            'students': students
+        }
+
+    @staticmethod
+    def bulk_marksheets_artifact_path(organization_id, class_name, exam_type, academic_year, extension='.zip') -> str:
+        """Get the artifact path of a class's bulk marksheets
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            class_name (str): The class name
+            exam_type (str): The term
+            academic_year (str): The academic year
+            extension (str): '.zip' for the archive, '.pdf' for the merged PDF
+
+        Returns:
+            str: Path inside the organization's export artifacts directory
+        """
+        file_name = secure_filename(f"bulk_marksheets_{class_name}_{exam_type}_{academic_year}") + extension
+        artifacts_dir = current_app.config.get('EXPORT_ARTIFACTS_DIR', 'exports')
+        return os.path.join(artifacts_dir, str(organization_id), file_name)
+
+    @staticmethod
+    def stream_bulk_marksheets(class_name, exam_type, organization_id, academic_year=None):
+        """Stream the marksheet ZIP of a class while it renders
+
+        The class data is loaded up front so errors surface before the
+        response starts; marksheets are rendered in parallel and each is
+        zipped into the stream as soon as it is done. The stream is also
+        saved as an artifact that can be re-downloaded (and resumed).
+
+        Args:
+            class_name (str): The class name
+            exam_type (str): The term, defaults to Annual
+            organization_id (UUID): The organization ID for tenant isolation
+            academic_year (str, optional): The academic year. Defaults to the latest with results.
+
+        Returns:
+            dict: success, error, stream of ZIP bytes and the artifact file name
+        """
+        term = exam_type or 'Annual'
+        try:
+            marksheets, customization, academic_year = ExportService._fetch_bulk_marksheet_data(
+                class_name, term, organization_id, academic_year
+            )
+        except Exception as e:
+            logger.error(f"Error loading bulk marksheet data for class {class_name}: {str(e)}")
+            return {'success': False, 'error': 'Failed to generate marksheets', 'stream': None}
+
+        if not marksheets:
+            return {'success': False, 'error': 'No results found for this class', 'stream': None}
+
+        renderer = BulkMarksheetRenderer.shared(
+            current_app.config.get('BULK_RENDER_WORKERS'),
+            current_app.config.get('BULK_RENDER_CHUNK_SIZE', 20)
+        )
+        artifact_path = ExportService.bulk_marksheets_artifact_path(organization_id, class_name, term, academic_year)
+        # The stream runs after the request; take the QR codes' site URL from it now
+        marksheet_stream = renderer.render(marksheets, customization, base_url=verification_base_url())
+        stream = tee_to_file(stream_zip(marksheet_stream), artifact_path)
+
+        return {
+            'success': True,
+            'error': None,
+            'stream': stream,
+            'artifact_name': os.path.basename(artifact_path)
+        }
+
+    @staticmethod
+    def generate_bulk_marksheets(class_name, exam_type, organization_id, academic_year=None, output_path=None):
+        """Render the marksheet of every student in a class into a ZIP artifact
+
+        Args:
+            class_name (str): The class name
+            exam_type (str): The term, defaults to Annual
+            organization_id (UUID): The organization ID for tenant isolation
+            academic_year (str, optional): The academic year. Defaults to the latest with results.
+            output_path (str, optional): Where to write the ZIP. Defaults to bulk_marksheets_artifact_path.
+
+        Returns:
+            dict: success, error, file_path, file_name and mimetype of the ZIP and render stats
+        """
+        term = exam_type or 'Annual'
+        try:
+            marksheets, customization, academic_year = ExportService._fetch_bulk_marksheet_data(
+                class_name, term, organization_id, academic_year
+            )
+            if not marksheets:
+                return {
+                    'success': False,
+                    'error': 'No results found for this class',
+                    'file_path': None
+                }
+
+            renderer = BulkMarksheetRenderer.shared(
+                current_app.config.get('BULK_RENDER_WORKERS'),
+                current_app.config.get('BULK_RENDER_CHUNK_SIZE', 20)
+            )
+            artifact_path = ExportService.bulk_marksheets_artifact_path(organization_id, class_name, term, academic_year)
+            file_path = output_path or artifact_path
+            stats = renderer.render_to_zip(marksheets, customization, file_path)
+
+            return {
+                'success': True,
+                'error': None,
+                'file_path': file_path,
+                'file_name': os.path.basename(artifact_path),
+                'mimetype': 'application/zip',
+                'stats': stats
+            }
+        except Exception as e:
+            logger.error(f"Error generating bulk marksheets for class {class_name}: {str(e)}")
+            return {
+                'success': False,
+                'error': 'Failed to generate marksheets',
+                'file_path': None
+            }
+
+    @staticmethod
+    def generate_class_marksheets_pdf(class_name, exam_type, organization_id, academic_year=None, output_path=None):
+        """Render the marksheets of a class into one merged, bookmarked PDF artifact
+
+        Every page is stamped from the same compiled template, so the logo,
+        watermark and fonts are embedded once for the whole class. Students
+        are laid out one at a time and the PDF is written to a partial file
+        that is only renamed into place once complete.
+
+        Args:
+            class_name (str): The class name
+            exam_type (str): The term, defaults to Annual
+            organization_id (UUID): The organization ID for tenant isolation
+            academic_year (str, optional): The academic year. Defaults to the latest with results.
+            output_path (str, optional): Where to write the PDF. Defaults to bulk_marksheets_artifact_path.
+
+        Returns:
+            dict: success, error, file_path, file_name and mimetype of the PDF and render stats
+        """
+        term = exam_type or 'Annual'
+        part_path = None
+        try:
+            marksheets, customization, academic_year = ExportService._fetch_bulk_marksheet_data(
+                class_name, term, organization_id, academic_year
+            )
+            if not marksheets:
+                return {
+                    'success': False,
+                    'error': 'No results found for this class',
+                    'file_path': None
+                }
+
+            artifact_path = ExportService.bulk_marksheets_artifact_path(
+                organization_id, class_name, term, academic_year, extension='.pdf'
+            )
+            file_path = output_path or artifact_path
+            os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+            part_path = partial_path(file_path)
+            with open(part_path, 'wb') as f:
+                stats = render_class_marksheets(
+                    (student_data for _, student_data in marksheets), customization, f,
+                    title=f"{class_name} {customization.get('exam_name', term)}"
+                )
+            os.replace(part_path, file_path)
+
+            return {
+                'success': True,
+                'error': None,
+                'file_path': file_path,
+                'file_name': os.path.basename(artifact_path),
+                'mimetype': 'application/pdf',
+                'stats': stats
+            }
+        except Exception as e:
+            logger.error(f"Error generating class marksheet PDF for class {class_name}: {str(e)}")
+            return {
+                'success': False,
+                'error': 'Failed to generate marksheets',
+                'file_path': None
+            }
+        finally:
+            if part_path and os.path.exists(part_path):
+                os.remove(part_path)
+
+    @staticmethod
+    def _fetch_bulk_marksheet_data(class_name: str, term: str, organization_id,
+                                   academic_year: Optional[str] = None) -> Tuple[List[Tuple[str, Dict[str, Any]]], Dict[str, Any], Optional[str]]:
+        """Load everything a class's marksheets need in one batch of queries
+
+        Returns:
+            tuple: (file_name, student_data) pairs, the shared customization data
+            (including the class series the charts compare against) and the
+            academic year used
+        """
+        students = Student.query.filter_by(
+            organization_id=organization_id,
+            class_name=class_name,
+            is_active=True
+        ).order_by(Student.section, Student.roll_no).all()
+        if not students:
+            return [], {}, academic_year
+
+        student_ids = [s.id for s in students]
+        if academic_year is None:
+            academic_year = db.session.query(func.max(Result.academic_year)).filter(
+                Result.organization_id == organization_id,
+                Result.student_id.in_(student_ids),
+                Result.term == term
+            ).scalar()
+
+        result_rows = db.session.query(
+            Result.student_id, Subject.name, Result.marks, Result.max_marks
+        ).join(Subject, Subject.id == Result.subject_id).filter(
+            Result.organization_id == organization_id,
+            Result.student_id.in_(student_ids),
+            Result.academic_year == academic_year,
+            Result.term == term
+        ).all()
+
+        attendance_rows = db.session.query(
+            Attendance.student_id,
+            func.count(Attendance.id).label('total'),
+            func.sum(case((Attendance.status == 'present', 1), else_=0)).label('present')
+        ).filter(
+            Attendance.organization_id == organization_id,
+            Attendance.student_id.in_(student_ids)
+        ).group_by(Attendance.student_id).all()
+        attendance = {row.student_id: (int(row.present or 0), int(row.total or 0)) for row in attendance_rows}
+
+        organization = Organization.query.get(organization_id)
+        settings = (organization.settings or {}) if organization else {}
+        customization = {
+            'institute_name': organization.name if organization else 'School Name',
+            'exam_name': f"{term} Examination {academic_year or ''}".strip(),
+            **(settings.get('marksheet') or {}),
+            # Logos and watermarks are cached per organization (see AssetCache.invalidate)
+            'organization_id': str(organization_id)
         }
 
+        scheme = get_grading_scheme(organization_id, class_name, academic_year)
+        marksheets = ExportService._build_marksheets(students, result_rows, attendance, scheme)
+        # Class averages are the same on every marksheet's chart; compute them once
+        customization['class_series'] = class_series(student_data for _, student_data in marksheets)
+        return marksheets, customization, academic_year
+
+    @staticmethod
+    def _build_marksheets(students: List[Student], result_rows: List[tuple], attendance: Dict[Any, Tuple[int, int]],
+                          scheme: Optional[GradingScheme] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """Turn a class's students and result rows into marksheet data
+
+        Args:
+            students (list): Students of the class
+            result_rows (list): (student_id, subject_name, marks, max_marks) rows
+            attendance (dict): (days present, days recorded) by student ID
+            scheme (GradingScheme, optional): Scheme to grade with
+
+        Returns:
+            list: (file_name, student_data) pairs for students with results
+        """
+        subjects = sorted({row[1] for row in result_rows})
+        column = {name: j for j, name in enumerate(subjects)}
+        row_of = {s.id: i for i, s in enumerate(students)}
+
+        marks = [[None] * len(subjects) for _ in students]
+        max_marks = [[100.0] * len(subjects) for _ in students]
+        for student_id, subject_name, obtained, maximum in result_rows:
+            i = row_of.get(student_id)
+            if i is None:
+                continue
+            marks[i][column[subject_name]] = float(obtained)
+            max_marks[i][column[subject_name]] = float(maximum or 100)
+
+        identities = [
+            {'name': s.name, 'roll_no': s.roll_no, 'cls': s.class_name, 'section': s.section}
+            for s in students
+        ]
+        records = calculate_class_results(identities, subjects, marks, max_marks, scheme)
+
+        marksheets = []
+        for student, record in zip(students, records):
+            if not record['subjects']:
+                continue
+            days_present, max_days = attendance.get(student.id, (0, 0))
+            overall = record['overall_result']
+            student_data = {
+                **{key: record[key] for key in ('name', 'roll_no', 'cls', 'section')},
+                'days_present': days_present,
+                'max_days': max_days,
+                'overall_result': {
+                    'subjects': [
+                        {
+                            'name': s['name'],
+                            'max_marks': s['max_marks'],
+                            'obtained_marks': s['marks'],
+                            'grade': s['grade'],
+                            'percentage': s['percentage']
+                        }
+                        for s in overall['subject_results']
+                    ],
+                    'overall_grade': overall['overall_grade'],
+                    'overall_percentage': overall['overall_percentage'],
+                    'is_pass': overall['is_pass'],
+                    'position': record['position']
+                }
+            }
+            file_name = secure_filename(f"{student.section}_{student.roll_no}_{student.name}") + '.pdf'
+            marksheets.append((file_name, student_data))
+
+        return marksheets
+
+    # Tabular exports: rows stream from a server-side cursor into
+    # utils/table_stream.py, so exports of any size use constant memory
+
     @staticmethod
-    def generate_class_result(class_name, exam_type, organization_id):
-        # Placeholder implementation
+    def _table_export(name: str, columns: List[Tuple[str, str]], rows: Iterable, fmt: str) -> Dict[str, Any]:
+        fmt, mimetype, extension = export_format(fmt)
         return {
-            'success': False,
-            'error': 'Class result generation not implemented',
-            'file_path': None
+            'success': True,
+            'error': None,
+            'stream': stream_table(columns, rows, fmt, title=name),
+            'file_name': secure_filename(name) + extension,
+            'mimetype': mimetype
         }
+
+    @staticmethod
+    def generate_student_list(organization_id, fmt='csv', class_name=None):
+        """Stream the organization's active students
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            fmt (str): csv, xlsx or ndjson
+            class_name (str, optional): Only this class
+
+        Returns:
+            dict: success, error, stream of file bytes, file_name and mimetype
+        """
+        query = db.session.query(
+            Student.roll_no, Student.name, Student.class_name, Student.section, Student.gender,
+            Student.date_of_birth, Student.admission_date, Student.guardian_name, Student.guardian_phone
+        ).filter(
+            Student.organization_id == organization_id,
+            Student.is_active.is_(True),
+            Student.deleted_at.is_(None)
+        )
+        if class_name:
+            query = query.filter(Student.class_name == class_name)
+        query = query.order_by(Student.class_name, Student.section, Student.roll_no).yield_per(EXPORT_YIELD_PER)
+        return ExportService._table_export(f"students_{class_name or 'all'}", STUDENT_LIST_COLUMNS, query, fmt)
+
+    @staticmethod
+    def generate_result_sheet(organization_id, fmt='csv', class_name=None, exam_type=None, academic_year=None):
+        """Stream a term's results with one row per student and a column per subject
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            fmt (str): csv, xlsx or ndjson
+            class_name (str, optional): Only this class
+            exam_type (str): The term, defaults to Annual
+            academic_year (str, optional): The academic year. Defaults to the latest with results.
+
+        Returns:
+            dict: success, error, stream of file bytes, file_name and mimetype
+        """
+        term = exam_type or 'Annual'
+        filters = [Result.organization_id == organization_id, Result.term == term]
+        if class_name:
+            filters.append(Student.class_name == class_name)
+        try:
+            if academic_year is None:
+                academic_year = db.session.query(func.max(Result.academic_year)).join(
+                    Student, Student.id == Result.student_id
+                ).filter(*filters).scalar()
+            filters.append(Result.academic_year == academic_year)
+            subjects = [name for name, in db.session.query(Subject.name).join(
+                Result, Result.subject_id == Subject.id
+            ).join(Student, Student.id == Result.student_id).filter(*filters).distinct().order_by(Subject.name)]
+        except Exception as e:
+            logger.error(f"Error preparing result export for organization {organization_id}: {str(e)}")
+            return {'success': False, 'error': 'Failed to export results', 'stream': None}
+        if not subjects:
+            return {'success': False, 'error': 'No results found', 'stream': None}
+
+        query = db.session.query(
+            Student.id, Student.roll_no, Student.name, Student.class_name, Student.section,
+            Subject.name, Result.marks, Result.max_marks
+        ).join(Result, Result.student_id == Student.id).join(Subject, Subject.id == Result.subject_id).filter(
+            *filters
+        ).order_by(Student.class_name, Student.section, Student.roll_no, Student.id).yield_per(EXPORT_YIELD_PER)
+
+        columns = [
+            ('roll_no', 'Roll No'), ('name', 'Name'), ('class_name', 'Class'), ('section', 'Section'),
+            *((subject, subject) for subject in subjects),
+            ('total', 'Total'), ('max_total', 'Max Total'), ('percentage', 'Percentage'), ('grade', 'Grade')
+        ]
+        rows = ExportService._pivot_results(query, subjects, organization_id, academic_year)
+        name = f"results_{class_name or 'all'}_{term}_{academic_year}"
+        return ExportService._table_export(name, columns, rows, fmt)
+
+    @staticmethod
+    def _pivot_results(rows: Iterable[tuple], subjects: List[str], organization_id, academic_year) -> Iterator[list]:
+        """Fold result rows, ordered by student, into one row per student"""
+        index = {subject: position for position, subject in enumerate(subjects)}
+        schemes = {}
+        for student_id, student_rows in groupby(rows, key=lambda row: row[0]):
+            marks = [None] * len(subjects)
+            total = max_total = Decimal(0)
+            for _, roll_no, name, class_name, section, subject, obtained, max_marks in student_rows:
+                marks[index[subject]] = obtained
+                total += obtained or 0
+                max_total += max_marks or 0
+
+            percentage = round(float(total / max_total * 100), 2) if max_total else None
+            if class_name not in schemes:
+                schemes[class_name] = get_grading_scheme(organization_id, class_name, academic_year)
+            grade = schemes[class_name].grade(percentage) if percentage is not None else None
+            yield [roll_no, name, class_name, section, *marks, total, max_total, percentage, grade]
+
+    @staticmethod
+    def generate_analytics_export(organization_id, fmt='csv', class_name=None, academic_year=None, term=None):
+        """Stream the stored per-student analytics
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            fmt (str): csv, xlsx or ndjson
+            class_name (str, optional): Only this class
+            academic_year (str, optional): Only this academic year
+            term (str, optional): Only this term
+
+        Returns:
+            dict: success, error, stream of file bytes, file_name and mimetype
+        """
+        query = db.session.query(
+            Student.roll_no, Student.name, Student.class_name, Student.section,
+            StudentAnalytics.academic_year, StudentAnalytics.term, StudentAnalytics.average_marks,
+            StudentAnalytics.rank_in_class, StudentAnalytics.attendance_percentage,
+            StudentAnalytics.improvement_percentage, StudentAnalytics.strengths, StudentAnalytics.weaknesses,
+            StudentAnalytics.last_calculated
+        ).join(Student, Student.id == StudentAnalytics.student_id).filter(
+            StudentAnalytics.organization_id == organization_id
+        )
+        if class_name:
+            query = query.filter(Student.class_name == class_name)
+        if academic_year:
+            query = query.filter(StudentAnalytics.academic_year == academic_year)
+        if term:
+            query = query.filter(StudentAnalytics.term == term)
+        query = query.order_by(
+            StudentAnalytics.academic_year, StudentAnalytics.term, Student.class_name,
+            Student.section, StudentAnalytics.rank_in_class, Student.roll_no
+        ).yield_per(EXPORT_YIELD_PER)
+        name = f"analytics_{class_name or 'all'}_{academic_year or 'all'}"
+        return ExportService._table_export(name, ANALYTICS_COLUMNS, query, fmt)
+
@@ -0,0 +1,100 @@
+# services/import_staging.py
+import logging
+import os
+import pickle
+import re
+import time
+import uuid
+from typing import Any, Optional
+
+from services.artifact_store import ArtifactStore
+from utils.config import config_value
+
+logger = logging.getLogger(__name__)
+
+# Staged imports.
+#
+# A dry run parses and validates an upload, then keeps the validated records
+# here under a token; confirming the import with the token writes them
+# without reading the file again. Staged records are pickled into the
+# artifact store's tmp directory, which ArtifactStore.cleanup already sweeps,
+# and are only handed back to the organization and user that staged them,
+# for the same kind of import, within IMPORT_STAGING_TTL_SECONDS.
+
+DEFAULT_TTL_SECONDS = 60 * 60
+_TOKEN_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+def _path(token: str) -> str:
+    return os.path.join(ArtifactStore.shared().root, 'tmp', f"import-{token}.pickle")
+
+class ImportStaging:
+    """Validated import records kept between a dry run and its commit"""
+
+    @staticmethod
+    def save(kind: str, organization_id, user_id, payload: Any) -> str:
+        """Stage the records of a dry run
+
+        Args:
+            kind (str): Import kind, e.g. results
+            organization_id (UUID): The organization ID for tenant isolation
+            user_id (UUID): User who ran the dry run
+            payload: Picklable records and whatever the commit needs
+
+        Returns:
+            str: The token to commit the import with
+        """
+        token = uuid.uuid4().hex
+        path = _path(token)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        staged = {
+            'kind': kind,
+            'organization_id': str(organization_id),
+            'user_id': str(user_id) if user_id else None,
+            'created_at': time.time(),
+            'payload': payload
+        }
+        with open(f"{path}.part", 'wb') as f:
+            pickle.dump(staged, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{path}.part", path)
+        return token
+
+    @staticmethod
+    def load(kind: str, token: str, organization_id, user_id) -> Optional[Any]:
+        """Get staged records
+
+        Args:
+            kind (str): Import kind, e.g. results
+            token (str): Token returned by save()
+            organization_id (UUID): The organization ID for tenant isolation
+            user_id (UUID): User committing the import
+
+        Returns:
+            The payload, or None if there is no such staged import, it has
+            expired or it belongs to another user or kind of import
+        """
+        if not token or not _TOKEN_PATTERN.match(token):
+            return None
+        path = _path(token)
+        try:
+            with open(path, 'rb') as f:
+                staged = pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+        if time.time() - staged['created_at'] > config_value('IMPORT_STAGING_TTL_SECONDS', DEFAULT_TTL_SECONDS):
+            ImportStaging.discard(token)
+            return None
+        owner = (staged['kind'], staged['organization_id'], staged['user_id'])
+        if owner != (kind, str(organization_id), str(user_id) if user_id else None):
+            logger.warning(f"Staged import {token} requested by another organization, user or import kind")
+            return None
+        return staged['payload']
+
+    @staticmethod
+    def discard(token: str) -> None:
+        """Drop staged records, e.g. once committed"""
+        if token and _TOKEN_PATTERN.match(token):
+            try:
+                os.remove(_path(token))
+            except FileNotFoundError:
+                pass
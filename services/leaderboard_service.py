@@ -0,0 +1,426 @@
+# services/leaderboard_service.py
+import logging
+from typing import Any, Dict, List, Optional
+from flask import current_app
+from sqlalchemy import func
+
+from models.base import db
+from models.result import Result
+from models.student import Student
+
+logger = logging.getLogger(__name__)
+
+class LeaderboardService:
+    """Live class ranks and subject toppers backed by Redis sorted sets
+
+    Each board is scoped to (tenant, class, section, academic year, term) and
+    holds one sorted set of average marks per student plus one sorted set of
+    marks per subject. Boards are updated on every result write, so rank,
+    top-k and neighbour reads are O(log n) and always current. When Redis is
+    unavailable every read returns None and callers fall back to the database.
+
+    Boards are only written per section. A class-wide board is the union of
+    the class's section boards, built on read by class_board; every board
+    write adds its section to the class's set of sections for that.
+    """
+
+    # Seconds a class-wide board is kept after it was built
+    CLASS_BOARD_TTL = 300
+
+    def __init__(self, redis_client=None):
+        """Initialize the leaderboard service
+
+        Args:
+            redis_client (Redis, optional): Redis client. Defaults to the app's client.
+        """
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        """Get the Redis connection
+
+        Returns:
+            Redis: The Redis connection or None if unavailable
+        """
+        if self._redis is not None:
+            return self._redis
+        try:
+            return getattr(current_app, 'redis', None) or current_app.extensions.get('redis')
+        except RuntimeError:
+            # Not in application context
+            return None
+
+    @staticmethod
+    def board_key(organization_id, class_name, section, academic_year, term) -> str:
+        """Build the key prefix shared by all sorted sets of one board
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            class_name (str): The class name
+            section (str, optional): The section
+            academic_year (str): The academic year
+            term (str): The term
+
+        Returns:
+            str: The board key prefix
+        """
+        return f"leaderboard:{organization_id}:{class_name}:{section or '-'}:{academic_year}:{term}"
+
+    @classmethod
+    def _sections_key(cls, organization_id, class_name, academic_year, term) -> str:
+        """Get the key of the set of sections with a board for a class"""
+        return f"{cls.board_key(organization_id, class_name, '*', academic_year, term)}:sections"
+
+    @staticmethod
+    def _set_key(board: str, subject_id=None) -> str:
+        """Get the sorted set key for the overall board or one subject"""
+        if subject_id is None:
+            return f"{board}:overall"
+        return f"{board}:subject:{subject_id}"
+
+    @staticmethod
+    def _decode(value) -> str:
+        """Decode a Redis member to str"""
+        return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+
+    def _entries(self, raw: List, first_rank: int) -> List[Dict[str, Any]]:
+        """Convert ZREVRANGE ... WITHSCORES output to ranked entries"""
+        return [
+            {'student_id': self._decode(member), 'score': float(score), 'rank': first_rank + i}
+            for i, (member, score) in enumerate(raw)
+        ]
+
+    # Result fields that decide which boards a result is on
+    BOARD_FIELDS = ('student_id', 'subject_id', 'academic_year', 'term')
+
+    def record_result(self, result: Result, student: Optional[Student] = None,
+                      previous: Optional[Dict[str, Any]] = None) -> bool:
+        """Update the boards touched by a saved result
+
+        The subject board receives the result's marks and the overall board the
+        student's recomputed average for the term. When an update moved the
+        result to another student, subject, year or term, it is first taken
+        off the boards it was on.
+
+        Args:
+            result (Result): The saved result
+            student (Student, optional): The result's student if already loaded
+            previous (dict, optional): BOARD_FIELDS of the result before the update
+
+        Returns:
+            bool: True if the boards were updated, False otherwise
+        """
+        redis = self.redis
+        if redis is None:
+            return False
+
+        try:
+            if student is None:
+                student = self._student(result.organization_id, result.student_id)
+            if student is None:
+                return False
+
+            pipe = redis.pipeline()
+            if previous and any(previous[f] != getattr(result, f) for f in self.BOARD_FIELDS):
+                old_student = (student if previous['student_id'] == result.student_id
+                               else self._student(result.organization_id, previous['student_id']))
+                if old_student is not None:
+                    self._place(pipe, result.organization_id, old_student, previous['subject_id'],
+                                previous['academic_year'], previous['term'])
+            self._place(pipe, result.organization_id, student, result.subject_id,
+                        result.academic_year, result.term, float(result.marks))
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error updating leaderboard for result {getattr(result, 'id', None)}: {str(e)}")
+            return False
+
+    def remove_result(self, result: Result, student: Optional[Student] = None) -> bool:
+        """Take a deleted result off its boards
+
+        Args:
+            result (Result): The deleted result
+            student (Student, optional): The result's student if already loaded
+
+        Returns:
+            bool: True if the boards were updated, False otherwise
+        """
+        redis = self.redis
+        if redis is None:
+            return False
+
+        try:
+            if student is None:
+                student = self._student(result.organization_id, result.student_id)
+            if student is None:
+                return False
+
+            pipe = redis.pipeline()
+            self._place(pipe, result.organization_id, student, result.subject_id,
+                        result.academic_year, result.term)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Error removing result {getattr(result, 'id', None)} from leaderboard: {str(e)}")
+            return False
+
+    @staticmethod
+    def _student(organization_id, student_id) -> Optional[Student]:
+        """Load the student a result belongs to"""
+        return Student.query.filter_by(id=student_id, organization_id=organization_id).first()
+
+    def _place(self, pipe, organization_id, student: Student, subject_id, academic_year, term,
+               marks: Optional[float] = None) -> None:
+        """Queue a student's entries on one board
+
+        The subject entry is set to marks, or removed when marks is None, and
+        the overall entry to the student's average over the results left for
+        the term, or removed when none are left.
+        """
+        average = db.session.query(func.avg(Result.marks)).filter(
+            Result.organization_id == organization_id,
+            Result.student_id == student.id,
+            Result.academic_year == academic_year,
+            Result.term == term,
+            Result.deleted_at.is_(None)
+        ).scalar()
+
+        board = self.board_key(organization_id, student.class_name, student.section, academic_year, term)
+        member = str(student.id)
+        if marks is None:
+            pipe.zrem(self._set_key(board, subject_id), member)
+        else:
+            pipe.zadd(self._set_key(board, subject_id), {member: marks})
+            pipe.sadd(f"{board}:subjects", str(subject_id))
+        if average is None:
+            pipe.zrem(self._set_key(board), member)
+        else:
+            pipe.zadd(self._set_key(board), {member: float(average)})
+        pipe.sadd(self._sections_key(organization_id, student.class_name, academic_year, term),
+                  student.section or '-')
+
+    def class_board(self, organization_id, class_name, academic_year, term) -> Optional[str]:
+        """Build the board of a whole class from its section boards
+
+        Students are on the board of their own section only, so the union of
+        the section boards ranks the whole class. Subject boards are merged
+        the same way.
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            class_name (str): The class name
+            academic_year (str): The academic year
+            term (str): The term
+
+        Returns:
+            str: The board key prefix, or None if Redis is unavailable
+        """
+        redis = self.redis
+        if redis is None:
+            return None
+        board = self.board_key(organization_id, class_name, '*', academic_year, term)
+        try:
+            sections = sorted(self._decode(s) for s in redis.smembers(
+                self._sections_key(organization_id, class_name, academic_year, term)))
+            section_boards = [self.board_key(organization_id, class_name, s, academic_year, term)
+                              for s in sections]
+            pipe = redis.pipeline()
+            for section_board in section_boards:
+                pipe.smembers(f"{section_board}:subjects")
+            subject_ids = sorted({self._decode(s) for members in pipe.execute() for s in members})
+
+            subjects_key = f"{board}:subjects"
+            stale_subjects = {self._decode(s) for s in redis.smembers(subjects_key)}
+            pipe = redis.pipeline()
+            pipe.delete(self._set_key(board), subjects_key,
+                        *[self._set_key(board, s) for s in stale_subjects - set(subject_ids)])
+            if section_boards:
+                pipe.zunionstore(self._set_key(board), [self._set_key(b) for b in section_boards], aggregate='MAX')
+                pipe.expire(self._set_key(board), self.CLASS_BOARD_TTL)
+            for subject_id in subject_ids:
+                key = self._set_key(board, subject_id)
+                pipe.zunionstore(key, [self._set_key(b, subject_id) for b in section_boards], aggregate='MAX')
+                pipe.expire(key, self.CLASS_BOARD_TTL)
+            if subject_ids:
+                pipe.sadd(subjects_key, *subject_ids)
+                pipe.expire(subjects_key, self.CLASS_BOARD_TTL)
+            pipe.execute()
+            return board
+        except Exception as e:
+            logger.error(f"Error building class leaderboard {board}: {str(e)}")
+            return None
+
+    def get_rank(self, board: str, student_id, subject_id=None) -> Optional[int]:
+        """Get a student's 1-based rank on a board
+
+        Args:
+            board (str): The board key prefix
+            student_id (UUID): The ID of the student
+            subject_id (UUID, optional): Rank within this subject instead of overall
+
+        Returns:
+            int: The rank, or None if unknown
+        """
+        redis = self.redis
+        if redis is None:
+            return None
+        try:
+            rank = redis.zrevrank(self._set_key(board, subject_id), str(student_id))
+            return rank + 1 if rank is not None else None
+        except Exception as e:
+            logger.error(f"Error reading leaderboard rank from {board}: {str(e)}")
+            return None
+
+    def get_top(self, board: str, k: int = 10, subject_id=None) -> Optional[List[Dict[str, Any]]]:
+        """Get the top-k students on a board
+
+        Args:
+            board (str): The board key prefix
+            k (int): Number of students to return
+            subject_id (UUID, optional): Use this subject's board instead of overall
+
+        Returns:
+            list: Ranked entries, or None if Redis is unavailable
+        """
+        redis = self.redis
+        if redis is None:
+            return None
+        try:
+            raw = redis.zrevrange(self._set_key(board, subject_id), 0, max(k, 1) - 1, withscores=True)
+            return self._entries(raw, 1)
+        except Exception as e:
+            logger.error(f"Error reading leaderboard top from {board}: {str(e)}")
+            return None
+
+    def get_neighbors(self, board: str, student_id, radius: int = 2, subject_id=None) -> Optional[List[Dict[str, Any]]]:
+        """Get the students ranked just above and below a student
+
+        Args:
+            board (str): The board key prefix
+            student_id (UUID): The ID of the student
+            radius (int): Number of neighbours on each side
+            subject_id (UUID, optional): Use this subject's board instead of overall
+
+        Returns:
+            list: Ranked entries including the student, or None if unknown
+        """
+        redis = self.redis
+        if redis is None:
+            return None
+        key = self._set_key(board, subject_id)
+        try:
+            rank = redis.zrevrank(key, str(student_id))
+            if rank is None:
+                return None
+            start = max(rank - radius, 0)
+            raw = redis.zrevrange(key, start, rank + radius, withscores=True)
+            return self._entries(raw, start + 1)
+        except Exception as e:
+            logger.error(f"Error reading leaderboard neighbours from {board}: {str(e)}")
+            return None
+
+    def get_subject_toppers(self, board: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Get the topper of every subject on a board
+
+        Args:
+            board (str): The board key prefix
+
+        Returns:
+            dict: Topper entry by subject ID, or None if Redis is unavailable
+        """
+        redis = self.redis
+        if redis is None:
+            return None
+        try:
+            subject_ids = sorted(self._decode(s) for s in redis.smembers(f"{board}:subjects"))
+            pipe = redis.pipeline()
+            for subject_id in subject_ids:
+                pipe.zrevrange(self._set_key(board, subject_id), 0, 0, withscores=True)
+            toppers = {}
+            for subject_id, raw in zip(subject_ids, pipe.execute()):
+                if raw:
+                    toppers[subject_id] = self._entries(raw, 1)[0]
+            return toppers
+        except Exception as e:
+            logger.error(f"Error reading subject toppers from {board}: {str(e)}")
+            return None
+
+    def rebuild(self, organization_id, class_name, section, academic_year, term) -> int:
+        """Rebuild one board from the database
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            class_name (str): The class name
+            section (str, optional): The section
+            academic_year (str): The academic year
+            term (str): The term
+
+        Returns:
+            int: Number of students placed on the overall board
+        """
+        redis = self.redis
+        if redis is None:
+            logger.warning("Redis not available, skipping leaderboard rebuild")
+            return 0
+
+        query = db.session.query(
+            Result.student_id, Result.subject_id, Result.marks
+        ).join(Student, Student.id == Result.student_id).filter(
+            Result.organization_id == organization_id,
+            Student.class_name == class_name,
+            Result.academic_year == academic_year,
+            Result.term == term,
+            Result.deleted_at.is_(None)
+        )
+        if section:
+            query = query.filter(Student.section == section)
+
+        totals = {}
+        subjects = {}
+        for student_id, subject_id, marks in query.all():
+            member = str(student_id)
+            total, count = totals.get(member, (0.0, 0))
+            totals[member] = (total + float(marks), count + 1)
+            subjects.setdefault(str(subject_id), {})[member] = float(marks)
+
+        board = self.board_key(organization_id, class_name, section, academic_year, term)
+        subjects_key = f"{board}:subjects"
+        stale_subjects = {self._decode(s) for s in redis.smembers(subjects_key)}
+
+        pipe = redis.pipeline()
+        pipe.delete(self._set_key(board), subjects_key,
+                    *[self._set_key(board, s) for s in stale_subjects | set(subjects)])
+        if totals:
+            pipe.zadd(self._set_key(board), {m: total / count for m, (total, count) in totals.items()})
+        for subject_id, scores in subjects.items():
+            pipe.zadd(self._set_key(board, subject_id), scores)
+            pipe.sadd(subjects_key, subject_id)
+        pipe.sadd(self._sections_key(organization_id, class_name, academic_year, term), section or '-')
+        pipe.execute()
+
+        logger.info(f"Rebuilt leaderboard {board} with {len(totals)} students")
+        return len(totals)
+
+    def rebuild_organization(self, organization_id, academic_year, term, class_name=None) -> int:
+        """Rebuild every class/section board of an organization
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            academic_year (str): The academic year
+            term (str): The term
+            class_name (str, optional): Only rebuild this class
+
+        Returns:
+            int: Number of boards rebuilt
+        """
+        query = db.session.query(Student.class_name, Student.section).filter(
+            Student.organization_id == organization_id
+        ).distinct()
+        if class_name:
+            query = query.filter(Student.class_name == class_name)
+
+        rebuilt = 0
+        for cls, section in query.all():
+            self.rebuild(organization_id, cls, section, academic_year, term)
+            rebuilt += 1
+        return rebuilt
@@ -0,0 +1,261 @@
+# services/parquet_export.py
+import json
+import logging
+import os
+import re
+import zipfile
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import String, cast, func
+
+from models.base import db
+from models.result import Result
+from models.student import Student
+from models.student_analytics import StudentAnalytics
+from models.subject import Subject
+from services.artifact_store import ArtifactStore
+from utils.config import config_value
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Columnar exports for analysts.
+#
+# A tenant's results, students, subjects and analytics for a range of
+# academic years are written as one Parquet file per table and bundled into a
+# ZIP artifact with a manifest.json of row counts. Each table is read from a
+# server-side cursor (yield_per) and written one row group of
+# PARQUET_ROW_GROUP_ROWS at a time, so memory stays flat however many years
+# are exported. Low-cardinality text columns (class, section, term, year,
+# grade...) are Arrow dictionary columns, which Parquet stores as small
+# integer codes and which pandas reads back as categoricals. IDs are exported
+# as text so the tables join on student_id and subject_id.
+#
+# Academic years are compared on their starting year, so 2023, 2023-24 and
+# 2023-2024 all fall in a range starting at 2023.
+
+DEFAULT_ROW_GROUP_ROWS = 64 * 1024
+DEFAULT_YIELD_PER = 10000
+DEFAULT_COMPRESSION = 'zstd'
+ACADEMIC_YEAR_PATTERN = re.compile(r'^\d{4}(-\d{2}|-\d{4})?$')
+
+def _schema(*fields: Tuple[str, str]):
+    """Arrow schema from (name, type) pairs, type one of the names below"""
+    types = {
+        'category': pa.dictionary(pa.int32(), pa.string()),
+        'text': pa.string(),
+        # Numeric(5, 2)
+        'decimal': pa.decimal128(5, 2),
+        'int': pa.int32(),
+        'bool': pa.bool_(),
+        'date': pa.date32(),
+        'timestamp': pa.timestamp('us'),
+        'text_list': pa.list_(pa.string())
+    }
+    return pa.schema([(name, types[kind]) for name, kind in fields])
+
+def _start_year(academic_year: Optional[str]) -> Optional[str]:
+    return academic_year[:4] if academic_year else None
+
+def _in_years(column, from_year: Optional[str], to_year: Optional[str]) -> list:
+    start = func.substr(column, 1, 4)
+    filters = []
+    if from_year:
+        filters.append(start >= _start_year(from_year))
+    if to_year:
+        filters.append(start <= _start_year(to_year))
+    return filters
+
+def _results(organization_id, from_year, to_year):
+    return db.session.query(
+        cast(Result.id, String), cast(Result.student_id, String), cast(Result.subject_id, String),
+        Result.academic_year, cast(Result.term, String), Result.marks, Result.max_marks, Result.grade,
+        Result.exam_date, Result.is_verified
+    ).filter(
+        Result.organization_id == organization_id,
+        Result.deleted_at.is_(None),
+        *_in_years(Result.academic_year, from_year, to_year)
+    ).order_by(Result.academic_year, Result.term, Result.student_id)
+
+def _students(organization_id, from_year, to_year):
+    # Every student, including inactive ones: older results refer to them
+    return db.session.query(
+        cast(Student.id, String), Student.roll_no, Student.name, Student.class_name, Student.section,
+        Student.gender, Student.date_of_birth, Student.admission_date, Student.is_active
+    ).filter(
+        Student.organization_id == organization_id,
+        Student.deleted_at.is_(None)
+    ).order_by(Student.class_name, Student.section, Student.roll_no)
+
+def _subjects(organization_id, from_year, to_year):
+    return db.session.query(
+        cast(Subject.id, String), Subject.name, Subject.code, Subject.class_name, Subject.max_marks,
+        Subject.is_active
+    ).filter(
+        Subject.organization_id == organization_id,
+        Subject.deleted_at.is_(None)
+    ).order_by(Subject.class_name, Subject.name)
+
+def _analytics(organization_id, from_year, to_year):
+    return db.session.query(
+        cast(StudentAnalytics.student_id, String), StudentAnalytics.academic_year,
+        cast(StudentAnalytics.term, String),
+        StudentAnalytics.average_marks, StudentAnalytics.rank_in_class, StudentAnalytics.attendance_percentage,
+        StudentAnalytics.improvement_percentage, StudentAnalytics.strengths, StudentAnalytics.weaknesses,
+        StudentAnalytics.last_calculated
+    ).filter(
+        StudentAnalytics.organization_id == organization_id,
+        *_in_years(StudentAnalytics.academic_year, from_year, to_year)
+    ).order_by(StudentAnalytics.academic_year, StudentAnalytics.term, StudentAnalytics.student_id)
+
+# Table name, columns in query order and the query
+TABLES = [
+    ('results', (
+        ('id', 'text'), ('student_id', 'text'), ('subject_id', 'text'), ('academic_year', 'category'),
+        ('term', 'category'), ('marks', 'decimal'), ('max_marks', 'decimal'), ('grade', 'category'),
+        ('exam_date', 'date'), ('is_verified', 'bool')
+    ), _results),
+    ('students', (
+        ('id', 'text'), ('roll_no', 'text'), ('name', 'text'), ('class_name', 'category'),
+        ('section', 'category'), ('gender', 'category'), ('date_of_birth', 'date'),
+        ('admission_date', 'date'), ('is_active', 'bool')
+    ), _students),
+    ('subjects', (
+        ('id', 'text'), ('name', 'category'), ('code', 'category'), ('class_name', 'category'),
+        ('max_marks', 'decimal'), ('is_active', 'bool')
+    ), _subjects),
+    ('analytics', (
+        ('student_id', 'text'), ('academic_year', 'category'), ('term', 'category'),
+        ('average_marks', 'decimal'), ('rank_in_class', 'int'), ('attendance_percentage', 'decimal'),
+        ('improvement_percentage', 'decimal'), ('strengths', 'text_list'), ('weaknesses', 'text_list'),
+        ('last_calculated', 'timestamp')
+    ), _analytics)
+]
+
+def write_parquet(path: str, fields: Sequence[Tuple[str, str]], rows: Iterable[Sequence[Any]],
+                  row_group_rows: Optional[int] = None, compression: Optional[str] = None,
+                  progress: Optional[Callable[[int], None]] = None) -> int:
+    """Write rows into a Parquet file one row group at a time
+
+    Args:
+        path (str): Where to write the file
+        fields (list): (name, type) pairs, see _schema
+        rows (iterable): Row value sequences in field order, e.g. from a yield_per query
+        row_group_rows (int, optional): Rows per row group; PARQUET_ROW_GROUP_ROWS by default
+        compression (str, optional): Parquet codec; PARQUET_COMPRESSION by default
+        progress (callable, optional): Called with the number of rows written after each row group
+
+    Returns:
+        int: Number of rows written
+    """
+    schema = _schema(*fields)
+    row_group_rows = row_group_rows or config_value('PARQUET_ROW_GROUP_ROWS', DEFAULT_ROW_GROUP_ROWS)
+    rows = iter(rows)
+    written = 0
+    with pq.ParquetWriter(path, schema, compression=compression or config_value('PARQUET_COMPRESSION', DEFAULT_COMPRESSION)) as writer:
+        while True:
+            chunk = list(islice(rows, row_group_rows))
+            if not chunk:
+                break
+            columns = zip(*chunk)
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+            ))
+            written += len(chunk)
+            if progress:
+                progress(written)
+    return written
+
+class ParquetExport:
+    """Columnar export of a tenant's result data"""
+
+    @staticmethod
+    def validate_params(from_year: Optional[str], to_year: Optional[str]) -> Optional[str]:
+        """Check an export request
+
+        Args:
+            from_year (str, optional): First academic year, e.g. 2021-22
+            to_year (str, optional): Last academic year
+
+        Returns:
+            str: An error message, or None if the export can run
+        """
+        if pa is None:
+            return 'Parquet export is not available on this server'
+        for label, year in (('from_year', from_year), ('to_year', to_year)):
+            if year is not None and not (isinstance(year, str) and ACADEMIC_YEAR_PATTERN.match(year)):
+                return f"{label} must be an academic year such as 2023-24"
+        if from_year and to_year and _start_year(from_year) > _start_year(to_year):
+            return 'from_year must not be after to_year'
+        return None
+
+    @staticmethod
+    def generate(organization_id, from_year: Optional[str] = None, to_year: Optional[str] = None,
+                 output_path: Optional[str] = None,
+                 progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict[str, Any]:
+        """Export results, students, subjects and analytics as Parquet files in a ZIP
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            from_year (str, optional): First academic year of results and analytics
+            to_year (str, optional): Last academic year of results and analytics
+            output_path (str): Where to write the ZIP
+            progress (callable, optional): Called with the rows written so far
+
+        Returns:
+            dict: success, error, file_path, file_name, mimetype and the row
+            count of each table
+        """
+        error = ParquetExport.validate_params(from_year, to_year)
+        if error:
+            return {'success': False, 'error': error, 'file_path': None}
+
+        yield_per = config_value('PARQUET_YIELD_PER', DEFAULT_YIELD_PER)
+        store = ArtifactStore.shared()
+        parts = []
+        counts = {}
+        done = 0
+        try:
+            for name, fields, query in TABLES:
+                path = store.temp_path('.parquet')
+                parts.append((f"{name}.parquet", path))
+                rows = query(organization_id, from_year, to_year).yield_per(yield_per)
+                report = (lambda written, before=done: progress(before + written)) if progress else None
+                counts[name] = write_parquet(path, fields, rows, progress=report)
+                done += counts[name]
+
+            manifest = {
+                'organization_id': str(organization_id),
+                'from_year': from_year,
+                'to_year': to_year,
+                'tables': {name: {'file': f"{name}.parquet", 'rows': count} for name, count in counts.items()}
+            }
+            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+                # Parquet pages are already compressed
+                for arcname, path in parts:
+                    archive.write(path, arcname)
+                archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+        except Exception as e:
+            logger.error(f"Error exporting Parquet for organization {organization_id}: {str(e)}")
+            return {'success': False, 'error': 'Failed to export data', 'file_path': None}
+        finally:
+            for _, path in parts:
+                if os.path.exists(path):
+                    os.remove(path)
+
+        years = '_'.join(filter(None, (_start_year(from_year), _start_year(to_year)))) or 'all'
+        return {
+            'success': True,
+            'error': None,
+            'file_path': output_path,
+            'file_name': f"result_data_{years}.zip",
+            'mimetype': 'application/zip',
+            'summary': counts
+        }
@@ -1,6 +1,6 @@
 # services/pdf_service.py
 import io
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, List, Optional
 from flask import Response, current_app
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -10,60 +10,94 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.graphics.shapes import Drawing, Rect, String
-from reportlab.graphics.charts.barcharts import VerticalBarChart
-from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics import renderPDF
 from datetime import datetime
 import base64
-import qrcode
 from PIL import Image as PILImage
 
+from utils.charts import grade_pie_chart, sparkline, subject_bar_chart
+from utils.grading import GradingScheme, default_grading_scheme
+from utils.pdf_output import doc_options
+from utils.pdf_styles import get_stylesheet, register_theme
+from utils.qr import QRCodeFlowable, verification_qr
+from services.asset_cache import AssetCache
+from services.render_cache import RenderCache
+
+@register_theme('base')
+def _build_base_styles(styles, options):
+    """Add the common custom styles for PDF generation"""
+    # Header style
+    styles.add(ParagraphStyle(
+        name='CustomHeader',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        textColor=colors.darkblue
+    ))
+    
+    # Subheader style
+    styles.add(ParagraphStyle(
+        name='CustomSubHeader',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12,
+        alignment=TA_CENTER,
+        textColor=colors.darkblue
+    ))
+    
+    # Normal text style
+    styles.add(ParagraphStyle(
+        name='CustomNormal',
+        parent=styles['Normal'],
+        fontSize=11,
+        spaceAfter=6,
+        alignment=TA_LEFT
+    ))
+    
+    # Grade style
+    styles.add(ParagraphStyle(
+        name='Grade',
+        parent=styles['Normal'],
+        fontSize=12,
+        alignment=TA_CENTER,
+        textColor=colors.darkgreen
+    ))
+
 class BasePDFService:
     """Base class for PDF generation with common functionality"""
     
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
-    
-    def _setup_custom_styles(self):
-        """Setup common custom styles for PDF generation"""
-        # Header style
-        self.styles.add(ParagraphStyle(
-            name='CustomHeader',
-            parent=self.styles['Heading1'],
-            fontSize=18,
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            textColor=colors.darkblue
-        ))
-        
-        # Subheader style
-        self.styles.add(ParagraphStyle(
-            name='CustomSubHeader',
-            parent=self.styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12,
-            alignment=TA_CENTER,
-            textColor=colors.darkblue
-        ))
-        
-        # Normal text style
-        self.styles.add(ParagraphStyle(
-            name='CustomNormal',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            spaceAfter=6,
-            alignment=TA_LEFT
-        ))
-        
-        # Grade style
-        self.styles.add(ParagraphStyle(
-            name='Grade',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            alignment=TA_CENTER,
-            textColor=colors.darkgreen
-        ))
+    # Stylesheet theme from utils.pdf_styles; built once per process and shared
+    style_theme = 'base'
+    
+    def __init__(self, grading_scheme: Optional[GradingScheme] = None):
+        self.styles = get_stylesheet(self.style_theme)
+        self.grading_scheme = grading_scheme or default_grading_scheme()
+    
+    def _render_cached(self, kind: str, inputs: Any, customization: Optional[Dict[str, Any]],
+                       render: Callable[[], io.BytesIO], template: Optional[str] = None) -> io.BytesIO:
+        """Serve a document from the render cache, rendering it on a miss
+        
+        Args:
+            kind (str): Document kind, part of the cache key
+            inputs: The document data
+            customization (dict, optional): Customization data
+            render (callable): Renders the document into a BytesIO
+            template (str, optional): Template name
+        
+        Returns:
+            BytesIO: The document, positioned at the start
+        """
+        cache = RenderCache.shared()
+        key = cache.key(kind, inputs, customization, template, self.grading_scheme.version)
+        data = cache.get(key)
+        if data is not None:
+            return io.BytesIO(data)
+        
+        buffer = render()
+        cache.put(key, buffer.getvalue())
+        buffer.seek(0)
+        return buffer
     
     def _create_header_section(self, organization_data: Dict[str, Any], customization: Dict[str, Any]) -> List:
         """Create common header section with logo and organization details"""
@@ -73,13 +107,9 @@ class BasePDFService:
         header_data = []
         
         # Logo column
-        logo_cell = ""
-        if customization.get('logo'):
-            try:
-                logo_img = Image(customization['logo'], width=60, height=60)
-                logo_cell = logo_img
-            except Exception:
-                print("Failed to load organization logo")
+        logo_cell = AssetCache.shared().image(
+            customization.get('logo'), 60, 60, organization_data.get('id')
+        ) or ""
         
         # Organization info column
         org_info = [
@@ -124,65 +154,64 @@ class BasePDFService:
         
         return elements
     
-    def _create_watermark(self, watermark_text: str) -> Drawing:
+    def _create_watermark(self, watermark_text: str, organization_id: Optional[Any] = None) -> Drawing:
         """Create watermark for the PDF"""
-        width, height = A4
-        drawing = Drawing(width, height)
-        
-        # Create rotated text using affine transformation
-        import math
-        radians = math.radians(45)
-        cos_theta = math.cos(radians)
-        sin_theta = math.sin(radians)
-        
-        # Calculate center point
-        cx, cy = width/2, height/2
-        
-        # Create text string with rotation around center
-        text = String(
-            cx, cy,
-            watermark_text,
-            fontSize=60,
-            fillColor=colors.Color(0, 0, 0, alpha=0.1),
-            textAnchor='middle'
-        )
-        
-        # Apply rotation transformation
-        text.x = cx + (text.x - cx) * cos_theta - (text.y - cy) * sin_theta
-        text.y = cy + (text.x - cx) * sin_theta + (text.y - cy) * cos_theta
-        
-        drawing.add(text)
-        return drawing
+        return AssetCache.shared().watermark(watermark_text, organization_id)
     
-    def _create_qr_code(self, data: Dict[str, Any]) -> Image:
-        """Create QR code with data"""
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(str(data))
-        qr.make(fit=True)
+    def _watermark_page(self, organization_data: Dict[str, Any],
+                        customization: Dict[str, Any]) -> Callable[[Any, Any], None]:
+        """Page callback drawing the watermark behind each page's content
         
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, 'PNG')
-        buffer.seek(0)
+        The watermark is page sized, so as a story flowable it does not fit
+        the frame and the build fails; it is drawn on the canvas instead,
+        centered for landscape and letter pages.
         
-        return Image(buffer, width=1.5*inch, height=1.5*inch)
+        Returns:
+            callable: onFirstPage / onLaterPages callback (a no-op without a watermark)
+        """
+        if not customization.get('watermark'):
+            return lambda canv, doc: None
+        watermark = self._create_watermark(customization['watermark'], organization_data.get('id'))
+        
+        def draw(canv, doc):
+            width, height = doc.pagesize
+            renderPDF.draw(watermark, canv, (width - watermark.width) / 2, (height - watermark.height) / 2)
+        return draw
+    
+    def _create_qr_code(self, data: Dict[str, Any]) -> QRCodeFlowable:
+        """Create verification QR code for the data"""
+        return verification_qr(data, 1.5*inch, border=4)
     
     def _calculate_grade(self, percentage: float) -> str:
         """Calculate grade based on percentage"""
-        if percentage >= 90:
-            return 'A+'
-        elif percentage >= 80:
-            return 'A'
-        elif percentage >= 70:
-            return 'B+'
-        elif percentage >= 60:
-            return 'B'
-        elif percentage >= 50:
-            return 'C'
-        elif percentage >= 40:
-            return 'D'
-        else:
-            return 'F'
+        return self.grading_scheme.grade(percentage)
+    
+    def _result_percentage(self, result: Dict[str, Any]) -> float:
+        """Percentage of a subject result, computed from its marks when not given"""
+        if result.get('percentage') is not None:
+            return float(result['percentage'])
+        marks = result.get('marks_obtained', result.get('marks', 0)) or 0
+        max_marks = result.get('total_marks', result.get('max_marks', 100)) or 0
+        return float(marks) / float(max_marks) * 100 if max_marks else 0.0
+    
+    def _create_bar_chart(self, results: List[Dict[str, Any]], series: Optional[Dict[str, Any]] = None) -> Drawing:
+        """Create bar chart for subject-wise performance
+        
+        Args:
+            results (list): Subject results with subject_name and percentage (or marks)
+            series (dict, optional): Class series from utils.charts.class_series to compare against
+        """
+        subjects = [{'name': r.get('subject_name', ''), 'percentage': self._result_percentage(r)} for r in results]
+        chart = subject_bar_chart(subjects, series, value_step=10, label_length=None, bar_color=colors.lightblue)
+        return chart or Drawing(400, 200)
+    
+    def _create_pie_chart(self, results: List[Dict[str, Any]]) -> Drawing:
+        """Create pie chart for grade distribution"""
+        grade_counts = {grade: 0 for grade in self.grading_scheme.grade_order}
+        for result in results:
+            grade = self._calculate_grade(self._result_percentage(result))
+            grade_counts[grade] = grade_counts.get(grade, 0) + 1
+        return grade_pie_chart(grade_counts)
     
     def _get_position_suffix(self, position: int) -> str:
         """Get position with appropriate suffix (1st, 2nd, 3rd, etc.)"""
@@ -209,8 +238,18 @@ class PDFService(BasePDFService):
                           organization_data: Dict[str, Any], template: str = 'modern',
                           customization: Optional[Dict[str, Any]] = None) -> io.BytesIO:
         """Generate individual student marksheet with specified template"""
+        return self._render_cached(
+            'marksheet', (student_data, results, organization_data), customization,
+            lambda: self._render_marksheet(student_data, results, organization_data, template, customization),
+            template=template
+        )
+    
+    def _render_marksheet(self, student_data: Dict[str, Any], results: List[Dict[str, Any]], 
+                         organization_data: Dict[str, Any], template: str = 'modern',
+                         customization: Optional[Dict[str, Any]] = None) -> io.BytesIO:
+        """Render the marksheet (bypasses the render cache)"""
         buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*inch, bottomMargin=1*inch)
+        doc = SimpleDocTemplate(buffer, **doc_options(pagesize=A4, topMargin=1*inch, bottomMargin=1*inch))
         
         # Select template builder
         template_builders = {
@@ -223,7 +262,8 @@ class PDFService(BasePDFService):
         story = builder(student_data, results, organization_data, customization or {})
         
         # Build PDF
-        doc.build(story)
+        on_page = self._watermark_page(organization_data, customization or {})
+        doc.build(story, onFirstPage=on_page, onLaterPages=on_page)
         buffer.seek(0)
         return buffer
     
@@ -231,8 +271,18 @@ class PDFService(BasePDFService):
                             organization_data: Dict[str, Any], template: str = 'modern',
                             customization: Optional[Dict[str, Any]] = None) -> io.BytesIO:
         """Generate class result sheet with specified template"""
+        return self._render_cached(
+            'class_result', (class_data, students_results, organization_data), customization,
+            lambda: self._render_class_result(class_data, students_results, organization_data, template, customization),
+            template=template
+        )
+    
+    def _render_class_result(self, class_data: Dict[str, Any], students_results: List[Dict[str, Any]], 
+                           organization_data: Dict[str, Any], template: str = 'modern',
+                           customization: Optional[Dict[str, Any]] = None) -> io.BytesIO:
+        """Render the class result sheet (bypasses the render cache)"""
         buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
+        doc = SimpleDocTemplate(buffer, **doc_options(pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch))
         
         # Select template builder
         template_builders = {
@@ -245,7 +295,8 @@ class PDFService(BasePDFService):
         story = builder(class_data, students_results, organization_data, customization or {})
         
         # Build PDF
-        doc.build(story)
+        on_page = self._watermark_page(organization_data, customization or {})
+        doc.build(story, onFirstPage=on_page, onLaterPages=on_page)
         buffer.seek(0)
         return buffer
     
@@ -254,10 +305,6 @@ class PDFService(BasePDFService):
         """Build modern template for individual marksheet"""
         story = []
         
-        # Add watermark if specified
-        if customization.get('watermark'):
-            story.append(self._create_watermark(customization['watermark']))
-        
         # Header with logo
         story.extend(self._create_header_section(organization_data, customization))
         story.append(Spacer(1, 20))
@@ -300,10 +347,6 @@ class PDFService(BasePDFService):
         """Build modern template for class result sheet"""
         story = []
         
-        # Add watermark if specified
-        if customization.get('watermark'):
-            story.append(self._create_watermark(customization['watermark']))
-        
         # Header with logo
         story.extend(self._create_header_section(organization_data, customization))
         story.append(Spacer(1, 15))
@@ -368,6 +411,11 @@ class PDFService(BasePDFService):
         story.extend(self._create_compact_layout(student_data, results))
         story.append(Spacer(1, 10))
         
+        # A sparkline stands in for the analytics charts
+        if customization.get('include_analytics', True) and results:
+            story.append(sparkline([self._result_percentage(r) for r in results], width=200))
+            story.append(Spacer(1, 10))
+        
         # Compact footer
         story.extend(self._create_compact_footer(organization_data))
         
@@ -653,23 +701,12 @@ class PDFService(BasePDFService):
         elements.append(Spacer(1, 10))
         
         # Calculate grade distribution
-        grade_counts = {'A+': 0, 'A': 0, 'B+': 0, 'B': 0, 'C': 0, 'D': 0, 'F': 0}
+        grade_counts = {grade: 0 for grade in self.grading_scheme.grade_order}
         for student in students_results:
-            grade = student.get('grade', 'F')
+            grade = student.get('grade', self.grading_scheme.fail_grade)
             grade_counts[grade] = grade_counts.get(grade, 0) + 1
         
-        # Create pie chart
-        drawing = Drawing(400, 200)
-        pie = Pie()
-        pie.x = 100
-        pie.y = 0
-        pie.width = 200
-        pie.height = 200
-        pie.data = list(grade_counts.values())
-        pie.labels = list(grade_counts.keys())
-        
-        drawing.add(pie)
-        elements.append(drawing)
+        elements.append(grade_pie_chart(grade_counts, x=100, y=0, size=200))
         
         return elements
     
@@ -0,0 +1,238 @@
+# services/render_cache.py
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional
+from services.asset_cache import REMOTE_TTL, _is_remote
+from utils.config import config_value
+from utils.pdf_output import output_settings
+from utils.qr import verification_base_url
+
+logger = logging.getLogger(__name__)
+
+# Customization keys that point at files whose content affects the output
+ASSET_FIELDS = ('logo', 'student_photo', 'signature', 'principal_signature', 'watermark_image')
+
+DEFAULT_CACHE_DIR = 'render_cache'
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+
+def _json_default(value):
+    """Serialize values json does not know for hashing"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return hashlib.sha256(value).hexdigest()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    return repr(value)
+
+def write_document(output, data: bytes) -> None:
+    """Write document bytes to a path or writable file
+
+    Args:
+        output (str or file): Destination path or file object
+        data (bytes): The document
+    """
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, 'wb') as f:
+            f.write(data)
+    else:
+        output.write(data)
+
+class RenderCache:
+    """Content-addressed store of rendered PDFs with size-bounded LRU eviction
+
+    Documents are keyed by a hash of everything that determines their bytes:
+    the input data, customization (including the files it points at),
+    template and grading scheme version. Any change to an input yields a new
+    key, so entries never need explicit invalidation; stale ones simply age
+    out. Renderers also stamp documents from the clock ("Generated on",
+    "Awarded on", the session year), so keys hold the day (local and UTC)
+    and documents are only reused the day they were rendered. Remote assets
+    cannot be stat'ed: their URL is keyed with the REMOTE_TTL window the
+    asset cache re-fetches them in. Entries live on the local disk, the file mtime is the LRU clock and
+    the oldest entries are evicted once the store exceeds max_bytes.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        """Initialize the render cache
+
+        Args:
+            root (str): Directory for cached documents
+            max_bytes (int): Size bound of the store
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'RenderCache':
+        """Get the process-wide cache configured from the app (or defaults)"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(
+                    config_value('RENDER_CACHE_DIR', DEFAULT_CACHE_DIR),
+                    config_value('RENDER_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+                )
+            return cls._shared
+
+    @staticmethod
+    def key(kind: str, inputs: Any, customization: Optional[Dict[str, Any]] = None,
+            template: Optional[str] = None, scheme_version: Optional[str] = None) -> str:
+        """Hash the exact inputs of a render
+
+        Args:
+            kind (str): Document kind, e.g. marksheet or invoice
+            inputs: The document data
+            customization (dict, optional): Customization data
+            template (str, optional): Template name
+            scheme_version (str, optional): Grading scheme version
+
+        Returns:
+            str: Hex digest identifying the rendered document
+        """
+        customization = customization or {}
+        assets = {}
+        for field in ASSET_FIELDS:
+            path = customization.get(field)
+            if not isinstance(path, str):
+                continue
+            if _is_remote(path):
+                assets[field] = int(time.time() // REMOTE_TTL)
+            elif os.path.isfile(path):
+                stat = os.stat(path)
+                assets[field] = (stat.st_mtime_ns, stat.st_size)
+
+        # Dates renderers read from the clock
+        render_day = [date.today().isoformat(), datetime.utcnow().date().isoformat()]
+        # Documents rendered with other output settings (or verification links) are different files
+        payload = json.dumps(
+            [kind, template, scheme_version, inputs, customization, assets, render_day, output_settings(),
+             verification_base_url()],
+            sort_keys=True, default=_json_default, separators=(',', ':')
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get a cached document, marking it recently used
+
+        Args:
+            key (str): The render key
+
+        Returns:
+            bytes: The document, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store a rendered document and evict old ones if over the bound
+
+        Args:
+            key (str): The render key
+            data (bytes): The document
+        """
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Error storing rendered document {key}: {str(e)}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def get_or_render(self, key: str, render: Callable[[], bytes]) -> bytes:
+        """Serve a cached document or render and store it
+
+        Args:
+            key (str): The render key
+            render (callable): Produces the document bytes on a miss
+
+        Returns:
+            bytes: The document
+        """
+        data = self.get(key)
+        if data is None:
+            data = render()
+            if data:
+                self.put(key, data)
+        return data
+
+    def _entries(self):
+        """List (mtime, size, path) of every stored document"""
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.pdf'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        """Remove least recently used documents until under 90% of the bound"""
+        # Rescan: other processes share the store
+        entries = sorted(self._entries())
+        size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
+            evicted += 1
+        self._size = size
+        if evicted:
+            logger.info(f"Evicted {evicted} rendered documents from {self.root}")
+
+    def clear(self) -> None:
+        """Remove every stored document"""
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size = 0
@@ -0,0 +1,386 @@
+# services/result_copy_loader.py
+import csv
+import io
+import logging
+import os
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from models.base import db
+from services.leaderboard_service import LeaderboardService
+from services.result_import import (
+    CONFLICT_COLUMNS, DEFAULT_TERM, MAX_MARKS_LIMIT, REQUIRED_COLUMNS, TERMS, _column_name
+)
+from utils.grading import get_grading_scheme
+from utils.validations import ValidationError
+
+logger = logging.getLogger(__name__)
+
+# COPY fast path for very large result imports.
+#
+# Onboarding a tenant with years of history means millions of marks, more
+# than even batched INSERTs load in reasonable time. ResultCopyLoader streams
+# the CSV into a temporary staging table with COPY, validates it with a few
+# set-based UPDATEs (each marks the rows it rejects with an error code), then
+# merges the remaining rows into students and results with one INSERT ...
+# SELECT each. Everything runs in one transaction; the staging table is
+# dropped on commit. Rejected rows are written to an error report, and
+# progress is reported by bytes of the file consumed by COPY. The class
+# leaderboards of the loaded terms are rebuilt after the commit, as the
+# chunked importer does.
+#
+# Only CSV can be COPYed; the chunked importer in result_import handles XLSX.
+
+PROGRESS_STEP_BYTES = 1024 * 1024
+# Columns staged besides the required ones; others in the file are ignored
+OPTIONAL_COLUMNS = ('name', 'section', 'max_marks', 'term', 'academic_year', 'exam_date', 'remarks')
+# Widths of the target columns
+COLUMN_LIMITS = {'class_name': 20, 'roll_no': 20, 'name': 100, 'section': 5}
+
+ERROR_MESSAGES = {
+    'required': 'class_name, roll_no, subject, marks and academic_year are required',
+    'too_long': 'class_name, roll_no, name or section is too long',
+    'invalid_number': 'marks and max_marks must be numbers',
+    'invalid_date': 'exam_date must be a valid YYYY-MM-DD date',
+    'invalid_choice': f"term must be one of {', '.join(TERMS)}",
+    'invalid_format': 'academic_year must look like 2024-25',
+    'unknown_subject': 'Unknown subject for the class',
+    'invalid_marks': f"marks must be between 0 and max_marks (at most {MAX_MARKS_LIMIT})",
+    'duplicate_roll_no': 'The roll number is used with different student names in the file',
+    'unknown_student': 'No such student and no name to create one',
+    'duplicate_result': 'A later row has the same student, subject, term and year'
+}
+
+NUMBER = r"'^\s*[0-9]+(\.[0-9]+)?\s*$'"
+DATE = r"'^\s*[0-9]{4}-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])\s*$'"
+# Dates shaped like DATE that do not exist (2023-02-30, year 0), checked
+# without casting so they are rejected rather than failing the whole load.
+# CASE fixes the evaluation order: the parts are only cast once the shape
+# matched.
+_DATE_PART = "split_part(btrim(exam_date_raw), '-', {})::int"
+IMPOSSIBLE_DATE = (
+    f"CASE WHEN exam_date_raw !~ {DATE} THEN exam_date_raw IS NOT NULL "
+    f"WHEN {_DATE_PART.format(1)} = 0 THEN true "
+    f"ELSE {_DATE_PART.format(3)} > extract(day from make_date({_DATE_PART.format(1)}, "
+    f"{_DATE_PART.format(2)}, 1) + interval '1 month - 1 day') END"
+)
+
+class ProgressReader:
+    """File wrapper counting the bytes read from it"""
+
+    def __init__(self, stream: BinaryIO, total: Optional[int] = None,
+                 callback: Optional[Callable[[int, Optional[int]], None]] = None,
+                 step: int = PROGRESS_STEP_BYTES):
+        """Wrap a stream
+
+        Args:
+            stream (file): Binary stream being consumed
+            total (int, optional): Total bytes, if known
+            callback (callable, optional): Called as callback(bytes_read, total)
+                every step bytes and at the end
+            step (int): Bytes between callbacks
+        """
+        self.stream = stream
+        self.total = total
+        self.callback = callback
+        self.step = step
+        self.bytes_read = 0
+        self._reported = 0
+
+    def _advance(self, data: bytes) -> bytes:
+        self.bytes_read += len(data)
+        if self.callback and (not data or self.bytes_read - self._reported >= self.step):
+            self._reported = self.bytes_read
+            self.callback(self.bytes_read, self.total)
+        return data
+
+    def read(self, size: int = -1) -> bytes:
+        return self._advance(self.stream.read(size))
+
+    def readline(self, size: int = -1) -> bytes:
+        return self._advance(self.stream.readline(size))
+
+def _remaining_bytes(stream: BinaryIO) -> Optional[int]:
+    """Bytes left in a seekable stream, or None"""
+    try:
+        position = stream.tell()
+        end = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+class ResultCopyLoader:
+    """Load a large result CSV through a staging table"""
+
+    def __init__(self, organization_id, user_id=None, academic_year: Optional[str] = None,
+                 term: Optional[str] = None, progress: Optional[Callable[[int, Optional[int]], None]] = None):
+        """Initialize the loader
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            user_id (UUID, optional): User loading the results
+            academic_year (str, optional): Academic year of rows without one
+            term (str, optional): Term of rows without one; defaults to Annual
+            progress (callable, optional): Called as progress(bytes_read, total_bytes)
+        """
+        self.organization_id = organization_id
+        self.user_id = user_id
+        self.academic_year = academic_year
+        self.term = term or DEFAULT_TERM
+        self.progress = progress
+
+    def staging_columns(self, header: List[str]) -> Dict[str, str]:
+        """Map staged fields to the raw columns (c0, c1, ...) of the file
+
+        Raises:
+            ValidationError: If required columns are missing
+        """
+        columns = {}
+        for index, name in enumerate(_column_name(value) for value in header):
+            if name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS:
+                columns.setdefault(name, f"c{index}")
+        missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+        if missing:
+            raise ValidationError(f"Missing columns: {', '.join(missing)}", 'file', 'missing_columns')
+        return columns
+
+    def _field(self, columns: Dict[str, str], name: str) -> str:
+        raw = columns.get(name)
+        return f"nullif(btrim({raw}), '')" if raw else 'NULL'
+
+    def statements(self, header: List[str]) -> Dict[str, Any]:
+        """SQL of a load, in order
+
+        Args:
+            header (list): Header row of the file
+
+        Returns:
+            dict: create, copy, normalize, validate (list), grade_bands,
+            merge_students, resolve_students, merge_results, boards and report
+        """
+        columns = self.staging_columns(header)
+        raw = [f"c{index}" for index in range(len(header))]
+        field = lambda name: self._field(columns, name)
+        terms = ', '.join(f"'{term}'" for term in TERMS)
+        conflict = ', '.join(CONFLICT_COLUMNS)
+
+        def reject(code, condition):
+            return f"UPDATE result_staging SET error = '{code}' WHERE error IS NULL AND ({condition})"
+
+        return {
+            'create': (
+                "CREATE TEMP TABLE result_staging ("
+                "line_no bigserial, " + ''.join(f"{c} text, " for c in raw) +
+                "class_name text, roll_no text, name text, section text, subject text, "
+                "marks_raw text, max_marks_raw text, marks numeric, max_marks numeric, term text, "
+                "academic_year text, exam_date_raw text, exam_date date, remarks text, "
+                "student_id uuid, subject_id uuid, grade text, error text"
+                ") ON COMMIT DROP"
+            ),
+            'copy': f"COPY result_staging ({', '.join(raw)}) FROM STDIN WITH (FORMAT csv, ENCODING 'UTF8')",
+            'normalize': (
+                f"UPDATE result_staging SET class_name = {field('class_name')}, roll_no = {field('roll_no')}, "
+                f"name = {field('name')}, section = {field('section')}, subject = {field('subject')}, "
+                f"marks_raw = {field('marks')}, max_marks_raw = {field('max_marks')}, "
+                f"term = coalesce({field('term')}, %(term)s), "
+                f"academic_year = coalesce({field('academic_year')}, %(academic_year)s), "
+                f"exam_date_raw = {field('exam_date')}, remarks = {field('remarks')}"
+            ),
+            'validate': [
+                reject('required', "class_name IS NULL OR roll_no IS NULL OR subject IS NULL "
+                                   "OR marks_raw IS NULL OR academic_year IS NULL"),
+                reject('too_long', ' OR '.join(f"length({name}) > {limit}" for name, limit in COLUMN_LIMITS.items())),
+                reject('invalid_number', f"marks_raw !~ {NUMBER} OR max_marks_raw !~ {NUMBER}"),
+                reject('invalid_date', IMPOSSIBLE_DATE),
+                "UPDATE result_staging SET marks = round(marks_raw::numeric, 2), "
+                "max_marks = round(max_marks_raw::numeric, 2), exam_date = exam_date_raw::date, "
+                f"term = (SELECT t FROM unnest(ARRAY[{terms}]) AS t WHERE lower(t) = lower(term)) "
+                "WHERE error IS NULL",
+                reject('invalid_choice', "term IS NULL"),
+                reject('invalid_format', r"academic_year !~ '^[0-9]{4}(-[0-9]{2}|-[0-9]{4})?$'"),
+                # Subjects by name or code; the class's own override organization-wide ones
+                "WITH pairs AS (SELECT DISTINCT class_name, lower(subject) AS subject FROM result_staging "
+                "WHERE error IS NULL), matched AS (SELECT DISTINCT ON (p.class_name, p.subject) "
+                "p.class_name, p.subject, s.id, s.max_marks FROM pairs p JOIN subjects s "
+                "ON s.organization_id = %(organization_id)s AND s.is_active "
+                "AND (lower(s.name) = p.subject OR lower(s.code) = p.subject) "
+                "AND (s.class_name = p.class_name OR s.class_name IS NULL) "
+                "ORDER BY p.class_name, p.subject, s.class_name IS NULL, lower(s.name) <> p.subject) "
+                "UPDATE result_staging r SET subject_id = m.id, max_marks = coalesce(r.max_marks, m.max_marks, 100) "
+                "FROM matched m WHERE r.error IS NULL AND r.class_name = m.class_name AND lower(r.subject) = m.subject",
+                reject('unknown_subject', "subject_id IS NULL"),
+                reject('invalid_marks', f"max_marks <= 0 OR max_marks > {MAX_MARKS_LIMIT} OR marks > max_marks"),
+                "UPDATE result_staging SET error = 'duplicate_roll_no' WHERE error IS NULL AND roll_no IN ("
+                "SELECT roll_no FROM result_staging WHERE error IS NULL AND name IS NOT NULL "
+                "GROUP BY roll_no HAVING count(DISTINCT lower(name)) > 1)",
+            ],
+            'grade_bands': (
+                "CREATE TEMP TABLE result_grade_bands (class_name text, academic_year text, "
+                "min_percentage numeric, grade text) ON COMMIT DROP"
+            ),
+            'grade': (
+                "UPDATE result_staging r SET grade = (SELECT b.grade FROM result_grade_bands b "
+                "WHERE b.class_name = r.class_name AND b.academic_year = r.academic_year "
+                "AND b.min_percentage <= r.marks / r.max_marks * 100 "
+                "ORDER BY b.min_percentage DESC LIMIT 1) WHERE error IS NULL"
+            ),
+            # New students take the class and section of their latest row
+            'merge_students': (
+                "WITH created AS (INSERT INTO students (id, organization_id, roll_no, name, class_name, section, "
+                "is_active, created_by, created_at, updated_at) "
+                "SELECT DISTINCT ON (roll_no) gen_random_uuid(), %(organization_id)s, roll_no, name, class_name, "
+                "coalesce(section, ''), true, %(user_id)s, timezone('utc', now()), timezone('utc', now()) FROM result_staging "
+                "WHERE error IS NULL AND name IS NOT NULL "
+                "ORDER BY roll_no, academic_year DESC, line_no DESC "
+                "ON CONFLICT (organization_id, roll_no) DO NOTHING RETURNING 1) "
+                "SELECT count(*) FROM created"
+            ),
+            'resolve_students': [
+                "UPDATE result_staging r SET student_id = s.id FROM students s "
+                "WHERE r.error IS NULL AND s.organization_id = %(organization_id)s AND s.roll_no = r.roll_no "
+                "AND s.deleted_at IS NULL",
+                reject('unknown_student', "student_id IS NULL"),
+                # The last row of a result wins, as with the chunked importer
+                "UPDATE result_staging r SET error = 'duplicate_result' FROM (SELECT line_no, row_number() OVER ("
+                "PARTITION BY student_id, subject_id, term, academic_year ORDER BY line_no DESC) AS n "
+                "FROM result_staging WHERE error IS NULL) d WHERE r.line_no = d.line_no AND d.n > 1",
+            ],
+            'merge_results': (
+                "WITH merged AS (INSERT INTO results (id, organization_id, student_id, subject_id, term, "
+                "academic_year, marks, max_marks, grade, remarks, exam_date, entered_by, is_verified, "
+                "created_at, updated_at) "
+                "SELECT gen_random_uuid(), %(organization_id)s, student_id, subject_id, term::term_type, "
+                "academic_year, marks, max_marks, grade, remarks, exam_date, %(user_id)s, false, timezone('utc', now()), timezone('utc', now()) "
+                "FROM result_staging WHERE error IS NULL "
+                f"ON CONFLICT ({conflict}) DO UPDATE SET marks = EXCLUDED.marks, "
+                "max_marks = EXCLUDED.max_marks, grade = EXCLUDED.grade, "
+                "remarks = coalesce(EXCLUDED.remarks, results.remarks), "
+                "exam_date = coalesce(EXCLUDED.exam_date, results.exam_date), "
+                "updated_at = EXCLUDED.updated_at RETURNING (xmax = 0) AS inserted) "
+                "SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM merged"
+            ),
+            # Leaderboards to rebuild; read before the staging table is dropped
+            'boards': (
+                "SELECT DISTINCT class_name, academic_year, term FROM result_staging WHERE error IS NULL "
+                "ORDER BY class_name, academic_year, term"
+            ),
+            'report': (
+                f"COPY (SELECT line_no + 1, {', '.join(raw)}, error, CASE error "
+                + ' '.join(f"WHEN '{code}' THEN '{message}'" for code, message in ERROR_MESSAGES.items()) +
+                " END FROM result_staging WHERE error IS NOT NULL ORDER BY line_no) "
+                "TO STDOUT WITH (FORMAT csv, ENCODING 'UTF8')"
+            )
+        }
+
+    def _grade_bands(self, cursor) -> None:
+        cursor.execute(
+            "SELECT DISTINCT class_name, academic_year FROM result_staging WHERE error IS NULL"
+        )
+        bands = []
+        for class_name, academic_year in cursor.fetchall():
+            scheme = get_grading_scheme(self.organization_id, class_name, academic_year)
+            bands.append((class_name, academic_year, -1, scheme.fail_grade))
+            bands.extend((class_name, academic_year, threshold, grade)
+                         for threshold, grade in zip(scheme.thresholds, scheme.grades))
+        if bands:
+            cursor.executemany("INSERT INTO result_grade_bands VALUES (%s, %s, %s, %s)", bands)
+        cursor.execute("CREATE INDEX ON result_grade_bands (class_name, academic_year, min_percentage)")
+
+    def load(self, stream: BinaryIO, report: Optional[BinaryIO] = None) -> Dict[str, Any]:
+        """Load a CSV of results
+
+        Args:
+            stream (file): Binary CSV stream, header first
+            report (file, optional): Binary stream the error report is written
+                to (CSV: row, the rejected row's columns, error, message)
+
+        Returns:
+            dict: success, rows, created_students, created, updated, count,
+            rejected and errors (count by code), or error
+        """
+        header_line = stream.readline()
+        header = next(csv.reader([header_line.decode('utf-8-sig')]), [])
+        try:
+            sql = self.statements(header)
+        except ValidationError as e:
+            return {'success': False, 'error': e.message}
+
+        params = {
+            'organization_id': str(self.organization_id),
+            'user_id': str(self.user_id) if self.user_id else None,
+            'term': self.term,
+            'academic_year': self.academic_year
+        }
+        total = _remaining_bytes(stream)
+        reader = ProgressReader(stream, total, self.progress)
+
+        cursor = db.session.connection().connection.cursor()
+        try:
+            cursor.execute(sql['create'])
+            cursor.copy_expert(sql['copy'], reader)
+            rows = cursor.rowcount
+            if self.progress:
+                self.progress(reader.bytes_read, total)
+
+            cursor.execute(sql['normalize'], params)
+            # Temporary tables are not analyzed automatically
+            cursor.execute("ANALYZE result_staging")
+            for statement in sql['validate']:
+                cursor.execute(statement, params)
+            cursor.execute(sql['grade_bands'])
+            self._grade_bands(cursor)
+            cursor.execute(sql['grade'])
+            cursor.execute(sql['merge_students'], params)
+            created_students = cursor.fetchone()[0]
+            for statement in sql['resolve_students']:
+                cursor.execute(statement, params)
+            cursor.execute(sql['merge_results'], params)
+            created, updated = cursor.fetchone()
+            cursor.execute(sql['boards'])
+            boards = cursor.fetchall()
+
+            cursor.execute("SELECT error, count(*) FROM result_staging WHERE error IS NOT NULL GROUP BY error")
+            errors = dict(cursor.fetchall())
+            if report is not None and errors:
+                self._write_report(cursor, sql['report'], header, report)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"COPY result load failed for organization {self.organization_id}: {str(e)}")
+            return {'success': False, 'error': f"Load failed, nothing was imported: {str(e).splitlines()[0]}"}
+        finally:
+            cursor.close()
+
+        self._refresh_leaderboards(boards)
+        rejected = sum(errors.values())
+        logger.info(f"Loaded {created + updated} results ({rejected} rejected, {created_students} new students) "
+                    f"for organization {self.organization_id}")
+        return {
+            'success': True,
+            'rows': rows,
+            'created_students': created_students,
+            'created': created,
+            'updated': updated,
+            'count': created + updated,
+            'rejected': rejected,
+            'errors': errors
+        }
+
+    def _refresh_leaderboards(self, boards: List[tuple]) -> None:
+        """Rebuild the boards of every (class, year, term) that got results"""
+        if not boards:
+            return
+        leaderboard = LeaderboardService()
+        for class_name, academic_year, term in boards:
+            try:
+                leaderboard.rebuild_organization(self.organization_id, academic_year, term, class_name=class_name)
+            except Exception as e:
+                logger.warning(f"Leaderboard rebuild failed for class {class_name}: {str(e)}")
+
+    @staticmethod
+    def _write_report(cursor, statement: str, header: List[str], report: BinaryIO) -> None:
+        """Write the file's header and COPY the rejected rows after it"""
+        header_buffer = io.StringIO()
+        csv.writer(header_buffer).writerow(['row'] + header + ['error', 'message'])
+        report.write(header_buffer.getvalue().encode('utf-8'))
+        cursor.copy_expert(statement, report)
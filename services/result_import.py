@@ -0,0 +1,563 @@
+# services/result_import.py
+import csv
+import io
+import logging
+import re
+import uuid
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, literal_column, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+
+from models.base import db
+from models.result import Result
+from models.student import Student
+from models.subject import Subject
+from services.leaderboard_service import LeaderboardService
+from utils.grading import get_grading_scheme
+from utils.iterables import chunked
+from utils.validations import ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Bulk result import.
+#
+# An uploaded sheet is processed as a stream in four stages, so memory stays
+# flat however many marks it holds:
+#
+# 1. read_rows parses the CSV (csv module) or XLSX (openpyxl read-only
+#    mode) one row at a time.
+# 2. ClassLookup resolves roll numbers and subject names through one map
+#    per class, loaded with a single query the first time the class appears.
+# 3. Rows are validated a chunk at a time; rejected rows are reported with
+#    their line number and do not stop the import.
+# 4. Each chunk is written with one INSERT ... ON CONFLICT (organization_id,
+#    student_id, subject_id, term, academic_year) DO UPDATE and committed,
+#    so re-uploading a corrected sheet updates marks in place.
+#
+# A dry run (plan) stops after stage 3, compares the validated results with
+# the stored ones a chunk of keys at a time, and stages them (see
+# import_staging.py) so the confirmed import (commit) only runs stage 4.
+
+DEFAULT_CHUNK_SIZE = 1000
+# Rows of each kind shown in a dry run
+SAMPLE_ROWS = 20
+# Rejected rows beyond this are counted but not listed
+MAX_REPORTED_ERRORS = 500
+TERMS = tuple(Result.__table__.c.term.type.enums)
+DEFAULT_TERM = 'Annual'
+# Numeric(5, 2)
+MAX_MARKS_LIMIT = Decimal('999.99')
+ACADEMIC_YEAR_PATTERN = re.compile(r'^\d{4}(-\d{2}|-\d{4})?$')
+
+REQUIRED_COLUMNS = ('class_name', 'roll_no', 'subject', 'marks')
+COLUMN_ALIASES = {
+    'class': 'class_name',
+    'roll': 'roll_no',
+    'roll_number': 'roll_no',
+    'subject_name': 'subject',
+    'marks_obtained': 'marks',
+    'total_marks': 'max_marks',
+    'year': 'academic_year',
+    'exam': 'term',
+    'exam_type': 'term'
+}
+CONFLICT_COLUMNS = ('organization_id', 'student_id', 'subject_id', 'term', 'academic_year')
+
+def _column_name(header: Any) -> str:
+    name = re.sub(r'[^a-z0-9]+', '_', str(header or '').strip().lower()).strip('_')
+    return COLUMN_ALIASES.get(name, name)
+
+def _csv_rows(file) -> Iterator[List[Any]]:
+    stream = getattr(file, 'stream', file)
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        # Leave the upload open for the caller
+        if not stream.closed:
+            text.detach()
+
+def _xlsx_rows(file) -> Iterator[Tuple[Any, ...]]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(getattr(file, 'stream', file), read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def read_rows(file, filename: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Parse an uploaded result sheet one row at a time
+
+    Headers are matched case-insensitively, with common aliases (Class,
+    Roll Number, Marks Obtained, Total Marks, ...). Blank rows are skipped.
+
+    Args:
+        file: Uploaded file (FileStorage) or binary file object
+        filename (str, optional): Name deciding the format; defaults to file.filename
+
+    Yields:
+        tuple: (line number, row dict keyed by column name)
+
+    Raises:
+        ValidationError: If the file is empty or required columns are missing
+    """
+    name = (filename or getattr(file, 'filename', None) or '').lower()
+    rows = _xlsx_rows(file) if name.endswith('.xlsx') else _csv_rows(file)
+
+    try:
+        header = next(rows, None)
+        if not header:
+            raise ValidationError("The file is empty", 'file', 'empty_file')
+        columns = [_column_name(value) for value in header]
+        missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+        if missing:
+            raise ValidationError(f"Missing columns: {', '.join(missing)}", 'file', 'missing_columns')
+
+        for line, values in enumerate(rows, start=2):
+            if all(value is None or str(value).strip() == '' for value in values):
+                continue
+            yield line, dict(zip(columns, values))
+    finally:
+        rows.close()
+
+class ClassLookup:
+    """Roll number and subject maps of an organization, loaded once per class"""
+
+    def __init__(self, organization_id):
+        """Initialize the lookup
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+        """
+        self.organization_id = organization_id
+        self._students = {}
+        self._subjects = {}
+        self._schemes = {}
+
+    def _load(self, class_name: str) -> None:
+        self._students[class_name] = {
+            str(roll_no).strip(): student_id
+            for roll_no, student_id in db.session.query(Student.roll_no, Student.id).filter(
+                Student.organization_id == self.organization_id,
+                Student.class_name == class_name,
+                Student.deleted_at.is_(None)
+            )
+        }
+
+        subjects = {}
+        # Subjects of the class override organization-wide ones of the same name
+        rows = db.session.query(Subject.name, Subject.code, Subject.id, Subject.max_marks, Subject.class_name).filter(
+            Subject.organization_id == self.organization_id,
+            Subject.is_active.is_(True),
+            or_(Subject.class_name == class_name, Subject.class_name.is_(None))
+        ).all()
+        for name, code, subject_id, max_marks, subject_class in sorted(rows, key=lambda row: row[4] is not None):
+            entry = (subject_id, Decimal(max_marks) if max_marks is not None else None)
+            subjects[name.strip().lower()] = entry
+            if code:
+                subjects.setdefault(code.strip().lower(), entry)
+        self._subjects[class_name] = subjects
+
+    def student(self, class_name: str, roll_no: str) -> Optional[uuid.UUID]:
+        """Student ID of a roll number in a class, or None"""
+        if class_name not in self._students:
+            self._load(class_name)
+        return self._students[class_name].get(roll_no)
+
+    def subject(self, class_name: str, name: str) -> Optional[Tuple[uuid.UUID, Optional[Decimal]]]:
+        """(subject ID, max marks) of a subject name or code in a class, or None"""
+        if class_name not in self._subjects:
+            self._load(class_name)
+        return self._subjects[class_name].get(name.lower())
+
+    def scheme(self, class_name: str, academic_year: str):
+        """Grading scheme of a class"""
+        key = (class_name, academic_year)
+        if key not in self._schemes:
+            self._schemes[key] = get_grading_scheme(self.organization_id, class_name, academic_year)
+        return self._schemes[key]
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Excel stores roll numbers typed as 12 as 12.0
+        value = int(value)
+    return str(value).strip()
+
+def _decimal(value: Any) -> Optional[Decimal]:
+    text = _text(value)
+    if not text:
+        return None
+    try:
+        number = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(text)
+    if not number.is_finite():
+        raise ValueError(text)
+    return number
+
+def _date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _text(value)
+    return datetime.strptime(text, '%Y-%m-%d').date() if text else None
+
+class ResultImport:
+    """One bulk result import: validates rows chunk by chunk and upserts them"""
+
+    def __init__(self, organization_id, user_id=None, academic_year: Optional[str] = None,
+                 term: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 lookup: Optional[ClassLookup] = None):
+        """Initialize the import
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            user_id (UUID, optional): User entering the results
+            academic_year (str, optional): Academic year of rows without one
+            term (str, optional): Term of rows without one; defaults to Annual
+            chunk_size (int): Rows validated and written together
+            lookup (ClassLookup, optional): Roll number and subject maps
+        """
+        self.organization_id = organization_id
+        self.user_id = user_id
+        self.academic_year = academic_year
+        self.term = term
+        self.chunk_size = max(int(chunk_size), 1)
+        self.lookup = lookup or ClassLookup(organization_id)
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.rejected = 0
+        self.errors = []
+        self.boards = set()
+
+    def _reject(self, line: int, field: str, message: str, code: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': line, 'field': field, 'message': message, 'code': code})
+
+    def _term(self, value: Any) -> Optional[str]:
+        text = _text(value) or self.term or DEFAULT_TERM
+        for term in TERMS:
+            if term.lower() == text.lower():
+                return term
+        return None
+
+    def validate_row(self, line: int, row: Dict[str, Any], now: datetime) -> Optional[Dict[str, Any]]:
+        """Validate and resolve one row
+
+        Args:
+            line (int): Line number, for error reporting
+            row (dict): The parsed row
+            now (datetime): Timestamp of the chunk
+
+        Returns:
+            dict: Result values ready to write, or None if the row was rejected
+        """
+        class_name, roll_no, subject_name = _text(row.get('class_name')), _text(row.get('roll_no')), _text(row.get('subject'))
+        for field, value in (('class_name', class_name), ('roll_no', roll_no), ('subject', subject_name)):
+            if not value:
+                self._reject(line, field, f"{field} is required", 'required')
+                return None
+
+        student_id = self.lookup.student(class_name, roll_no)
+        if student_id is None:
+            self._reject(line, 'roll_no', f"No student with roll number {roll_no} in class {class_name}", 'unknown_student')
+            return None
+        subject = self.lookup.subject(class_name, subject_name)
+        if subject is None:
+            self._reject(line, 'subject', f"Unknown subject {subject_name} for class {class_name}", 'unknown_subject')
+            return None
+        subject_id, subject_max = subject
+
+        try:
+            marks = _decimal(row.get('marks'))
+            max_marks = _decimal(row.get('max_marks'))
+        except ValueError as e:
+            self._reject(line, 'marks', f"Not a number: {e}", 'invalid_number')
+            return None
+        if marks is None:
+            self._reject(line, 'marks', "marks is required", 'required')
+            return None
+        if max_marks is None:
+            max_marks = subject_max if subject_max is not None else Decimal(100)
+        if max_marks <= 0 or max_marks > MAX_MARKS_LIMIT:
+            self._reject(line, 'max_marks', f"Max marks must be between 0 and {MAX_MARKS_LIMIT}", 'invalid_marks')
+            return None
+        if marks < 0 or marks > max_marks:
+            self._reject(line, 'marks', f"Marks must be between 0 and {max_marks}", 'invalid_marks')
+            return None
+
+        term = self._term(row.get('term'))
+        if term is None:
+            self._reject(line, 'term', f"Term must be one of {', '.join(TERMS)}", 'invalid_choice')
+            return None
+        academic_year = _text(row.get('academic_year')) or self.academic_year
+        if not academic_year or not ACADEMIC_YEAR_PATTERN.match(academic_year):
+            self._reject(line, 'academic_year', "Academic year must look like 2024-25", 'invalid_format')
+            return None
+
+        try:
+            exam_date = _date(row.get('exam_date'))
+        except ValueError:
+            self._reject(line, 'exam_date', "Exam date must be YYYY-MM-DD", 'invalid_date')
+            return None
+
+        percentage = float(marks / max_marks * 100)
+        self.boards.add((class_name, academic_year, term))
+        return {
+            'id': uuid.uuid4(),
+            'organization_id': self.organization_id,
+            'student_id': student_id,
+            'subject_id': subject_id,
+            'term': term,
+            'academic_year': academic_year,
+            'marks': marks,
+            'max_marks': max_marks,
+            'grade': self.lookup.scheme(class_name, academic_year).grade(percentage),
+            'remarks': _text(row.get('remarks')) or None,
+            'exam_date': exam_date,
+            'entered_by': self.user_id,
+            'created_at': now,
+            'updated_at': now
+        }
+
+    def validate_chunk(self, rows: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Validate a chunk of rows
+
+        A result appearing twice in the chunk is written once, with the later
+        row's values, as a later chunk would overwrite it too.
+
+        Returns:
+            list: Result values ready to write
+        """
+        now = datetime.utcnow()
+        records = {}
+        for line, row in rows:
+            record = self.validate_row(line, row, now)
+            if record is not None:
+                records[tuple(record[column] for column in CONFLICT_COLUMNS)] = record
+        return list(records.values())
+
+    @staticmethod
+    def upsert_statement(records: List[Dict[str, Any]]):
+        """INSERT ... ON CONFLICT DO UPDATE of results, returning whether each row was inserted
+
+        Args:
+            records (list): Result values, unique per conflict key
+        """
+        table = Result.__table__
+        stmt = insert(table).values(records)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[column] for column in CONFLICT_COLUMNS],
+            set_={
+                'marks': stmt.excluded.marks,
+                'max_marks': stmt.excluded.max_marks,
+                'grade': stmt.excluded.grade,
+                # Keep what the sheet leaves blank
+                'remarks': func.coalesce(stmt.excluded.remarks, table.c.remarks),
+                'exam_date': func.coalesce(stmt.excluded.exam_date, table.c.exam_date),
+                'entered_by': func.coalesce(stmt.excluded.entered_by, table.c.entered_by),
+                'updated_at': stmt.excluded.updated_at
+            }
+        ).returning(literal_column('(xmax = 0)'))
+        return stmt
+
+    def upsert(self, records: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """Write results with one statement
+
+        Args:
+            records (list): Result values, unique per conflict key
+
+        Returns:
+            tuple: (rows inserted, rows updated)
+        """
+        inserted = sum(1 for (is_insert,) in db.session.execute(self.upsert_statement(records)) if is_insert)
+        return inserted, len(records) - inserted
+
+    def run(self, rows: Iterable[Tuple[int, Dict[str, Any]]]) -> Dict[str, Any]:
+        """Validate and write all rows, committing each chunk
+
+        A failure while writing rolls back the current chunk only; earlier
+        chunks stay committed and are reported as imported.
+
+        Args:
+            rows (iterable): (line number, row) pairs, e.g. from read_rows
+
+        Returns:
+            dict: success, count (results written), created, updated, rows,
+            rejected and errors (row, field, message, code), or error
+        """
+        try:
+            for chunk in chunked(rows, self.chunk_size):
+                self.rows += len(chunk)
+                self._write(self.validate_chunk(chunk))
+        except ValidationError as e:
+            return {**self.summary(), 'success': False, 'error': e.message}
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Result import failed after {self.rows} rows: {str(e)}")
+            return {**self.summary(), 'success': False, 'error': 'Import failed; rows before the failure were saved'}
+
+        self._refresh_leaderboards()
+        logger.info(f"Imported {self.created + self.updated} results ({self.rejected} rejected) "
+                    f"for organization {self.organization_id}")
+        return {**self.summary(), 'success': True}
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        if records:
+            created, updated = self.upsert(records)
+            db.session.commit()
+            self.created += created
+            self.updated += updated
+
+    def existing(self, keys: List[tuple]) -> Dict[tuple, tuple]:
+        """Stored marks of results, with one query
+
+        Args:
+            keys (list): (student_id, subject_id, term, academic_year) keys
+
+        Returns:
+            dict: (marks, max_marks, grade) by key, for the keys stored
+        """
+        table = Result.__table__
+        key_columns = [table.c[column] for column in CONFLICT_COLUMNS[1:]]
+        query = select(*key_columns, table.c.marks, table.c.max_marks, table.c.grade).where(
+            table.c.organization_id == self.organization_id,
+            tuple_(*key_columns).in_(keys)
+        )
+        width = len(key_columns)
+        return {tuple(row[:width]): tuple(row[width:]) for row in db.session.execute(query)}
+
+    def plan(self, rows: Iterable[Tuple[int, Dict[str, Any]]], sample_size: int = SAMPLE_ROWS) -> Dict[str, Any]:
+        """Dry run: validate all rows and work out what importing them changes
+
+        Nothing is written. The validated results are staged under a token
+        that commit() takes to import them without parsing the sheet again.
+
+        Args:
+            rows (iterable): (line number, row) pairs, e.g. from read_rows
+            sample_size (int): Rows listed per kind of change
+
+        Returns:
+            dict: success, token, rows, inserted, updated (marks changed),
+            unchanged, rejected, errors and samples (inserted, updated: row,
+            class_name, roll_no, subject, term, academic_year, old and new
+            marks, max_marks and grade), or error
+        """
+        records = {}
+        sources = {}
+        try:
+            for chunk in chunked(rows, self.chunk_size):
+                self.rows += len(chunk)
+                now = datetime.utcnow()
+                for line, row in chunk:
+                    record = self.validate_row(line, row, now)
+                    if record is not None:
+                        # The last row of a result wins, as in run()
+                        key = tuple(record[column] for column in CONFLICT_COLUMNS[1:])
+                        records.pop(key, None)
+                        records[key] = record
+                        sources[key] = (line, row)
+        except ValidationError as e:
+            return {**self.summary(), 'success': False, 'error': e.message}
+
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        samples = {'inserted': [], 'updated': []}
+        for keys in chunked(records, self.chunk_size):
+            existing = self.existing(keys)
+            for key in keys:
+                record, old = records[key], existing.get(key)
+                if old is None:
+                    change = 'inserted'
+                elif (old[0], old[1]) == (record['marks'], record['max_marks']):
+                    change = 'unchanged'
+                else:
+                    change = 'updated'
+                counts[change] += 1
+
+                sample = samples.get(change)
+                if sample is not None and len(sample) < sample_size:
+                    line, row = sources[key]
+                    sample.append({
+                        'row': line,
+                        'class_name': _text(row.get('class_name')),
+                        'roll_no': _text(row.get('roll_no')),
+                        'subject': _text(row.get('subject')),
+                        'term': record['term'],
+                        'academic_year': record['academic_year'],
+                        'old_marks': float(old[0]) if old else None,
+                        'old_max_marks': float(old[1]) if old and old[1] is not None else None,
+                        'old_grade': old[2] if old else None,
+                        'marks': float(record['marks']),
+                        'max_marks': float(record['max_marks']),
+                        'grade': record['grade']
+                    })
+
+        from services.import_staging import ImportStaging
+        token = ImportStaging.save('results', self.organization_id, self.user_id, {
+            'records': list(records.values()),
+            'rows': self.rows,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'boards': self.boards
+        })
+        return {
+            **self.summary(), **counts, 'success': True, 'dry_run': True, 'token': token, 'samples': samples
+        }
+
+    def commit(self, staged: Dict[str, Any]) -> Dict[str, Any]:
+        """Write the results of a dry run
+
+        Args:
+            staged (dict): Payload staged by plan()
+
+        Returns:
+            dict: As run()
+        """
+        self.rows = staged['rows']
+        self.rejected = staged['rejected']
+        self.errors = staged['errors']
+        self.boards = staged['boards']
+        try:
+            for records in chunked(staged['records'], self.chunk_size):
+                now = datetime.utcnow()
+                for record in records:
+                    record['created_at'] = record['updated_at'] = now
+                self._write(records)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Staged result import failed after {self.created + self.updated} results: {str(e)}")
+            return {**self.summary(), 'success': False, 'error': 'Import failed; rows before the failure were saved'}
+
+        self._refresh_leaderboards()
+        logger.info(f"Imported {self.created + self.updated} staged results for organization {self.organization_id}")
+        return {**self.summary(), 'success': True}
+
+    def summary(self) -> Dict[str, Any]:
+        """Counts and errors so far"""
+        return {
+            'count': self.created + self.updated,
+            'created': self.created,
+            'updated': self.updated,
+            'rows': self.rows,
+            'rejected': self.rejected,
+            'errors': self.errors
+        }
+
+    def _refresh_leaderboards(self) -> None:
+        if not self.boards:
+            return
+        leaderboard = LeaderboardService()
+        for class_name, academic_year, term in sorted(self.boards):
+            try:
+                leaderboard.rebuild_organization(self.organization_id, academic_year, term, class_name=class_name)
+            except Exception as e:
+                logger.warning(f"Leaderboard rebuild failed for class {class_name}: {str(e)}")
@@ -3,6 +3,10 @@ from models.result import Result
 from models.student import Student
 from models.subject import Subject
 from models.class_settings import ClassSettings
+from services.import_staging import ImportStaging
+from services.leaderboard_service import LeaderboardService
+from services.result_import import DEFAULT_CHUNK_SIZE, ResultImport, read_rows
+from utils.config import config_value
 from flask import g
 
 class ResultService(BaseService):
@@ -24,6 +28,7 @@ class ResultService(BaseService):
         result = Result(**data, organization_id=g.organization_id)
         self.db.session.add(result)
         self.db.session.commit()
+        LeaderboardService().record_result(result)
         return result
     
     def update_result(self, result_id, data):
@@ -31,7 +36,70 @@ class ResultService(BaseService):
         result = Result.query.get_or_404(result_id)
         if result.organization_id != g.organization_id:
             raise PermissionError("Not authorized to access this result")
+        previous = {field: getattr(result, field) for field in LeaderboardService.BOARD_FIELDS}
         for key, value in data.items():
             setattr(result, key, value)
         self.db.session.commit()
-        return result
\ No newline at end of file
+        LeaderboardService().record_result(result, previous=previous)
+        return result
+    
+    def delete_result(self, result_id):
+        """Delete a result and take it off the leaderboards"""
+        result = Result.query.get_or_404(result_id)
+        if result.organization_id != g.organization_id:
+            raise PermissionError("Not authorized to access this result")
+        result.soft_delete()
+        LeaderboardService().remove_result(result)
+        return result
+    
+    @staticmethod
+    def bulk_import_results(file, organization_id, user_id=None, academic_year=None, term=None, dry_run=False):
+        """Import results from an uploaded CSV or XLSX sheet
+        
+        The sheet needs class_name, roll_no, subject and marks columns, and
+        may have max_marks, term, academic_year, exam_date and remarks. Rows
+        are streamed, validated and upserted in chunks (see
+        services/result_import.py); invalid rows are skipped and reported.
+        
+        Args:
+            file: Uploaded file (FileStorage)
+            organization_id (UUID): The organization ID for tenant isolation
+            user_id (UUID, optional): User entering the results
+            academic_year (str, optional): Academic year of rows without one
+            term (str, optional): Term of rows without one; defaults to Annual
+            dry_run (bool): Only report what the import would change, and
+                stage it for commit_result_import
+            
+        Returns:
+            dict: success, count, created, updated, rows, rejected and errors, or error;
+            for a dry run, the plan (token, inserted, updated, unchanged, samples, ...)
+        """
+        result_import = ResultImport(organization_id, user_id, academic_year, term, ResultService._chunk_size())
+        if dry_run:
+            return result_import.plan(read_rows(file))
+        return result_import.run(read_rows(file))
+    
+    @staticmethod
+    def commit_result_import(token, organization_id, user_id=None):
+        """Import the results staged by a dry run
+        
+        Args:
+            token (str): Token of the dry run
+            organization_id (UUID): The organization ID for tenant isolation
+            user_id (UUID, optional): User who ran the dry run
+            
+        Returns:
+            dict: As bulk_import_results
+        """
+        staged = ImportStaging.load('results', token, organization_id, user_id)
+        if staged is None:
+            return {'success': False, 'error': 'The preview has expired; upload the file again'}
+        
+        result = ResultImport(organization_id, user_id, chunk_size=ResultService._chunk_size()).commit(staged)
+        if result['success']:
+            ImportStaging.discard(token)
+        return result
+    
+    @staticmethod
+    def _chunk_size():
+        return config_value('RESULT_IMPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
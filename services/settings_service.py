@@ -16,3 +16,37 @@ class SettingsService:
         db.session.add(subject)
         db.session.commit()
         return subject
+
+    @staticmethod
+    def update_school_profile(profile_data, organization_id):
+        """Update the school profile shown on generated documents
+
+        Args:
+            profile_data (dict): name, address, phone, email and website
+            organization_id (UUID): The organization ID for tenant isolation
+
+        Returns:
+            dict: success and error
+        """
+        from models import db
+        from models.organization import Organization
+        from services.asset_cache import AssetCache
+
+        organization = Organization.query.get(organization_id)
+        if not organization:
+            return {'success': False, 'error': 'Organization not found'}
+
+        for field in ('name', 'address', 'phone', 'email', 'website'):
+            value = profile_data.get(field)
+            if value is not None:
+                setattr(organization, field, value)
+
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            return {'success': False, 'error': 'Failed to update school profile'}
+
+        # Logos and watermarks rendered from the old profile are stale now
+        AssetCache.shared().invalidate(organization_id)
+        return {'success': True, 'error': None}
@@ -1,19 +1,25 @@
+from bisect import bisect_left
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, case
 import logging
 
 from models.student import Student
 from models.result import Result
+from models.subject import Subject
 from models.student_analytics import StudentAnalytics
-from models.base import db
+from models.base import db, Attendance
 from services.base_service import BaseService
 from services.cache_service import CacheService
+from services.leaderboard_service import LeaderboardService
 from flask import current_app
 
 logger = logging.getLogger(__name__)
 # Initialize cache service with a longer default timeout for analytics data
 cache_service = CacheService(default_timeout=3600)  # 1 hour default timeout
 
+# Optional per-student sections returned by the class analytics endpoint
+CLASS_ANALYTICS_FIELDS = ('analytics', 'rank', 'comparison', 'trend')
+
 class StudentAnalyticsService(BaseService):
     """Service for student-specific analytics and insights
     
@@ -58,35 +64,29 @@ class StudentAnalyticsService(BaseService):
         # Calculate average marks
         avg_marks = sum(r.marks for r in results) / len(results) if results else 0
         
-        # Calculate rank in class
-        class_results = db.session.query(
-            Student.id,
-            func.avg(Result.marks).label('avg_marks')
-        ).join(Result).filter(
-            Student.class_name == student.class_name,
-            Student.section == student.section,
-            Student.organization_id == organization_id,
-            Result.academic_year == academic_year,
-            Result.term == term
-        ).group_by(Student.id).order_by(func.avg(Result.marks).desc()).all()
-        
-        # Find student's rank
-        rank = next((i+1 for i, r in enumerate(class_results) if r[0] == student_id), 0)
+        # Read rank from the live leaderboard, falling back to a class scan
+        board = LeaderboardService.board_key(
+            organization_id, student.class_name, student.section, academic_year, term
+        )
+        rank = LeaderboardService().get_rank(board, student_id)
+        if rank is None:
+            class_results = db.session.query(
+                Student.id,
+                func.avg(Result.marks).label('avg_marks')
+            ).join(Result).filter(
+                Student.class_name == student.class_name,
+                Student.section == student.section,
+                Student.organization_id == organization_id,
+                Result.academic_year == academic_year,
+                Result.term == term
+            ).group_by(Student.id).order_by(func.avg(Result.marks).desc()).all()
+
+            # Find student's rank
+            rank = next((i+1 for i, r in enumerate(class_results) if r[0] == student_id), 0)
         
         # Calculate improvement from previous term
-        prev_term = StudentAnalyticsService._get_previous_term(term)
-        prev_year = academic_year
-        if not prev_term:
-            # If no previous term in current year, check previous year's annual results
-            try:
-                prev_year = str(int(academic_year) - 1)
-            except ValueError:
-                # Handle academic years like "2023-2024"
-                if '-' in academic_year:
-                    year = academic_year.split('-')[0]
-                    prev_year = f"{int(year)-1}-{int(year)}"
-            prev_term = 'Annual'
-            
+        prev_year, prev_term = StudentAnalyticsService._get_previous_period(academic_year, term)
+
         prev_results = Result.query.filter_by(
             student_id=student_id, 
             organization_id=organization_id,
@@ -171,7 +171,32 @@ class StudentAnalyticsService(BaseService):
             if term == 'Half Yearly':
                 return 'First Term'
             return None
-    
+
+    @staticmethod
+    def _get_previous_period(academic_year, term):
+        """Get the academic year and term to compare improvement against
+
+        Args:
+            academic_year (str): The current academic year
+            term (str): The current term
+
+        Returns:
+            tuple: (previous academic year, previous term)
+        """
+        prev_term = StudentAnalyticsService._get_previous_term(term)
+        prev_year = academic_year
+        if not prev_term:
+            # If no previous term in current year, check previous year's annual results
+            try:
+                prev_year = str(int(academic_year) - 1)
+            except ValueError:
+                # Handle academic years like "2023-2024"
+                if '-' in academic_year:
+                    year = academic_year.split('-')[0]
+                    prev_year = f"{int(year)-1}-{int(year)}"
+            prev_term = 'Annual'
+        return prev_year, prev_term
+
     @staticmethod
     def _generate_recommendations(student, sorted_subjects, improvement, attendance):
         """Generate personalized recommendations based on performance
@@ -217,20 +242,17 @@ class StudentAnalyticsService(BaseService):
             recommendations.append("Continue with consistent performance across all subjects")
         
         return "\n".join(recommendations)
-    
+
     @staticmethod
-    def get_student_performance_trends(student_id, organization_id, period='12months'):
-        """Get performance trends for a student over time
-        
+    def _get_period_cutoff(period):
+        """Get the cut-off datetime for a trend period
+
         Args:
-            student_id (UUID): The ID of the student
-            organization_id (UUID): The organization ID for tenant isolation
-            period (str): The period to analyze ('6months', '12months', 'all')
-            
+            period (str): The period to analyze ('3months', '6months', '12months', 'all')
+
         Returns:
-            list: List of trend data points
+            datetime: Results created before this point are excluded
         """
-        # Determine time period
         months = 12
         if period == '6months':
             months = 6
@@ -238,8 +260,22 @@ class StudentAnalyticsService(BaseService):
             months = 3
         elif period == 'all':
             months = 60  # 5 years should cover all data
+
+        return datetime.utcnow() - timedelta(days=30*months)
+
+    @staticmethod
+    def get_student_performance_trends(student_id, organization_id, period='12months'):
+        """Get performance trends for a student over time
+        
+        Args:
+            student_id (UUID): The ID of the student
+            organization_id (UUID): The organization ID for tenant isolation
+            period (str): The period to analyze ('6months', '12months', 'all')
             
-        cutoff = datetime.utcnow() - timedelta(days=30*months)
+        Returns:
+            list: List of trend data points
+        """
+        cutoff = StudentAnalyticsService._get_period_cutoff(period)
         
         # Get results for the period
         results = Result.query.filter_by(
@@ -354,9 +390,272 @@ class StudentAnalyticsService(BaseService):
             'class_average': class_avg,
             'difference': student_avg - class_avg
         }
-        
+
         return comparison
-    
+
+    @staticmethod
+    def get_class_analytics(organization_id, class_name, section, academic_year, term,
+                            page=1, per_page=50, fields=None, period='12months'):
+        """Get analytics, rank, comparison and trends for every student in a class
+
+        All students are computed together from a handful of set-based queries
+        instead of running calculate_student_analytics and get_student_comparison
+        once per student. The computed class is cached as a whole and pages are
+        sliced from the cached copy.
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            class_name (str): The class name
+            section (str, optional): The section; all sections, each ranked on its own, when omitted
+            academic_year (str): The academic year
+            term (str): The term
+            page (int): The page number (1-based)
+            per_page (int): Number of students per page
+            fields (list, optional): Subset of CLASS_ANALYTICS_FIELDS to include
+            period (str): The trend period ('3months', '6months', '12months', 'all')
+
+        Returns:
+            dict: Student records, class summary and pagination data
+        """
+        cache_key = (f"student_analytics:{organization_id}:class:{class_name}:"
+                     f"{section or 'all'}:{academic_year}:{term}:{period}")
+        class_analytics = cache_service.get(cache_key)
+        if class_analytics is not None:
+            logger.info(f"Retrieved class analytics from cache for class {class_name}")
+        else:
+            class_analytics = StudentAnalyticsService._compute_class_analytics(
+                organization_id, class_name, section, academic_year, term, period
+            )
+            cache_service.set(cache_key, class_analytics, timeout=3600)
+
+        return StudentAnalyticsService._paginate_class_analytics(class_analytics, page, per_page, fields)
+
+    @staticmethod
+    def _compute_class_analytics(organization_id, class_name, section, academic_year, term, period):
+        """Load everything a class needs in bulk and build the per-student records
+
+        Args:
+            organization_id (UUID): The organization ID for tenant isolation
+            class_name (str): The class name
+            section (str, optional): The section
+            academic_year (str): The academic year
+            term (str): The term
+            period (str): The trend period
+
+        Returns:
+            dict: Uncut student records and class summary
+        """
+        query = Student.query.filter_by(organization_id=organization_id, class_name=class_name, is_active=True)
+        if section:
+            query = query.filter_by(section=section)
+        students = query.order_by(Student.roll_no).all()
+
+        if not students:
+            logger.warning(f"No students found for class {class_name} {section or ''}")
+            return {'students': [], 'class_summary': {}}
+
+        student_ids = [s.id for s in students]
+
+        # Current term marks with subject names in one round trip
+        results = db.session.query(
+            Result.student_id, Result.subject_id, Subject.name, Result.marks
+        ).outerjoin(Subject, Subject.id == Result.subject_id).filter(
+            Result.organization_id == organization_id,
+            Result.student_id.in_(student_ids),
+            Result.academic_year == academic_year,
+            Result.term == term
+        ).all()
+
+        # Previous term averages for improvement
+        prev_year, prev_term = StudentAnalyticsService._get_previous_period(academic_year, term)
+        prev_averages = dict(db.session.query(
+            Result.student_id, func.avg(Result.marks)
+        ).filter(
+            Result.organization_id == organization_id,
+            Result.student_id.in_(student_ids),
+            Result.academic_year == prev_year,
+            Result.term == prev_term
+        ).group_by(Result.student_id).all())
+
+        # The Attendance counts Student.total_attendance takes, for all students at once
+        attendance = {
+            row.student_id: (row.total, row.present or 0)
+            for row in db.session.query(
+                Attendance.student_id,
+                func.count(Attendance.id).label('total'),
+                func.sum(case((Attendance.status == 'present', 1), else_=0)).label('present')
+            ).filter(
+                Attendance.organization_id == organization_id,
+                Attendance.student_id.in_(student_ids)
+            ).group_by(Attendance.student_id).all()
+        }
+
+        # Raw points for the trend sparklines
+        trend_rows = db.session.query(
+            Result.student_id, Result.created_at, Result.marks
+        ).filter(
+            Result.organization_id == organization_id,
+            Result.student_id.in_(student_ids),
+            Result.created_at >= StudentAnalyticsService._get_period_cutoff(period)
+        ).all()
+
+        return StudentAnalyticsService._build_class_analytics(
+            students, results, prev_averages, attendance, trend_rows
+        )
+
+    @staticmethod
+    def _build_class_analytics(students, results, prev_averages, attendance, trend_rows):
+        """Build per-student analytics records from preloaded class data
+
+        Uses the same rules as calculate_student_analytics and
+        get_student_comparison so both paths agree on every number: students
+        are ranked within their section, and attendance is the percentage
+        Student.total_attendance gives. When the whole class is loaded, each
+        section is ranked on its own.
+
+        Args:
+            students (list): Student objects in the class
+            results (list): (student_id, subject_id, subject_name, marks) rows
+            prev_averages (dict): Previous term average marks by student ID
+            attendance (dict): (total_days, present_days) by student ID
+            trend_rows (list): (student_id, created_at, marks) rows
+
+        Returns:
+            dict: Student records ordered by section and rank, and a class summary
+        """
+        by_student = {}
+        subject_marks = {}
+        for student_id, subject_id, subject_name, marks in results:
+            subject = subject_name or f"Subject ID: {subject_id}"
+            marks = float(marks)
+            by_student.setdefault(student_id, []).append((subject, marks))
+            subject_marks.setdefault(subject, []).append(marks)
+
+        for marks_list in subject_marks.values():
+            marks_list.sort()
+        subject_averages = {s: sum(m) / len(m) for s, m in subject_marks.items()}
+        class_avg = sum(float(r[3]) for r in results) / len(results) if results else 0
+
+        averages = {sid: sum(m for _, m in rows) / len(rows) for sid, rows in by_student.items()}
+
+        # Rank by average marks within each section, students without results are left unranked
+        sections = {}
+        for student in students:
+            if student.id in averages:
+                sections.setdefault(student.section, []).append(student.id)
+        ranks = {}
+        for section_ids in sections.values():
+            ranking = sorted(section_ids, key=averages.get, reverse=True)
+            ranks.update((sid, i + 1) for i, sid in enumerate(ranking))
+
+        monthly = {}
+        for student_id, created_at, marks in trend_rows:
+            if created_at is None:
+                continue
+            month = created_at.strftime('%Y-%m')
+            monthly.setdefault(student_id, {}).setdefault(month, []).append(float(marks))
+
+        records = []
+        for student in students:
+            rows = by_student.get(student.id, [])
+            avg_marks = averages.get(student.id, 0)
+
+            prev_avg = float(prev_averages.get(student.id) or 0)
+            improvement = ((avg_marks - prev_avg) / prev_avg * 100) if prev_avg > 0 else 0
+
+            total_days, present_days = attendance.get(student.id, (0, 0))
+            attendance_percentage = Student.attendance_percentage(total_days, present_days)
+
+            sorted_subjects = sorted(rows, key=lambda x: x[1], reverse=True)
+
+            comparison = {}
+            for subject, marks in rows:
+                marks_sorted = subject_marks[subject]
+                comparison[subject] = {
+                    'student_marks': marks,
+                    'class_average': subject_averages[subject],
+                    'percentile': (bisect_left(marks_sorted, marks) / len(marks_sorted)) * 100,
+                    'difference': marks - subject_averages[subject]
+                }
+            comparison['overall'] = {
+                'student_average': avg_marks,
+                'class_average': class_avg,
+                'difference': avg_marks - class_avg
+            }
+
+            records.append({
+                'student_id': str(student.id),
+                'name': student.name,
+                'roll_no': student.roll_no,
+                'section': student.section,
+                'analytics': {
+                    'average_marks': avg_marks,
+                    'attendance_percentage': attendance_percentage,
+                    'improvement_percentage': improvement,
+                    'strengths': [s for s, m in sorted_subjects[:3] if m >= 60],
+                    'weaknesses': [s for s, m in sorted_subjects[-3:] if m < 60],
+                    'recommendations': StudentAnalyticsService._generate_recommendations(
+                        student, sorted_subjects, improvement, attendance_percentage
+                    )
+                },
+                'rank': ranks.get(student.id, 0),
+                'comparison': comparison,
+                'trend': [
+                    {'month': month, 'average': sum(marks) / len(marks)}
+                    for month, marks in sorted(monthly.get(student.id, {}).items())
+                ]
+            })
+
+        records.sort(key=lambda r: (r['section'] or '', r['rank'] == 0, r['rank']))
+
+        return {
+            'students': records,
+            'class_summary': {
+                'total_students': len(students),
+                'students_with_results': len(averages),
+                'class_average': class_avg,
+                'subject_averages': subject_averages
+            }
+        }
+
+    @staticmethod
+    def _paginate_class_analytics(class_analytics, page, per_page, fields=None):
+        """Slice a page of class analytics and keep only the requested fields
+
+        Args:
+            class_analytics (dict): Output of _build_class_analytics
+            page (int): The page number (1-based)
+            per_page (int): Number of students per page
+            fields (list, optional): Subset of CLASS_ANALYTICS_FIELDS to include
+
+        Returns:
+            dict: Page of student records, class summary and pagination data
+        """
+        records = class_analytics.get('students', [])
+        total = len(records)
+        page = max(page or 1, 1)
+        per_page = min(max(per_page or 50, 1), 200)
+        pages = max(1, (total + per_page - 1) // per_page)
+
+        selected = [f for f in CLASS_ANALYTICS_FIELDS if not fields or f in fields]
+        keys = ('student_id', 'name', 'roll_no', 'section') + tuple(selected)
+
+        start = (page - 1) * per_page
+        items = [{k: r[k] for k in keys} for r in records[start:start + per_page]]
+
+        return {
+            'students': items,
+            'class_summary': class_analytics.get('class_summary', {}),
+            'pagination': {
+                'page': page,
+                'pages': pages,
+                'per_page': per_page,
+                'total': total,
+                'has_next': page < pages,
+                'has_prev': page > 1
+            }
+        }
+
     @staticmethod
     def get_student_analytics_summary(student_id, organization_id):
         """Get a summary of student analytics across all terms
@@ -1,13 +1,32 @@
 # services/student_service.py
-from typing import Dict, Any, List, Optional
+import uuid
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
+from sqlalchemy.dialects.postgresql import insert
 from models.student import Student
 from models.base import db
 from services.base_service import BaseService
-from utils.validations import StudentValidator, ValidationError, validate_bulk_data
+from services.import_staging import ImportStaging
+from utils.bulk_validation import STUDENT_SCHEMA, Length
+from utils.config import config_value
+from utils.iterables import chunked
+from utils.validations import StudentValidator, ValidationError
 from utils.error_handlers import ResourceNotFoundError, DuplicateResourceError, BusinessLogicError, audit_log
 
+DEFAULT_CHUNK_SIZE = 1000
+# Rows of each kind shown in a dry run
+SAMPLE_ROWS = 20
+# Rejected rows beyond this are counted but not listed
+MAX_REPORTED_ERRORS = 500
+
+# Student records that also fit the students table
+STUDENT_ROW_SCHEMA = STUDENT_SCHEMA.extend(
+    Length('class_name', 'Class name', 1, 20),
+    Length('section', 'Section', 0, 5, optional=True)
+)
+
 class StudentService(BaseService):
     """Service layer for student-related operations"""
     
@@ -273,92 +292,233 @@ class StudentService(BaseService):
             return self._handle_db_error(e, "get_classes")
     
     @audit_log("bulk_create_students", "student")
-    def bulk_create(self, students_data: List[Dict[str, Any]], user_id: int, organization_id: int) -> Dict[str, Any]:
-        """Create multiple students in bulk"""
+    def bulk_create(self, students_data: Iterable[Dict[str, Any]], user_id: int, organization_id: int,
+                    chunk_size: Optional[int] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Create students in bulk, e.g. a whole admission intake
+
+        Records are streamed in chunks, so there is no limit on their number.
+        Each chunk is checked against existing roll numbers with one query and
+        inserted with one multi-row INSERT, then committed; invalid records and
+        roll numbers already taken (in the organization or earlier in the
+        batch) are skipped and reported.
+
+        A dry run creates nothing: it reports what would be created and
+        stages those students under a token for create_staged.
+
+        Args:
+            students_data (iterable): Student dicts (name, roll_number, class_name,
+                section, date_of_birth, address, parent_name, parent_phone)
+            user_id (UUID): User creating the students
+            organization_id (UUID): The organization ID for tenant isolation
+            chunk_size (int, optional): Records per INSERT; STUDENT_IMPORT_CHUNK_SIZE by default
+            dry_run (bool): Only plan the import
+
+        Returns:
+            dict: success, data (created_count, invalid_count, duplicate_count,
+            errors, duplicate_errors and total_processed) and message; a dry
+            run also has dry_run, token and data.samples, and created_count
+            is the number of students that would be created
+        """
+        chunk_size = chunk_size or config_value('STUDENT_IMPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+        created_count = 0
+        total = 0
+        errors = []
+        duplicate_errors = []
+        counts = {'invalid': 0, 'duplicate': 0}
+        seen = set()
+        staged = []
+
+        def report(target, row, field, message, code):
+            counts['invalid' if target is errors else 'duplicate'] += 1
+            if len(errors) + len(duplicate_errors) < MAX_REPORTED_ERRORS:
+                target.append({'row': row, 'field': field, 'message': message, 'code': code})
+
         try:
-            # Validate all student data
-            validation_result = validate_bulk_data(students_data, StudentValidator.validate_student_data)
-            
-            if validation_result['errors']:
-                return {
-                    'success': False,
-                    'errors': validation_result['errors'],
-                    'message': f"Validation failed for {validation_result['error_count']} records"
-                }
-            
-            valid_students = validation_result['valid_records']
-            created_students = []
-            duplicate_errors = []
-            
-            for idx, student_data in enumerate(valid_students):
-                try:
-                    # Check for duplicate roll number
-                    existing_student = self.db.query(Student).filter(
-                        and_(
-                            Student.organization_id == organization_id,
-                            Student.roll_number == student_data['roll_number'],
-                            Student.class_name == student_data['class_name']
-                        )
-                    ).first()
-                    
-                    if existing_student:
-                        duplicate_errors.append({
-                            'row': idx + 1,
-                            'field': 'roll_number',
-                            'message': f"Student with roll number {student_data['roll_number']} already exists in class {student_data['class_name']}",
-                            'code': 'duplicate_roll_number'
-                        })
+            for chunk in chunked(students_data, chunk_size):
+                invalid = {}
+                for error in STUDENT_ROW_SCHEMA.check(chunk, offset=total):
+                    invalid[error['row']] = True
+                    report(errors, error['row'], error['field'], error['message'], error['code'])
+                rows = {}
+                for row, student_data in enumerate(chunk, start=total + 1):
+                    if row in invalid:
                         continue
-                    
-                    # Create student
-                    student = Student(
-                        name=student_data['name'].strip(),
-                        roll_number=student_data['roll_number'].strip(),
-                        class_name=student_data['class_name'].strip(),
-                        email=student_data.get('email', '').strip() if student_data.get('email') else None,
-                        phone=student_data.get('phone', '').strip() if student_data.get('phone') else None,
-                        date_of_birth=student_data.get('date_of_birth'),
-                        address=student_data.get('address', '').strip() if student_data.get('address') else None,
-                        parent_name=student_data.get('parent_name', '').strip() if student_data.get('parent_name') else None,
-                        parent_phone=student_data.get('parent_phone', '').strip() if student_data.get('parent_phone') else None,
-                        organization_id=organization_id,
-                        created_by=user_id
-                    )
-                    
-                    self.db.add(student)
-                    created_students.append(student_data)
-                    
-                except Exception as e:
-                    duplicate_errors.append({
-                        'row': idx + 1,
-                        'field': 'general',
-                        'message': f"Error creating student: {str(e)}",
-                        'code': 'creation_error'
-                    })
-            
-            # Commit all successful creates
-            if created_students:
-                self.db.commit()
-            
-            self._log_operation("bulk_create_students", {
-                'total_attempted': len(valid_students),
-                'successfully_created': len(created_students),
-                'duplicate_errors': len(duplicate_errors)
-            })
-            
+                    values = self._student_values(student_data, user_id, organization_id)
+                    if values['roll_no'] in seen:
+                        report(duplicate_errors, row, 'roll_number',
+                               f"Roll number {values['roll_no']} appears earlier in the batch", 'duplicate_in_batch')
+                        continue
+                    seen.add(values['roll_no'])
+                    rows[values['roll_no']] = (row, values)
+                total += len(chunk)
+                if not rows:
+                    continue
+
+                existing = self._existing_roll_numbers(list(rows), organization_id)
+                pending = [(row, values) for roll_no, (row, values) in rows.items() if roll_no not in existing]
+                if dry_run:
+                    staged.extend(pending)
+                    inserted = {values['roll_no'] for row, values in pending}
+                else:
+                    inserted = self._insert([values for row, values in pending])
+                for roll_no, (row, values) in rows.items():
+                    if roll_no not in inserted:
+                        class_name = existing.get(roll_no) or values['class_name']
+                        report(duplicate_errors, row, 'roll_number',
+                               f"Student with roll number {roll_no} already exists in class {class_name}",
+                               'duplicate_roll_number')
+                if not dry_run:
+                    self.db.commit()
+                created_count += len(inserted)
+        except Exception as e:
+            self.db.rollback()
+            self.logger.error(f"Bulk student creation stopped after {created_count} students")
+            return self._handle_db_error(e, "bulk_create_students")
+
+        if total == 0:
+            return {'success': False, 'errors': [], 'message': 'At least one record is required'}
+
+        data = {
+            'created_count': created_count,
+            'invalid_count': counts['invalid'],
+            'duplicate_count': counts['duplicate'],
+            'errors': errors,
+            'duplicate_errors': duplicate_errors,
+            'total_processed': total
+        }
+        if dry_run:
+            token = ImportStaging.save('students', organization_id, user_id, {'rows': staged, 'data': data})
+            samples = [
+                {'row': row, **{key: values[key] for key in ('roll_no', 'name', 'class_name', 'section')}}
+                for row, values in staged[:SAMPLE_ROWS]
+            ]
             return {
                 'success': True,
-                'data': {
-                    'created_count': len(created_students),
-                    'duplicate_errors': duplicate_errors,
-                    'total_processed': len(valid_students)
-                },
-                'message': f"Successfully created {len(created_students)} students"
+                'dry_run': True,
+                'token': token,
+                'data': {**data, 'samples': samples},
+                'message': f"{created_count} students would be created"
             }
-            
+
+        self._log_operation("bulk_create_students", {
+            'total_attempted': total,
+            'successfully_created': created_count,
+            'invalid': counts['invalid'],
+            'duplicates': counts['duplicate']
+        })
+
+        return {
+            'success': True,
+            'data': data,
+            'message': f"Successfully created {created_count} students"
+        }
+
+    @audit_log("bulk_create_students", "student")
+    def create_staged(self, token: str, user_id: int, organization_id: int,
+                      chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """Create the students staged by a bulk_create dry run
+
+        Roll numbers taken since the dry run are skipped and reported.
+
+        Args:
+            token (str): Token of the dry run
+            user_id (UUID): User who ran the dry run
+            organization_id (UUID): The organization ID for tenant isolation
+            chunk_size (int, optional): Records per INSERT; STUDENT_IMPORT_CHUNK_SIZE by default
+
+        Returns:
+            dict: As bulk_create
+        """
+        staged = ImportStaging.load('students', token, organization_id, user_id)
+        if staged is None:
+            return {'success': False, 'errors': [], 'message': 'The preview has expired; upload the students again'}
+
+        chunk_size = chunk_size or config_value('STUDENT_IMPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+        data = staged['data']
+        created_count = 0
+        try:
+            for chunk in chunked(staged['rows'], chunk_size):
+                now = datetime.utcnow()
+                for row, values in chunk:
+                    values['created_at'] = values['updated_at'] = now
+                inserted = self._insert([values for row, values in chunk])
+                for row, values in chunk:
+                    if values['roll_no'] not in inserted:
+                        data['duplicate_count'] += 1
+                        data['duplicate_errors'].append({
+                            'row': row,
+                            'field': 'roll_number',
+                            'message': f"Student with roll number {values['roll_no']} was added since the preview",
+                            'code': 'duplicate_roll_number'
+                        })
+                self.db.commit()
+                created_count += len(inserted)
         except Exception as e:
             self.db.rollback()
+            self.logger.error(f"Staged student creation stopped after {created_count} students")
             return self._handle_db_error(e, "bulk_create_students")
+
+        ImportStaging.discard(token)
+        self._log_operation("bulk_create_students", {
+            'total_attempted': len(staged['rows']),
+            'successfully_created': created_count,
+            'staged': True
+        })
+        return {
+            'success': True,
+            'data': {**data, 'created_count': created_count},
+            'message': f"Successfully created {created_count} students"
+        }
+
+    @staticmethod
+    def _student_values(data: Dict[str, Any], user_id, organization_id) -> Dict[str, Any]:
+        """Build the students row of a valid bulk record"""
+        section = (data.get('section') or '').strip()
+        now = datetime.utcnow()
+        optional = lambda name: data[name].strip() if data.get(name) else None
+        return {
+            'id': uuid.uuid4(),
+            'organization_id': organization_id,
+            'roll_no': data['roll_number'].strip(),
+            'name': data['name'].strip(),
+            'class_name': data['class_name'].strip(),
+            'section': section,
+            'date_of_birth': datetime.strptime(data['date_of_birth'], '%Y-%m-%d').date() if data.get('date_of_birth') else None,
+            'admission_date': now.date(),
+            'address': optional('address'),
+            'guardian_name': optional('parent_name'),
+            'guardian_phone': optional('parent_phone'),
+            'is_active': True,
+            'created_by': user_id,
+            'created_at': now,
+            'updated_at': now
+        }
+
+    def _existing_roll_numbers(self, roll_numbers: List[str], organization_id) -> Dict[str, str]:
+        """Classes of the students already holding any of the roll numbers, in one query"""
+        existing = self.db.query(Student.roll_no, Student.class_name).filter(
+            Student.organization_id == organization_id,
+            Student.roll_no.in_(roll_numbers)
+        ).all()
+        return {roll_no: class_name for roll_no, class_name in existing}
+
+    @staticmethod
+    def insert_statement(rows: List[Dict[str, Any]]):
+        """Multi-row INSERT of students, skipping roll numbers taken concurrently"""
+        statement = insert(Student.__table__).values(rows)
+        return statement.on_conflict_do_nothing(
+            index_elements=['organization_id', 'roll_no']
+        ).returning(Student.__table__.c.roll_no)
+
+    def _insert(self, rows: List[Dict[str, Any]]) -> set:
+        """Insert student rows
+
+        Returns:
+            set: Roll numbers of the students inserted
+        """
+        if not rows:
+            return set()
+        return {roll_no for roll_no, in self.db.execute(self.insert_statement(rows))}
     
     def search_students(self, search_term: str, user_id: int, organization_id: int, 
                        class_filter: str = None, limit: int = 10) -> Dict[str, Any]:
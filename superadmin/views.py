@@ -11,10 +11,38 @@ from .decorators import superadmin_required, permission_required, master_admin_r
 from .models import SuperAdmin, Tenant, SystemSettings, GlobalAudit, TenantMetrics, TenantStatus, SubscriptionTier
 from .tenant_manager import TenantManager
 from services.supabase_client import get_superadmin_client
+from utils.supabase_pages import paged_rows
+from utils.table_stream import FORMATS, export_format, stream_table
 import logging
 
 logger = logging.getLogger(__name__)
 
+AUDIT_EXPORT_COLUMNS = [
+    ('created_at', 'Timestamp'), ('superadmin_id', 'User'), ('action', 'Action'),
+    ('resource_type', 'Resource Type'), ('resource_id', 'Resource ID'), ('severity', 'Severity'),
+    ('ip_address', 'IP Address'), ('description', 'Description')
+]
+# Audit log rows fetched per request while exporting
+AUDIT_EXPORT_PAGE_SIZE = 1000
+
+def _audit_log_rows(make_query):
+    """Yield export rows of every audit log matching a query, a page at a time
+
+    Args:
+        make_query (callable): Returns a fresh filtered query per page
+    """
+    for log in paged_rows(make_query, AUDIT_EXPORT_PAGE_SIZE):
+        yield [
+            log.get('created_at'),
+            log.get('superadmin_id', 'System'),
+            log.get('action'),
+            log.get('resource_type'),
+            log.get('resource_id', ''),
+            log.get('severity'),
+            log.get('ip_address'),
+            log.get('description')
+        ]
+
 @superadmin_bp.route('/login', methods=['GET', 'POST'])
 def login():
     """SuperAdmin login page"""
@@ -584,106 +612,82 @@ def audit_logs():
     
     try:
         supabase = get_superadmin_client()
-        query = supabase.table('global_audit_logs').select('*')
+        # (method, column, value) filters; postgrest builders change in place,
+        # so every request gets a fresh query built from these
+        filters = []
         
         # Apply filters
         if action:
-            query = query.eq('action', action.lower())
+            filters.append(('eq', 'action', action.lower()))
         
         if resource_type:
-            query = query.eq('resource_type', resource_type.lower())
+            filters.append(('eq', 'resource_type', resource_type.lower()))
             
         if severity:
-            query = query.eq('severity', severity.lower())
+            filters.append(('eq', 'severity', severity.lower()))
             
         # Date filtering
         if date_range:
             now = datetime.utcnow()
             if date_range == 'today':
                 start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                query = query.gte('created_at', start.isoformat())
+                filters.append(('gte', 'created_at', start.isoformat()))
             elif date_range == 'yesterday':
                 start = (now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
                 end = now.replace(hour=0, minute=0, second=0, microsecond=0)
-                query = query.gte('created_at', start.isoformat()).lt('created_at', end.isoformat())
+                filters += [('gte', 'created_at', start.isoformat()), ('lt', 'created_at', end.isoformat())]
             elif date_range == 'last7days':
                 start = (now - timedelta(days=7))
-                query = query.gte('created_at', start.isoformat())
+                filters.append(('gte', 'created_at', start.isoformat()))
             elif date_range == 'last30days':
                 start = (now - timedelta(days=30))
-                query = query.gte('created_at', start.isoformat())
+                filters.append(('gte', 'created_at', start.isoformat()))
             elif date_range == 'thismonth':
                 start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                query = query.gte('created_at', start.isoformat())
+                filters.append(('gte', 'created_at', start.isoformat()))
             elif date_range == 'lastmonth':
                 last_month = now.month - 1 if now.month > 1 else 12
                 last_month_year = now.year if now.month > 1 else now.year - 1
                 start = datetime(last_month_year, last_month, 1)
                 end = datetime(now.year, now.month, 1)
-                query = query.gte('created_at', start.isoformat()).lt('created_at', end.isoformat())
+                filters += [('gte', 'created_at', start.isoformat()), ('lt', 'created_at', end.isoformat())]
         elif start_date and end_date:
             # Custom date range
             try:
                 start = datetime.strptime(start_date, '%Y-%m-%d')
                 end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)  # Include the end date
-                query = query.gte('created_at', start.isoformat()).lt('created_at', end.isoformat())
+                filters += [('gte', 'created_at', start.isoformat()), ('lt', 'created_at', end.isoformat())]
             except ValueError:
                 flash('Invalid date format. Please use YYYY-MM-DD.', 'error')
         
-        # Order by most recent first
-        query = query.order('created_at', desc=True)
+        def audit_query():
+            query = supabase.table('global_audit_logs').select('*')
+            for method, column, value in filters:
+                query = getattr(query, method)(column, value)
+            # Order by most recent first
+            return query.order('created_at', desc=True)
         
-        # Handle export request
-        if request.args.get('export') == 'csv':
-            # Get all logs for export (limit to reasonable number)
-            export_limit = 1000
-            response = query.limit(export_limit).execute()
+        # Handle export request (export=csv|xlsx|ndjson), streamed page by page
+        if request.args.get('export') in FORMATS:
+            from flask import Response, stream_with_context
             
-            if response.data:
-                # Generate CSV
-                import csv
-                from io import StringIO
-                from flask import Response
-                
-                output = StringIO()
-                writer = csv.writer(output)
-                
-                # Write header
-                writer.writerow(['Timestamp', 'User', 'Action', 'Resource Type', 'Resource ID', 
-                                'Severity', 'IP Address', 'Description'])
-                
-                # Write data
-                for log in response.data:
-                    writer.writerow([
-                        log.get('created_at'),
-                        log.get('superadmin_id', 'System'),
-                        log.get('action'),
-                        log.get('resource_type'),
-                        log.get('resource_id', ''),
-                        log.get('severity'),
-                        log.get('ip_address'),
-                        log.get('description')
-                    ])
-                
-                # Create response
-                output.seek(0)
-                return Response(
-                    output.getvalue(),
-                    mimetype="text/csv",
-                    headers={"Content-Disposition": f"attachment;filename=audit_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"}
-                )
-            else:
-                flash('No data to export.', 'warning')
+            fmt, mimetype, extension = export_format(request.args.get('export'))
+            stream = stream_table(AUDIT_EXPORT_COLUMNS, _audit_log_rows(audit_query), fmt, title='Audit Logs')
+            return Response(
+                stream_with_context(stream),
+                mimetype=mimetype,
+                headers={"Content-Disposition": f"attachment;filename=audit_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}"}
+            )
         
         # Pagination for display
-        total_count_response = query.count().execute()
+        total_count_response = audit_query().count().execute()
         total_count = total_count_response.count if hasattr(total_count_response, 'count') else 0
         
         # Calculate offset
         offset = (page - 1) * per_page
         
         # Get paginated results
-        response = query.range(offset, offset + per_page - 1).execute()
+        response = audit_query().range(offset, offset + per_page - 1).execute()
         
         # Create a pagination object
         class Pagination:
@@ -11,6 +11,13 @@ class TestConfig(Config):
     SERVER_NAME = 'localhost.localdomain'
     PRESERVE_CONTEXT_ON_EXCEPTION = False
 
+@pytest.fixture(autouse=True)
+def render_cache_dir(tmp_path, monkeypatch):
+    """Keep rendered documents out of the working tree"""
+    from services.render_cache import RenderCache
+    monkeypatch.setenv('RENDER_CACHE_DIR', str(tmp_path / 'render_cache'))
+    monkeypatch.setattr(RenderCache, '_shared', None)
+
 @pytest.fixture(scope='session')
 def app():
     """Create application for the tests."""
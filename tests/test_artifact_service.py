@@ -0,0 +1,224 @@
+import json
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+from services import artifact_service
+from services.artifact_service import ArtifactService, ArtifactWorker, register_renderer
+from services.artifact_store import ArtifactStore
+
+ORG = 'org-1'
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A fresh shared artifact store in a temporary directory"""
+    monkeypatch.setattr(ArtifactStore, '_shared', ArtifactStore(str(tmp_path / 'artifacts'), ttl=60, quota_bytes=1000))
+    return ArtifactStore.shared()
+
+
+@pytest.fixture
+def renderer():
+    """Register a test renderer writing its params' content"""
+    calls = []
+
+    @register_renderer('test')
+    def render(params, organization_id, output_path):
+        calls.append(params)
+        if params.get('fail'):
+            return {'success': False, 'error': 'No results found'}
+        with open(output_path, 'wb') as f:
+            f.write(params.get('content', 'data').encode('utf-8'))
+        return {'success': True, 'file_name': 'test.pdf', 'mimetype': 'application/pdf'}
+
+    yield calls
+    artifact_service._renderers.pop('test', None)
+
+
+def _submit(params):
+    with patch.object(ArtifactService, '_dispatch'):
+        return ArtifactService.submit('test', params, ORG)
+
+
+class TestArtifactStore:
+    """Test the content-addressed artifact store"""
+
+    def test_identical_content_stored_once(self, store, tmp_path):
+        digests = []
+        for _ in range(2):
+            path = store.temp_path()
+            with open(path, 'wb') as f:
+                f.write(b'%PDF same')
+            digests.append(store.put_file(path))
+        assert digests[0] == digests[1]
+        assert os.listdir(os.path.dirname(store.object_path(digests[0][0]))) == [digests[0][0]]
+
+    def test_records_are_tenant_scoped(self, store):
+        record = store.create(ORG, 'test', {})
+        assert store.load(ORG, record['id'])['kind'] == 'test'
+        assert store.load('org-2', record['id']) is None
+        assert store.load(ORG, '../' + record['id']) is None
+
+    def test_lease_is_exclusive_until_stale(self, store):
+        record = store.create(ORG, 'test', {})
+        assert store.claim(record, lease=60)
+        assert not store.claim(record, lease=60)
+        # A dead worker's lease is taken over
+        assert store.claim(record, lease=0)
+        store.release(record)
+        assert not store.is_claimed(record, lease=60)
+
+    def test_renewed_lease_is_not_taken_over(self, store, tmp_path):
+        record = store.create(ORG, 'test', {})
+        assert store.claim(record, lease=1)
+        os.utime(store._lock_path(record), (time.time() - 5, time.time() - 5))
+        assert store.renew(record)
+        # Another worker process sharing the directory
+        other = ArtifactStore(store.root, ttl=60, quota_bytes=1000)
+        assert not other.claim(record, lease=1)
+
+    def test_stalled_holder_loses_the_lease(self, store):
+        record = store.create(ORG, 'test', {})
+        assert store.claim(record, lease=1)
+        os.utime(store._lock_path(record), (time.time() - 5, time.time() - 5))
+        other = ArtifactStore(store.root, ttl=60, quota_bytes=1000)
+        assert other.claim(record, lease=1)
+
+        assert not store.renew(record)
+        # The stalled worker does not drop the new holder's lease
+        store.release(record)
+        assert other.is_claimed(record, lease=60)
+        assert other.renew(record)
+
+
+class TestArtifactService:
+    """Test artifact jobs"""
+
+    def test_submit_then_run(self, store, renderer):
+        result = _submit({'content': 'hello'})
+        assert result['success'] and result['status'] == 'queued'
+
+        record = ArtifactService.run(result['artifact_id'], ORG)
+        assert record['status'] == 'ready'
+        assert record['attempts'] == 1
+
+        artifact = ArtifactService.download(result['artifact_id'], ORG)
+        with open(artifact['path'], 'rb') as f:
+            assert f.read() == b'hello'
+        assert ArtifactService.download(result['artifact_id'], 'org-2') is None
+        assert ArtifactService.status(result['artifact_id'], ORG)['file_name'] == 'test.pdf'
+
+    def test_in_flight_duplicates_share_a_job(self, store, renderer):
+        first = _submit({'content': 'a'})
+        assert _submit({'content': 'a'})['artifact_id'] == first['artifact_id']
+        assert _submit({'content': 'b'})['artifact_id'] != first['artifact_id']
+
+    def test_active_job_limit(self, store, renderer, monkeypatch):
+        monkeypatch.setenv('ARTIFACT_MAX_ACTIVE_JOBS', '2')
+        assert _submit({'content': 'a'})['success']
+        assert _submit({'content': 'b'})['success']
+        assert not _submit({'content': 'c'})['success']
+
+    def test_render_failure_is_recorded(self, store, renderer):
+        result = _submit({'fail': True})
+        record = ArtifactService.run(result['artifact_id'], ORG)
+        assert record['status'] == 'failed'
+        assert record['error'] == 'No results found'
+        assert ArtifactService.download(result['artifact_id'], ORG) is None
+
+    def test_quota_drops_oldest_artifacts(self, store, renderer):
+        ids = []
+        for i in range(3):
+            artifact_id = _submit({'content': str(i) * 400})['artifact_id']
+            ArtifactService.run(artifact_id, ORG)
+            ids.append(artifact_id)
+        assert store.load(ORG, ids[0]) is None
+        assert store.load(ORG, ids[2])['status'] == 'ready'
+        assert store.usage(ORG) <= 1000
+
+    def test_cleanup_expires_and_collects(self, store, renderer):
+        artifact_id = _submit({'content': 'old'})['artifact_id']
+        record = ArtifactService.run(artifact_id, ORG)
+        assert store.cleanup(now=time.time())['expired'] == 0
+
+        stats = store.cleanup(now=record['expires_at'] + 120)
+        assert stats == {'expired': 1, 'removed_objects': 1}
+        assert not os.path.exists(store.object_path(record['digest']))
+
+    def test_recover_requeues_interrupted_jobs(self, store, renderer, monkeypatch):
+        monkeypatch.setenv('ARTIFACT_LEASE_SECONDS', '1')
+        monkeypatch.setenv('ARTIFACT_MAX_ATTEMPTS', '2')
+        artifact_id = _submit({'content': 'x'})['artifact_id']
+
+        # A worker claimed the job and died mid-render
+        record = store.load(ORG, artifact_id)
+        record.update(status='running', attempts=1, updated_at=time.time() - 5)
+        store.claim(record, lease=1)
+        os.utime(store._lock_path(record), (time.time() - 5, time.time() - 5))
+        with open(store._record_path(ORG, artifact_id), 'w') as f:
+            json.dump(record, f)
+
+        with patch.object(ArtifactService, '_dispatch') as dispatch:
+            assert ArtifactService.recover() == 1
+        assert dispatch.call_args.args[0]['id'] == artifact_id
+        assert ArtifactService.run(artifact_id, ORG)['status'] == 'ready'
+
+    def test_job_running_past_the_lease_keeps_it(self, store, monkeypatch):
+        monkeypatch.setenv('ARTIFACT_LEASE_SECONDS', '1')
+        recovered = []
+
+        @register_renderer('slow_test')
+        def render(params, organization_id, output_path):
+            # No progress reported for longer than the lease
+            time.sleep(1.5)
+            with patch.object(ArtifactService, '_dispatch'):
+                recovered.append(ArtifactService.recover())
+            with open(output_path, 'wb') as f:
+                f.write(b'slow')
+            return {'success': True}
+
+        try:
+            with patch.object(ArtifactService, '_dispatch'):
+                artifact_id = ArtifactService.submit('slow_test', {}, ORG)['artifact_id']
+            record = ArtifactService.run(artifact_id, ORG)
+        finally:
+            artifact_service._renderers.pop('slow_test', None)
+
+        assert recovered == [0]
+        assert record['status'] == 'ready' and record['attempts'] == 1
+        assert not store.is_claimed(record, lease=60)
+
+    def test_thread_worker_renders_in_background(self, store, renderer):
+        app = Flask(__name__)
+        with app.app_context():
+            with patch.object(ArtifactWorker, '_shared', None):
+                result = ArtifactService.submit('test', {'content': 'async'}, ORG)
+                ArtifactWorker._shared.executor.shutdown(wait=True)
+        assert store.load(ORG, result['artifact_id'])['status'] == 'ready'
+
+    def test_progress_and_summary_recorded(self, store):
+        @register_renderer('progress_test', progress=True)
+        def render(params, organization_id, output_path, progress=None):
+            progress(50, 100)
+            assert store.load(ORG, params['id'])['progress'] == {'done': 50, 'total': 100}
+            with open(output_path, 'wb') as f:
+                f.write(b'row,error\n')
+            return {'success': True, 'file_name': 'errors.csv', 'mimetype': 'text/csv', 'summary': {'count': 3}}
+
+        try:
+            with patch.object(ArtifactService, '_dispatch'):
+                artifact_id = ArtifactService.submit('progress_test', {'id': None}, ORG)['artifact_id']
+            record = store.load(ORG, artifact_id)
+            record['params']['id'] = artifact_id
+            store.save(record)
+            ArtifactService.run(artifact_id, ORG)
+        finally:
+            artifact_service._renderers.pop('progress_test', None)
+            artifact_service._progress_kinds.discard('progress_test')
+
+        status = ArtifactService.status(artifact_id, ORG)
+        assert status['summary'] == {'count': 3}
+        assert status['progress'] == {'done': 50, 'total': 100}
@@ -0,0 +1,95 @@
+import os
+from io import BytesIO
+from unittest.mock import patch
+
+from PIL import Image as PILImage
+from reportlab.platypus import SimpleDocTemplate
+
+from services.asset_cache import AssetCache, CachedImage, _normalize
+
+
+def _write_image(path, size=(2000, 1000), mode='RGB'):
+    PILImage.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else (200, 30, 30)).save(path)
+    return str(path)
+
+
+class TestAssetCacheImages:
+    """Test decoded and downsampled images"""
+
+    def test_downsampled_to_printed_size(self, tmp_path):
+        logo = _write_image(tmp_path / 'logo.png')
+        cache = AssetCache(dpi=144)
+        reader = cache.image_reader(logo, 60, 60)
+        # 60pt at 144dpi is 120px; the aspect ratio is kept
+        assert reader.getSize() == (120, 60)
+
+    def test_transparency_kept(self, tmp_path):
+        logo = _write_image(tmp_path / 'logo.png', mode='RGBA')
+        reader = AssetCache().image_reader(logo, 60, 60)
+        assert reader._image.mode == 'RGBA'
+
+    def test_decoded_once(self, tmp_path):
+        logo = _write_image(tmp_path / 'logo.png')
+        cache = AssetCache()
+        with patch('services.asset_cache._normalize', wraps=_normalize) as normalized:
+            first = cache.image_reader(logo, 60, 60)
+            second = cache.image_reader(logo, 60, 60)
+        assert first is second
+        assert normalized.call_count == 1
+
+    def test_replaced_file_reloaded(self, tmp_path):
+        logo = _write_image(tmp_path / 'logo.png')
+        cache = AssetCache()
+        first = cache.image_reader(logo, 60, 60)
+        _write_image(tmp_path / 'logo.png', size=(100, 100))
+        os.utime(logo, ns=(1, 1))
+        assert cache.image_reader(logo, 60, 60) is not first
+
+    def test_missing_and_broken_sources(self, tmp_path):
+        broken = tmp_path / 'broken.png'
+        broken.write_bytes(b'not an image')
+        cache = AssetCache()
+        assert cache.image_reader(str(tmp_path / 'missing.png'), 60, 60) is None
+        assert cache.image_reader(str(broken), 60, 60) is None
+        assert cache.image(None, 60, 60) is None
+
+    def test_lru_eviction(self, tmp_path):
+        cache = AssetCache(max_entries=2)
+        paths = [_write_image(tmp_path / f'{i}.png', size=(10, 10)) for i in range(3)]
+        first = cache.image_reader(paths[0], 10, 10)
+        cache.image_reader(paths[1], 10, 10)
+        cache.image_reader(paths[0], 10, 10)
+        cache.image_reader(paths[2], 10, 10)
+        assert len(cache) == 2
+        assert cache.image_reader(paths[0], 10, 10) is first
+
+    def test_flowable_renders(self, tmp_path):
+        logo = _write_image(tmp_path / 'logo.png')
+        cache = AssetCache()
+        buffer = BytesIO()
+        SimpleDocTemplate(buffer).build([cache.image(logo, 60, 60), cache.image(logo, 60, 60)])
+        assert buffer.getvalue().startswith(b'%PDF')
+        assert isinstance(cache.image(logo, 60, 60), CachedImage)
+
+
+class TestAssetCacheInvalidation:
+    """Test watermarks and invalidation"""
+
+    def test_watermark_shapes_shared(self):
+        cache = AssetCache()
+        first = cache.watermark('DRAFT')
+        second = cache.watermark('DRAFT')
+        assert first is not second
+        assert first.contents[0] is second.contents[0]
+        assert first.contents[0].text == 'DRAFT'
+
+    def test_invalidate_organization(self, tmp_path):
+        logo = _write_image(tmp_path / 'logo.png')
+        cache = AssetCache()
+        first = cache.image_reader(logo, 60, 60, 'org-1')
+        other = cache.image_reader(logo, 60, 60, 'org-2')
+        cache.invalidate('org-1')
+        assert cache.image_reader(logo, 60, 60, 'org-1') is not first
+        assert cache.image_reader(logo, 60, 60, 'org-2') is other
+        cache.invalidate()
+        assert len(cache) == 0
@@ -0,0 +1,128 @@
+import os
+import uuid
+import zipfile
+from io import BytesIO
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from flask import Flask, Response
+
+from services.bulk_render_service import BulkMarksheetRenderer, _count_pages, _render_chunk
+from services.export_service import ExportService
+from utils import qr
+
+
+def make_student(section, roll_no, name):
+    return SimpleNamespace(id=uuid.uuid4(), name=name, roll_no=roll_no, class_name='10', section=section)
+
+
+@pytest.fixture
+def class_marksheets():
+    students = [make_student('A', str(i), f'Student {i}') for i in range(1, 6)]
+    rows = []
+    for i, student in enumerate(students):
+        rows.append((student.id, 'Maths', 40 + i * 10, 100))
+        rows.append((student.id, 'English', 35 + i * 12, 100))
+    attendance = {students[0].id: (180, 200)}
+    return students, ExportService._build_marksheets(students, rows, attendance)
+
+
+class TestBuildMarksheets:
+    """Test marksheet data assembly"""
+
+    def test_build_marksheets(self, class_marksheets):
+        students, marksheets = class_marksheets
+        assert [name for name, _ in marksheets][0] == 'A_1_Student_1.pdf'
+
+        data = marksheets[-1][1]
+        assert data['days_present'] == 0
+        assert [s['name'] for s in data['overall_result']['subjects']] == ['English', 'Maths']
+        assert data['overall_result']['position'] == 1
+        assert marksheets[0][1]['max_days'] == 200
+
+    def test_students_without_results_skipped(self):
+        student = make_student('A', '1', 'Absent')
+        assert ExportService._build_marksheets([student], [], {}) == []
+
+
+class TestBulkMarksheetRenderer:
+    """Test parallel marksheet rendering"""
+
+    def test_render_to_zip(self, class_marksheets):
+        _, marksheets = class_marksheets
+        renderer = BulkMarksheetRenderer(workers=2, chunk_size=2)
+        try:
+            output = BytesIO()
+            stats = renderer.render_to_zip(marksheets, {'include_qr': False}, output)
+        finally:
+            renderer.shutdown()
+
+        with zipfile.ZipFile(output) as archive:
+            assert sorted(archive.namelist()) == sorted(name for name, _ in marksheets)
+            assert archive.read(marksheets[0][0]).startswith(b'%PDF')
+
+        assert stats['marksheets'] == 5
+        assert stats['failed'] == []
+        assert stats['pages'] >= 5
+        assert stats['pages_per_second'] > 0
+        assert all(w['peak_rss_mb'] > 0 for w in stats['workers'].values())
+
+    def test_count_pages(self):
+        assert _count_pages(b'<< /Type /Pages >> << /Type /Page >> << /Type/Page >>') == 2
+
+    def test_chunks_link_qr_codes_to_their_own_site(self, class_marksheets, monkeypatch):
+        _, marksheets = class_marksheets
+        monkeypatch.delenv('VERIFICATION_BASE_URL', raising=False)
+        payloads = []
+        real_qr_code = qr.qr_code
+
+        def recording_qr_code(payload, *args, **kwargs):
+            payloads.append(payload)
+            return real_qr_code(payload, *args, **kwargs)
+
+        with patch('utils.qr.qr_code', side_effect=recording_qr_code):
+            _render_chunk(marksheets[:1], {'verification_base_url': 'https://a.example.org'})
+            # A later job of a worker without a site URL does not inherit the last one
+            _render_chunk(marksheets[:1], {'verification_base_url': ''})
+
+        assert payloads[0].startswith('HTTPS://A.EXAMPLE.ORG/V/')
+        assert payloads[1] == payloads[0].rsplit('/', 1)[1]
+        assert 'VERIFICATION_BASE_URL' not in os.environ
+
+
+class TestStreamBulkMarksheets:
+    """Test the streamed class ZIP"""
+
+    def test_qr_links_survive_the_end_of_the_request(self, class_marksheets, tmp_path, monkeypatch):
+        _, marksheets = class_marksheets
+        monkeypatch.delenv('VERIFICATION_BASE_URL', raising=False)
+        app = Flask(__name__)
+        app.config['EXPORT_ARTIFACTS_DIR'] = str(tmp_path)
+        # Render in threads of this process so the QR payloads can be recorded
+        renderer = BulkMarksheetRenderer(workers=1, chunk_size=2)
+        renderer._pool = ThreadPoolExecutor(max_workers=1)
+        payloads = []
+        real_qr_code = qr.qr_code
+
+        def recording_qr_code(payload, *args, **kwargs):
+            payloads.append(payload)
+            return real_qr_code(payload, *args, **kwargs)
+
+        with patch.object(ExportService, '_fetch_bulk_marksheet_data', return_value=(marksheets, {}, '2024-25')), \
+                patch.object(BulkMarksheetRenderer, 'shared', return_value=renderer):
+            with app.test_request_context(base_url='https://school.example.org'):
+                result = ExportService.stream_bulk_marksheets('10', 'Annual', 'org-1')
+                response = Response(result['stream'], mimetype='application/zip')
+
+            # As a WSGI server does, after the request context is gone
+            with patch('utils.qr.qr_code', side_effect=recording_qr_code):
+                body = b''.join(response.response)
+        renderer.shutdown()
+
+        with zipfile.ZipFile(BytesIO(body)) as archive:
+            assert len(archive.namelist()) == len(marksheets)
+        assert len(payloads) == len(marksheets)
+        assert all(payload.startswith('HTTPS://SCHOOL.EXAMPLE.ORG/V/') for payload in payloads)
+        assert os.listdir(tmp_path / 'org-1') == [result['artifact_name']]
@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+
+import pytest
+
+from utils.bulk_validation import STUDENT_SCHEMA, BulkSchema, IsoDate, Length, Required, Rule
+from utils.validations import StudentValidator, ValidationError
+
+TOMORROW = (date.today() + timedelta(days=1)).isoformat()
+
+RECORDS = [
+    {'name': 'Asha Rao', 'roll_number': '1', 'class_name': '10'},
+    {'name': '', 'roll_number': '2', 'class_name': '10'},
+    {'name': 'Bala', 'roll_number': None, 'class_name': '  '},
+    {'name': 'R2D2', 'roll_number': '3', 'class_name': '10'},
+    {'name': 'A' * 101, 'roll_number': '4', 'class_name': '10'},
+    {'name': 'Chitra', 'roll_number': 'x' * 21, 'class_name': '10'},
+    {'name': 'Dev', 'roll_number': 5, 'class_name': '10'},
+    {'name': 'Esha', 'roll_number': '6', 'class_name': '10', 'email': 'esha@'},
+    {'name': 'Farah', 'roll_number': '7', 'class_name': '10', 'email': '', 'phone': '12'},
+    {'name': 'Gita', 'roll_number': '8', 'class_name': '10', 'date_of_birth': '2010-02-30'},
+    {'name': 'Hari', 'roll_number': '9', 'class_name': '10', 'date_of_birth': TOMORROW},
+    {'name': 'Isha', 'roll_number': '10', 'class_name': '10', 'date_of_birth': '2010-5-1', 'phone': '555-123-4567'},
+]
+
+
+def _per_record(records):
+    """Errors of the exception-based validator"""
+    errors = []
+    for index, record in enumerate(records):
+        try:
+            StudentValidator.validate_student_data(record)
+        except ValidationError as e:
+            errors.append({'row': index + 1, 'field': e.field, 'message': e.message, 'code': e.code})
+    return errors
+
+
+class TestBulkSchema:
+    """Test compiled column-wise validation"""
+
+    def test_same_errors_as_the_record_validator(self):
+        assert STUDENT_SCHEMA.check(RECORDS) == _per_record(RECORDS)
+
+    def test_first_failed_rule_wins(self):
+        schema = BulkSchema(Required('name', 'Name'), Length('name', 'Name', 3), IsoDate('dob', 'DOB'))
+        errors = schema.check([{'name': None, 'dob': 'soon'}, {'name': 'Al', 'dob': 'soon'}, {'name': 'Ali', 'dob': 'soon'}], offset=10)
+        assert [(e['row'], e['code']) for e in errors] == [(11, 'required'), (12, 'min_length'), (13, 'invalid_date')]
+
+    def test_rules_must_implement_fails(self):
+        with pytest.raises(TypeError):
+            Rule('name', 'Name is bad', 'bad')
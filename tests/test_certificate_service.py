@@ -0,0 +1,106 @@
+import csv
+import io
+import uuid
+
+from services.certificate_service import CertificateService, select_recipients, write_manifest
+from utils.certificate_templates import CompiledCertificateTemplate
+from utils.grading import calculate_class_results
+
+
+def _class(marks, attendance=None, subjects=('English', 'Maths')):
+    students = [
+        {
+            'name': f"Student {i + 1}",
+            'roll_no': str(i + 1),
+            'cls': '10',
+            'section': 'A',
+            'days_present': (attendance or {}).get(i, 150),
+            'max_days': 200
+        }
+        for i in range(len(marks))
+    ]
+    return calculate_class_results(students, list(subjects), marks, [[100] * len(subjects)] * len(marks))
+
+
+class TestSelectRecipients:
+    """Test the recipient selection rules"""
+
+    def test_top_k_includes_ties(self):
+        classes = {'10': _class([[90, 90], [80, 80], [80, 80], [70, 70]])}
+        certificates = select_recipients(classes, [{'rule': 'top', 'k': 2}], '2024-25')
+        assert [c['recipient_name'] for c in certificates] == ['Student 1', 'Student 2', 'Student 3']
+        assert certificates[1]['achievement'].startswith('for securing 2nd position')
+        assert [c['certificate_number'] for c in certificates] == [
+            'CERT/2024-25/0001', 'CERT/2024-25/0002', 'CERT/2024-25/0003'
+        ]
+
+    def test_subject_toppers(self):
+        classes = {'10': _class([[95, 60], [70, 99], [95, 50]])}
+        certificates = select_recipients(classes, [{'rule': 'subject_top', 'k': 1, 'title': 'Subject Topper'}])
+        assert [(c['recipient_name'], c['achievement']) for c in certificates] == [
+            ('Student 1', 'for the highest marks in English in Class 10'),
+            ('Student 3', 'for the highest marks in English in Class 10'),
+            ('Student 2', 'for the highest marks in Maths in Class 10'),
+        ]
+        assert {c['type'] for c in certificates} == {'Subject Topper'}
+
+    def test_attendance_threshold(self):
+        classes = {'10': _class([[50, 50], [60, 60]], attendance={0: 196, 1: 120})}
+        certificates = select_recipients(classes, [{'rule': 'attendance', 'min_percentage': 95}])
+        assert [c['recipient_name'] for c in certificates] == ['Student 1']
+        assert certificates[0]['achievement'] == 'for 98.0% attendance in Class 10-A'
+
+    def test_rules_apply_to_every_class(self):
+        classes = {'9': _class([[50, 50], [60, 60]]), '10': _class([[70, 70], [40, 40]])}
+        certificates = select_recipients(classes, [{'rule': 'top', 'k': 1}], prefix='MERIT')
+        assert [c['recipient_name'] for c in certificates] == ['Student 1', 'Student 2']
+        assert certificates[0]['certificate_number'] == 'MERIT/0001'
+
+    def test_validate_rules(self):
+        assert CertificateService.validate_rules([{'rule': 'top', 'k': 3}]) is None
+        assert CertificateService.validate_rules([]) == 'At least one rule is required'
+        assert 'Unknown rule' in CertificateService.validate_rules([{'rule': 'fastest'}])
+        assert CertificateService.validate_rules([{'rule': 'top', 'k': 'many'}]) == 'k must be a number'
+
+
+class TestGradeRows:
+    """Test grading the aggregate query rows"""
+
+    def test_rows_are_graded_per_class(self):
+        a, b, c = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        rows = [
+            (a, 'Asha', '1', '10', 'A', 'English', 90, 100, 190, 200),
+            (a, 'Asha', '1', '10', 'A', 'Maths', 70, 100, 190, 200),
+            (b, 'Bala', '2', '10', 'A', 'English', 95, 100, None, None),
+            (b, 'Bala', '2', '10', 'A', 'Maths', 85, 100, None, None),
+            (c, 'Chitra', '1', '9', 'B', 'English', 40, 50, 10, 20),
+        ]
+        classes = CertificateService._grade_rows(rows, None, '2024-25')
+        assert sorted(classes) == ['10', '9']
+        assert [(r['name'], r['position']) for r in classes['10']] == [('Asha', 2), ('Bala', 1)]
+        assert classes['10'][1]['max_days'] == 0
+        assert classes['9'][0]['total_percentage'] == 80.0
+
+
+class TestCertificateTemplate:
+    """Test rendering certificates on the compiled template"""
+
+    def test_one_page_per_certificate_and_manifest(self):
+        classes = {'10': _class([[90, 90], [80, 80], [70, 70]])}
+        certificates = select_recipients(classes, [{'rule': 'top', 'k': 3}], '2024-25')
+        template = CompiledCertificateTemplate({'name': 'Springfield School', 'address': 'Springfield'}, {})
+
+        output = io.BytesIO()
+        page_ranges = template.render(certificates, output)
+        pdf = output.getvalue()
+        assert [(first, last) for _, first, last in page_ranges] == [(1, 1), (2, 2), (3, 3)]
+        # The border and header are drawn once and stamped on every page
+        assert pdf.count(b'/Subtype /Form') == 1
+        assert b'/Outlines' in pdf
+
+        rows = list(csv.DictReader(io.StringIO(write_manifest(page_ranges).decode('utf-8'))))
+        assert [(row['certificate_number'], row['page'], row['recipient_name']) for row in rows] == [
+            ('CERT/2024-25/0001', '1', 'Student 1'),
+            ('CERT/2024-25/0002', '2', 'Student 2'),
+            ('CERT/2024-25/0003', '3', 'Student 3'),
+        ]
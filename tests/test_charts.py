@@ -0,0 +1,93 @@
+from unittest.mock import patch
+
+from reportlab.graphics.shapes import Rect
+
+from services.pdf_service import PDFService
+from utils.charts import chart_frame, class_series, clear_chart_frames, sparkline, subject_bar_chart
+from utils.grading import GradingScheme
+from utils.marksheet_pdf import _render_result_pdf
+
+
+def _student(name, percentages, grade='B'):
+    return {
+        'name': name,
+        'roll_no': '1',
+        'cls': '10',
+        'section': 'A',
+        'overall_result': {
+            'subjects': [
+                {'name': subject, 'max_marks': 100, 'obtained_marks': value, 'grade': 'B', 'percentage': value}
+                for subject, value in percentages.items()
+            ],
+            'overall_percentage': sum(percentages.values()) / len(percentages) if percentages else 0,
+            'overall_grade': grade
+        }
+    }
+
+
+class TestClassSeries:
+    """Test the class-level chart series"""
+
+    def test_averages_and_grades(self):
+        series = class_series([
+            _student('A', {'Maths': 80, 'English': 60}, 'A'),
+            _student('B', {'Maths': 60}, 'C'),
+            _student('C', {}),
+        ])
+        assert series['subjects'] == ['English', 'Maths']
+        assert series['averages'] == {'English': 60.0, 'Maths': 70.0}
+        assert series['overall_average'] == 65.0
+        assert series['grade_counts'] == {'A': 1, 'C': 1}
+
+
+class TestChartFrames:
+    """Test the shared chart frames"""
+
+    def setup_method(self):
+        clear_chart_frames()
+
+    def test_students_of_a_class_share_one_frame(self):
+        series = {'averages': {'Maths': 70.0, 'English': 60.0}}
+        first = subject_bar_chart([{'name': 'Maths', 'percentage': 90}, {'name': 'English', 'percentage': 40}], series)
+        second = subject_bar_chart([{'name': 'Maths', 'percentage': 50}, {'name': 'English', 'percentage': 65}], series)
+        assert first.contents[0] is second.contents[0]
+        # Only the student's own bars are new shapes
+        assert [shape.height for shape in first.contents[1:]] == [112.5, 50.0]
+        assert all(isinstance(shape, Rect) for shape in second.contents[1:])
+
+    def test_frames_differ_by_class_series(self):
+        assert chart_frame(['Maths'], [70.0]) is chart_frame(['Maths'], [70.0])
+        assert chart_frame(['Maths'], [70.0]) is not chart_frame(['Maths'], [60.0])
+        assert chart_frame(['Maths']) is not chart_frame(['Maths'], value_step=10)
+
+    def test_no_subjects_no_chart(self):
+        assert subject_bar_chart([]) is None
+        assert sparkline([]) is None
+
+
+class TestChartsInDocuments:
+    """Test the templates using the chart layer"""
+
+    def test_compact_marksheet_has_a_sparkline(self):
+        student = _student('A', {'Maths': 80, 'English': 60})
+        customization = {'template': 'compact', 'include_analytics': True}
+        with_line = _render_result_pdf(student, customization, 'compact')
+        without = _render_result_pdf(student, {**customization, 'include_analytics': False}, 'compact')
+        assert with_line.startswith(b'%PDF') and len(with_line) > len(without)
+
+    def test_service_charts_from_raw_marks(self):
+        service = PDFService()
+        results = [
+            {'subject_name': 'Maths', 'marks_obtained': 45, 'total_marks': 50},
+            {'subject_name': 'English', 'marks_obtained': 30, 'total_marks': 100, 'percentage': 30.0},
+        ]
+        bars = service._create_bar_chart(results)
+        assert [shape.height for shape in bars.contents[1:]] == [112.5, 37.5]
+        assert service._create_pie_chart(results).contents
+
+    def test_class_analytics_uses_the_grading_scheme(self):
+        service = PDFService(GradingScheme({'Distinction': 75, 'Pass': 40, 'Fail': 0}))
+        with patch('services.pdf_service.grade_pie_chart') as chart:
+            service._create_class_analytics([{'grade': 'Pass'}, {'grade': 'Distinction'}, {}])
+        assert chart.call_args.args[0] == {'Distinction': 1, 'Pass': 1, 'Fail': 1}
+        assert list(chart.call_args.args[0]) == service.grading_scheme.grade_order
@@ -0,0 +1,103 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from services.student_analytics_service import StudentAnalyticsService
+
+
+@pytest.fixture
+def class_students():
+    """Create three students in the same class and section"""
+    return [
+        SimpleNamespace(id=uuid.uuid4(), name=name, roll_no=roll, section='A')
+        for name, roll in (('Asha', '1'), ('Bilal', '2'), ('Chen', '3'))
+    ]
+
+
+@pytest.fixture
+def class_data(class_students):
+    """Create preloaded results, previous averages, attendance and trend rows"""
+    a, b, c = class_students
+    results = [
+        (a.id, 1, 'Mathematics', Decimal('90')),
+        (a.id, 2, 'English', Decimal('70')),
+        (b.id, 1, 'Mathematics', Decimal('50')),
+        (b.id, 2, 'English', Decimal('40')),
+    ]
+    prev_averages = {a.id: Decimal('40'), b.id: Decimal('50')}
+    attendance = {a.id: (10, 9), b.id: (10, 5)}
+    trend_rows = [
+        (a.id, datetime(2024, 1, 5), Decimal('60')),
+        (a.id, datetime(2024, 1, 20), Decimal('80')),
+        (a.id, datetime(2024, 2, 1), Decimal('90')),
+    ]
+    return results, prev_averages, attendance, trend_rows
+
+
+class TestClassAnalytics:
+    """Test the batch class analytics computation"""
+
+    def test_rank_and_ordering(self, class_students, class_data):
+        """Students are ranked by average and unranked students go last"""
+        data = StudentAnalyticsService._build_class_analytics(class_students, *class_data)
+
+        names = [s['name'] for s in data['students']]
+        ranks = [s['rank'] for s in data['students']]
+        assert names == ['Asha', 'Bilal', 'Chen']
+        assert ranks == [1, 2, 0]
+        assert data['class_summary']['students_with_results'] == 2
+
+    def test_ranked_within_section(self, class_students, class_data):
+        """Without a section each section is ranked on its own, as for a single student"""
+        class_students[0].section = 'B'
+        data = StudentAnalyticsService._build_class_analytics(class_students, *class_data)
+
+        assert [(s['section'], s['name'], s['rank']) for s in data['students']] == [
+            ('A', 'Bilal', 1), ('A', 'Chen', 0), ('B', 'Asha', 1)
+        ]
+
+    def test_student_analytics(self, class_students, class_data):
+        """Average, improvement, attendance, strengths and weaknesses"""
+        data = StudentAnalyticsService._build_class_analytics(class_students, *class_data)
+        asha, bilal = data['students'][0]['analytics'], data['students'][1]['analytics']
+
+        assert asha['average_marks'] == 80
+        assert asha['improvement_percentage'] == 100
+        assert asha['attendance_percentage'] == 90
+        assert asha['strengths'] == ['Mathematics', 'English']
+        assert bilal['weaknesses'] == ['Mathematics', 'English']
+
+    def test_comparison_deltas(self, class_students, class_data):
+        """Per-subject deltas are measured against the class average"""
+        data = StudentAnalyticsService._build_class_analytics(class_students, *class_data)
+        comparison = data['students'][0]['comparison']
+
+        assert comparison['Mathematics']['class_average'] == 70
+        assert comparison['Mathematics']['difference'] == 20
+        assert comparison['Mathematics']['percentile'] == 50
+        assert comparison['overall']['class_average'] == 62.5
+
+    def test_trend_sparkline(self, class_students, class_data):
+        """Trend points are monthly averages in month order"""
+        data = StudentAnalyticsService._build_class_analytics(class_students, *class_data)
+
+        assert data['students'][0]['trend'] == [
+            {'month': '2024-01', 'average': 70},
+            {'month': '2024-02', 'average': 90},
+        ]
+        assert data['students'][2]['trend'] == []
+
+    def test_pagination_and_fields(self, class_students, class_data):
+        """Pages are sliced from the full class and fields can be trimmed"""
+        data = StudentAnalyticsService._build_class_analytics(class_students, *class_data)
+        page = StudentAnalyticsService._paginate_class_analytics(data, page=2, per_page=2, fields=['rank'])
+
+        assert [s['name'] for s in page['students']] == ['Chen']
+        assert set(page['students'][0]) == {'student_id', 'name', 'roll_no', 'section', 'rank'}
+        assert page['pagination'] == {
+            'page': 2, 'pages': 2, 'per_page': 2, 'total': 3,
+            'has_next': False, 'has_prev': True
+        }
@@ -0,0 +1,114 @@
+from reportlab.lib.pagesizes import A4, landscape, letter
+
+from utils.class_result_pdf import ClassResultPDFService, _render_class_pdf
+from utils.class_sheet import ClassSheetLayout, ClassSheetRows, SheetColumn
+from utils.grading import calculate_class_results
+
+
+COLUMNS = [SheetColumn('Roll No'), SheetColumn('Name', align='LEFT', min_width=60, flex=True), SheetColumn('Grade')]
+
+
+def _rows(count, name='Student'):
+    return [[str(i), f"{name} {i}", 'A'] for i in range(count)]
+
+
+def _class_data(count, subjects=('English', 'Maths', 'Science')):
+    students = [
+        {'name': f"Student {i}", 'roll_no': str(i), 'cls': '10', 'section': 'A', 'days_present': 150, 'max_days': 180}
+        for i in range(count)
+    ]
+    marks = [[40 + (i * 7 + j * 13) % 60 for j in range(len(subjects))] for i in range(count)]
+    records = calculate_class_results(students, list(subjects), marks, [[100] * len(subjects)] * count)
+    return {'cls': '10', 'section': 'A', 'students': records}
+
+
+class TestClassSheetLayout:
+    """Test the column layout engine"""
+
+    def test_spare_width_goes_to_flex_column(self):
+        layout = ClassSheetLayout(COLUMNS, _rows(10), 400)
+        assert abs(sum(layout.widths) - 400) < 0.01
+        assert layout.widths[1] == max(layout.widths)
+        assert layout.scale == 1.0
+        assert layout.clipped == []
+
+    def test_flex_column_shrinks_and_clips(self):
+        rows = _rows(3, name='A very long student name that does not fit')
+        layout = ClassSheetLayout(COLUMNS, rows, 150)
+        assert abs(sum(layout.widths) - 150) < 0.01
+        assert layout.clipped == [1]
+        clipped = layout.format_row(rows[0])[1]
+        assert clipped.endswith('…')
+        assert len(clipped) < len(rows[0][1])
+
+    def test_wide_sheet_goes_landscape_then_shrinks(self):
+        subjects = [SheetColumn(f"Mathematics{i}") for i in range(10)]
+        layout, pagesize = ClassSheetLayout.fit(COLUMNS + subjects, [['1', 'Name', 'A'] + ['100'] * 10])
+        assert pagesize == landscape(A4)
+        assert layout.scale == 1.0
+
+        subjects = [SheetColumn(f"Mathematics{i}") for i in range(40)]
+        layout, pagesize = ClassSheetLayout.fit(COLUMNS + subjects, [['1', 'Name', 'A'] + ['100'] * 40])
+        assert pagesize == landscape(A4)
+        assert layout.scale < 1.0
+        assert layout.font_size < 8
+        assert sum(layout.widths) <= landscape(A4)[0] - 52
+
+    def test_long_headers_wrap(self):
+        layout = ClassSheetLayout([SheetColumn('Computer Science'), SheetColumn('Art')], [['1', '2']], 100)
+        assert layout.headers[0] == 'Computer\nScience'
+        assert layout.header_height > layout.row_height
+
+
+class TestClassSheetRows:
+    """Test page-at-a-time row tables"""
+
+    def test_split_hands_out_a_page(self):
+        layout = ClassSheetLayout(COLUMNS, _rows(100), 400)
+        height = layout.header_height + layout.row_height * 30
+        page, rest = ClassSheetRows(layout, _rows(100)).split(400, height)
+        assert page._cellvalues[0] == layout.headers
+        assert len(page._cellvalues) == 31
+        assert page._cellvalues[-1][0] == '29'
+
+        # The continuation starts where the page ended and fits once small enough
+        width, rest_height = rest.wrap(400, layout.header_height + layout.row_height * 70)
+        assert abs(rest_height - (layout.header_height + layout.row_height * 70)) < 0.01
+
+    def test_streams_rows_lazily(self):
+        pulled = []
+
+        def rows():
+            for row in _rows(1000):
+                pulled.append(row)
+                yield row
+
+        layout = ClassSheetLayout(COLUMNS, _rows(10), 400)
+        ClassSheetRows(layout, rows()).split(400, layout.header_height + layout.row_height * 20)
+        assert len(pulled) == 21
+
+
+class TestClassResultSheets:
+    """Test the class result PDFs"""
+
+    def test_large_class_paginates(self):
+        data = _class_data(150)
+        pdf = _render_class_pdf(data, {'main_color': '#112233'})
+        assert pdf.startswith(b'%PDF')
+        assert pdf.count(b'/Type /Page\n') + pdf.count(b'/Type /Page ') >= 3
+
+    def test_streams_students_from_iterator(self):
+        data = _class_data(150)
+        streamed = _render_class_pdf({**data, 'students': iter(data['students'])}, None, streaming=True)
+        assert streamed.startswith(b'%PDF')
+
+    def test_service_picks_landscape_for_many_subjects(self):
+        students = [
+            {'roll_number': str(i), 'name': f"Student {i}", 'total_marks': 500, 'total_percentage': 70.0,
+             'subjects': [{'name': f"Mathematics{j}", 'marks': 70} for j in range(12)]}
+            for i in range(5)
+        ]
+        service = ClassResultPDFService()
+        assert service.pagesize == letter
+        service._create_class_results_table(students)
+        assert service.pagesize == landscape(letter)
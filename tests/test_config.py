@@ -0,0 +1,25 @@
+from flask import Flask
+
+from utils.config import config_value
+
+
+class TestConfigValue:
+    """Test reading settings in and outside the app"""
+
+    def test_app_config_wins_in_app_context(self, monkeypatch):
+        monkeypatch.setenv('RESULT_IMPORT_CHUNK_SIZE', '50')
+        app = Flask(__name__)
+        app.config['RESULT_IMPORT_CHUNK_SIZE'] = 200
+        with app.app_context():
+            assert config_value('RESULT_IMPORT_CHUNK_SIZE', 1000) == 200
+            assert config_value('PARQUET_COMPRESSION', 'zstd') == 'zstd'
+
+    def test_environment_outside_the_app(self, monkeypatch):
+        monkeypatch.setenv('RESULT_IMPORT_CHUNK_SIZE', '50')
+        monkeypatch.setenv('PDF_OPTIMIZE', 'false')
+        monkeypatch.setenv('VERIFICATION_BASE_URL', 'https://results.example.org')
+        monkeypatch.delenv('PARQUET_COMPRESSION', raising=False)
+        assert config_value('RESULT_IMPORT_CHUNK_SIZE', 1000) == 50
+        assert config_value('PDF_OPTIMIZE', True) is False
+        assert config_value('VERIFICATION_BASE_URL') == 'https://results.example.org'
+        assert config_value('PARQUET_COMPRESSION', 'zstd') == 'zstd'
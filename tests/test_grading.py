@@ -0,0 +1,125 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from utils import grading
+from utils.grading import (
+    GradingScheme, calculate_class_results, calculate_grade, calculate_student_overall_result,
+    get_grading_scheme, invalidate_grading_scheme
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_scheme_cache():
+    invalidate_grading_scheme()
+    yield
+    invalidate_grading_scheme()
+
+
+class TestGradingScheme:
+    """Test compiled grading schemes"""
+
+    def test_from_config_shapes(self):
+        """Band dicts, plain minimums and band lists compile to the same scheme"""
+        nested = GradingScheme.from_config({'A': {'min': 80, 'max': 100}, 'B': {'min': 50, 'max': 79.99}, 'F': {'min': 0, 'max': 49.99}})
+        flat = GradingScheme.from_config({'grades': {'A': 80, 'B': 50, 'F': 0}})
+        listed = GradingScheme.from_config([{'grade': 'F', 'min': 0}, {'grade': 'A', 'min': 80}, {'grade': 'B', 'min': 50}])
+        assert nested.version == flat.version == listed.version
+        assert nested.grade_order == ['A', 'B', 'F']
+
+    def test_from_config_without_bands(self):
+        assert GradingScheme.from_config({}) is None
+        assert GradingScheme.from_config(None) is None
+
+    def test_grade_boundaries(self):
+        scheme = GradingScheme({'A': 80, 'B': 50, 'F': 0})
+        assert scheme.grade(80) == 'A'
+        assert scheme.grade(79.995) == 'B'
+        assert scheme.grade(49.99) == 'F'
+        assert scheme.is_passing('B')
+        assert not scheme.is_passing('F')
+
+    def test_grade_many_matches_grade(self):
+        scheme = grading.default_grading_scheme()
+        percentages = [0, 39.99, 40, 55.5, 69.99, 70, 80, 100]
+        assert scheme.grade_many(percentages) == [scheme.grade(p) for p in percentages]
+
+    def test_calculate_grade_validation(self):
+        assert calculate_grade(85) == 'A+'
+        assert calculate_grade(150) == 'F'
+        assert calculate_grade('85') == 'F'
+
+    def test_custom_fail_grade(self):
+        """Schemes whose lowest band is not F fail and pass by their own bands"""
+        scheme = GradingScheme({'Distinction': 75, 'Pass': 40, 'Fail': 0})
+        assert calculate_grade(150, scheme) == 'Fail'
+        assert not grading.is_passing_grade('Fail', scheme)
+        assert grading.is_passing_grade('Pass', scheme)
+
+        results = [
+            SimpleNamespace(marks=80, subject=SimpleNamespace(name='English', max_marks=100)),
+            SimpleNamespace(marks=20, subject=SimpleNamespace(name='Maths', max_marks=100))
+        ]
+        overall = calculate_student_overall_result(results, scheme)
+        assert [s['is_pass'] for s in overall['subject_results']] == [True, False]
+        assert overall['is_pass'] is False
+        assert calculate_student_overall_result([], scheme)['overall_grade'] == 'Fail'
+
+
+class TestGetGradingScheme:
+    """Test per-class scheme caching"""
+
+    def test_class_scheme_cached(self):
+        scheme = GradingScheme({'P': 33, 'F': 0})
+        with patch.object(grading, '_load_class_grading_scheme', return_value=scheme) as load:
+            assert get_grading_scheme('org', '10', '2024') is scheme
+            assert get_grading_scheme('org', '10', '2024') is scheme
+            assert load.call_count == 1
+
+    def test_invalidate_organization(self):
+        with patch.object(grading, '_load_class_grading_scheme', return_value=None) as load:
+            get_grading_scheme('org', '10', '2024')
+            invalidate_grading_scheme('other')
+            get_grading_scheme('org', '10', '2024')
+            assert load.call_count == 1
+
+            invalidate_grading_scheme('org')
+            get_grading_scheme('org', '10', '2024')
+            assert load.call_count == 2
+
+    def test_falls_back_to_default(self):
+        with patch.object(grading, '_load_class_grading_scheme', return_value=None):
+            assert get_grading_scheme('org', '10') is grading.default_grading_scheme()
+        assert get_grading_scheme() is grading.default_grading_scheme()
+
+
+class TestCalculateClassResults:
+    """Test whole-class result calculation"""
+
+    def test_matches_per_student_calculation(self):
+        subjects = ['English', 'Maths', 'Science']
+        max_marks = [100, 50, 100]
+        marks = [[85, 45, 90], [35, 30, None], [60, 20, 55], [60, 20, 55]]
+        students = [{'roll_no': str(i + 1), 'name': f'Student {i + 1}'} for i in range(len(marks))]
+
+        records = calculate_class_results(students, subjects, marks, max_marks)
+
+        for student, row, record in zip(students, marks, records):
+            results = [
+                SimpleNamespace(marks=m, subject=SimpleNamespace(name=name, max_marks=mx))
+                for name, m, mx in zip(subjects, row, max_marks) if m is not None
+            ]
+            expected = calculate_student_overall_result(results)
+            overall = record['overall_result']
+            assert record['roll_no'] == student['roll_no']
+            assert overall['overall_percentage'] == expected['overall_percentage']
+            assert overall['overall_grade'] == expected['overall_grade']
+            assert overall['is_pass'] == expected['is_pass']
+            assert [s['grade'] for s in overall['subject_results']] == [s['grade'] for s in expected['subject_results']]
+
+        assert [r['position'] for r in records] == [1, 4, 2, 2]
+        assert records[1]['subjects'][-1]['name'] == 'Maths'
+
+    def test_empty_class(self):
+        assert calculate_class_results([], ['Maths'], [], [100]) == []
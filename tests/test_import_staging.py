@@ -0,0 +1,34 @@
+import pytest
+
+from services.artifact_store import ArtifactStore
+from services.import_staging import ImportStaging
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(ArtifactStore, '_shared', ArtifactStore(str(tmp_path / 'artifacts'), ttl=60, quota_bytes=1000))
+    return ArtifactStore.shared()
+
+
+class TestImportStaging:
+    """Test records kept between a dry run and its commit"""
+
+    def test_round_trip_for_the_owner_only(self):
+        token = ImportStaging.save('results', 'org-1', 'user-1', {'records': [1, 2]})
+        assert ImportStaging.load('results', token, 'org-1', 'user-1') == {'records': [1, 2]}
+        assert ImportStaging.load('results', token, 'org-2', 'user-1') is None
+        assert ImportStaging.load('results', token, 'org-1', 'user-2') is None
+        assert ImportStaging.load('students', token, 'org-1', 'user-1') is None
+
+    def test_bad_tokens(self):
+        assert ImportStaging.load('results', '../../etc/passwd', 'org-1', 'user-1') is None
+        assert ImportStaging.load('results', 'a' * 32, 'org-1', 'user-1') is None
+
+    def test_expired_and_discarded(self, monkeypatch):
+        token = ImportStaging.save('results', 'org-1', 'user-1', {})
+        monkeypatch.setenv('IMPORT_STAGING_TTL_SECONDS', '-1')
+        assert ImportStaging.load('results', token, 'org-1', 'user-1') is None
+        monkeypatch.delenv('IMPORT_STAGING_TTL_SECONDS')
+        token = ImportStaging.save('results', 'org-1', 'user-1', {})
+        ImportStaging.discard(token)
+        assert ImportStaging.load('results', token, 'org-1', 'user-1') is None
@@ -0,0 +1,186 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from services.leaderboard_service import LeaderboardService
+
+
+class FakePipeline:
+    """Queue commands and run them against the parent FakeRedis"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the sorted set commands we use"""
+
+    def __init__(self):
+        self.zsets = {}
+        self.sets = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def _ordered(self, key):
+        return sorted(self.zsets.get(key, {}).items(), key=lambda x: (-x[1], x[0]))
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    def smembers(self, key):
+        return {m.encode() for m in self.sets.get(key, set())}
+
+    def delete(self, *keys):
+        for key in keys:
+            self.zsets.pop(key, None)
+            self.sets.pop(key, None)
+
+    def zunionstore(self, dest, keys, aggregate=None):
+        union = {}
+        for key in keys:
+            for member, score in self.zsets.get(key, {}).items():
+                union[member] = max(score, union.get(member, score))
+        self.zsets[dest] = union
+
+    def expire(self, key, seconds):
+        pass
+
+    def zrem(self, key, *members):
+        for member in members:
+            self.zsets.get(key, {}).pop(member, None)
+
+    def zrevrank(self, key, member):
+        members = [m for m, _ in self._ordered(key)]
+        return members.index(member) if member in members else None
+
+    def zrevrange(self, key, start, end, withscores=False):
+        return [(m.encode(), s) for m, s in self._ordered(key)[start:end + 1]]
+
+
+@pytest.fixture
+def board():
+    return LeaderboardService.board_key('org', '10', 'A', '2024', 'Annual')
+
+
+@pytest.fixture
+def leaderboard(board):
+    redis = FakeRedis()
+    redis.zadd(f"{board}:overall", {'s1': 70.0, 's2': 90.0, 's3': 80.0, 's4': 60.0, 's5': 50.0})
+    redis.zadd(f"{board}:subject:math", {'s1': 95.0, 's2': 85.0})
+    redis.zadd(f"{board}:subject:eng", {'s3': 88.0})
+    redis.sadd(f"{board}:subjects", 'math', 'eng')
+    return LeaderboardService(redis_client=redis)
+
+
+class TestLeaderboardService:
+    """Test leaderboard reads"""
+
+    def test_board_key(self):
+        """Missing sections get a placeholder so keys stay unambiguous"""
+        assert LeaderboardService.board_key('org', '10', None, '2024', 'Annual') == 'leaderboard:org:10:-:2024:Annual'
+
+    def test_get_rank(self, leaderboard, board):
+        assert leaderboard.get_rank(board, 's2') == 1
+        assert leaderboard.get_rank(board, 's5') == 5
+        assert leaderboard.get_rank(board, 's1', subject_id='math') == 1
+        assert leaderboard.get_rank(board, 'unknown') is None
+
+    def test_get_top(self, leaderboard, board):
+        top = leaderboard.get_top(board, k=2)
+        assert top == [
+            {'student_id': 's2', 'score': 90.0, 'rank': 1},
+            {'student_id': 's3', 'score': 80.0, 'rank': 2},
+        ]
+
+    def test_get_neighbors(self, leaderboard, board):
+        neighbors = leaderboard.get_neighbors(board, 's2', radius=1)
+        assert [(n['student_id'], n['rank']) for n in neighbors] == [('s2', 1), ('s3', 2)]
+
+        neighbors = leaderboard.get_neighbors(board, 's4', radius=1)
+        assert [(n['student_id'], n['rank']) for n in neighbors] == [('s1', 3), ('s4', 4), ('s5', 5)]
+
+    def test_get_subject_toppers(self, leaderboard, board):
+        toppers = leaderboard.get_subject_toppers(board)
+        assert toppers == {
+            'eng': {'student_id': 's3', 'score': 88.0, 'rank': 1},
+            'math': {'student_id': 's1', 'score': 95.0, 'rank': 1},
+        }
+
+    def test_reads_without_redis(self, board):
+        """Reads report unknown so callers can fall back to the database"""
+        service = LeaderboardService()
+        assert service.get_rank(board, 's1') is None
+        assert service.get_top(board) is None
+        assert service.get_subject_toppers(board) is None
+
+    def test_class_board_merges_sections(self):
+        """Without a section the class is ranked across its section boards"""
+        redis = FakeRedis()
+        service = LeaderboardService(redis_client=redis)
+        for section, scores, maths in (('A', {'s1': 70.0, 's2': 90.0}, {'s1': 95.0}),
+                                       ('B', {'s3': 80.0}, {'s3': 60.0})):
+            section_board = LeaderboardService.board_key('org', '10', section, '2024', 'Annual')
+            redis.zadd(f"{section_board}:overall", scores)
+            redis.zadd(f"{section_board}:subject:math", maths)
+            redis.sadd(f"{section_board}:subjects", 'math')
+            redis.sadd(LeaderboardService._sections_key('org', '10', '2024', 'Annual'), section)
+
+        board = service.class_board('org', '10', '2024', 'Annual')
+        assert [(e['student_id'], e['rank']) for e in service.get_top(board)] == [('s2', 1), ('s3', 2), ('s1', 3)]
+        assert service.get_rank(board, 's3', subject_id='math') == 2
+        assert service.get_subject_toppers(board) == {'math': {'student_id': 's1', 'score': 95.0, 'rank': 1}}
+        assert LeaderboardService().class_board('org', '10', '2024', 'Annual') is None
+
+
+class TestResultWrites:
+    """Test keeping the boards in step with result writes"""
+
+    @pytest.fixture
+    def service(self):
+        return LeaderboardService(redis_client=FakeRedis())
+
+    @staticmethod
+    def _write(service, method, result, averages, **kwargs):
+        """Run a board write with the term averages the database would return, in order"""
+        student = SimpleNamespace(id='s1', class_name='10', section='A')
+        with patch('services.leaderboard_service.db') as db:
+            db.session.query.return_value.filter.return_value.scalar.side_effect = averages
+            assert getattr(service, method)(result, student=student, **kwargs)
+
+    def test_update_moves_result_to_new_term(self, service):
+        result = SimpleNamespace(id='r1', organization_id='org', student_id='s1', subject_id='math',
+                                 academic_year='2024', term='Annual', marks=80)
+        self._write(service, 'record_result', result, [80.0])
+        previous = {'student_id': 's1', 'subject_id': 'math', 'academic_year': '2024', 'term': 'Annual'}
+        result.term = 'Half Yearly'
+        # No results left in the old term; the new term has this one
+        self._write(service, 'record_result', result, [None, 80.0], previous=previous)
+
+        old = LeaderboardService.board_key('org', '10', 'A', '2024', 'Annual')
+        new = LeaderboardService.board_key('org', '10', 'A', '2024', 'Half Yearly')
+        assert service.get_top(old) == []
+        assert service.get_top(old, subject_id='math') == []
+        assert service.get_top(new, subject_id='math') == [{'student_id': 's1', 'score': 80.0, 'rank': 1}]
+
+    def test_delete_recomputes_the_average(self, service):
+        board = LeaderboardService.board_key('org', '10', 'A', '2024', 'Annual')
+        for subject_id, marks in (('math', 80), ('eng', 60)):
+            result = SimpleNamespace(id=subject_id, organization_id='org', student_id='s1', subject_id=subject_id,
+                                     academic_year='2024', term='Annual', marks=marks)
+            self._write(service, 'record_result', result, [70.0])
+
+        self._write(service, 'remove_result', result, [80.0])
+        assert service.get_top(board, subject_id='eng') == []
+        assert service.get_top(board) == [{'student_id': 's1', 'score': 80.0, 'rank': 1}]
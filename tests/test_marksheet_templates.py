@@ -0,0 +1,127 @@
+import re
+from io import BytesIO
+from unittest.mock import patch
+
+from PIL import Image as PILImage
+
+from services.asset_cache import AssetCache
+from services.bulk_render_service import _render_chunk
+from utils import marksheet_pdf
+from utils.marksheet_templates import clear_compiled_templates, get_compiled_template, render_class_marksheets
+
+
+def _student(i, subjects=5):
+    return {
+        'name': f"Student {i}", 'roll_no': str(i), 'cls': '10', 'section': 'A',
+        'days_present': 150, 'max_days': 180,
+        'overall_result': {
+            'subjects': [
+                {'name': f"Subject {j}", 'max_marks': 100, 'obtained_marks': 60 + j, 'grade': 'B', 'percentage': 60.0 + j}
+                for j in range(subjects)
+            ],
+            'overall_grade': 'B', 'overall_percentage': 62.0, 'is_pass': True, 'position': i
+        }
+    }
+
+
+def _count(pattern, pdf):
+    return len(re.findall(pattern, pdf))
+
+
+class TestCompiledMarksheetTemplate:
+    """Test marksheets stamped from a compiled static layer"""
+
+    def setup_method(self):
+        clear_compiled_templates()
+
+    def test_compiled_once_per_customization(self):
+        first = get_compiled_template({'institute_name': 'A', 'compiled': True})
+        assert get_compiled_template({'institute_name': 'A', 'compiled': True}) is first
+        assert get_compiled_template({'institute_name': 'B', 'compiled': True}) is not first
+
+    def test_static_layer_is_one_form(self, tmp_path):
+        logo = tmp_path / 'logo.png'
+        PILImage.new('RGB', (600, 600), (0, 0, 200)).save(logo)
+        template = get_compiled_template({'logo': str(logo), 'watermark': 'OFFICIAL', 'compiled': True})
+
+        # Enough subjects to run over several pages
+        pdf = template.render(_student(1, subjects=60))
+        assert pdf.startswith(b'%PDF')
+        assert _count(rb'/Type\s*/Page\b', pdf) > 1
+        assert _count(rb'/Subtype\s*/Form', pdf) == 1
+        assert _count(rb'/Subtype\s*/Image', pdf) == 1
+
+    def test_assets_cached_per_organization(self, tmp_path):
+        logo = tmp_path / 'logo.png'
+        PILImage.new('RGB', (600, 600), (0, 0, 200)).save(logo)
+        cache = AssetCache()
+        with patch.object(AssetCache, '_shared', cache):
+            get_compiled_template({'logo': str(logo), 'watermark': 'OFFICIAL', 'organization_id': 'org-1', 'compiled': True})
+            assert len(cache) == 2
+            cache.invalidate('org-1')
+            assert len(cache) == 0
+
+    def test_render_result_pdf_uses_compiled_mode(self):
+        with patch('utils.marksheet_templates.CompiledMarksheetTemplate.render', return_value=b'%PDF-compiled') as render:
+            assert marksheet_pdf._render_result_pdf(_student(1), {'compiled': True}, 'modern') == b'%PDF-compiled'
+            assert marksheet_pdf._render_result_pdf(_student(1), {'compiled': True}, 'classic') != b'%PDF-compiled'
+            assert marksheet_pdf._render_result_pdf(_student(1), {}, 'modern') != b'%PDF-compiled'
+        assert render.call_count == 1
+
+    def test_bulk_chunks_render_compiled(self):
+        with patch('utils.marksheet_pdf.generate_result_pdf', return_value=True) as generate:
+            _render_chunk([('a.pdf', _student(1))], {'template': 'modern'})
+            _render_chunk([('a.pdf', _student(1))], {'template': 'modern', 'compiled': False})
+        assert generate.call_args_list[0].args[2]['compiled'] is True
+        assert generate.call_args_list[1].args[2]['compiled'] is False
+
+
+class TestMergedClassMarksheets:
+    """Test one bookmarked PDF for a whole class"""
+
+    def setup_method(self):
+        clear_compiled_templates()
+
+    def test_page_range_and_bookmark_per_student(self, tmp_path):
+        logo = tmp_path / 'logo.png'
+        PILImage.new('RGB', (600, 600), (0, 0, 200)).save(logo)
+        students = [_student(i, subjects=60 if i == 2 else 5) for i in range(1, 5)]
+
+        output = BytesIO()
+        stats = render_class_marksheets(students, {'logo': str(logo), 'watermark': 'OFFICIAL'}, output)
+        pdf = output.getvalue()
+
+        assert stats['students'] == 4
+        ranges = stats['page_ranges']
+        assert ranges[0][0] == '1 - Student 1'
+        assert ranges[0][1] == 1
+        assert ranges[1][2] > ranges[1][1]
+        assert all(later[1] == earlier[2] + 1 for earlier, later in zip(ranges, ranges[1:]))
+        assert ranges[-1][2] == stats['pages'] == _count(rb'/Type\s*/Page\b', pdf)
+
+        # Outline entries per student; static layer and logo embedded once
+        assert _count(rb'/Title', pdf) >= 4
+        assert _count(rb'/Subtype\s*/Form', pdf) == 1
+        assert _count(rb'/Subtype\s*/Image', pdf) == 1
+
+    def test_students_pulled_one_at_a_time(self):
+        pulled = []
+
+        def students():
+            for i in range(1, 4):
+                pulled.append(i)
+                yield _student(i)
+
+        template = get_compiled_template({'compiled': True})
+        story = template.story
+        laid_out = []
+
+        def tracked_story(data):
+            # Nothing beyond the student being laid out has been pulled
+            laid_out.append(len(pulled))
+            return story(data)
+
+        with patch.object(template, 'story', side_effect=tracked_story):
+            stats = template.render_merged(students(), BytesIO())
+        assert laid_out == [1, 2, 3]
+        assert stats['students'] == 3
@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+import zipfile
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from services import parquet_export
+from services.artifact_store import ArtifactStore
+from services.parquet_export import ParquetExport, write_parquet
+
+RESULT_FIELDS = {name: fields for name, fields, query in parquet_export.TABLES}['results']
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(ArtifactStore, '_shared', ArtifactStore(str(tmp_path / 'artifacts'), ttl=60, quota_bytes=1000))
+    return ArtifactStore.shared()
+
+
+class FakeQuery:
+    """Stands in for a query: yield_per returns the rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.yield_per_rows = None
+
+    def yield_per(self, count):
+        self.yield_per_rows = count
+        return iter(self.rows)
+
+
+def _results(count):
+    terms = ['First Term', 'Second Term', 'Annual']
+    return [
+        (f"00000000-0000-0000-0000-{index:012d}", f"00000000-0000-0000-0001-{index % 500:012d}",
+         f"00000000-0000-0000-0002-{index % 8:012d}", f"{2020 + index % 4}-{21 + index % 4}",
+         terms[index % 3], Decimal(index % 100) + Decimal('0.50'), Decimal('100.00'), 'ABCDE'[index % 5],
+         date(2024, 3, 1 + index % 28), index % 2 == 0)
+        for index in range(count)
+    ]
+
+
+class TestWriteParquet:
+    """Test chunked Parquet writing"""
+
+    def test_row_groups_and_round_trip(self, tmp_path):
+        path = str(tmp_path / 'results.parquet')
+        rows = _results(2500)
+        progress = []
+        assert write_parquet(path, RESULT_FIELDS, rows, row_group_rows=1000, progress=progress.append) == 2500
+
+        parquet = pq.ParquetFile(path)
+        assert parquet.metadata.num_row_groups == 3
+        assert progress == [1000, 2000, 2500]
+        table = parquet.read()
+        assert table.column('marks')[1].as_py() == Decimal('1.50')
+        assert table.column('exam_date')[0].as_py() == date(2024, 3, 1)
+        assert table.to_pylist()[-1]['term'] == rows[-1][4]
+
+    def test_categorical_columns_are_dictionary_encoded(self, tmp_path):
+        path = str(tmp_path / 'results.parquet')
+        write_parquet(path, RESULT_FIELDS, _results(100))
+
+        schema = pq.read_schema(path)
+        for name in ('academic_year', 'term', 'grade'):
+            assert pa.types.is_dictionary(schema.field(name).type)
+        assert schema.field('student_id').type == pa.string()
+
+    def test_empty_table_keeps_schema(self, tmp_path):
+        path = str(tmp_path / 'results.parquet')
+        assert write_parquet(path, RESULT_FIELDS, []) == 0
+        assert pq.read_table(path).num_rows == 0
+        assert pq.read_schema(path).names == [name for name, kind in RESULT_FIELDS]
+
+    def test_much_smaller_than_csv(self, tmp_path):
+        path = str(tmp_path / 'results.parquet')
+        rows = _results(20000)
+        write_parquet(path, RESULT_FIELDS, rows)
+
+        text = io.StringIO()
+        csv.writer(text).writerows(rows)
+        assert (tmp_path / 'results.parquet').stat().st_size * 5 < len(text.getvalue().encode())
+
+
+class TestParquetExport:
+    """Test the tenant export artifact"""
+
+    def test_validate_params(self):
+        assert ParquetExport.validate_params(None, None) is None
+        assert ParquetExport.validate_params('2021-22', '2023-2024') is None
+        assert 'from_year' in ParquetExport.validate_params('last year', None)
+        assert ParquetExport.validate_params('2024-25', '2021-22') == 'from_year must not be after to_year'
+
+    def test_generate_zips_tables_and_manifest(self, tmp_path, monkeypatch):
+        queries = {name: FakeQuery([]) for name, fields, query in parquet_export.TABLES}
+        queries['results'] = FakeQuery(_results(300))
+        requested = []
+
+        def query_for(name):
+            def query(organization_id, from_year, to_year):
+                requested.append((name, organization_id, from_year, to_year))
+                return queries[name]
+            return query
+
+        monkeypatch.setattr(parquet_export, 'TABLES', [
+            (name, fields, query_for(name)) for name, fields, query in parquet_export.TABLES
+        ])
+        output_path = str(tmp_path / 'export.zip')
+        progress = []
+        result = ParquetExport.generate('org-1', '2021-22', '2023-24', output_path=output_path,
+                                        progress=progress.append)
+
+        assert result['success'] is True
+        assert result['file_name'] == 'result_data_2021_2023.zip'
+        assert result['summary'] == {'results': 300, 'students': 0, 'subjects': 0, 'analytics': 0}
+        assert progress == [300]
+        assert requested[0] == ('results', 'org-1', '2021-22', '2023-24')
+        assert queries['results'].yield_per_rows == parquet_export.DEFAULT_YIELD_PER
+
+        with zipfile.ZipFile(output_path) as archive:
+            assert sorted(archive.namelist()) == [
+                'analytics.parquet', 'manifest.json', 'results.parquet', 'students.parquet', 'subjects.parquet'
+            ]
+            manifest = json.loads(archive.read('manifest.json'))
+            assert manifest['tables']['results'] == {'file': 'results.parquet', 'rows': 300}
+            table = pq.read_table(io.BytesIO(archive.read('results.parquet')))
+            assert table.num_rows == 300
+        # Part files are removed once zipped
+        assert not list((tmp_path / 'artifacts' / 'tmp').glob('*.parquet'))
+
+    def test_generate_rejects_bad_years(self, tmp_path):
+        result = ParquetExport.generate('org-1', 'soon', None, output_path=str(tmp_path / 'export.zip'))
+        assert result['success'] is False
@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+from benchmarks import fixtures
+from benchmarks.pdf_suite import CASES, compare, main, run_case
+
+
+class TestFixtures:
+    """Test the synthetic school fixtures"""
+
+    def test_class_is_deterministic(self):
+        first = fixtures.synthetic_class(students=5, subjects=20, seed=3)
+        assert first == fixtures.synthetic_class(students=5, subjects=20, seed=3)
+        assert len(first['subjects']) == len(set(first['subjects'])) == 20
+        assert sorted(record['position'] for record in first['students'])[0] == 1
+
+    def test_every_format_covers_the_class(self):
+        school_class = fixtures.synthetic_class(students=4, subjects=3)
+        marksheets = fixtures.marksheet_students(school_class)
+        assert len(marksheets) == 4
+        assert len(marksheets[0]['overall_result']['subjects']) == 3
+        assert len(fixtures.service_marksheets(school_class)[0][1]) == 3
+        assert len(fixtures.class_service_results(school_class)[1]) == 4
+        assert len(fixtures.certificates(school_class, count=2)) == 2
+
+
+class TestPDFSuite:
+    """Test the benchmark runner and baseline comparison"""
+
+    def test_run_case(self):
+        metrics = run_case('marksheet/classic', students=2, subjects=3, seed=0)
+        assert metrics['documents'] == 2
+        assert metrics['pages'] >= 2
+        assert metrics['bytes_per_page'] > 0
+        assert metrics['seconds_per_page'] > 0
+
+    def test_bytes_saved_reported(self):
+        metrics = run_case('invoice/subscription', students=2, subjects=3, seed=0)
+        assert metrics['unoptimized_bytes'] > metrics['bytes']
+        assert metrics['bytes_saved_per_document'] == round((metrics['unoptimized_bytes'] - metrics['bytes']) / 10)
+
+    def test_failures_are_reported(self):
+        def broken(school_class):
+            raise KeyError('subjects')
+
+        with patch.dict(CASES, {'broken': broken}):
+            assert run_case('broken', 1, 1, 0) == {'error': "KeyError: 'subjects'"}
+
+    def test_watermarked_cases_render(self):
+        for name in ('service-marksheet/modern', 'class/result-service', 'service-class/modern', 'certificate/merit'):
+            metrics = run_case(name, students=2, subjects=3, seed=0)
+            assert 'error' not in metrics, (name, metrics)
+            assert metrics['pages'] >= 1
+
+    def test_failed_cases_exit_non_zero(self):
+        results = {'a': {'seconds_per_page': 0.01, 'rss_growth_mb': 1.0, 'bytes_per_page': 1}, 'b': {'error': 'LayoutError'}}
+        with patch('benchmarks.pdf_suite.run_suite', return_value=results), \
+                patch('benchmarks.pdf_suite.print_results'), patch('sys.argv', ['pdf_suite']):
+            assert main() == 1
+        with patch('benchmarks.pdf_suite.run_suite', return_value={'a': results['a']}), \
+                patch('benchmarks.pdf_suite.print_results'), patch('sys.argv', ['pdf_suite']):
+            assert main() == 0
+
+    def test_compare_flags_regressions_past_threshold(self):
+        baseline = {
+            'a': {'seconds_per_page': 0.010, 'rss_growth_mb': 20.0, 'bytes_per_page': 4000},
+            'b': {'seconds_per_page': 0.010, 'rss_growth_mb': 20.0, 'bytes_per_page': 4000},
+            'c': {'error': 'KeyError'},
+            'd': {'error': 'KeyError'},
+        }
+        results = {
+            'a': {'seconds_per_page': 0.0115, 'rss_growth_mb': 22.0, 'bytes_per_page': 6000},
+            'b': {'error': 'LayoutError'},
+            'c': {'seconds_per_page': 1.0, 'rss_growth_mb': 1.0, 'bytes_per_page': 1},
+            'd': {'error': 'KeyError'},
+            'new': {'seconds_per_page': 1.0, 'rss_growth_mb': 1.0, 'bytes_per_page': 1},
+        }
+        assert compare(results, baseline, 0.25) == [
+            ('a', 'bytes_per_page', 4000, 6000),
+            ('b', 'error', None, 'LayoutError'),
+            ('d', 'error', 'KeyError', 'KeyError'),
+        ]
+
+    def test_small_absolute_changes_are_noise(self):
+        baseline = {'a': {'seconds_per_page': 0.0001, 'rss_growth_mb': 1.0, 'bytes_per_page': 100}}
+        results = {'a': {'seconds_per_page': 0.0005, 'rss_growth_mb': 4.0, 'bytes_per_page': 300}}
+        assert compare(results, baseline, 0.25) == []
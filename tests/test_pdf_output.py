@@ -0,0 +1,91 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image as PILImage
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+from services.asset_cache import AssetCache
+from utils.marksheet_pdf import _render_result_pdf
+from utils.pdf_output import configure, doc_options, output_settings
+
+
+def _write_image(path, size=(1200, 1200)):
+    PILImage.linear_gradient('L').resize(size).convert('RGB').save(path)
+    return str(path)
+
+
+def _student():
+    return {
+        'name': 'Asha',
+        'roll_no': '1',
+        'cls': '10',
+        'section': 'A',
+        'overall_result': {
+            'subjects': [{'name': 'Maths', 'max_marks': 100, 'obtained_marks': 80, 'grade': 'A', 'percentage': 80}],
+            'overall_percentage': 80,
+            'overall_grade': 'A'
+        }
+    }
+
+
+@pytest.fixture(autouse=True)
+def restore_settings():
+    yield
+    configure()
+
+
+class TestOutputSettings:
+    """Test the process-wide output settings"""
+
+    def test_page_compression_enforced(self):
+        assert doc_options(pagesize=(100, 100), pageCompression=0) == {'pagesize': (100, 100), 'pageCompression': 1}
+
+    def test_binary_streams_when_optimizing(self):
+        def render():
+            buffer = BytesIO()
+            SimpleDocTemplate(buffer, **doc_options()).build([Paragraph('Result ' * 200, getSampleStyleSheet()['Normal'])])
+            return buffer.getvalue()
+
+        configure(optimize=False)
+        text = render()
+        assert output_settings()['optimize'] is False
+        configure(optimize=True)
+        binary = render()
+        assert b'ASCII85Decode' in text and b'ASCII85Decode' not in binary
+        assert len(binary) < len(text)
+
+
+class TestImageOptimization:
+    """Test images downsampled, re-encoded and shared across sources"""
+
+    def test_identical_images_share_a_reader(self, tmp_path):
+        cache = AssetCache()
+        logo = cache.image_reader(_write_image(tmp_path / 'logo.png'), 60, 60, 'org-1')
+        signature = cache.image_reader(_write_image(tmp_path / 'signature.png'), 60, 60, 'org-1')
+        other = cache.image_reader(_write_image(tmp_path / 'other.png'), 60, 60, 'org-2')
+        assert logo is signature
+        assert other is not logo
+
+    def test_images_kept_as_loaded_without_optimizing(self, tmp_path):
+        cache = AssetCache(dpi=72)
+        path = _write_image(tmp_path / 'logo.png')
+        assert cache.image_reader(path, 60, 60).getSize() == (60, 60)
+        configure(optimize=False)
+        assert cache.image_reader(path, 60, 60).getSize() == (1200, 1200)
+
+    def test_uncached_images(self, tmp_path):
+        cache = AssetCache()
+        reader = cache.image_reader(_write_image(tmp_path / 'photo.png'), 80, 100, cache=False)
+        assert reader is not None
+        assert len(cache) == 0
+
+    def test_student_photo_downsampled(self, tmp_path):
+        photo = _write_image(tmp_path / 'photo.png', size=(3000, 3000))
+        with_photo = _render_result_pdf(_student(), {'student_photo': photo}, 'modern')
+        configure(optimize=False)
+        unoptimized = _render_result_pdf(_student(), {'student_photo': photo}, 'modern')
+        # 80pt at 300dpi
+        assert b'/Width 334' in with_photo
+        assert b'/Width 3000' in unoptimized
+        assert len(with_photo) < len(unoptimized)
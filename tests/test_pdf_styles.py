@@ -0,0 +1,40 @@
+import pytest
+from reportlab.lib.styles import ParagraphStyle
+
+from services.pdf_service import BasePDFService
+from utils.certificate_pdf import CertificatePDFService
+from utils.marksheet_pdf import _get_enhanced_styles
+from utils.pdf_styles import clear_style_cache, get_table_style
+
+
+class TestStyleRegistry:
+    """Test the shared style registry"""
+
+    def setup_method(self):
+        clear_style_cache()
+
+    def test_services_share_stylesheet(self):
+        assert BasePDFService().styles is BasePDFService().styles
+        assert 'CustomHeader' in BasePDFService().styles
+
+    def test_shared_stylesheet_is_read_only(self):
+        styles = BasePDFService().styles
+        with pytest.raises(TypeError):
+            styles.add(ParagraphStyle('Extra', parent=styles['Normal']))
+
+    def test_certificate_theme(self):
+        styles = CertificatePDFService().styles
+        assert styles['RecipientName'].fontSize == 24
+        assert 'RecipientName' not in BasePDFService().styles
+
+    def test_keyed_by_relevant_customization(self):
+        """Only the fields a theme reads split the cache"""
+        blue = _get_enhanced_styles({'main_color': '#1E40AF', 'institute_name': 'A'})
+        assert _get_enhanced_styles({'main_color': '#1E40AF', 'institute_name': 'B'}) is blue
+        assert _get_enhanced_styles({'main_color': '#FF0000'}) is not blue
+        assert _get_enhanced_styles({'main_color': '#1E40AF'}, theme='classic') is not blue
+
+    def test_table_styles_shared(self):
+        customization = {'main_color': '#1E40AF', 'header_color': '#E5E7EB'}
+        assert get_table_style('marksheet_results', customization) is get_table_style('marksheet_results', dict(customization))
+        assert get_table_style('marksheet_remarks') is get_table_style('marksheet_remarks', customization)
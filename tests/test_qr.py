@@ -0,0 +1,128 @@
+import os
+from io import BytesIO
+
+import qrcode
+from flask import Flask
+from reportlab.platypus import SimpleDocTemplate
+
+from routes.main_routes import main_bp
+from utils.qr import (
+    _qr_runs, describe_claims, qr_code, verification_claims, verification_qr, verification_token,
+    verification_url, verify_token
+)
+
+
+SECRET = b'test-secret'
+STUDENT = {
+    'name': 'Asha', 'roll_no': '7', 'cls': '10', 'section': 'A',
+    'overall_result': {
+        'subjects': [{'name': 'Maths', 'max_marks': 100, 'obtained_marks': 91}],
+        'overall_grade': 'A+', 'overall_percentage': 91.234, 'position': 1
+    }
+}
+
+
+class TestVerificationToken:
+    """Test compact signed tokens"""
+
+    def test_claims_are_compact(self):
+        claims = verification_claims(STUDENT)
+        assert claims == ['Asha', '7', '10', 'A', 'A+', 91.23, 1]
+        assert verification_claims({'id': 5, 'items': [1, 2]}) == {'id': 5}
+        assert verification_claims('CERT-1') == 'CERT-1'
+
+    def test_round_trip(self):
+        token = verification_token(STUDENT, SECRET)
+        assert token.startswith('V1.')
+        # Upper case letters, digits and dots fit QR alphanumeric mode
+        assert all(c.isupper() or c.isdigit() or c == '.' for c in token)
+        assert len(token) < 100
+        assert verify_token(token, SECRET) == verification_claims(STUDENT)
+
+    def test_tampering_rejected(self):
+        token = verification_token(STUDENT, SECRET)
+        forged = verification_token({**STUDENT, 'name': 'Someone'}, SECRET)
+        version, claims, signature = token.split('.')
+        assert verify_token(f"{version}.{forged.split('.')[1]}.{signature}", SECRET) is None
+        assert verify_token(token, b'other-secret') is None
+        assert verify_token('garbage', SECRET) is None
+
+
+class TestVectorQR:
+    """Test QR codes drawn as shapes"""
+
+    def test_runs_cover_dark_modules(self):
+        modules, runs = _qr_runs('hello', 1)
+        qr = qrcode.QRCode(border=1, error_correction=qrcode.constants.ERROR_CORRECT_M, mask_pattern=0)
+        qr.add_data('hello')
+        qr.make(fit=True)
+        matrix = qr.get_matrix()
+
+        covered = {(modules - y - 1, col) for x, y, length in runs for col in range(x, x + length)}
+        dark = {(row, col) for row, cells in enumerate(matrix) for col, cell in enumerate(cells) if cell}
+        assert modules == len(matrix)
+        assert covered == dark
+        # Runs are merged, so there are fewer rectangles than dark modules
+        assert len(runs) < len(dark)
+
+    def test_payload_memoized(self):
+        first = qr_code('payload', 60)
+        second = qr_code('payload', 90)
+        assert first is not second
+        assert first.runs is second.runs
+        assert (first.wrap(500, 500), second.wrap(500, 500)) == ((60, 60), (90, 90))
+
+    def test_renders_without_images(self):
+        buffer = BytesIO()
+        SimpleDocTemplate(buffer).build([qr_code(verification_token(STUDENT, SECRET), 60)])
+        pdf = buffer.getvalue()
+        assert pdf.startswith(b'%PDF')
+        assert b'/Subtype /Image' not in pdf
+
+
+class TestVerificationPage:
+    """Test the page QR codes link to"""
+
+    @staticmethod
+    def _app():
+        app = Flask(__name__, template_folder=os.path.join(os.path.dirname(__file__), '..', 'templates'))
+        app.config.update(SECRET_KEY=SECRET.decode(), VERIFICATION_BASE_URL='https://results.example.org')
+        app.register_blueprint(main_bp)
+        return app
+
+    def test_link_fits_alphanumeric_mode(self):
+        token = verification_token(STUDENT, SECRET)
+        url = verification_url(token, 'https://results.example.org/')
+        assert url == f"HTTPS://RESULTS.EXAMPLE.ORG/V/{token}"
+        assert set(url) <= set('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:')
+        assert verification_url(token, '') == token
+
+    def test_qr_code_holds_the_link(self):
+        app = self._app()
+        with app.app_context():
+            flowable = verification_qr(STUDENT, 60)
+            token = verification_token(STUDENT)
+        assert flowable.runs == _qr_runs(f"HTTPS://RESULTS.EXAMPLE.ORG/V/{token}", 1)[1]
+
+    def test_claims_are_labelled(self):
+        assert describe_claims(verification_claims(STUDENT))[:2] == [('Name', 'Asha'), ('Roll No', '7')]
+        assert describe_claims({'certificate_number': 'C-1', 'award_level': 'Gold'}) == [
+            ('Award Level', 'Gold'), ('Certificate No', 'C-1')
+        ]
+        assert describe_claims('CERT-1') == [('Reference', 'CERT-1')]
+
+    def test_genuine_and_forged_tokens(self):
+        app = self._app()
+        client = app.test_client()
+        token = verification_token(STUDENT, SECRET)
+
+        response = client.get(f"/V/{token}")
+        assert response.status_code == 200
+        assert b'Genuine document' in response.data and b'Asha' in response.data
+        # Scanners may lower-case the link
+        assert client.get(f"/V/{token.lower()}").status_code == 200
+
+        forged = verification_token({**STUDENT, 'name': 'Someone'}, b'other-secret')
+        response = client.get(f"/V/{forged}")
+        assert response.status_code == 404
+        assert b'Not verified' in response.data
@@ -0,0 +1,101 @@
+import os
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+from services import render_cache
+from services.asset_cache import REMOTE_TTL
+from services.pdf_service import BasePDFService
+from services.render_cache import RenderCache
+from utils import marksheet_pdf
+
+
+STUDENT = {
+    'name': 'Asha', 'roll_no': '1', 'cls': '10', 'section': 'A',
+    'overall_result': {'subjects': [{'name': 'Maths', 'max_marks': 100, 'obtained_marks': 91, 'grade': 'A+', 'percentage': 91.0}]}
+}
+
+
+class TestRenderCacheKey:
+    """Test render keys"""
+
+    def test_stable_and_input_sensitive(self):
+        key = RenderCache.key('marksheet', {'marks': Decimal('91.00')}, {'main_color': '#000'}, 'modern', 'v1')
+        assert key == RenderCache.key('marksheet', {'marks': Decimal('91.00')}, {'main_color': '#000'}, 'modern', 'v1')
+        assert key != RenderCache.key('marksheet', {'marks': Decimal('92.00')}, {'main_color': '#000'}, 'modern', 'v1')
+        assert key != RenderCache.key('marksheet', {'marks': Decimal('91.00')}, {'main_color': '#fff'}, 'modern', 'v1')
+        assert key != RenderCache.key('marksheet', {'marks': Decimal('91.00')}, {'main_color': '#000'}, 'classic', 'v1')
+        assert key != RenderCache.key('marksheet', {'marks': Decimal('91.00')}, {'main_color': '#000'}, 'modern', 'v2')
+
+    def test_asset_changes_change_key(self, tmp_path):
+        logo = tmp_path / 'logo.png'
+        logo.write_bytes(b'one')
+        key = RenderCache.key('marksheet', {}, {'logo': str(logo)})
+        logo.write_bytes(b'three')
+        assert RenderCache.key('marksheet', {}, {'logo': str(logo)}) != key
+
+    def test_key_changes_with_the_day(self, monkeypatch):
+        key = RenderCache.key('marksheet', {}, {})
+
+        class Tomorrow(date):
+            @classmethod
+            def today(cls):
+                return date.today() + timedelta(days=1)
+
+        monkeypatch.setattr(render_cache, 'date', Tomorrow)
+        assert RenderCache.key('marksheet', {}, {}) != key
+
+    def test_remote_assets_keyed_by_refresh_window(self, monkeypatch):
+        customization = {'logo': 'https://example.com/logo.png'}
+        monkeypatch.setattr(render_cache.time, 'time', lambda: 10 * REMOTE_TTL + 1)
+        key = RenderCache.key('marksheet', {}, customization)
+        assert RenderCache.key('marksheet', {}, customization) == key
+        monkeypatch.setattr(render_cache.time, 'time', lambda: 11 * REMOTE_TTL + 1)
+        assert RenderCache.key('marksheet', {}, customization) != key
+        assert RenderCache.key('marksheet', {}, {'logo': 'https://example.com/new.png'}) != key
+
+
+class TestRenderCacheStore:
+    """Test the local artifact store"""
+
+    def test_get_put(self, tmp_path):
+        cache = RenderCache(str(tmp_path))
+        assert cache.get('ab' * 32) is None
+        cache.put('ab' * 32, b'%PDF-1')
+        assert cache.get('ab' * 32) == b'%PDF-1'
+
+    def test_lru_eviction(self, tmp_path):
+        cache = RenderCache(str(tmp_path), max_bytes=250)
+        keys = [f'{i:02d}' * 32 for i in range(3)]
+        for i, key in enumerate(keys[:2]):
+            cache.put(key, b'x' * 100)
+            past = time.time() - 100 + i
+            os.utime(cache._path(key), (past, past))
+        # Touch the oldest so the other one is least recently used
+        cache.get(keys[0])
+
+        cache.put(keys[2], b'x' * 100)
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[2]) is not None
+
+
+class TestCachedRenders:
+    """Test that renderers serve hits without re-rendering"""
+
+    def test_generate_result_pdf(self):
+        first, second = BytesIO(), BytesIO()
+        assert marksheet_pdf.generate_result_pdf(STUDENT, first, {'include_qr': False})
+        with patch.object(marksheet_pdf, '_render_result_pdf') as render:
+            assert marksheet_pdf.generate_result_pdf(STUDENT, second, {'include_qr': False})
+            render.assert_not_called()
+        assert first.getvalue() == second.getvalue()
+
+    def test_service_render_cached(self):
+        service = BasePDFService()
+        render = MagicMock(return_value=BytesIO(b'%PDF-invoice'))
+        for _ in range(2):
+            assert service._render_cached('invoice', {'number': 'INV-1'}, None, render).read() == b'%PDF-invoice'
+        assert render.call_count == 1
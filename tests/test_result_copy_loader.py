@@ -0,0 +1,292 @@
+import io
+import os
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services.result_copy_loader import ProgressReader, ResultCopyLoader
+from services.result_import import CONFLICT_COLUMNS, TERMS
+from utils.grading import default_grading_scheme
+from utils.validations import ValidationError
+
+ORG = uuid.uuid4()
+HEADER = ['Class', 'Roll Number', 'Name', 'Subject', 'Marks Obtained', 'Notes']
+
+
+class FakeCursor:
+    """DB-API cursor recording statements, answering the loader's queries"""
+
+    def __init__(self, rows=3, created_students=1, merged=(2, 1), errors=()):
+        self.rows = rows
+        self.results = {'merge_students': (created_students,), 'merge_results': merged}
+        self.errors = list(errors)
+        self.executed = []
+        self.copied = []
+        self.rowcount = -1
+        self.closed = False
+
+    def execute(self, statement, params=None):
+        self.executed.append(statement)
+
+    def executemany(self, statement, rows):
+        self.executed.append((statement, list(rows)))
+
+    def copy_expert(self, statement, stream):
+        if 'FROM STDIN' in statement:
+            self.copied.append(stream.read())
+            self.rowcount = self.rows
+        else:
+            stream.write(b'3,10,9,,Maths,40,,unknown_student,No such student\n')
+
+    def fetchone(self):
+        last = self.executed[-1]
+        return self.results['merge_students' if 'INSERT INTO students' in last else 'merge_results']
+
+    def fetchall(self):
+        if 'GROUP BY error' in self.executed[-1]:
+            return self.errors
+        if 'academic_year, term FROM result_staging' in self.executed[-1]:
+            return [('10', '2024-25', 'Annual')]
+        return [('10', '2024-25')]
+
+    def close(self):
+        self.closed = True
+
+
+def _load(cursor, data, report=None, progress=None, leaderboard=None):
+    loader = ResultCopyLoader(ORG, academic_year='2024-25', progress=progress)
+    with patch('services.result_copy_loader.db') as db, \
+            patch('services.result_copy_loader.LeaderboardService', return_value=leaderboard or MagicMock()), \
+            patch('services.result_copy_loader.get_grading_scheme', return_value=default_grading_scheme()):
+        db.session.connection.return_value.connection.cursor.return_value = cursor
+        result = loader.load(io.BytesIO(data), report)
+    return result, db
+
+
+class TestProgressReader:
+    """Test counting the bytes COPY consumes"""
+
+    def test_callback_every_step_and_at_the_end(self):
+        calls = []
+        reader = ProgressReader(io.BytesIO(b'x' * 10), 10, lambda done, total: calls.append((done, total)), step=4)
+        while reader.read(3):
+            pass
+        assert calls == [(6, 10), (10, 10), (10, 10)]
+        assert reader.bytes_read == 10
+
+
+class TestStatements:
+    """Test the generated SQL"""
+
+    def test_header_mapped_to_raw_columns(self):
+        columns = ResultCopyLoader(ORG).staging_columns(HEADER)
+        assert columns == {'class_name': 'c0', 'roll_no': 'c1', 'name': 'c2', 'subject': 'c3', 'marks': 'c4'}
+
+    def test_missing_columns(self):
+        with pytest.raises(ValidationError) as error:
+            ResultCopyLoader(ORG).staging_columns(['class', 'roll_no', 'marks'])
+        assert error.value.code == 'missing_columns'
+
+    def test_copy_and_merge(self):
+        sql = ResultCopyLoader(ORG).statements(HEADER)
+        assert sql['copy'].startswith('COPY result_staging (c0, c1, c2, c3, c4, c5) FROM STDIN')
+        assert 'max_marks_raw = NULL' in sql['normalize']
+        assert 'ON CONFLICT (organization_id, student_id, subject_id, term, academic_year) DO UPDATE' in sql['merge_results']
+        assert 'ON CONFLICT (organization_id, roll_no) DO NOTHING' in sql['merge_students']
+        assert "WHEN 'unknown_subject' THEN 'Unknown subject for the class'" in sql['report']
+        # Soft-deleted students are unknown, as to the chunked importer
+        assert 's.deleted_at IS NULL' in sql['resolve_students'][0]
+
+    def test_impossible_dates_rejected_before_the_cast(self):
+        sql = ResultCopyLoader(ORG).statements(HEADER + ['exam_date'])
+        check = next(index for index, statement in enumerate(sql['validate']) if "'invalid_date'" in statement)
+        cast = next(index for index, statement in enumerate(sql['validate']) if 'exam_date_raw::date' in statement)
+        assert check < cast
+        statement = sql['validate'][check]
+        # The parts are cast only after the shape matched, and days are checked against the month
+        assert statement.index('CASE WHEN exam_date_raw !~') < statement.index('::int')
+        assert "make_date(" in statement and "interval '1 month - 1 day'" in statement
+
+
+class TestLoad:
+    """Test a load against a fake cursor"""
+
+    def test_load_reports_counts_and_progress(self):
+        cursor = FakeCursor(errors=[('unknown_student', 1)])
+        report = io.BytesIO()
+        calls = []
+        data = ','.join(HEADER).encode() + b'\n10,1,Asha,Maths,40,\n10,2,,Maths,45,\n10,9,,Maths,40,\n'
+        result, db = _load(cursor, data, report, progress=lambda done, total: calls.append((done, total)))
+
+        assert result == {
+            'success': True, 'rows': 3, 'created_students': 1, 'created': 2, 'updated': 1, 'count': 3,
+            'rejected': 1, 'errors': {'unknown_student': 1}
+        }
+        assert cursor.copied == [data.split(b'\n', 1)[1]]
+        assert calls[-1] == (len(cursor.copied[0]), len(cursor.copied[0]))
+        assert report.getvalue().splitlines()[0] == b'row,Class,Roll Number,Name,Subject,Marks Obtained,Notes,error,message'
+        # Grade bands come from the class's grading scheme
+        bands = [statement for statement in cursor.executed if isinstance(statement, tuple)]
+        assert bands[0][1][0] == ('10', '2024-25', -1, default_grading_scheme().fail_grade)
+        db.session.commit.assert_called_once()
+        assert cursor.closed
+
+    def test_leaderboards_rebuilt_after_commit(self):
+        events = []
+        leaderboard = MagicMock()
+        leaderboard.rebuild_organization.side_effect = lambda *args, **kwargs: events.append('rebuild')
+        cursor = FakeCursor()
+        close = cursor.close
+        cursor.close = lambda: (events.append('close'), close())
+        data = b'class,roll_no,subject,marks\n10,1,Maths,40\n'
+        result, db = _load(cursor, data, leaderboard=leaderboard)
+        assert result['success']
+        # The boards are read from the staging table, rebuilt once the load is done
+        assert any('academic_year, term FROM result_staging' in str(statement) for statement in cursor.executed)
+        assert events == ['close', 'rebuild']
+        leaderboard.rebuild_organization.assert_called_once_with(ORG, '2024-25', 'Annual', class_name='10')
+
+    def test_impossible_date_is_a_rejected_row(self):
+        cursor = FakeCursor(rows=2, merged=(1, 0), errors=[('invalid_date', 1)])
+        execute = cursor.execute
+
+        def strict_execute(statement, params=None):
+            # As Postgres would: casting 2023-02-30 fails unless the row was rejected first
+            if 'exam_date_raw::date' in statement and not any(
+                    "'invalid_date'" in str(done) and 'make_date' in str(done) for done in cursor.executed):
+                raise RuntimeError('date/time field value out of range: "2023-02-30"')
+            execute(statement, params)
+
+        cursor.execute = strict_execute
+        data = b'class,roll_no,subject,marks,exam_date\n10,1,Maths,40,2023-02-30\n10,2,Maths,45,2023-02-28\n'
+        result, db = _load(cursor, data, io.BytesIO())
+        assert result['success']
+        assert result['errors'] == {'invalid_date': 1}
+        db.session.commit.assert_called_once()
+
+    def test_failed_load_rolls_back(self):
+        cursor = FakeCursor()
+        cursor.fetchone = lambda: (_ for _ in ()).throw(RuntimeError('deadlock detected\nDETAIL: ...'))
+        result, db = _load(cursor, b'class,roll_no,subject,marks\n10,1,Maths,40\n')
+        assert not result['success']
+        assert result['error'] == 'Load failed, nothing was imported: deadlock detected'
+        db.session.rollback.assert_called_once()
+        db.session.commit.assert_not_called()
+
+    def test_bad_header_fails_before_copy(self):
+        cursor = FakeCursor()
+        result, db = _load(cursor, b'name,marks\nAsha,40\n')
+        assert not result['success'] and 'Missing columns' in result['error']
+        assert cursor.executed == []
+
+
+# Postgres the end-to-end test loads into, e.g. postgresql://postgres@localhost/test
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+SCHEMA = f"""
+CREATE TYPE term_type AS ENUM ({', '.join(f"'{term}'" for term in TERMS)});
+CREATE TABLE subjects (
+    id uuid PRIMARY KEY, organization_id uuid NOT NULL, name varchar(100) NOT NULL, code varchar(20),
+    max_marks numeric(5, 2) DEFAULT 100.0, class_name varchar(20), is_active boolean DEFAULT true
+);
+CREATE TABLE students (
+    id uuid PRIMARY KEY, organization_id uuid NOT NULL, roll_no varchar(20) NOT NULL,
+    name varchar(100) NOT NULL, class_name varchar(20) NOT NULL, section varchar(5) NOT NULL,
+    is_active boolean DEFAULT true, created_by uuid, created_at timestamp, updated_at timestamp,
+    deleted_at timestamp, UNIQUE (organization_id, roll_no)
+);
+CREATE TABLE results (
+    id uuid PRIMARY KEY, organization_id uuid NOT NULL, student_id uuid NOT NULL REFERENCES students (id),
+    subject_id uuid NOT NULL REFERENCES subjects (id), term term_type DEFAULT 'Annual',
+    academic_year varchar(10) NOT NULL, marks numeric(5, 2) NOT NULL, max_marks numeric(5, 2) DEFAULT 100.0,
+    grade varchar(5), remarks text, exam_date date, entered_by uuid, is_verified boolean DEFAULT false,
+    created_at timestamp, updated_at timestamp, deleted_at timestamp,
+    UNIQUE ({', '.join(CONFLICT_COLUMNS)})
+);
+"""
+
+
+@pytest.fixture
+def pg():
+    """Connection to a throwaway schema holding the tables the loader writes"""
+    psycopg2 = pytest.importorskip('psycopg2')
+    connection = psycopg2.connect(TEST_DATABASE_URL)
+    schema = f"copy_loader_{uuid.uuid4().hex}"
+    with connection.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA {schema}")
+        cursor.execute(f"SET search_path TO {schema}, public")
+        cursor.execute(SCHEMA)
+    connection.commit()
+    yield connection
+    connection.rollback()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+    connection.commit()
+    connection.close()
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason='TEST_DATABASE_URL is not set')
+class TestLoadPostgres:
+    """Test a load end to end against Postgres"""
+
+    def test_csv_loaded_and_rejected_rows_reported(self, pg):
+        maths, existing, deleted = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        with pg.cursor() as cursor:
+            cursor.execute("INSERT INTO subjects (id, organization_id, name, code, max_marks, class_name) "
+                           "VALUES (%s, %s, 'Maths', 'MTH', 50, '10')", (str(maths), str(ORG)))
+            cursor.execute(
+                "INSERT INTO students (id, organization_id, roll_no, name, class_name, section, deleted_at) "
+                "VALUES (%s, %s, '1', 'Asha', '10', 'A', NULL), (%s, %s, '7', 'Ravi', '10', 'A', now())",
+                (str(existing), str(ORG), str(deleted), str(ORG)))
+        pg.commit()
+
+        data = (
+            'class,roll_no,name,subject,marks,term,exam_date\n'
+            '10,1,,mth,30,,2024-03-01\n'         # superseded by the last row
+            '10,2,Meera,Maths,45,half yearly,\n'  # new student, term matched case-insensitively
+            '10,3,Kiran,Maths,40,,2023-02-30\n'   # no such date
+            '10,1,,Science,40,,\n'                # no such subject
+            '10,7,,Maths,40,,\n'                  # soft-deleted, no name to create one
+            '10,1,,Maths,42,,2024-03-02\n'
+        ).encode()
+        report = io.BytesIO()
+        loader = ResultCopyLoader(ORG, academic_year='2024-25')
+        with patch('services.result_copy_loader.db') as db, \
+                patch('services.result_copy_loader.LeaderboardService') as leaderboard, \
+                patch('services.result_copy_loader.get_grading_scheme', return_value=default_grading_scheme()):
+            db.session.connection.return_value.connection = pg
+            db.session.commit.side_effect = pg.commit
+            db.session.rollback.side_effect = pg.rollback
+            result = loader.load(io.BytesIO(data), report)
+
+        assert result == {
+            'success': True, 'rows': 6, 'created_students': 1, 'created': 2, 'updated': 0, 'count': 2,
+            'rejected': 4, 'errors': {'invalid_date': 1, 'unknown_subject': 1, 'unknown_student': 1,
+                                      'duplicate_result': 1}
+        }
+        lines = report.getvalue().decode().splitlines()
+        assert lines[0] == 'row,class,roll_no,name,subject,marks,term,exam_date,error,message'
+        assert lines[1:] == [
+            '2,10,1,,mth,30,,2024-03-01,duplicate_result,"A later row has the same student, subject, term and year"',
+            '4,10,3,Kiran,Maths,40,,2023-02-30,invalid_date,exam_date must be a valid YYYY-MM-DD date',
+            '5,10,1,,Science,40,,,unknown_subject,Unknown subject for the class',
+            '6,10,7,,Maths,40,,,unknown_student,No such student and no name to create one',
+        ]
+
+        with pg.cursor() as cursor:
+            cursor.execute("SELECT st.roll_no, r.term::text, r.academic_year, r.marks, r.max_marks, r.grade, "
+                           "r.exam_date::text FROM results r JOIN students st ON st.id = r.student_id "
+                           "ORDER BY st.roll_no")
+            rows = cursor.fetchall()
+            cursor.execute("SELECT count(*) FROM pg_tables WHERE tablename = 'result_staging'")
+            staging = cursor.fetchone()[0]
+        scheme = default_grading_scheme()
+        assert [(roll_no, term, year, float(marks), float(max_marks), grade, exam_date)
+                for roll_no, term, year, marks, max_marks, grade, exam_date in rows] == [
+            ('1', 'Annual', '2024-25', 42.0, 50.0, scheme.grade(84.0), '2024-03-02'),
+            ('2', 'Half Yearly', '2024-25', 45.0, 50.0, scheme.grade(90.0), None),
+        ]
+        assert staging == 0
+        rebuilt = sorted(call.args[2] for call in leaderboard.return_value.rebuild_organization.call_args_list)
+        assert rebuilt == ['Annual', 'Half Yearly']
@@ -0,0 +1,181 @@
+import io
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from openpyxl import Workbook
+from sqlalchemy.dialects import postgresql
+
+from services.artifact_store import ArtifactStore
+from services.import_staging import ImportStaging
+from services.result_import import ClassLookup, ResultImport, read_rows
+from utils.iterables import chunked
+from utils.grading import default_grading_scheme
+from utils.validations import ValidationError
+
+ORG = uuid.uuid4()
+ASHA, BALA = uuid.uuid4(), uuid.uuid4()
+MATHS, ENGLISH = uuid.uuid4(), uuid.uuid4()
+
+
+class StubLookup(ClassLookup):
+    """Lookup with preloaded maps instead of queries"""
+
+    def __init__(self):
+        super().__init__(ORG)
+        self._students['10'] = {'1': ASHA, '2': BALA}
+        self._subjects['10'] = {'maths': (MATHS, Decimal(50)), 'english': (ENGLISH, None)}
+
+    def scheme(self, class_name, academic_year):
+        return default_grading_scheme()
+
+
+def _csv(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+
+def _import(**kwargs):
+    return ResultImport(ORG, academic_year='2024-25', lookup=StubLookup(), **kwargs)
+
+
+class TestReadRows:
+    """Test parsing uploaded sheets"""
+
+    def test_csv_headers_and_blank_rows(self):
+        rows = list(read_rows(_csv("Class,Roll Number,Subject,Marks Obtained\n10,1,Maths,40\n,,,\n10,2,English,70\n"), 'marks.csv'))
+        assert rows == [
+            (2, {'class_name': '10', 'roll_no': '1', 'subject': 'Maths', 'marks': '40'}),
+            (4, {'class_name': '10', 'roll_no': '2', 'subject': 'English', 'marks': '70'}),
+        ]
+
+    def test_xlsx_read_only(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['class_name', 'roll_no', 'subject', 'marks', 'max_marks'])
+        sheet.append([10, 1, 'Maths', 45.5, 50])
+        output = io.BytesIO()
+        workbook.save(output)
+        output.seek(0)
+        rows = list(read_rows(output, 'marks.xlsx'))
+        assert rows == [(2, {'class_name': 10, 'roll_no': 1, 'subject': 'Maths', 'marks': 45.5, 'max_marks': 50})]
+
+    def test_missing_columns(self):
+        with pytest.raises(ValidationError) as error:
+            list(read_rows(_csv("class,roll_no,marks\n10,1,40\n"), 'marks.csv'))
+        assert error.value.code == 'missing_columns'
+        assert 'subject' in error.value.message
+
+    def test_chunked(self):
+        assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+class TestValidation:
+    """Test resolving and validating rows"""
+
+    def test_valid_row_resolved_and_graded(self):
+        result_import = _import()
+        [record] = result_import.validate_chunk([(2, {'class_name': '10', 'roll_no': 1.0, 'subject': 'MATHS', 'marks': '45'})])
+        assert record['student_id'] == ASHA and record['subject_id'] == MATHS
+        # Subject max marks apply when the sheet has none
+        assert record['max_marks'] == Decimal(50)
+        assert record['term'] == 'Annual' and record['academic_year'] == '2024-25'
+        assert record['grade'] == default_grading_scheme().grade(90.0)
+        assert result_import.boards == {('10', '2024-25', 'Annual')}
+
+    def test_rejected_rows_reported(self):
+        result_import = _import()
+        records = result_import.validate_chunk([
+            (2, {'class_name': '10', 'roll_no': '9', 'subject': 'Maths', 'marks': '10'}),
+            (3, {'class_name': '10', 'roll_no': '1', 'subject': 'Art', 'marks': '10'}),
+            (4, {'class_name': '10', 'roll_no': '1', 'subject': 'Maths', 'marks': 'ten'}),
+            (5, {'class_name': '10', 'roll_no': '1', 'subject': 'Maths', 'marks': '51'}),
+            (6, {'class_name': '10', 'roll_no': '1', 'subject': 'English', 'marks': '10', 'term': 'Midterm'}),
+            (7, {'class_name': '10', 'roll_no': '1', 'subject': 'English', 'marks': '10', 'exam_date': '31/03/2025'}),
+            (8, {'class_name': '', 'roll_no': '1', 'subject': 'English', 'marks': '10'}),
+        ])
+        assert records == []
+        assert [(e['row'], e['code']) for e in result_import.errors] == [
+            (2, 'unknown_student'), (3, 'unknown_subject'), (4, 'invalid_number'), (5, 'invalid_marks'),
+            (6, 'invalid_choice'), (7, 'invalid_date'), (8, 'required')
+        ]
+        assert result_import.rejected == 7
+
+    def test_duplicate_rows_in_a_chunk_keep_the_last(self):
+        records = _import(term='First Term').validate_chunk([
+            (2, {'class_name': '10', 'roll_no': '2', 'subject': 'English', 'marks': '60'}),
+            (3, {'class_name': '10', 'roll_no': '2', 'subject': 'english', 'marks': '65'}),
+        ])
+        assert [(r['term'], r['marks']) for r in records] == [('First Term', Decimal(65))]
+
+
+class TestWrite:
+    """Test the upsert and the chunked run"""
+
+    def test_upsert_statement(self):
+        record = _import().validate_chunk([(2, {'class_name': '10', 'roll_no': '1', 'subject': 'Maths', 'marks': '45'})])
+        sql = str(ResultImport.upsert_statement(record).compile(dialect=postgresql.dialect()))
+        assert 'ON CONFLICT (organization_id, student_id, subject_id, term, academic_year) DO UPDATE' in sql
+        assert 'coalesce(excluded.remarks, results.remarks)' in sql
+        assert 'RETURNING (xmax = 0)' in sql
+
+    def test_run_writes_each_chunk(self):
+        sheet = "class,roll_no,subject,marks\n" + "10,1,Maths,40\n10,2,Maths,45\n10,3,Maths,30\n10,2,English,70\n"
+        result_import = _import(chunk_size=2)
+        with patch.object(ResultImport, 'upsert', side_effect=lambda records: (len(records), 0)) as upsert, \
+                patch('services.result_import.db') as db, \
+                patch('services.result_import.LeaderboardService') as leaderboard:
+            result = result_import.run(read_rows(_csv(sheet), 'marks.csv'))
+        assert [len(call.args[0]) for call in upsert.call_args_list] == [2, 1]
+        assert db.session.commit.call_count == 2
+        assert result['success'] and result['count'] == 3 and result['rows'] == 4
+        assert result['errors'][0]['row'] == 4
+        leaderboard.return_value.rebuild_organization.assert_called_once_with(ORG, '2024-25', 'Annual', class_name='10')
+
+    def test_bad_sheet_fails_without_writing(self):
+        with patch('services.result_import.db') as db:
+            result = _import().run(read_rows(_csv(""), 'marks.csv'))
+        assert not result['success'] and result['error'] == 'The file is empty'
+        db.session.commit.assert_not_called()
+
+
+class TestDryRun:
+    """Test planning an import and committing the plan"""
+
+    @pytest.fixture(autouse=True)
+    def store(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ArtifactStore, '_shared', ArtifactStore(str(tmp_path / 'artifacts'), ttl=60, quota_bytes=1000))
+
+    def _plan(self, sheet):
+        stored = {(ASHA, MATHS, 'Annual', '2024-25'): (Decimal('40.00'), Decimal('50.00'), 'B'),
+                  (BALA, MATHS, 'Annual', '2024-25'): (Decimal('45.00'), Decimal('50.00'), 'A')}
+        result_import = _import(chunk_size=2)
+        with patch.object(ResultImport, 'existing', side_effect=lambda keys: {k: stored[k] for k in keys if k in stored}), \
+                patch('services.result_import.db') as db:
+            plan = result_import.plan(read_rows(_csv(sheet), 'marks.csv'))
+        db.session.commit.assert_not_called()
+        return plan
+
+    def test_plan_classifies_changes(self):
+        sheet = "class,roll_no,subject,marks\n10,1,Maths,30\n10,2,Maths,45\n10,1,English,70\n10,9,Maths,1\n10,1,Maths,35\n"
+        plan = self._plan(sheet)
+        assert plan['success'] and plan['dry_run']
+        assert (plan['inserted'], plan['updated'], plan['unchanged'], plan['rejected']) == (1, 1, 1, 1)
+        [update] = plan['samples']['updated']
+        # The last row of a result wins
+        assert (update['row'], update['roll_no'], update['old_marks'], update['marks']) == (6, '1', 40.0, 35.0)
+        assert update['old_grade'] == 'B'
+        assert plan['samples']['inserted'][0]['subject'] == 'English'
+
+    def test_commit_writes_the_staged_results(self):
+        plan = self._plan("class,roll_no,subject,marks\n10,1,Maths,30\n10,2,English,70\n10,9,Maths,1\n")
+        staged = ImportStaging.load('results', plan['token'], ORG, None)
+        assert len(staged['records']) == 2
+
+        with patch.object(ResultImport, 'upsert', side_effect=lambda records: (1, len(records) - 1)) as upsert, \
+                patch('services.result_import.db') as db, \
+                patch('services.result_import.LeaderboardService'):
+            result = _import().commit(staged)
+        assert result['success'] and result['count'] == 2 and result['rejected'] == 1
+        assert upsert.call_count == 1 and db.session.commit.call_count == 1
+
@@ -0,0 +1,107 @@
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager
+from sqlalchemy.dialects import postgresql
+
+from services.artifact_store import ArtifactStore
+from services.student_service import StudentService
+
+ORG = uuid.uuid4()
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(ArtifactStore, '_shared', ArtifactStore(str(tmp_path / 'artifacts'), ttl=60, quota_bytes=1000))
+
+
+@pytest.fixture(autouse=True)
+def request_context():
+    app = Flask(__name__)
+    LoginManager(app).user_loader(lambda user_id: None)
+    with app.test_request_context():
+        yield
+
+
+def _student(roll_number, **fields):
+    return {'name': 'Asha Rao', 'roll_number': roll_number, 'class_name': '10', **fields}
+
+
+def _service(existing=()):
+    session = MagicMock()
+    session.query.return_value.filter.return_value.all.return_value = list(existing)
+    service = StudentService(session)
+    inserted = []
+    service._insert = lambda rows: inserted.append(rows) or {row['roll_no'] for row in rows}
+    return service, session, inserted
+
+
+class TestBulkCreate:
+    """Test set-based bulk student creation"""
+
+    def test_chunks_probed_and_inserted_once_each(self):
+        service, session, inserted = _service()
+        result = service.bulk_create((_student(str(n)) for n in range(1, 2501)), 'user-1', ORG, chunk_size=1000)
+        assert result['success'] and result['data']['created_count'] == 2500
+        assert [len(rows) for rows in inserted] == [1000, 1000, 500]
+        assert session.query.call_count == 3
+        assert session.commit.call_count == 3
+
+    def test_duplicates_in_batch_and_database_skipped(self):
+        service, session, inserted = _service(existing=[('2', '9')])
+        result = service.bulk_create(
+            [_student('1'), _student(' 2 '), _student('1', section='B'), _student('3', name='')], 'user-1', ORG
+        )
+        data = result['data']
+        assert data['created_count'] == 1 and data['total_processed'] == 4
+        assert [(e['row'], e['code']) for e in data['duplicate_errors']] == [(3, 'duplicate_in_batch'), (2, 'duplicate_roll_number')]
+        assert 'already exists in class 9' in data['duplicate_errors'][1]['message']
+        assert [e['row'] for e in data['errors']] == [4]
+        assert [row['roll_no'] for row in inserted[0]] == ['1']
+
+    def test_rows_use_student_columns(self):
+        service, session, inserted = _service()
+        service.bulk_create([_student('1', section='A', parent_name='Ravi', date_of_birth='2010-05-01')], 'user-1', ORG)
+        [row] = inserted[0]
+        assert row['guardian_name'] == 'Ravi' and row['section'] == 'A'
+        assert row['date_of_birth'].year == 2010 and row['organization_id'] == ORG
+
+    def test_columns_limited_to_the_table(self):
+        service, session, inserted = _service()
+        result = service.bulk_create([_student('1', class_name='x' * 21), _student('2', section='ABCDEF')], 'user-1', ORG)
+        assert result['data']['invalid_count'] == 2 and inserted == []
+
+    def test_empty_input(self):
+        service, session, inserted = _service()
+        assert not service.bulk_create(iter([]), 'user-1', ORG)['success']
+
+    def test_insert_statement(self):
+        service, session, inserted = _service()
+        service.bulk_create([_student('1'), _student('2')], 'user-1', ORG)
+        sql = str(StudentService.insert_statement(inserted[0]).compile(dialect=postgresql.dialect()))
+        assert 'ON CONFLICT (organization_id, roll_no) DO NOTHING RETURNING students.roll_no' in sql
+        assert sql.count('%(name_m') == 2
+
+    def test_failed_chunk_rolled_back(self):
+        service, session, inserted = _service()
+        session.commit.side_effect = RuntimeError('connection lost')
+        result = service.bulk_create([_student('1')], 'user-1', ORG)
+        assert not result['success']
+        session.rollback.assert_called_once()
+
+    def test_dry_run_then_create_staged(self):
+        service, session, inserted = _service(existing=[('2', '9')])
+        plan = service.bulk_create([_student('1'), _student('2'), _student('3')], 'user-1', ORG, dry_run=True)
+        assert plan['dry_run'] and plan['data']['created_count'] == 2 and plan['data']['duplicate_count'] == 1
+        assert [sample['roll_no'] for sample in plan['data']['samples']] == ['1', '3']
+        assert inserted == [] and session.commit.call_count == 0
+
+        # Roll number 3 was taken since the preview
+        service._insert = lambda rows: inserted.append(rows) or {'1'}
+        result = service.create_staged(plan['token'], 'user-1', ORG)
+        assert result['data']['created_count'] == 1 and result['data']['duplicate_count'] == 2
+        assert result['data']['duplicate_errors'][-1]['row'] == 3
+        assert not service.create_staged(plan['token'], 'user-1', ORG)['success']
+
@@ -0,0 +1,72 @@
+import pytest
+
+from utils.supabase_pages import paged_rows
+
+ROWS = [{'id': index} for index in range(2500)]
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """Request builder that, like postgrest-py's, adds range parameters to itself"""
+
+    def __init__(self, requests):
+        self.params = []
+        self.requests = requests
+
+    def range(self, start, end):
+        self.params += [('offset', start), ('limit', end - start + 1)]
+        return self
+
+    def execute(self):
+        self.requests.append(list(self.params))
+        offsets = [value for key, value in self.params if key == 'offset']
+        limits = [value for key, value in self.params if key == 'limit']
+        if len(offsets) > 1:
+            raise RuntimeError('offset sent twice')
+        return FakeResponse(ROWS[offsets[0]:offsets[0] + limits[0]])
+
+
+class TestPagedRows:
+    """Test paging through PostgREST queries"""
+
+    def test_pages_through_every_row_with_fresh_queries(self):
+        requests = []
+        rows = list(paged_rows(lambda: FakeQuery(requests), page_size=1000))
+
+        assert rows == ROWS
+        assert requests == [
+            [('offset', 0), ('limit', 1000)],
+            [('offset', 1000), ('limit', 1000)],
+            [('offset', 2000), ('limit', 1000)]
+        ]
+
+    def test_reusing_one_builder_would_repeat_parameters(self):
+        requests = []
+        query = FakeQuery(requests)
+        with pytest.raises(RuntimeError):
+            list(paged_rows(lambda: query, page_size=1000))
+
+    def test_real_builders_get_one_offset_per_page(self):
+        postgrest = pytest.importorskip('postgrest')
+        client = postgrest.SyncPostgrestClient('http://localhost:3000')
+        sent = []
+
+        class Recorder:
+            def __init__(self, builder):
+                self.builder = builder
+
+            def range(self, start, end):
+                self.builder = self.builder.range(start, end)
+                return self
+
+            def execute(self):
+                sent.append(str(self.builder.params))
+                return FakeResponse(ROWS[:1000] if len(sent) == 1 else [])
+
+        list(paged_rows(lambda: Recorder(client.table('global_audit_logs').select('*')), page_size=1000))
+        assert sent[1].count('offset=') == 1
+        assert 'offset=1000' in sent[1]
@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+from openpyxl import load_workbook
+
+from services.export_service import ExportService
+from utils import table_stream
+from utils.grading import default_grading_scheme
+from utils.table_stream import export_format, stream_table
+
+COLUMNS = [('roll_no', 'Roll No'), ('name', 'Name'), ('dob', 'Date of Birth'), ('average', 'Average')]
+ROWS = [('1', 'Asha', date(2010, 5, 1), Decimal('81.50')), ('2', 'Bala', None, None)]
+
+
+class TestStreamTable:
+    """Test streaming rows into files"""
+
+    def test_csv(self):
+        data = b''.join(stream_table(COLUMNS, iter(ROWS), 'csv')).decode('utf-8-sig')
+        assert list(csv.reader(io.StringIO(data))) == [
+            ['Roll No', 'Name', 'Date of Birth', 'Average'], ['1', 'Asha', '2010-05-01', '81.50'], ['2', 'Bala', '', '']
+        ]
+
+    def test_ndjson(self):
+        lines = b''.join(stream_table(COLUMNS, iter(ROWS), 'ndjson')).decode().splitlines()
+        assert json.loads(lines[0]) == {'roll_no': '1', 'name': 'Asha', 'dob': '2010-05-01', 'average': 81.5}
+        assert len(lines) == 2
+
+    def test_xlsx(self):
+        workbook = load_workbook(io.BytesIO(b''.join(stream_table(COLUMNS, iter(ROWS), 'xlsx', title='Students'))))
+        sheet = workbook['Students']
+        assert [cell.value for cell in sheet[1]] == ['Roll No', 'Name', 'Date of Birth', 'Average']
+        assert sheet['A2'].value == '1' and sheet['D2'].value == 81.5
+
+    def test_rows_consumed_as_the_stream_is_read(self, monkeypatch):
+        monkeypatch.setattr(table_stream, 'FLUSH_BYTES', 100)
+        consumed = []
+
+        def rows():
+            for n in range(1000):
+                consumed.append(n)
+                yield (str(n), 'Student', None, None)
+
+        stream = stream_table(COLUMNS, rows(), 'csv')
+        next(stream)
+        assert len(consumed) < 20
+
+    def test_formats(self):
+        assert export_format('XLSX')[0] == 'xlsx'
+        assert export_format('pdf') == ('csv', 'text/csv', '.csv')
+
+
+class TestResultSheet:
+    """Test pivoting result rows per student"""
+
+    def test_pivot(self):
+        rows = [
+            ('s1', '1', 'Asha', '10', 'A', 'English', Decimal(40), Decimal(50)),
+            ('s1', '1', 'Asha', '10', 'A', 'Maths', Decimal(90), Decimal(100)),
+            ('s2', '2', 'Bala', '10', 'A', 'Maths', Decimal(30), Decimal(100)),
+        ]
+        with patch('services.export_service.get_grading_scheme', return_value=default_grading_scheme()) as scheme:
+            pivoted = list(ExportService._pivot_results(iter(rows), ['English', 'Maths', 'Science'], 'org-1', '2024-25'))
+        assert pivoted[0][:9] == ['1', 'Asha', '10', 'A', Decimal(40), Decimal(90), None, Decimal(130), Decimal(150)]
+        assert pivoted[0][9] == 86.67 and pivoted[0][10] == default_grading_scheme().grade(86.67)
+        assert pivoted[1][4:7] == [None, Decimal(30), None]
+        scheme.assert_called_once()
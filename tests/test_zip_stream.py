@@ -0,0 +1,69 @@
+import os
+import zipfile
+from io import BytesIO
+
+from utils.zip_stream import partial_path, stream_zip, tee_to_file, write_stream
+
+
+def files():
+    for i in range(3):
+        yield f'{i}.pdf', b'%PDF-' + bytes([i]) * 1000
+
+
+class TestStreamZip:
+    """Test incremental ZIP assembly"""
+
+    def test_valid_archive(self):
+        chunks = list(stream_zip(files()))
+        # One chunk per file plus the central directory
+        assert len(chunks) == 4
+        with zipfile.ZipFile(BytesIO(b''.join(chunks))) as archive:
+            assert archive.testzip() is None
+            assert archive.read('2.pdf') == b'%PDF-' + b'\x02' * 1000
+
+    def test_emits_before_input_exhausted(self):
+        consumed = []
+
+        def tracked():
+            for name, data in files():
+                consumed.append(name)
+                yield name, data
+
+        stream = stream_zip(tracked())
+        assert next(stream)
+        assert consumed == ['0.pdf']
+
+
+class TestTeeToFile:
+    """Test artifact writing"""
+
+    def test_write_stream(self, tmp_path):
+        path = str(tmp_path / 'org' / 'export.zip')
+        write_stream(stream_zip(files()), path)
+        with zipfile.ZipFile(path) as archive:
+            assert archive.namelist() == ['0.pdf', '1.pdf', '2.pdf']
+
+    def test_aborted_stream_leaves_no_artifact(self, tmp_path):
+        path = str(tmp_path / 'export.zip')
+        stream = tee_to_file(stream_zip(files()), path)
+        next(stream)
+        stream.close()
+        assert os.listdir(tmp_path) == []
+
+    def test_concurrent_streams_write_separate_parts(self, tmp_path):
+        path = str(tmp_path / 'export.zip')
+        first = tee_to_file(stream_zip(files()), path)
+        second = tee_to_file(stream_zip(files()), path)
+        next(first)
+        next(second)
+        assert len(os.listdir(tmp_path)) == 2
+        assert partial_path(path) != partial_path(path)
+
+        # Interleaved writers each leave a complete archive
+        for _ in first:
+            pass
+        for _ in second:
+            pass
+        assert os.listdir(tmp_path) == ['export.zip']
+        with zipfile.ZipFile(path) as archive:
+            assert archive.testzip() is None
@@ -0,0 +1,190 @@
+# utils/bulk_validation.py
+import calendar
+import re
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+from utils.validations import Validator
+
+# Compiled bulk validation.
+#
+# The Validator helpers check one value and raise ValidationError on the
+# first problem, which is fine for a form but slow for an import of tens of
+# thousands of records: every invalid field costs an exception, and every
+# record goes through a chain of generic calls. A BulkSchema is the same
+# checks compiled once into rules that each run over a whole column of a
+# batch with a comprehension and return the failing indexes. A record keeps
+# the error of the first rule it fails, in rule order, so the errors (field,
+# message and code) are exactly those of the per-record validators.
+
+# As strptime('%Y-%m-%d'), which takes unpadded months and days
+_ISO_DATE = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})$')
+
+def _blank(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+def _iso_date(value: Any) -> Optional[date]:
+    """Parse a YYYY-MM-DD date without raising, None if invalid"""
+    match = _ISO_DATE.match(value) if isinstance(value, str) else None
+    if not match:
+        return None
+    year, month, day = (int(part) for part in match.groups())
+    if not (1 <= year and 1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]):
+        return None
+    return date(year, month, day)
+
+class Rule(ABC):
+    """A check of one column, compiled from a field's constraints"""
+
+    def __init__(self, field: str, message: str, code: str, error_field: Optional[str] = None):
+        """Initialize the rule
+
+        Args:
+            field (str): Record key checked
+            message (str): Error message of failing records
+            code (str): Error code of failing records
+            error_field (str, optional): Field reported with the error; the key by default
+        """
+        self.field = field
+        self.message = message
+        self.code = code
+        self.error_field = error_field or field
+
+    @abstractmethod
+    def fails(self, value: Any) -> bool:
+        """Whether a value fails the rule"""
+        pass
+
+    def error(self, value: Any) -> tuple:
+        """Field, message and code of a failing value"""
+        return self.error_field, self.message, self.code
+
+    def failures(self, column: Sequence[Any]) -> List[int]:
+        """Indexes of the column's values failing the rule
+
+        Each distinct value is checked once: imported columns repeat a lot
+        (classes, sections, dates of birth).
+        """
+        fails = self.fails
+        try:
+            failing = {value for value in set(column) if fails(value)}
+        except TypeError:
+            # Unhashable values (lists, dicts)
+            return [index for index, value in enumerate(column) if fails(value)]
+        if not failing:
+            return []
+        return [index for index, value in enumerate(column) if value in failing]
+
+class Required(Rule):
+    def __init__(self, field: str, label: str):
+        super().__init__(field, f"{label} is required", 'required', label)
+
+    def fails(self, value: Any) -> bool:
+        return _blank(value)
+
+class Length(Rule):
+    """String length, checked like Validator.validate_string_length; with optional, None passes"""
+
+    def __init__(self, field: str, label: str, min_length: int = 0, max_length: Optional[int] = None,
+                 optional: bool = False):
+        super().__init__(field, '', '', label)
+        self.label = label
+        self.min_length = min_length
+        self.max_length = max_length
+        self.optional = optional
+
+    def fails(self, value: Any) -> bool:
+        return not (self.optional and value is None) and self.error(value) is not None
+
+    def error(self, value: Any) -> Optional[tuple]:
+        # One rule, three messages: the first one failed wins, as with the helper
+        if not isinstance(value, str):
+            return self.label, f"{self.label} must be a string", 'invalid_type'
+        if len(value) < self.min_length:
+            return self.label, f"{self.label} must be at least {self.min_length} characters", 'min_length'
+        if self.max_length and len(value) > self.max_length:
+            return self.label, f"{self.label} must be no more than {self.max_length} characters", 'max_length'
+        return None
+
+class Pattern(Rule):
+    """Regex match; with optional, blank values pass"""
+
+    def __init__(self, field: str, pattern, message: str, code: str, error_field: Optional[str] = None,
+                 optional: bool = False):
+        super().__init__(field, message, code, error_field)
+        self.match = pattern.match
+        self.optional = optional
+
+    def fails(self, value: Any) -> bool:
+        return not (self.optional and not value) and not (isinstance(value, str) and self.match(value))
+
+class IsoDate(Rule):
+    """Optional YYYY-MM-DD date, optionally not in the future"""
+
+    def __init__(self, field: str, label: str, not_future: bool = False):
+        super().__init__(field, f"{label} must be in format %Y-%m-%d", 'invalid_date', label.lower())
+        self.label = label
+        self.not_future = not_future
+
+    def fails(self, value: Any) -> bool:
+        return bool(value) and self.error(value) is not None
+
+    def error(self, value: Any) -> Optional[tuple]:
+        parsed = _iso_date(value)
+        if parsed is None:
+            return self.error_field, self.message, self.code
+        if self.not_future and parsed > date.today():
+            return self.field, f"{self.label} cannot be in the future", 'future_date'
+        return None
+
+class BulkSchema:
+    """Rules validating batches of records column by column"""
+
+    def __init__(self, *rules: Rule):
+        self.rules = list(rules)
+
+    def extend(self, *rules: Rule) -> 'BulkSchema':
+        """A schema with more rules checked after these"""
+        return BulkSchema(*self.rules, *rules)
+
+    def check(self, records: Sequence[Dict[str, Any]], offset: int = 0) -> List[Dict[str, Any]]:
+        """Errors of a batch, the first failed rule of each invalid record
+
+        Args:
+            records (list): Record dicts
+            offset (int): Index of the first record in the whole batch
+
+        Returns:
+            list: Error dicts (row, field, message, code) ordered by row
+        """
+        columns = {}
+        errors = {}
+        for rule in self.rules:
+            column = columns.get(rule.field)
+            if column is None:
+                column = columns[rule.field] = [
+                    record.get(rule.field) if isinstance(record, dict) else None for record in records
+                ]
+            for index in rule.failures(column):
+                if index in errors:
+                    continue
+                field, message, code = rule.error(column[index])
+                errors[index] = {'row': offset + index + 1, 'field': field, 'message': message, 'code': code}
+        return [errors[index] for index in sorted(errors)]
+
+# StudentValidator.validate_student_data, compiled
+STUDENT_SCHEMA = BulkSchema(
+    Required('name', 'Student name'),
+    Required('roll_number', 'Roll number'),
+    Required('class_name', 'Class name'),
+    Pattern('name', Validator.NAME_PATTERN,
+            'Student name must contain only letters, spaces, hyphens, apostrophes, and periods',
+            'invalid_name', 'student name'),
+    Length('name', 'Student name', 2, 100),
+    Length('roll_number', 'Roll number', 1, 20),
+    Length('class_name', 'Class name', 1, 50),
+    Pattern('email', Validator.EMAIL_PATTERN, 'Email must be a valid email address', 'invalid_email', optional=True),
+    Pattern('phone', Validator.PHONE_PATTERN, 'Phone must be a valid phone number', 'invalid_phone', optional=True),
+    IsoDate('date_of_birth', 'Date of birth', not_future=True)
+)
@@ -11,20 +11,42 @@ from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER
 from reportlab.graphics.shapes import Drawing
 from reportlab.lib.styles import ParagraphStyle
-from services.pdf_service import BasePDFService
+from services.asset_cache import AssetCache
+from services.pdf_service import BasePDFService, _build_base_styles
+from utils.pdf_output import doc_options
+from utils.pdf_styles import register_theme
+
+@register_theme('certificate')
+def _build_certificate_styles(styles, options):
+    """Add the certificate styles on top of the common ones"""
+    _build_base_styles(styles, options)
+    styles.add(ParagraphStyle(
+        'RecipientName',
+        parent=styles['CustomHeader'],
+        fontSize=24,
+        textColor=colors.darkblue,
+        alignment=TA_CENTER
+    ))
 
 class CertificatePDFService(BasePDFService):
     """Service for generating certificates"""
     
+    style_theme = 'certificate'
+    
     def generate_certificate(self, certificate_data: Dict[str, Any], organization_data: Dict[str, Any], 
                            customization: Dict[str, Any]) -> BytesIO:
         """Generate a certificate"""
+        return self._render_cached(
+            'certificate', (certificate_data, organization_data), customization,
+            lambda: self._render_certificate(certificate_data, organization_data, customization),
+            template=customization.get('template')
+        )
+    
+    def _render_certificate(self, certificate_data: Dict[str, Any], organization_data: Dict[str, Any], 
+                          customization: Dict[str, Any]) -> BytesIO:
+        """Render the certificate (bypasses the render cache)"""
         elements = []
         
-        # Add decorative border if enabled
-        if customization.get('show_border', True):
-            elements.extend(self._create_decorative_border())
-        
         # Add header with logo
         elements.extend(self._create_certificate_header(organization_data, customization))
         elements.append(Spacer(1, 40))
@@ -43,40 +65,27 @@ class CertificatePDFService(BasePDFService):
         # Generate PDF
         return self._generate_pdf(elements, organization_data, customization)
     
-    def _create_decorative_border(self) -> List:
-        """Create decorative border for certificate"""
-        elements = []
-        
-        # Create border table
-        border_style = TableStyle([
-            ('GRID', (0, 0), (-1, -1), 2, colors.gold),
-            ('BACKGROUND', (0, 0), (-1, -1), colors.white),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.gold),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ])
-        
-        # Add decorative corners
-        corner_size = 0.5 * inch
-        border_data = [[' ']]
-        border_table = Table(border_data, colWidths=[7*inch], rowHeights=[9*inch])
-        border_table.setStyle(border_style)
-        
-        elements.append(border_table)
-        return elements
+    def _draw_decorative_border(self, canv, doc) -> None:
+        """Draw the gold border around the page (a page-sized table would not fit the frame)"""
+        width, height = doc.pagesize
+        inset = 0.5 * inch
+        canv.saveState()
+        canv.setStrokeColor(colors.gold)
+        canv.setLineWidth(2)
+        canv.rect(inset, inset, width - 2 * inset, height - 2 * inset)
+        canv.restoreState()
     
     def _create_certificate_header(self, organization_data: Dict[str, Any], customization: Dict[str, Any]) -> List:
         """Create certificate header with logo"""
         elements = []
         
         # Add organization logo if available
-        if customization.get('logo'):
-            try:
-                logo_img = Image(customization['logo'], width=1.5*inch, height=1.5*inch)
-                elements.append(logo_img)
-                elements.append(Spacer(1, 20))
-            except Exception:
-                print("Failed to load organization logo")
+        logo_img = AssetCache.shared().image(
+            customization.get('logo'), 1.5*inch, 1.5*inch, organization_data.get('id')
+        )
+        if logo_img:
+            elements.append(logo_img)
+            elements.append(Spacer(1, 20))
         
         # Add organization name
         org_name = organization_data.get('name', 'Organization Name')
@@ -103,14 +112,7 @@ class CertificatePDFService(BasePDFService):
         # Add recipient name
         elements.append(Spacer(1, 10))
         recipient_name = certificate_data.get('recipient_name', '')
-        name_style = self.styles.add(ParagraphStyle(
-            'RecipientName',
-            parent=self.styles['CustomHeader'],
-            fontSize=24,
-            textColor=colors.darkblue,
-            alignment=TA_CENTER
-        ))
-        elements.append(Paragraph(recipient_name, name_style))
+        elements.append(Paragraph(recipient_name, self.styles['RecipientName']))
         
         return elements
     
@@ -148,7 +150,11 @@ class CertificatePDFService(BasePDFService):
             width = 2 * inch
             
             for sig in signatures:
-                sig_row.append('_' * 30)
+                # Scanned signature if provided, otherwise a line to sign on
+                sig_img = AssetCache.shared().image(
+                    sig.get('image'), 1.5*inch, 0.5*inch, organization_data.get('id')
+                )
+                sig_row.append(sig_img or '_' * 30)
                 title_row.append(sig.get('title', ''))
             
             signature_data = [sig_row, title_row]
@@ -187,20 +193,26 @@ class CertificatePDFService(BasePDFService):
         # Use landscape orientation for certificates
         doc = SimpleDocTemplate(
             buffer,
-            pagesize=landscape(A4),
-            rightMargin=72,
-            leftMargin=72,
-            topMargin=72,
-            bottomMargin=72
+            **doc_options(
+                pagesize=landscape(A4),
+                rightMargin=72,
+                leftMargin=72,
+                topMargin=72,
+                bottomMargin=72
+            )
         )
         
-        # Add watermark if enabled
-        if customization.get('watermark'):
-            elements.insert(0, self._create_watermark(customization['watermark']))
-        
         # Add QR code if enabled
         if customization.get('qr_data'):
             elements.append(self._create_qr_code(customization['qr_data']))
         
-        doc.build(elements)
+        # Watermark and decorative border behind each page
+        draw_watermark = self._watermark_page(organization_data, customization)
+        
+        def on_page(canv, doc):
+            draw_watermark(canv, doc)
+            if customization.get('show_border', True):
+                self._draw_decorative_border(canv, doc)
+        
+        doc.build(elements, onFirstPage=on_page, onLaterPages=on_page)
         return buffer 
\ No newline at end of file
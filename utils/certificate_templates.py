@@ -0,0 +1,256 @@
+# utils/certificate_templates.py
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from reportlab.graphics import renderPDF
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import inch
+from reportlab.platypus import BaseDocTemplate, Flowable, Frame, PageBreak, PageTemplate, Paragraph, Spacer, Table, TableStyle
+
+from services.asset_cache import AssetCache
+from utils.certificate_pdf import CertificatePDFService
+from utils.pdf_output import doc_options
+from utils.pdf_styles import get_stylesheet
+from utils.qr import verification_qr
+
+# Compiled certificate templates.
+#
+# Certificates of a batch share their border, organization header and
+# signature block. A compiled template lays those out once, draws them into
+# a PDF form XObject on the first page and stamps the form on every page, so
+# each certificate only lays out its own text (and a verification QR code,
+# drawn as an overlay). The border is drawn on the canvas around the frame
+# rather than as a page-sized table, which cannot fit inside the margins.
+
+QR_SIZE = 56
+BORDER_INSET = 18
+
+class CertificateMarker(Flowable):
+    """Zero-size flowable marking where a certificate's page begins"""
+
+    def __init__(self, certificate: Dict[str, Any]):
+        super().__init__()
+        self.certificate = certificate
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        pass
+
+class CertificateDocTemplate(BaseDocTemplate):
+    """Document whose pages carry a compiled certificate template's static layer"""
+
+    def __init__(self, output, template: 'CompiledCertificateTemplate', bookmarks: bool = False, **kwargs):
+        self.current_certificate = None
+        self.certificate_first_page = None
+        self.bookmarks = bookmarks
+        # (certificate, first page) of every certificate, in order
+        self.certificate_pages = []
+        super().__init__(
+            output,
+            pagesize=template.pagesize,
+            leftMargin=template.margin,
+            rightMargin=template.margin,
+            topMargin=template.margin,
+            bottomMargin=template.margin,
+            **kwargs
+        )
+        self.addPageTemplates([PageTemplate(
+            id='certificate',
+            frames=[template.body_frame()],
+            onPage=template.draw_static,
+            onPageEnd=template.draw_overlay
+        )])
+
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, CertificateMarker):
+            certificate = flowable.certificate
+            self.current_certificate = certificate
+            self.certificate_first_page = self.page
+            self.certificate_pages.append((certificate, self.page))
+            if self.bookmarks:
+                key = f"certificate{len(self.certificate_pages)}"
+                self.canv.bookmarkPage(key)
+                self.canv.addOutlineEntry(certificate.get('recipient_name', ''), key, level=0)
+                if len(self.certificate_pages) == 1:
+                    self.canv.showOutline()
+
+    def page_ranges(self) -> List[Tuple[Dict[str, Any], int, int]]:
+        """(certificate, first page, last page) of every certificate laid out so far"""
+        ends = [first - 1 for _, first in self.certificate_pages[1:]] + [self.page]
+        return [(c, first, last) for (c, first), last in zip(self.certificate_pages, ends)]
+
+class CompiledCertificateTemplate:
+    """Static layer of a certificate, laid out once per organization and customization"""
+
+    def __init__(self, organization_data: Dict[str, Any], customization: Optional[Dict[str, Any]] = None,
+                 pagesize=landscape(A4), margin: float = 48):
+        """Lay out the static layer
+
+        Args:
+            organization_data (dict): Organization name, address and ID
+            customization (dict, optional): Certificate customization shared by the batch
+            pagesize (tuple): Page size
+            margin (float): Margin on every side, inside the border
+        """
+        self.organization = dict(organization_data or {})
+        self.customization = dict(customization or {})
+        self.pagesize = pagesize
+        self.margin = margin
+        self.show_border = self.customization.get('show_border', True)
+        self.include_qr = self.customization.get('include_qr', True)
+        self.styles = get_stylesheet(CertificatePDFService.style_theme)
+        self.form_name = f"CertificateStatic{id(self):x}"
+        self._lock = threading.Lock()
+
+        width, height = pagesize
+        self.content_width = width - 2 * margin
+        self.header = self._header()
+        self.footer = self._footer()
+        self.header_height = sum(f.wrap(self.content_width, height)[1] for f in self.header)
+        self.footer_height = sum(f.wrap(self.content_width, height)[1] for f in self.footer)
+
+        watermark = self.customization.get('watermark')
+        self.watermark = AssetCache.shared().watermark(watermark, self.organization.get('id')) if watermark else None
+
+    def _header(self) -> List[Flowable]:
+        elements = []
+        logo = AssetCache.shared().image(self.customization.get('logo'), 0.9 * inch, 0.9 * inch, self.organization.get('id'))
+        if logo:
+            elements.extend([logo, Spacer(1, 8)])
+        elements.append(Paragraph(self.organization.get('name', 'Organization Name'), self.styles['CustomHeader']))
+        if self.organization.get('address'):
+            elements.append(Paragraph(self.organization['address'], self.styles['CustomNormal']))
+        return elements
+
+    def _footer(self) -> List[Flowable]:
+        signatures = self.customization.get('signatures', [])
+        if signatures:
+            sig_row = []
+            for sig in signatures:
+                sig_img = AssetCache.shared().image(sig.get('image'), 1.5 * inch, 0.5 * inch, self.organization.get('id'))
+                sig_row.append(sig_img or '_' * 30)
+            signature_data = [sig_row, [sig.get('title', '') for sig in signatures]]
+        else:
+            signature_data = [['_' * 30, '_' * 30], ['Principal', 'Academic Director']]
+
+        sig_table = Table(signature_data, colWidths=[2.5 * inch] * len(signature_data[0]))
+        sig_table.setStyle(TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 1), (-1, 1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 1), (-1, 1), 10),
+            ('TOPPADDING', (0, 1), (-1, 1), 10),
+        ]))
+        return [sig_table]
+
+    def body_frame(self) -> Frame:
+        """Frame between the header and the signature block"""
+        width, height = self.pagesize
+        bottom = self.margin + self.footer_height + 10
+        top = height - self.margin - self.header_height - 10
+        return Frame(self.margin, bottom, self.content_width, top - bottom, id='body')
+
+    def _draw_flowables(self, canv, flowables: List[Flowable], top: float) -> None:
+        y = top
+        for flowable in flowables:
+            w, h = flowable.wrap(self.content_width, y)
+            y -= h
+            flowable.drawOn(canv, self.margin + (self.content_width - w) / 2, y)
+
+    def _draw_border(self, canv) -> None:
+        width, height = self.pagesize
+        canv.saveState()
+        canv.setStrokeColor(colors.gold)
+        canv.setLineWidth(3)
+        canv.rect(BORDER_INSET, BORDER_INSET, width - 2 * BORDER_INSET, height - 2 * BORDER_INSET)
+        canv.setLineWidth(1)
+        inner = BORDER_INSET + 7
+        canv.rect(inner, inner, width - 2 * inner, height - 2 * inner)
+        canv.restoreState()
+
+    def draw_static(self, canv, doc) -> None:
+        """Stamp the static layer, drawing it into a form the first time"""
+        if not canv.hasForm(self.form_name):
+            # Flowables are annotated while drawn, so one document at a time
+            with self._lock:
+                canv.beginForm(self.form_name)
+                if self.watermark is not None:
+                    # The watermark is page sized for portrait A4; center it
+                    width, height = self.pagesize
+                    renderPDF.draw(
+                        self.watermark, canv,
+                        (width - self.watermark.width) / 2, (height - self.watermark.height) / 2
+                    )
+                if self.show_border:
+                    self._draw_border(canv)
+                self._draw_flowables(canv, self.header, self.pagesize[1] - self.margin)
+                self._draw_flowables(canv, self.footer, self.margin + self.footer_height)
+                canv.endForm()
+        canv.doForm(self.form_name)
+
+    def draw_overlay(self, canv, doc) -> None:
+        """Draw the certificate's verification QR code on its first page"""
+        certificate = getattr(doc, 'current_certificate', None)
+        if self.include_qr and certificate and doc.page == doc.certificate_first_page:
+            claims = {
+                key: certificate[key]
+                for key in ('certificate_number', 'recipient_name', 'type', 'date')
+                if certificate.get(key)
+            }
+            width, _ = self.pagesize
+            verification_qr(claims, QR_SIZE).drawOn(canv, width - self.margin - QR_SIZE, self.margin)
+
+    def story(self, certificate: Dict[str, Any]) -> List[Flowable]:
+        """The flowables that vary per certificate
+
+        Args:
+            certificate (dict): Certificate data in the generate_certificate format,
+                optionally with a certificate_number
+
+        Returns:
+            list: Flowables for the body frame
+        """
+        cert_type = certificate.get('type', 'Certificate of Achievement')
+        story = [
+            CertificateMarker(certificate),
+            Paragraph(cert_type.upper(), self.styles['CustomHeader']),
+            Spacer(1, 12),
+            Paragraph("This is to certify that", self.styles['CustomNormal']),
+            Spacer(1, 8),
+            Paragraph(certificate.get('recipient_name', ''), self.styles['RecipientName']),
+            Spacer(1, 12),
+            Paragraph(certificate.get('achievement', ''), self.styles['CustomNormal'])
+        ]
+        if details := certificate.get('details'):
+            story.extend([Spacer(1, 8), Paragraph(details, self.styles['CustomNormal'])])
+
+        date_text = f"Awarded on {certificate.get('date', datetime.now().strftime('%B %d, %Y'))}"
+        story.extend([Spacer(1, 12), Paragraph(date_text, self.styles['CustomNormal'])])
+        if cert_number := certificate.get('certificate_number'):
+            story.extend([Spacer(1, 8), Paragraph(f"Certificate No: {cert_number}", self.styles['CustomNormal'])])
+        return story
+
+    def render(self, certificates: Iterable[Dict[str, Any]], output, bookmarks: bool = True,
+               **kwargs) -> List[Tuple[Dict[str, Any], int, int]]:
+        """Render certificates into one PDF, each starting on a new page
+
+        Args:
+            certificates (iterable): Certificate data dicts
+            output (str or file): Destination of the PDF
+            bookmarks (bool): Add an outline entry per recipient
+            **kwargs: Passed to BaseDocTemplate (e.g. title)
+
+        Returns:
+            list: (certificate, first page, last page) per certificate
+        """
+        story = []
+        for certificate in certificates:
+            if story:
+                story.append(PageBreak())
+            story.extend(self.story(certificate))
+        doc = CertificateDocTemplate(output, self, bookmarks=bookmarks, **doc_options(**kwargs))
+        doc.build(story)
+        return doc.page_ranges()
@@ -0,0 +1,259 @@
+# utils/charts.py
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.shapes import Circle, Drawing, Group, Line, PolyLine, Rect, String
+from reportlab.lib import colors
+
+# Marksheet charts.
+#
+# A subject bar chart is mostly the same for every student of a class: the
+# axes, gridlines, subject labels, legend and, when the class series is
+# known, the class-average bars. Only the student's own bars differ. The
+# shared part is drawn once per (subjects, class series, style) into a
+# ChartFrame kept in a small cache, and each student's chart is a new
+# Drawing holding the frame's group plus a handful of rectangles, instead
+# of a VerticalBarChart laid out from scratch per document. Compact
+# templates use a sparkline, a single polyline, instead of a chart.
+
+CHART_FRAME_CACHE_SIZE = 64
+STUDENT_COLOR = colors.blue
+AVERAGE_COLOR = colors.HexColor('#b0b7c3')
+
+_frames = OrderedDict()
+_frames_lock = threading.Lock()
+
+def class_series(students: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compute the class-level series of a batch of marksheets once
+
+    Args:
+        students (iterable): Student data in the generate_result_pdf format
+
+    Returns:
+        dict: subjects (sorted names), averages (percentage by subject),
+        overall_average and grade_counts (overall grades)
+    """
+    totals, counts, grade_counts = {}, {}, {}
+    overall_total, overall_count = 0.0, 0
+    for student_data in students:
+        overall = student_data.get('overall_result', {})
+        for subject in overall.get('subjects', []):
+            name = subject.get('name', '')
+            totals[name] = totals.get(name, 0.0) + float(subject.get('percentage', 0) or 0)
+            counts[name] = counts.get(name, 0) + 1
+        if overall.get('subjects'):
+            overall_total += float(overall.get('overall_percentage', 0) or 0)
+            overall_count += 1
+            grade = overall.get('overall_grade', 'N/A')
+            grade_counts[grade] = grade_counts.get(grade, 0) + 1
+
+    subjects = sorted(totals)
+    return {
+        'subjects': subjects,
+        'averages': {name: round(totals[name] / counts[name], 2) for name in subjects},
+        'overall_average': round(overall_total / overall_count, 2) if overall_count else None,
+        'grade_counts': grade_counts
+    }
+
+class ChartFrame:
+    """Static layer of a subject bar chart: axes, labels, legend and reference bars"""
+
+    def __init__(self, categories: Sequence[str], reference: Optional[Sequence[float]] = None,
+                 width: float = 400, height: float = 200, value_step: float = 20,
+                 label_length: Optional[int] = 8, series_names=('Student', 'Class average'),
+                 bar_color=STUDENT_COLOR, reference_color=AVERAGE_COLOR):
+        """Lay out the frame
+
+        Args:
+            categories (list): Category (subject) names
+            reference (list, optional): Reference values (e.g. class averages) drawn
+                next to every chart's own bars
+            width (float): Drawing width
+            height (float): Drawing height
+            value_step (float): Gridline step on the 0-100 value axis
+            label_length (int, optional): Truncate category labels to this length
+            series_names (tuple): Legend names of the chart's and the reference bars
+            bar_color (Color): Color of the chart's own bars
+            reference_color (Color): Color of the reference bars
+        """
+        self.categories = list(categories)
+        self.width = width
+        self.height = height
+        self.bar_color = bar_color
+        self.plot_x, self.plot_y = 50, 50
+        self.plot_width, self.plot_height = width - 100, height - 75
+
+        slots = max(len(self.categories), 1)
+        self.slot_width = self.plot_width / slots
+        series = 2 if reference is not None else 1
+        self.bar_width = self.slot_width * 0.7 / series
+
+        group = Group()
+        value = 0
+        while value <= 100:
+            y = self._y(value)
+            group.add(Line(self.plot_x, y, self.plot_x + self.plot_width, y,
+                           strokeColor=colors.lightgrey if value else colors.black, strokeWidth=0.5))
+            group.add(String(self.plot_x - 4, y - 2.5, f"{value:g}", fontName='Helvetica', fontSize=7, textAnchor='end'))
+            value += value_step
+        group.add(Line(self.plot_x, self.plot_y, self.plot_x, self.plot_y + self.plot_height, strokeWidth=0.5))
+
+        for i, name in enumerate(self.categories):
+            label = Group(String(0, 0, name[:label_length] if label_length else name,
+                                 fontName='Helvetica', fontSize=7, textAnchor='end'))
+            label.translate(self.plot_x + (i + 0.5) * self.slot_width + 4, self.plot_y - 6)
+            label.rotate(30)
+            group.add(label)
+
+        if reference is not None:
+            for i, value in enumerate(reference):
+                group.add(self._bar(i, value, offset=1, color=reference_color))
+            legend_y = self.plot_y + self.plot_height + 10
+            for j, (name, color) in enumerate(zip(series_names, (bar_color, reference_color))):
+                x = self.plot_x + j * 100
+                group.add(Rect(x, legend_y, 8, 8, fillColor=color, strokeColor=None))
+                group.add(String(x + 12, legend_y + 1, name, fontName='Helvetica', fontSize=7))
+        self.group = group
+
+    def _y(self, value: float) -> float:
+        return self.plot_y + self.plot_height * max(0.0, min(float(value or 0), 100.0)) / 100
+
+    def _bar(self, index: int, value: float, offset: int = 0, color=None) -> Rect:
+        x = self.plot_x + index * self.slot_width + self.slot_width * 0.15 + offset * self.bar_width
+        return Rect(x, self.plot_y, self.bar_width, self._y(value) - self.plot_y,
+                    fillColor=color or self.bar_color, strokeColor=None)
+
+    def drawing(self, values: Sequence[float]) -> Drawing:
+        """A chart of values on this frame
+
+        Args:
+            values (list): One value (0-100) per category
+
+        Returns:
+            Drawing: New drawing sharing the frame's shapes
+        """
+        drawing = Drawing(self.width, self.height)
+        drawing.add(self.group)
+        for i, value in enumerate(values):
+            drawing.add(self._bar(i, value))
+        return drawing
+
+def chart_frame(categories: Sequence[str], reference: Optional[Sequence[float]] = None, **kwargs) -> ChartFrame:
+    """Get the cached frame for a set of categories and reference values, laying it out on first use
+
+    Args:
+        categories (list): Category (subject) names
+        reference (list, optional): Reference values, one per category
+        **kwargs: Passed to ChartFrame (sizes, colors, labels)
+
+    Returns:
+        ChartFrame: The shared frame
+    """
+    key = (
+        tuple(categories),
+        tuple(reference) if reference is not None else None,
+        tuple(sorted((name, repr(value)) for name, value in kwargs.items()))
+    )
+    with _frames_lock:
+        frame = _frames.get(key)
+        if frame is not None:
+            _frames.move_to_end(key)
+            return frame
+
+    frame = ChartFrame(categories, reference, **kwargs)
+    with _frames_lock:
+        _frames[key] = frame
+        while len(_frames) > CHART_FRAME_CACHE_SIZE:
+            _frames.popitem(last=False)
+    return frame
+
+def subject_bar_chart(subjects: List[Dict[str, Any]], series: Optional[Dict[str, Any]] = None,
+                      **kwargs) -> Optional[Drawing]:
+    """Bar chart of a student's subject percentages, against the class averages when known
+
+    Args:
+        subjects (list): Subject dicts with name and percentage
+        series (dict, optional): The class series from class_series
+        **kwargs: Passed to ChartFrame
+
+    Returns:
+        Drawing: The chart, or None without subjects
+    """
+    if not subjects:
+        return None
+    names = [s.get('name', '') for s in subjects]
+    averages = (series or {}).get('averages')
+    reference = [averages.get(name, 0) for name in names] if averages else None
+    return chart_frame(names, reference, **kwargs).drawing([s.get('percentage', 0) for s in subjects])
+
+def sparkline(values: Sequence[float], width: float = 120, height: float = 24,
+              reference: Optional[float] = None, color=STUDENT_COLOR) -> Optional[Drawing]:
+    """Sparkline of 0-100 values, e.g. subject percentages
+
+    Args:
+        values (list): Values in order
+        width (float): Drawing width
+        height (float): Drawing height
+        reference (float, optional): Value drawn as a dashed line (e.g. the class average)
+        color (Color): Line color
+
+    Returns:
+        Drawing: The sparkline, or None without values
+    """
+    if not values:
+        return None
+    pad = 3
+    step = (width - 2 * pad) / max(len(values) - 1, 1)
+
+    def y(value):
+        return pad + (height - 2 * pad) * max(0.0, min(float(value or 0), 100.0)) / 100
+
+    drawing = Drawing(width, height)
+    if reference is not None:
+        drawing.add(Line(pad, y(reference), width - pad, y(reference),
+                         strokeColor=AVERAGE_COLOR, strokeWidth=0.5, strokeDashArray=[2, 2]))
+    points = []
+    for i, value in enumerate(values):
+        points.extend([pad + i * step, y(value)])
+    if len(values) > 1:
+        drawing.add(PolyLine(points, strokeColor=color, strokeWidth=1))
+    low = min(range(len(values)), key=lambda i: values[i])
+    high = max(range(len(values)), key=lambda i: values[i])
+    for i, fill in ((low, colors.red), (high, colors.green)):
+        drawing.add(Circle(points[2 * i], points[2 * i + 1], 1.5, fillColor=fill, strokeColor=None))
+    return drawing
+
+def grade_pie_chart(grade_counts: Dict[str, int], width: float = 400, height: float = 200,
+                    x: float = 150, y: float = 50, size: float = 100) -> Drawing:
+    """Pie chart of a grade distribution, leaving out grades nobody got
+
+    Args:
+        grade_counts (dict): Count by grade, in display order
+        width (float): Drawing width
+        height (float): Drawing height
+        x (float): Pie left edge
+        y (float): Pie bottom edge
+        size (float): Pie diameter
+
+    Returns:
+        Drawing: The chart
+    """
+    grades = [(grade, count) for grade, count in grade_counts.items() if count > 0]
+    drawing = Drawing(width, height)
+    pie = Pie()
+    pie.x = x
+    pie.y = y
+    pie.width = size
+    pie.height = size
+    pie.data = [count for _, count in grades] or [1]
+    pie.labels = [grade for grade, _ in grades] or ['N/A']
+    pie.slices.strokeWidth = 0.5
+    drawing.add(pie)
+    return drawing
+
+def clear_chart_frames() -> None:
+    """Drop every cached chart frame"""
+    with _frames_lock:
+        _frames.clear()
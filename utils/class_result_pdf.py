@@ -1,5 +1,5 @@
 from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
+from reportlab.lib.pagesizes import A4, landscape, letter
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -7,21 +7,107 @@ from reportlab.lib.enums import TA_CENTER
 from datetime import datetime
 from typing import Dict, Any, List
 from reportlab.lib.units import inch
-from reportlab.graphics.charts.barcharts import VerticalBarChart
-from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics.shapes import Drawing
 from services.pdf_service import BasePDFService
+from services.render_cache import RenderCache, write_document
+from utils.charts import grade_pie_chart, subject_bar_chart
+from utils.class_sheet import ClassSheetLayout, ClassSheetRows, SheetColumn, prepare_rows
+from utils.grading import default_grading_scheme
+from utils.pdf_output import doc_options
+from utils.pdf_styles import get_table_style, register_table_style
 from io import BytesIO
 
-def generate_class_pdf(class_data, output_path, customization_data=None):
-    """Generate enhanced PDF for entire class with modern styling and customization."""
+@register_table_style('class_sheet', fields=('main_color',))
+def _class_sheet_table_style(options):
+    """Table style for the class result sheet"""
+    main_color = colors.toColor(options.get('main_color') or '#1E40AF') if options else colors.blue
+    return [
+        ('BACKGROUND', (0, 0), (-1, 0), main_color),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.whitesmoke]),
+    ]
+
+@register_table_style('class_results')
+def _class_results_table_style(options):
+    """Table style for the service's class results table"""
+    return [
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ]
+
+def _subject_names(students):
+    """Subject names of a class in order of first appearance"""
+    names = {}
+    for student in students:
+        for subject in student['overall_result']['subject_results']:
+            names.setdefault(subject['subject_name'], None)
+    return list(names)
+
+def _format_class_row(student, subjects):
+    """Format a student as a row of the class result sheet"""
+    overall = student['overall_result']
+    by_subject = {s['subject_name']: s for s in overall['subject_results']}
+    days_present, max_days = student['days_present'], student['max_days']
+    attendance_str = f"{days_present}/{max_days} ({(days_present/max_days*100):.1f}%)" if max_days else f"{days_present}/{max_days}"
+    return [
+        str(student['roll_no']),
+        str(student['name']),
+        attendance_str,
+        *(
+            f"{by_subject[name]['marks']} ({by_subject[name]['grade']})" if name in by_subject else '-'
+            for name in subjects
+        ),
+        f"{overall['overall_percentage']}%",
+        str(overall['overall_grade']),
+        "PASS" if overall['is_pass'] else "FAIL"
+    ]
+
+def generate_class_pdf(class_data, output_path, customization_data=None, streaming=False):
+    """Generate enhanced PDF for entire class with modern styling and customization.
+
+    In streaming mode class_data['students'] may be any iterable (e.g. a
+    query streamed from the database); students are laid out a page at a
+    time and the render cache is bypassed.
+    """
+    if streaming:
+        write_document(output_path, _render_class_pdf(class_data, customization_data, streaming=True))
+        return
+
+    # Serve repeat downloads from the render cache
+    cache = RenderCache.shared()
+    key = cache.key('class_result', class_data, customization_data, None, default_grading_scheme().version)
+    data = cache.get_or_render(key, lambda: _render_class_pdf(class_data, customization_data))
+    write_document(output_path, data)
+
+def _render_class_pdf(class_data, customization_data, streaming=False):
+    """Render the class result sheet to PDF bytes"""
+    # Lay the sheet out once from every student (or a sample when streaming)
+    sample, students = prepare_rows(class_data['students'], streaming)
+    subjects = class_data.get('subjects') or _subject_names(sample)
+    columns = [
+        SheetColumn('Roll No'),
+        SheetColumn('Name', align='LEFT', min_width=80, flex=True),
+        SheetColumn('Attendance'),
+        *(SheetColumn(name) for name in subjects),
+        SheetColumn('Total %'),
+        SheetColumn('Grade'),
+        SheetColumn('Status')
+    ]
+    measured = [_format_class_row(student, subjects) for student in sample]
+    rows = (_format_class_row(student, subjects) for student in students) if streaming else measured
+    layout, pagesize = ClassSheetLayout.fit(columns, measured, margin=20, font_size=9, clip_all=streaming)
+
+    buffer = BytesIO()
     doc = SimpleDocTemplate(
-        output_path,
-        pagesize=A4,
-        rightMargin=20,
-        leftMargin=20,
-        topMargin=30,
-        bottomMargin=30
+        buffer,
+        **doc_options(
+            pagesize=pagesize,
+            rightMargin=20,
+            leftMargin=20,
+            topMargin=30,
+            bottomMargin=30
+        )
     )
     styles = getSampleStyleSheet()
     main_color = colors.toColor(customization_data.get('main_color', '#1E40AF')) if customization_data else colors.blue
@@ -34,46 +120,8 @@ def generate_class_pdf(class_data, output_path, customization_data=None):
     story.append(Paragraph(f"{exam_name} - Class {class_data['cls']} Section {class_data['section']}", ParagraphStyle('Heading2', fontSize=14, alignment=TA_CENTER)))
     story.append(Spacer(1, 16))
 
-    # Table header
-    headers = ['Roll No', 'Name', 'Attendance', 'Subjects', 'Total %', 'Grade', 'Status']
-    table_data = [headers]
-
-    # Table rows
-    for student in class_data['students']:
-        overall = student['overall_result']
-        subjects_str = ", ".join(
-            f"{s['subject_name']} ({s['marks']}/{s['max_marks']}, {s['grade']})"
-            for s in overall['subject_results']
-        )
-        attendance_str = f"{student['days_present']}/{student['max_days']} ({(student['days_present']/student['max_days']*100):.1f}%)"
-        table_data.append([
-            student['roll_no'],
-            student['name'],
-            attendance_str,
-            subjects_str,
-            f"{overall['overall_percentage']}%",
-            overall['overall_grade'],
-            "PASS" if overall['is_pass'] else "FAIL"
-        ])
-
-    # Table styling
-    table = Table(table_data, colWidths=[60, 100, 90, 180, 50, 40, 40])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), main_color),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.whitesmoke]),
-        ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
-        ('ALIGN', (1, 1), (1, -1), 'LEFT'),
-        ('ALIGN', (3, 1), (3, -1), 'LEFT'),
-    ]))
-
-    story.append(table)
+    # Student rows, paginated with the header repeated on every page
+    story.append(ClassSheetRows(layout, rows, [get_table_style('class_sheet', customization_data)]))
     story.append(Spacer(1, 20))
 
     # Optional: Add class remarks if provided
@@ -97,13 +145,26 @@ def generate_class_pdf(class_data, output_path, customization_data=None):
     story.append(footer_table)
 
     doc.build(story)
+    return buffer.getvalue()
 
 class ClassResultPDFService(BasePDFService):
     """Service for generating class result sheets"""
     
+    # Landscape when the results table is too wide for portrait
+    pagesize = letter
+    
     def generate_class_result(self, class_data: Dict[str, Any], students_results: List[Dict[str, Any]], 
                             organization_data: Dict[str, Any], customization: Dict[str, Any]) -> BytesIO:
         """Generate a class result sheet"""
+        return self._render_cached(
+            'class_result', (class_data, students_results, organization_data), customization,
+            lambda: self._render_class_result(class_data, students_results, organization_data, customization),
+            template=customization.get('template')
+        )
+    
+    def _render_class_result(self, class_data: Dict[str, Any], students_results: List[Dict[str, Any]], 
+                           organization_data: Dict[str, Any], customization: Dict[str, Any]) -> BytesIO:
+        """Render the class result sheet (bypasses the render cache)"""
         elements = []
         
         # Add header
@@ -164,12 +225,6 @@ class ClassResultPDFService(BasePDFService):
             for subject in student.get('subjects', [])
         )))
         
-        # Table header
-        header = ['Roll No.', 'Student Name'] + subjects + ['Total', 'Percentage', 'Grade', 'Position']
-        
-        # Table data
-        data = [header]
-        
         # Sort students by percentage in descending order
         sorted_results = sorted(
             students_results,
@@ -177,11 +232,12 @@ class ClassResultPDFService(BasePDFService):
             reverse=True
         )
         
-        # Add student rows
+        # Student rows
+        rows = []
         for position, student in enumerate(sorted_results, 1):
             row = [
-                student.get('roll_number', 'N/A'),
-                student.get('name', 'N/A')
+                str(student.get('roll_number', 'N/A')),
+                str(student.get('name', 'N/A'))
             ]
             
             # Add subject marks
@@ -195,25 +251,23 @@ class ClassResultPDFService(BasePDFService):
             row.extend([
                 str(student.get('total_marks', 0)),
                 f"{student.get('total_percentage', 0):.1f}%",
-                self._calculate_grade(student.get('total_percentage', 0)),
-                self._get_position_suffix(position)
+                student.get('grade') or self._calculate_grade(student.get('total_percentage', 0)),
+                self._get_position_suffix(student.get('position', position))
             ])
             
-            data.append(row)
+            rows.append(row)
         
-        # Create table
-        col_widths = [1*inch, 2*inch] + [0.8*inch] * len(subjects) + [0.8*inch, 1*inch, 0.8*inch, 0.8*inch]
-        table = Table(data, colWidths=col_widths, repeatRows=1)
-        table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
+        # Lay out the columns once; wide sheets switch to landscape
+        columns = (
+            [SheetColumn('Roll No.'), SheetColumn('Student Name', align='LEFT', min_width=1*inch, flex=True)]
+            + [SheetColumn(subject) for subject in subjects]
+            + [SheetColumn('Total'), SheetColumn('Percentage'), SheetColumn('Grade'), SheetColumn('Position')]
+        )
+        layout, self.pagesize = ClassSheetLayout.fit(
+            columns, rows, page_sizes=(letter, landscape(letter)), margin=inch, font_size=9
+        )
         
-        elements.append(table)
+        elements.append(ClassSheetRows(layout, rows, [get_table_style('class_results')]))
         return elements
     
     def _create_class_analytics(self, students_results: List[Dict[str, Any]]) -> List:
@@ -261,62 +315,21 @@ class ClassResultPDFService(BasePDFService):
             avg = subject_totals[subject] / subject_counts[subject]
             averages.append(avg)
         
-        # Create drawing
-        drawing = Drawing(400, 200)
-        
-        # Create bar chart
-        bc = VerticalBarChart()
-        bc.x = 50
-        bc.y = 50
-        bc.height = 125
-        bc.width = 300
-        bc.data = [averages]
-        bc.categoryAxis.categoryNames = subjects
-        bc.categoryAxis.labels.boxAnchor = 'ne'
-        bc.categoryAxis.labels.angle = 30
-        bc.categoryAxis.labels.dx = -8
-        bc.categoryAxis.labels.dy = -2
-        bc.valueAxis.valueMin = 0
-        bc.valueAxis.valueMax = 100
-        bc.valueAxis.valueStep = 10
-        bc.bars[0].fillColor = colors.lightblue
-        
-        drawing.add(bc)
-        return drawing
+        return subject_bar_chart(
+            [{'name': subject, 'percentage': average} for subject, average in zip(subjects, averages)],
+            value_step=10, label_length=None, bar_color=colors.lightblue
+        ) or Drawing(400, 200)
     
     def _create_grade_distribution_chart(self, students_results: List[Dict[str, Any]]) -> Drawing:
         """Create pie chart for grade distribution"""
         # Calculate grade distribution
-        grade_counts = {'A+': 0, 'A': 0, 'B+': 0, 'B': 0, 'C': 0, 'D': 0, 'F': 0}
+        grade_counts = {grade: 0 for grade in self.grading_scheme.grade_order}
         
         for student in students_results:
-            percentage = student.get('total_percentage', 0)
-            grade = self._calculate_grade(percentage)
+            grade = student.get('grade') or self._calculate_grade(student.get('total_percentage', 0))
             grade_counts[grade] = grade_counts.get(grade, 0) + 1
         
-        # Filter out grades with zero count
-        grades = []
-        counts = []
-        for grade, count in grade_counts.items():
-            if count > 0:
-                grades.append(grade)
-                counts.append(count)
-        
-        # Create drawing
-        drawing = Drawing(400, 200)
-        
-        # Create pie chart
-        pc = Pie()
-        pc.x = 150
-        pc.y = 50
-        pc.width = 100
-        pc.height = 100
-        pc.data = counts
-        pc.labels = grades
-        pc.slices.strokeWidth = 0.5
-        
-        drawing.add(pc)
-        return drawing
+        return grade_pie_chart(grade_counts)
     
     def _create_class_statistics(self, students_results: List[Dict[str, Any]]) -> List:
         """Create class statistics section"""
@@ -361,15 +374,13 @@ class ClassResultPDFService(BasePDFService):
     def _generate_pdf(self, elements: List, organization_data: Dict[str, Any], customization: Dict[str, Any]) -> BytesIO:
         """Generate PDF from elements"""
         buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer)
-        
-        # Add watermark if enabled
-        if customization.get('watermark'):
-            elements.insert(0, self._create_watermark(customization['watermark']))
+        doc = SimpleDocTemplate(buffer, **doc_options(pagesize=self.pagesize))
         
         # Add QR code if enabled
         if customization.get('qr_data'):
             elements.append(self._create_qr_code(customization['qr_data']))
         
-        doc.build(elements)
+        # Watermark behind each page
+        on_page = self._watermark_page(organization_data, customization)
+        doc.build(elements, onFirstPage=on_page, onLaterPages=on_page)
         return buffer
@@ -0,0 +1,281 @@
+# utils/class_sheet.py
+import math
+from itertools import chain, islice
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Flowable, LongTable, TableStyle
+
+# Paginated class result sheets.
+#
+# A class sheet used to be one Table holding every student, which ReportLab
+# measures cell by cell and re-splits at every page break, so layout time
+# and memory grow much faster than the class. Here column widths are
+# computed once for the whole sheet by ClassSheetLayout, every row has the
+# same fixed height, and ClassSheetRows only turns the rows that fit on the
+# current page into a LongTable (with the header repeated). Rendering time
+# is linear in the number of students; in streaming mode rows are also
+# pulled from an iterator a page at a time.
+
+MIN_FONT_SIZE = 5
+# Default padding of a platypus Frame
+FRAME_PADDING = 6
+# Rows measured to lay out a streamed sheet; longer cells are clipped
+LAYOUT_SAMPLE_ROWS = 500
+ELLIPSIS = '…'
+
+class SheetColumn:
+    """A column of a class sheet"""
+
+    def __init__(self, header: str, align: str = 'CENTER', min_width: float = 24, flex: bool = False):
+        """Initialize the column
+
+        Args:
+            header (str): Header text, wrapped onto at most two lines
+            align (str): Cell alignment
+            min_width (float): Narrowest the column may be made
+            flex (bool): Whether the column takes up spare width (and gives it back first)
+        """
+        self.header = header
+        self.align = align
+        self.min_width = min_width
+        self.flex = flex
+
+def _wrap_header(text: str, width: float, font_name: str, font_size: float) -> str:
+    """Greedily wrap header text onto lines no wider than width"""
+    lines = []
+    for word in text.split():
+        if lines and stringWidth(f"{lines[-1]} {word}", font_name, font_size) <= width:
+            lines[-1] = f"{lines[-1]} {word}"
+        else:
+            lines.append(word)
+    return '\n'.join(lines)
+
+def _clip(text: str, width: float, font_name: str, font_size: float) -> str:
+    """Shorten text with an ellipsis until it fits width"""
+    if stringWidth(text, font_name, font_size) <= width:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if stringWidth(text[:middle] + ELLIPSIS, font_name, font_size) <= width:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low] + ELLIPSIS
+
+def _natural_widths(columns: Sequence[SheetColumn], rows: Iterable[Sequence[str]], font_size: float,
+                    font_name: str, header_font_name: str, padding: float) -> List[float]:
+    """Width of the widest cell (or header word) of every column, padding included"""
+    natural = [
+        max(stringWidth(word, header_font_name, font_size) for word in (column.header.split() or ['']))
+        for column in columns
+    ]
+    for row in rows:
+        for j, cell in enumerate(row):
+            width = stringWidth(cell, font_name, font_size)
+            if width > natural[j]:
+                natural[j] = width
+    return [width + 2 * padding for width in natural]
+
+class ClassSheetLayout:
+    """Column widths, font size and row heights of a class sheet, computed once
+
+    Every column starts at its natural width (widest cell or header word).
+    Spare width goes to the flex column; if the sheet is too wide the flex
+    column shrinks (clipping its text) down to its minimum, and after that
+    the whole sheet, font included, is scaled down to fit.
+    """
+
+    def __init__(self, columns: Sequence[SheetColumn], rows: Iterable[Sequence[str]], available_width: float,
+                 font_size: float = 8, font_name: str = 'Helvetica', header_font_name: str = 'Helvetica-Bold',
+                 padding: float = 3, clip_all: bool = False, natural_widths: Optional[List[float]] = None):
+        """Lay out a sheet
+
+        Args:
+            columns (list): The sheet's columns
+            rows (iterable): Formatted rows (or a sample of them) to measure
+            available_width (float): Frame width in points
+            font_size (float): Preferred font size
+            font_name (str): Cell font
+            header_font_name (str): Header font
+            padding (float): Horizontal and vertical cell padding
+            clip_all (bool): Clip any overlong cell, for rows that were not all measured
+            natural_widths (list, optional): Widths already measured from the rows
+        """
+        self.columns = list(columns)
+        self.font_name = font_name
+        self.header_font_name = header_font_name
+        self.padding = padding
+
+        natural = natural_widths or _natural_widths(self.columns, rows, font_size, font_name, header_font_name, padding)
+        widths = [max(width, column.min_width) for width, column in zip(natural, self.columns)]
+
+        flex = [j for j, column in enumerate(self.columns) if column.flex]
+        deficit = sum(widths) - available_width
+        if deficit < 0 and flex:
+            for j in flex:
+                widths[j] += -deficit / len(flex)
+        elif deficit > 0:
+            for j in flex:
+                reduction = min(deficit, widths[j] - self.columns[j].min_width)
+                widths[j] -= reduction
+                deficit -= reduction
+
+        self.scale = min(1.0, available_width / sum(widths))
+        self.font_size = max(MIN_FONT_SIZE, font_size * self.scale)
+        self.widths = [width * self.scale for width in widths]
+        self.clipped = [
+            j for j, width in enumerate(self.widths)
+            if clip_all or natural[j] * self.scale > width + 0.01
+        ]
+
+        self.headers = [
+            _wrap_header(column.header, width - 2 * padding, header_font_name, self.font_size)
+            for column, width in zip(self.columns, self.widths)
+        ]
+        line_height = self.font_size * 1.2
+        self.row_height = line_height + 2 * padding
+        self.header_height = line_height * max(header.count('\n') + 1 for header in self.headers) + 2 * padding
+
+        self.style = TableStyle(
+            [
+                ('FONTNAME', (0, 0), (-1, 0), header_font_name),
+                ('FONTNAME', (0, 1), (-1, -1), font_name),
+                ('FONTSIZE', (0, 0), (-1, -1), self.font_size),
+                ('LEADING', (0, 0), (-1, -1), line_height),
+                ('TOPPADDING', (0, 0), (-1, -1), padding),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), padding),
+                ('LEFTPADDING', (0, 0), (-1, -1), padding),
+                ('RIGHTPADDING', (0, 0), (-1, -1), padding),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ] + [
+                ('ALIGN', (j, 1), (j, -1), column.align)
+                for j, column in enumerate(self.columns) if column.align != 'LEFT'
+            ]
+        )
+
+    @classmethod
+    def fit(cls, columns: Sequence[SheetColumn], rows: Sequence[Sequence[str]],
+            page_sizes: Sequence[Tuple[float, float]] = (A4, landscape(A4)), margin: float = 20,
+            **kwargs) -> Tuple['ClassSheetLayout', Tuple[float, float]]:
+        """Lay out a sheet on the first page size it fits without shrinking
+
+        Args:
+            columns (list): The sheet's columns
+            rows (list): Formatted rows (or a sample of them) to measure
+            page_sizes (list): Candidate page sizes, in order of preference
+            margin (float): Left and right page margin (the frame's own padding is allowed for)
+            **kwargs: Passed to ClassSheetLayout
+
+        Returns:
+            tuple: The layout and the page size it was made for
+        """
+        # Measure once for every candidate page size
+        natural = _natural_widths(
+            columns, rows, kwargs.get('font_size', 8), kwargs.get('font_name', 'Helvetica'),
+            kwargs.get('header_font_name', 'Helvetica-Bold'), kwargs.get('padding', 3)
+        )
+        for pagesize in page_sizes:
+            layout = cls(columns, (), pagesize[0] - 2 * (margin + FRAME_PADDING), natural_widths=natural, **kwargs)
+            if layout.scale >= 1.0:
+                break
+        return layout, pagesize
+
+    def format_row(self, row: Sequence[str]) -> List[str]:
+        """Clip the cells of a row that are wider than their column"""
+        if not self.clipped:
+            return list(row)
+        row = list(row)
+        for j in self.clipped:
+            row[j] = _clip(row[j], self.widths[j] - 2 * self.padding, self.font_name, self.font_size)
+        return row
+
+    def rows_fitting(self, height: float) -> int:
+        """Number of rows that fit below the header in a given height"""
+        return max(0, math.floor((height - self.header_height) / self.row_height + 1e-6))
+
+class ClassSheetRows(Flowable):
+    """The rows of a class sheet, laid out one page at a time
+
+    Splitting hands out a LongTable of exactly the rows that fit in the
+    frame, with the header repeated, plus a continuation holding the rest.
+    Rows may be any iterable; only a page worth is held at a time.
+    """
+
+    def __init__(self, layout: ClassSheetLayout, rows: Iterable[Sequence[str]],
+                 styles: Sequence[TableStyle] = (), _buffer: Optional[List[Sequence[str]]] = None):
+        """Initialize the rows
+
+        Args:
+            layout (ClassSheetLayout): Layout of the sheet
+            rows (iterable): Formatted rows
+            styles (list): TableStyles applied on top of the layout's own
+        """
+        super().__init__()
+        self.layout = layout
+        self.styles = list(styles)
+        self._rows = iter(rows)
+        self._buffer = _buffer or []
+        self._table = None
+
+    def _fill(self, count: int) -> None:
+        """Pull rows from the source until count are buffered"""
+        if len(self._buffer) < count:
+            self._buffer.extend(islice(self._rows, count - len(self._buffer)))
+
+    def _build_table(self, rows: List[Sequence[str]]) -> LongTable:
+        layout = self.layout
+        table = LongTable(
+            [layout.headers] + [layout.format_row(row) for row in rows],
+            colWidths=layout.widths,
+            rowHeights=[layout.header_height] + [layout.row_height] * len(rows),
+            repeatRows=1
+        )
+        table.setStyle(layout.style)
+        for style in self.styles:
+            table.setStyle(style)
+        return table
+
+    def wrap(self, availWidth, availHeight):
+        capacity = self.layout.rows_fitting(availHeight)
+        # One row more than fits tells the frame to split
+        self._fill(capacity + 1)
+        if len(self._buffer) > capacity:
+            self._table = None
+            return sum(self.layout.widths), availHeight + self.layout.row_height
+        self._table = self._build_table(self._buffer)
+        self._height = self.layout.header_height + self.layout.row_height * len(self._buffer)
+        return sum(self.layout.widths), self._height
+
+    def split(self, availWidth, availHeight):
+        capacity = self.layout.rows_fitting(availHeight)
+        if capacity < 1:
+            return []
+        self._fill(capacity + 1)
+        page = self._build_table(self._buffer[:capacity])
+        rest = ClassSheetRows(self.layout, self._rows, self.styles, _buffer=self._buffer[capacity:])
+        return [page, rest]
+
+    def draw(self):
+        self._table.wrapOn(self.canv, sum(self.layout.widths), self._height)
+        self._table.drawOn(self.canv, 0, 0)
+
+def prepare_rows(rows: Iterable[Sequence[str]], streaming: bool = False) -> Tuple[Sequence[Sequence[str]], Iterable[Sequence[str]]]:
+    """Split rows into those to measure for the layout and those to render
+
+    Args:
+        rows (iterable): Formatted rows
+        streaming (bool): Measure only the first LAYOUT_SAMPLE_ROWS and keep the rest lazy
+
+    Returns:
+        tuple: (rows to measure, rows to render)
+    """
+    if not streaming:
+        rows = list(rows)
+        return rows, rows
+    rows = iter(rows)
+    sample = list(islice(rows, LAYOUT_SAMPLE_ROWS))
+    return sample, chain(sample, rows)
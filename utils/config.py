@@ -0,0 +1,37 @@
+# utils/config.py
+import os
+from typing import Any
+
+from flask import current_app
+
+# Settings read outside the app.
+#
+# Services run both in the web app and in processes without an application
+# context (bulk render and validation workers, job workers, benchmarks).
+# config_value reads the app config when there is one and otherwise the
+# environment variable of the same name, which app/config.py reads too, so
+# both see the same setting.
+
+_TRUE_VALUES = ('true', 'on', '1')
+
+def config_value(name: str, default: Any = None) -> Any:
+    """Get a setting from the app config, or the environment outside the app
+
+    Args:
+        name (str): Setting name, as in app/config.py and the environment
+        default: Value when the setting is not set. Environment values are
+            converted to its type; booleans accept true, on and 1.
+
+    Returns:
+        The setting, or default
+    """
+    try:
+        return current_app.config.get(name, default)
+    except RuntimeError:
+        # Not in application context (e.g. worker processes)
+        value = os.environ.get(name)
+        if not value or default is None:
+            return value or default
+        if isinstance(default, bool):
+            return value.lower() in _TRUE_VALUES
+        return type(default)(value)
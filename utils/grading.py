@@ -1,6 +1,18 @@
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
+from bisect import bisect_right
+from functools import lru_cache
+import hashlib
 import json
 import os
+import time
+
+import numpy as np
+
+# Compiled schemes are cached per (tenant, class, year) for this long so that
+# settings changed in another worker process are picked up eventually
+GRADING_SCHEME_TTL = 300
+
+_scheme_cache: Dict[tuple, tuple] = {}
 
 # Load grading system from config
 def load_grading_config() -> Dict:
@@ -18,7 +30,131 @@ def load_grading_config() -> Dict:
             'F': {'min': 0, 'max': 39.99}
         }
 
-def calculate_grade(percentage: float) -> str:
+class GradingScheme:
+    """Grading scheme compiled into sorted thresholds for bisect lookup
+
+    Every band is reduced to its lower bound. A percentage gets the grade of
+    the highest band whose minimum it reaches, so there are no gaps between
+    bands (e.g. 79.995 is an A, not an F).
+    """
+
+    __slots__ = ('thresholds', 'grades', 'fail_grade', 'version')
+
+    def __init__(self, bands: Dict[str, float]):
+        ordered = sorted((float(minimum), grade) for grade, minimum in bands.items())
+        self.thresholds = [minimum for minimum, _ in ordered]
+        self.grades = [grade for _, grade in ordered]
+        self.fail_grade = self.grades[0] if self.grades else 'F'
+        self.version = hashlib.sha1(json.dumps(ordered).encode()).hexdigest()[:12]
+
+    @classmethod
+    def from_config(cls, config) -> Optional['GradingScheme']:
+        """Compile a grading config into a scheme
+
+        Accepts {'A+': {'min': 80, ...}}, {'A+': 80} or
+        [{'grade': 'A+', 'min': 80}], optionally nested under 'grades'.
+        Returns None when no usable band is found.
+        """
+        if isinstance(config, dict) and isinstance(config.get('grades'), (dict, list)):
+            config = config['grades']
+
+        if isinstance(config, dict):
+            items = [(grade, value.get('min') if isinstance(value, dict) else value)
+                     for grade, value in config.items()]
+        elif isinstance(config, list):
+            items = [(band.get('grade'), band.get('min')) for band in config if isinstance(band, dict)]
+        else:
+            return None
+
+        bands = {}
+        for grade, minimum in items:
+            try:
+                if grade:
+                    bands[str(grade)] = float(minimum)
+            except (TypeError, ValueError):
+                continue
+
+        return cls(bands) if bands else None
+
+    @property
+    def grade_order(self) -> List[str]:
+        """Grades from best to worst"""
+        return self.grades[::-1]
+
+    def grade(self, percentage: float) -> str:
+        """Look up the grade for one percentage"""
+        index = bisect_right(self.thresholds, percentage) - 1
+        return self.grades[index] if index >= 0 else self.fail_grade
+
+    def grade_many(self, percentages) -> List[str]:
+        """Look up grades for a whole class of percentages"""
+        thresholds, grades, fail_grade = self.thresholds, self.grades, self.fail_grade
+        result = []
+        for percentage in percentages:
+            index = bisect_right(thresholds, percentage) - 1
+            result.append(grades[index] if index >= 0 else fail_grade)
+        return result
+
+    def is_passing(self, grade: str) -> bool:
+        """Check if grade is passing (not the lowest band)"""
+        return grade != self.fail_grade
+
+@lru_cache(maxsize=1)
+def default_grading_scheme() -> GradingScheme:
+    """Get the system-wide scheme, compiled from grading_config.json once"""
+    return GradingScheme.from_config(load_grading_config()) or GradingScheme({'F': 0})
+
+def _load_class_grading_scheme(organization_id, class_name, academic_year=None) -> Optional[GradingScheme]:
+    """Compile the grading system stored in ClassSettings, if any"""
+    try:
+        from models.class_settings import ClassSettings
+
+        query = ClassSettings.query.filter_by(
+            organization_id=organization_id,
+            class_name=class_name,
+            is_active=True
+        )
+        if academic_year:
+            query = query.filter_by(academic_year=academic_year)
+        settings = query.order_by(ClassSettings.academic_year.desc()).first()
+    except Exception as e:
+        print(f"Error loading grading system: {str(e)}")
+        return None
+
+    return GradingScheme.from_config(settings.grading_system) if settings else None
+
+def get_grading_scheme(organization_id=None, class_name=None, academic_year=None) -> GradingScheme:
+    """Get the compiled grading scheme for a class, falling back to the default"""
+    if organization_id is None or class_name is None:
+        return default_grading_scheme()
+
+    key = (str(organization_id), str(class_name), str(academic_year) if academic_year else None)
+    now = time.monotonic()
+    cached = _scheme_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    scheme = _load_class_grading_scheme(organization_id, class_name, academic_year) or default_grading_scheme()
+    _scheme_cache[key] = (now + GRADING_SCHEME_TTL, scheme)
+    return scheme
+
+def invalidate_grading_scheme(organization_id=None, class_name=None, academic_year=None) -> None:
+    """Drop cached schemes; everything when no organization is given"""
+    if organization_id is None:
+        _scheme_cache.clear()
+        default_grading_scheme.cache_clear()
+        return
+
+    for key in list(_scheme_cache):
+        if key[0] != str(organization_id):
+            continue
+        if class_name is not None and key[1] != str(class_name):
+            continue
+        if academic_year is not None and key[2] not in (None, str(academic_year)):
+            continue
+        _scheme_cache.pop(key, None)
+
+def calculate_grade(percentage: float, scheme: Optional[GradingScheme] = None) -> str:
     """Calculate grade with input validation"""
     try:
         if not isinstance(percentage, (int, float)):
@@ -28,15 +164,10 @@ def calculate_grade(percentage: float) -> str:
         if percentage < 0 or percentage > 100:
             raise ValueError("Percentage must be between 0 and 100")
             
-        grading_system = load_grading_config()
-        for grade, range_ in grading_system.items():
-            if range_['min'] <= percentage <= range_['max']:
-                return grade
-                
-        return 'F'
+        return (scheme or default_grading_scheme()).grade(percentage)
     except Exception as e:
         print(f"Error calculating grade: {str(e)}")
-        return 'F'
+        return (scheme or default_grading_scheme()).fail_grade
 
 def calculate_percentage(marks, max_marks=100):
     """Calculate percentage from marks using provided max_marks"""
@@ -44,18 +175,19 @@ def calculate_percentage(marks, max_marks=100):
         return 0
     return round((marks / max_marks) * 100, 2)
 
-def is_passing_grade(grade):
-    """Check if grade is passing (not F)"""
-    return grade != 'F'
+def is_passing_grade(grade, scheme: Optional[GradingScheme] = None):
+    """Check if grade is passing (not the scheme's lowest band)"""
+    return (scheme or default_grading_scheme()).is_passing(grade)
 
-def calculate_student_overall_result(results):
+def calculate_student_overall_result(results, scheme: Optional[GradingScheme] = None):
     """Calculate overall result using dynamic max marks"""
+    scheme = scheme or default_grading_scheme()
     if not results:
         return {
             'total_marks': 0,
             'total_max_marks': 0,
             'overall_percentage': 0,
-            'overall_grade': 'F',
+            'overall_grade': scheme.fail_grade,
             'is_pass': False,
             'subject_results': []
         }
@@ -72,9 +204,9 @@ def calculate_student_overall_result(results):
         
         # Calculate percentage based on subject's max marks
         percentage = calculate_percentage(marks, max_marks)
-        grade = calculate_grade(percentage)
+        grade = calculate_grade(percentage, scheme)
         
-        if not is_passing_grade(grade):
+        if not is_passing_grade(grade, scheme):
             has_failed_subject = True
         
         subject_results.append({
@@ -83,7 +215,7 @@ def calculate_student_overall_result(results):
             'max_marks': max_marks,
             'percentage': percentage,
             'grade': grade,
-            'is_pass': is_passing_grade(grade)
+            'is_pass': is_passing_grade(grade, scheme)
         })
         
         total_marks += marks
@@ -91,8 +223,8 @@ def calculate_student_overall_result(results):
     
     # Calculate overall percentage based on total marks and total max marks
     overall_percentage = calculate_percentage(total_marks, total_max_marks)
-    overall_grade = calculate_grade(overall_percentage)
-    is_pass = not has_failed_subject and is_passing_grade(overall_grade)
+    overall_grade = calculate_grade(overall_percentage, scheme)
+    is_pass = not has_failed_subject and is_passing_grade(overall_grade, scheme)
     
     return {
         'total_marks': total_marks,
@@ -103,6 +235,87 @@ def calculate_student_overall_result(results):
         'subject_results': subject_results
     }
 
+def calculate_class_results(students: List[Dict], subjects: List[str], marks, max_marks,
+                            scheme: Optional[GradingScheme] = None) -> List[Dict]:
+    """Calculate results for a whole class from its marks matrix in one pass
+
+    Args:
+        students (list): One dict per matrix row with identity fields (roll_no, name, ...)
+        subjects (list): Subject names, one per matrix column
+        marks: students x subjects marks, None/NaN where a student has no result
+        max_marks: Max marks per subject, or a full students x subjects matrix
+        scheme (GradingScheme, optional): Scheme to grade with. Defaults to the system scheme.
+
+    Returns:
+        list: Per-student records in input order. Each is the student dict plus
+        position, overall_result (as calculate_student_overall_result) and the
+        subjects/total_marks/total_percentage keys ClassResultPDFService reads.
+    """
+    if not students:
+        return []
+
+    scheme = scheme or default_grading_scheme()
+    marks = np.asarray(marks, dtype=float).reshape(len(students), len(subjects))
+    max_marks = np.broadcast_to(np.asarray(max_marks, dtype=float), marks.shape)
+    present = ~np.isnan(marks)
+    thresholds = np.asarray(scheme.thresholds)
+
+    def grade_indexes(percentages):
+        # Out-of-range percentages fail, as in calculate_grade
+        indexes = np.searchsorted(thresholds, percentages, side='right') - 1
+        return np.where((percentages < 0) | (percentages > 100), 0, np.maximum(indexes, 0))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentages = np.where(present & (max_marks > 0), np.round(marks / max_marks * 100, 2), 0.0)
+        subject_grades = grade_indexes(percentages)
+
+        total_marks = np.where(present, marks, 0.0).sum(axis=1)
+        total_max_marks = np.where(present, max_marks, 0.0).sum(axis=1)
+        overall = np.where(total_max_marks > 0, np.round(total_marks / total_max_marks * 100, 2), 0.0)
+    overall_grades = grade_indexes(overall)
+
+    failed_subject = (present & (subject_grades == 0)).any(axis=1)
+    is_pass = present.any(axis=1) & ~failed_subject & (overall_grades > 0)
+
+    # Competition ranking: tied percentages share a position
+    positions = len(overall) - np.searchsorted(np.sort(overall), overall, side='right') + 1
+
+    grades = scheme.grades
+    rows = zip(present.tolist(), marks.tolist(), max_marks.tolist(), percentages.tolist(), subject_grades.tolist())
+    records = []
+    for i, (row_present, row_marks, row_max, row_percentages, row_grades) in enumerate(rows):
+        subject_results = [
+            {
+                'subject_name': subject,
+                'name': subject,
+                'marks': row_marks[j],
+                'max_marks': row_max[j],
+                'percentage': row_percentages[j],
+                'grade': grades[row_grades[j]],
+                'is_pass': row_grades[j] > 0
+            }
+            for j, subject in enumerate(subjects) if row_present[j]
+        ]
+        overall_result = {
+            'total_marks': float(total_marks[i]),
+            'total_max_marks': float(total_max_marks[i]),
+            'overall_percentage': float(overall[i]),
+            'overall_grade': grades[overall_grades[i]],
+            'is_pass': bool(is_pass[i]),
+            'subject_results': subject_results
+        }
+        records.append({
+            **students[i],
+            'position': int(positions[i]),
+            'overall_result': overall_result,
+            'subjects': subject_results,
+            'total_marks': overall_result['total_marks'],
+            'total_percentage': overall_result['overall_percentage'],
+            'grade': overall_result['overall_grade']
+        })
+
+    return records
+
 def get_grade_color(grade):
     """Get color class for grade display"""
     grade_colors = {
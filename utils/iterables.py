@@ -0,0 +1,12 @@
+# utils/iterables.py
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+def chunked(iterable: Iterable, size: int) -> Iterator[List]:
+    """Split an iterable into lists of up to size items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
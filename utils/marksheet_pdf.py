@@ -8,49 +8,73 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
 from reportlab.lib.utils import ImageReader
 from reportlab.graphics.shapes import Drawing, Rect, String
-from reportlab.graphics.charts.barcharts import VerticalBarChart
-from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics import renderPDF
-import qrcode
 from io import BytesIO
 import os
 from datetime import datetime
 from typing import Dict, Any, List
+from services.asset_cache import AssetCache
 from services.pdf_service import BasePDFService
+from services.render_cache import RenderCache, write_document
+from utils.charts import grade_pie_chart, sparkline, subject_bar_chart
+from utils.grading import default_grading_scheme
+from utils.pdf_output import doc_options
+from utils.pdf_styles import get_stylesheet, get_table_style, register_table_style, register_theme
+from utils.qr import verification_qr
+
+# Customization fields the marksheet styles depend on
+MARKSHEET_STYLE_FIELDS = ('main_color', 'header_color')
 
 # Enhanced PDF generation for academic results with modern styling. generate pdf-1
 def generate_result_pdf(student_data, output_path, customization_data=None):
     """Enhanced PDF generation with modern academic styling"""
     try:
-        # Initialize document
-        doc = SimpleDocTemplate(
-            output_path,
-            pagesize=A4,
-            rightMargin=20,
-            leftMargin=20,
-            topMargin=30,
-            bottomMargin=30
-        )
-        
         # Get template choice
         template = customization_data.get('template', 'modern') if customization_data else 'modern'
         
-        # Build content based on template
-        if template == 'classic':
-            story = _build_classic_template(student_data, customization_data)
-        elif template == 'compact':
-            story = _build_compact_template(student_data, customization_data)
-        else:  # modern (default)
-            story = _build_modern_template(student_data, customization_data)
+        # Serve repeat downloads from the render cache
+        cache = RenderCache.shared()
+        key = cache.key('marksheet', student_data, customization_data, template, default_grading_scheme().version)
+        data = cache.get_or_render(key, lambda: _render_result_pdf(student_data, customization_data, template))
         
-        # Build PDF
-        doc.build(story)
+        write_document(output_path, data)
         return True
         
     except Exception as e:
         print(f"Error generating enhanced PDF: {str(e)}")
         return False
 
+def _render_result_pdf(student_data, customization_data, template):
+    """Render a marksheet to PDF bytes"""
+    # Compiled mode stamps a pre-rendered static layer (modern template only)
+    if template == 'modern' and customization_data and customization_data.get('compiled'):
+        from utils.marksheet_templates import get_compiled_template
+        return get_compiled_template(customization_data).render(student_data)
+    
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        **doc_options(
+            pagesize=A4,
+            rightMargin=20,
+            leftMargin=20,
+            topMargin=30,
+            bottomMargin=30
+        )
+    )
+    
+    # Build content based on template
+    if template == 'classic':
+        story = _build_classic_template(student_data, customization_data)
+    elif template == 'compact':
+        story = _build_compact_template(student_data, customization_data)
+    else:  # modern (default)
+        story = _build_modern_template(student_data, customization_data)
+    
+    # Build PDF
+    doc.build(story)
+    return buffer.getvalue()
+
 def _build_modern_template(student_data, customization_data):
     """Build modern academic template with clean design"""
     story = []
@@ -127,12 +151,16 @@ def _build_compact_template(student_data, customization_data):
     return story
 
 def _get_enhanced_styles(customization_data, theme='modern'):
-    """Create enhanced styles based on theme and customization"""
-    styles = getSampleStyleSheet()
-    
+    """Get the shared enhanced styles for a theme and customization"""
+    return get_stylesheet(f'marksheet_{theme}', customization_data)
+
+@register_theme('marksheet_modern', fields=('main_color',))
+@register_theme('marksheet_classic', fields=('main_color',))
+@register_theme('marksheet_compact', fields=('main_color',))
+def _build_enhanced_styles(styles, options):
+    """Add enhanced styles based on customization"""
     # Get colors from customization
-    main_color = colors.toColor(customization_data.get('main_color', '#1E40AF')) if customization_data else colors.blue
-    header_color = colors.toColor(customization_data.get('header_color', '#E5E7EB')) if customization_data else colors.lightgrey
+    main_color = colors.toColor(options.get('main_color') or '#1E40AF') if options else colors.blue
     
     # Enhanced styles
     styles.add(ParagraphStyle(
@@ -184,8 +212,137 @@ def _get_enhanced_styles(customization_data, theme='modern'):
         fontName='Helvetica-Bold',
         alignment=TA_CENTER
     ))
-    
-    return styles
+
+@register_table_style('marksheet_header')
+def _marksheet_header_table_style(options):
+    """Table style for the header table"""
+    return [
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (1, 0), (1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (1, 0), (1, 0), 14),
+    ]
+
+@register_table_style('marksheet_rule')
+def _marksheet_rule_table_style(options):
+    """Table style for the rule table"""
+    return [
+        ('LINEBELOW', (0, 0), (-1, -1), 2, colors.blue),
+    ]
+
+@register_table_style('marksheet_info_card')
+def _marksheet_info_card_table_style(options):
+    """Table style for the info card table"""
+    return [
+        ('ALIGN', (0, 0), (0, 0), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('BOX', (0, 0), (-1, -1), 1, colors.grey),
+        ('BACKGROUND', (0, 0), (-1, -1), colors.lightyellow),
+        ('PADDING', (0, 0), (-1, -1), 10),
+    ]
+
+@register_table_style('marksheet_results', fields=MARKSHEET_STYLE_FIELDS)
+def _marksheet_results_table_style(options):
+    """Table style for the results table"""
+    main_color = colors.toColor(options.get('main_color') or '#1E40AF') if options else colors.blue
+    header_color = colors.toColor(options.get('header_color') or '#E5E7EB') if options else colors.lightgrey
+    return [
+        # Header styling
+        ('BACKGROUND', (0, 0), (-1, 0), header_color),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+
+        # Data rows styling
+        ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -2), 10),
+        ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
+        ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+
+        # Total row styling
+        ('BACKGROUND', (0, -1), (-1, -1), main_color),
+        ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, -1), (-1, -1), 11),
+
+        # Borders
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('LINEBELOW', (0, 0), (-1, 0), 2, main_color),
+
+        # Padding
+        ('PADDING', (0, 0), (-1, -1), 8),
+
+        # Alternating row colors
+        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.lightgrey]),
+    ]
+
+@register_table_style('marksheet_attendance')
+def _marksheet_attendance_table_style(options):
+    """Table style for the attendance table"""
+    return [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, 1), 'Helvetica'),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('PADDING', (0, 0), (-1, -1), 8),
+    ]
+
+@register_table_style('marksheet_remarks')
+def _marksheet_remarks_table_style(options):
+    """Table style for the remarks table"""
+    return [
+        ('BOX', (0, 0), (-1, -1), 1, colors.grey),
+        ('BACKGROUND', (0, 0), (-1, -1), colors.lightyellow),
+        ('PADDING', (0, 0), (-1, -1), 15),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ]
+
+@register_table_style('marksheet_signatures')
+def _marksheet_signatures_table_style(options):
+    """Table style for the signatures table"""
+    return [
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 3), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('TOPPADDING', (0, 2), (-1, 2), 20),
+    ]
+
+@register_table_style('marksheet_classic_details')
+def _marksheet_classic_details_table_style(options):
+    """Table style for the classic details table"""
+    return [
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('PADDING', (0, 0), (-1, -1), 5),
+    ]
+
+@register_table_style('marksheet_student_info')
+def _marksheet_student_info_table_style(options):
+    """Table style for the student info table"""
+    return [
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+        ('BACKGROUND', (2, 0), (2, -1), colors.lightgrey),
+    ]
+
+@register_table_style('marksheet_results_summary')
+def _marksheet_results_summary_table_style(options):
+    """Table style for the results summary table"""
+    return [
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
+    ]
 
 def _create_header_section(student_data, customization_data, styles):
     """Create modern header with logo and institute details"""
@@ -197,11 +354,9 @@ def _create_header_section(student_data, customization_data, styles):
     # Logo column
     logo_cell = ""
     if customization_data and customization_data.get('logo'):
-        try:
-            logo_img = Image(customization_data['logo'], width=60, height=60)
-            logo_cell = logo_img
-        except:
-            logo_cell = ""
+        logo_cell = AssetCache.shared().image(
+            customization_data['logo'], 60, 60, customization_data.get('organization_id')
+        ) or ""
     
     # Institute info column
     institute_name = customization_data.get('institute_name', 'School Name') if customization_data else 'School Name'
@@ -216,17 +371,12 @@ def _create_header_section(student_data, customization_data, styles):
     # QR Code column (if enabled)
     qr_cell = ""
     if customization_data and customization_data.get('include_qr', True):
-        qr_cell = _create_qr_code(student_data)
+        qr_cell = _create_qr_code(student_data, customization_data.get('verification_base_url'))
     
     header_data.append([logo_cell, Paragraph(institute_info, styles['InstituteHeader']), qr_cell])
     
     header_table = Table(header_data, colWidths=[80, 350, 80])
-    header_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (1, 0), (1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (1, 0), (1, 0), 14),
-    ]))
+    header_table.setStyle(get_table_style('marksheet_header'))
     
     header_elements.append(header_table)
     
@@ -234,9 +384,7 @@ def _create_header_section(student_data, customization_data, styles):
     header_elements.append(Spacer(1, 10))
     line_data = [[''] * 3]
     line_table = Table(line_data, colWidths=[510])
-    line_table.setStyle(TableStyle([
-        ('LINEBELOW', (0, 0), (-1, -1), 2, colors.blue),
-    ]))
+    line_table.setStyle(get_table_style('marksheet_rule'))
     header_elements.append(line_table)
     
     return header_elements
@@ -248,11 +396,8 @@ def _create_student_info_card(student_data, customization_data, styles):
     # Student photo (if available)
     photo_cell = ""
     if customization_data and customization_data.get('student_photo'):
-        try:
-            photo_img = Image(customization_data['student_photo'], width=80, height=100)
-            photo_cell = photo_img
-        except:
-            photo_cell = ""
+        # Per-student photos are downsampled like logos but not kept in the cache
+        photo_cell = AssetCache.shared().image(customization_data['student_photo'], 80, 100, cache=False) or ""
     
     # Student details
     student_info = f"""
@@ -265,13 +410,7 @@ def _create_student_info_card(student_data, customization_data, styles):
     # Create student info table
     info_data = [[photo_cell, Paragraph(student_info, styles['StudentInfo'])]]
     info_table = Table(info_data, colWidths=[100, 400])
-    info_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BOX', (0, 0), (-1, -1), 1, colors.grey),
-        ('BACKGROUND', (0, 0), (-1, -1), colors.lightyellow),
-        ('PADDING', (0, 0), (-1, -1), 10),
-    ]))
+    info_table.setStyle(get_table_style('marksheet_info_card'))
     
     card_elements.append(info_table)
     return card_elements
@@ -320,39 +459,7 @@ def _create_results_table(student_data, customization_data, styles):
     results_table = Table(table_data, colWidths=[120, 80, 80, 60, 80])
     
     # Enhanced table styling
-    main_color = colors.toColor(customization_data.get('main_color', '#1E40AF')) if customization_data else colors.blue
-    header_color = colors.toColor(customization_data.get('header_color', '#E5E7EB')) if customization_data else colors.lightgrey
-    
-    results_table.setStyle(TableStyle([
-        # Header styling
-        ('BACKGROUND', (0, 0), (-1, 0), header_color),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        
-        # Data rows styling
-        ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -2), 10),
-        ('ALIGN', (1, 1), (-1, -1), 'CENTER'),
-        ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-        
-        # Total row styling
-        ('BACKGROUND', (0, -1), (-1, -1), main_color),
-        ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, -1), (-1, -1), 11),
-        
-        # Borders
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('LINEBELOW', (0, 0), (-1, 0), 2, main_color),
-        
-        # Padding
-        ('PADDING', (0, 0), (-1, -1), 8),
-        
-        # Alternating row colors
-        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.lightgrey]),
-    ]))
+    results_table.setStyle(get_table_style('marksheet_results', customization_data))
     
     table_elements.append(results_table)
     return table_elements
@@ -372,6 +479,8 @@ def _create_performance_analytics(student_data, customization_data, styles):
         chart = _create_bar_chart(student_data, customization_data)
     elif chart_type == 'pie':
         chart = _create_pie_chart(student_data, customization_data)
+    elif chart_type == 'sparkline':
+        chart = _create_sparkline_row(student_data, customization_data, styles)
     else:
         chart = _create_bar_chart(student_data, customization_data)  # default
     
@@ -381,37 +490,11 @@ def _create_performance_analytics(student_data, customization_data, styles):
     return analytics_elements
 
 def _create_bar_chart(student_data, customization_data):
-    """Create performance bar chart"""
+    """Create performance bar chart, against the class averages when the batch provides them"""
     try:
         results = student_data.get('overall_result', {})
-        subjects = results.get('subjects', [])
-        
-        if not subjects:
-            return None
-        
-        # Create chart
-        drawing = Drawing(400, 200)
-        chart = VerticalBarChart()
-        chart.x = 50
-        chart.y = 50
-        chart.height = 125
-        chart.width = 300
-        
-        # Data
-        chart.data = [[s.get('percentage', 0) for s in subjects]]
-        chart.categoryAxis.categoryNames = [s.get('name', '')[:8] for s in subjects]
-        
-        # Styling
-        chart.bars[0].fillColor = colors.blue
-        chart.valueAxis.valueMin = 0
-        chart.valueAxis.valueMax = 100
-        chart.categoryAxis.labels.boxAnchor = 'ne'
-        chart.categoryAxis.labels.dx = 8
-        chart.categoryAxis.labels.dy = -2
-        chart.categoryAxis.labels.angle = 30
-        
-        drawing.add(chart)
-        return drawing
+        series = customization_data.get('class_series') if customization_data else None
+        return subject_bar_chart(results.get('subjects', []), series)
     except:
         return None
 
@@ -430,23 +513,36 @@ def _create_pie_chart(student_data, customization_data):
             grade = subject.get('grade', 'N/A')
             grade_counts[grade] = grade_counts.get(grade, 0) + 1
         
-        # Create chart
-        drawing = Drawing(300, 200)
-        pie = Pie()
-        pie.x = 50
-        pie.y = 50
-        pie.width = 100
-        pie.height = 100
-        
-        pie.data = list(grade_counts.values())
-        pie.labels = list(grade_counts.keys())
-        pie.slices.strokeWidth = 0.5
-        
-        drawing.add(pie)
-        return drawing
+        return grade_pie_chart(grade_counts, width=300, x=50)
     except:
         return None
 
+def _create_sparkline_row(student_data, customization_data, styles):
+    """Create a one-line performance summary with a sparkline of subject percentages"""
+    subjects = student_data.get('overall_result', {}).get('subjects', [])
+    series = customization_data.get('class_series') if customization_data else None
+    line = sparkline(
+        [s.get('percentage', 0) for s in subjects],
+        reference=series.get('overall_average') if series else None
+    )
+    if line is None:
+        return None
+    
+    # Plain strings rather than paragraphs keep the row cheap to lay out
+    best = max(subjects, key=lambda s: s.get('percentage', 0))
+    weakest = min(subjects, key=lambda s: s.get('percentage', 0))
+    row = Table([[
+        line,
+        f"Best: {best.get('name', '')} ({best.get('percentage', 0):.0f}%)",
+        f"Needs work: {weakest.get('name', '')} ({weakest.get('percentage', 0):.0f}%)"
+    ]], colWidths=[130, 190, 190])
+    row.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (1, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (1, 0), (-1, -1), 9),
+    ]))
+    return row
+
 def _create_attendance_section(student_data, customization_data, styles):
     """Create attendance information section"""
     attendance_elements = []
@@ -467,14 +563,7 @@ def _create_attendance_section(student_data, customization_data, styles):
     ]
     
     attendance_table = Table(attendance_data, colWidths=[100, 100, 100])
-    attendance_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTNAME', (0, 1), (-1, 1), 'Helvetica'),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('PADDING', (0, 0), (-1, -1), 8),
-    ]))
+    attendance_table.setStyle(get_table_style('marksheet_attendance'))
     
     attendance_elements.append(attendance_table)
     return attendance_elements
@@ -511,12 +600,7 @@ def _create_remarks_section(student_data, customization_data, styles):
     # Create remarks box
     remarks_data = [[remarks_para]]
     remarks_table = Table(remarks_data, colWidths=[500])
-    remarks_table.setStyle(TableStyle([
-        ('BOX', (0, 0), (-1, -1), 1, colors.grey),
-        ('BACKGROUND', (0, 0), (-1, -1), colors.lightyellow),
-        ('PADDING', (0, 0), (-1, -1), 15),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
+    remarks_table.setStyle(get_table_style('marksheet_remarks'))
     
     remarks_elements.append(remarks_table)
     return remarks_elements
@@ -532,21 +616,22 @@ def _create_footer_section(student_data, customization_data, styles):
     principal_name = customization_data.get('principal_name', 'Principal') if customization_data else 'Principal'
     teacher_name = customization_data.get('teacher_name', 'Class Teacher') if customization_data else 'Class Teacher'
     
+    # Scanned signatures, if provided, go in the blank space above the names
+    assets = AssetCache.shared()
+    organization_id = customization_data.get('organization_id') if customization_data else None
+    principal_signature = assets.image(customization_data.get('principal_signature'), 100, 30, organization_id) if customization_data else None
+    teacher_signature = assets.image(customization_data.get('signature'), 100, 30, organization_id) if customization_data else None
+    
     signature_data = [
         ['Date: ___________', '', 'Parent Signature'],
         ['', '', ''],
-        ['', '', ''],
+        [principal_signature or '', teacher_signature or '', ''],
         [f'({principal_name})', f'({teacher_name})', ''],
         ['Principal', 'Class Teacher', '']
     ]
     
     signature_table = Table(signature_data, colWidths=[150, 150, 150])
-    signature_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 3), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (0, 2), (-1, 2), 20),
-    ]))
+    signature_table.setStyle(get_table_style('marksheet_signatures'))
     
     footer_elements.append(signature_table)
     
@@ -556,27 +641,11 @@ def _create_footer_section(student_data, customization_data, styles):
     
     return footer_elements
 
-def _create_qr_code(student_data):
+def _create_qr_code(student_data, base_url=None):
     """Create QR code for result verification"""
     try:
-        # Create QR code data
-        qr_data = f"Student: {student_data['name']}\nRoll: {student_data['roll_no']}\nClass: {student_data['cls']}-{student_data['section']}"
-        
-        # Generate QR code
-        qr = qrcode.QRCode(version=1, box_size=2, border=1)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        
-        # Create image
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to ReportLab image
-        img_buffer = BytesIO()
-        qr_img.save(img_buffer, format='PNG')
-        img_buffer.seek(0)
-        
-        return Image(img_buffer, width=60, height=60)
-    except:
+        return verification_qr(student_data, 60, base_url=base_url)
+    except Exception:
         return ""
 
 def _add_watermark(customization_data):
@@ -611,13 +680,7 @@ def _create_classic_student_details(student_data, customization_data, styles):
     ]
     
     info_table = Table(student_info, colWidths=[100, 150, 100, 150])
-    info_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('PADDING', (0, 0), (-1, -1), 5),
-    ]))
+    info_table.setStyle(get_table_style('marksheet_classic_details'))
     
     details_elements.append(info_table)
     return details_elements
@@ -645,6 +708,13 @@ def _create_compact_layout(student_data, customization_data, styles):
     compact_elements.append(Spacer(1, 10))
     compact_elements.extend(_create_results_table(student_data, customization_data, styles))
     
+    # A sparkline stands in for the analytics charts
+    if customization_data and customization_data.get('include_analytics', True):
+        sparkline_row = _create_sparkline_row(student_data, customization_data, styles)
+        if sparkline_row:
+            compact_elements.append(Spacer(1, 10))
+            compact_elements.append(sparkline_row)
+    
     return compact_elements
 
 def _create_compact_footer(student_data, customization_data, styles):
@@ -657,6 +727,15 @@ class MarksheetPDFService(BasePDFService):
     def generate_marksheet(self, student_data: Dict[str, Any], results: List[Dict[str, Any]], 
                          organization_data: Dict[str, Any], customization: Dict[str, Any]) -> BytesIO:
         """Generate a student marksheet"""
+        return self._render_cached(
+            'marksheet', (student_data, results, organization_data), customization,
+            lambda: self._render_marksheet(student_data, results, organization_data, customization),
+            template=customization.get('template')
+        )
+    
+    def _render_marksheet(self, student_data: Dict[str, Any], results: List[Dict[str, Any]], 
+                        organization_data: Dict[str, Any], customization: Dict[str, Any]) -> BytesIO:
+        """Render the marksheet (bypasses the render cache)"""
         elements = []
         
         # Add header
@@ -699,14 +778,7 @@ class MarksheetPDFService(BasePDFService):
         ]
         
         info_table = Table(student_info, colWidths=[1.5*inch, 2*inch, 1.5*inch, 2*inch])
-        info_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('BACKGROUND', (2, 0), (2, -1), colors.lightgrey),
-        ]))
+        info_table.setStyle(get_table_style('marksheet_student_info'))
         
         elements.append(info_table)
         return elements
@@ -753,14 +825,7 @@ class MarksheetPDFService(BasePDFService):
         
         # Create table
         table = Table(data, colWidths=[2*inch, 1.2*inch, 1.5*inch, 1.2*inch, 1*inch])
-        table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('BACKGROUND', (0, -1), (-1, -1), colors.lightgrey),
-        ]))
+        table.setStyle(get_table_style('marksheet_results_summary'))
         
         elements.append(table)
         return elements
@@ -792,80 +857,16 @@ class MarksheetPDFService(BasePDFService):
         
         return elements
     
-    def _create_bar_chart(self, results: List[Dict[str, Any]]) -> Drawing:
-        """Create bar chart for subject-wise performance"""
-        # Prepare data
-        subjects = [r.get('subject_name', '') for r in results]
-        percentages = [r.get('percentage', 0) for r in results]
-        
-        # Create drawing
-        drawing = Drawing(400, 200)
-        
-        # Create bar chart
-        bc = VerticalBarChart()
-        bc.x = 50
-        bc.y = 50
-        bc.height = 125
-        bc.width = 300
-        bc.data = [percentages]
-        bc.categoryAxis.categoryNames = subjects
-        bc.categoryAxis.labels.boxAnchor = 'ne'
-        bc.categoryAxis.labels.angle = 30
-        bc.categoryAxis.labels.dx = -8
-        bc.categoryAxis.labels.dy = -2
-        bc.valueAxis.valueMin = 0
-        bc.valueAxis.valueMax = 100
-        bc.valueAxis.valueStep = 10
-        bc.bars[0].fillColor = colors.lightblue
-        
-        drawing.add(bc)
-        return drawing
-    
-    def _create_pie_chart(self, results: List[Dict[str, Any]]) -> Drawing:
-        """Create pie chart for grade distribution"""
-        # Calculate grade distribution
-        grade_counts = {'A+': 0, 'A': 0, 'B+': 0, 'B': 0, 'C': 0, 'D': 0, 'F': 0}
-        for result in results:
-            percentage = result.get('percentage', 0)
-            grade = self._calculate_grade(percentage)
-            grade_counts[grade] = grade_counts.get(grade, 0) + 1
-        
-        # Filter out grades with zero count
-        grades = []
-        counts = []
-        for grade, count in grade_counts.items():
-            if count > 0:
-                grades.append(grade)
-                counts.append(count)
-        
-        # Create drawing
-        drawing = Drawing(400, 200)
-        
-        # Create pie chart
-        pc = Pie()
-        pc.x = 150
-        pc.y = 50
-        pc.width = 100
-        pc.height = 100
-        pc.data = counts
-        pc.labels = grades
-        pc.slices.strokeWidth = 0.5
-        
-        drawing.add(pc)
-        return drawing
-    
     def _generate_pdf(self, elements: List, organization_data: Dict[str, Any], customization: Dict[str, Any]) -> BytesIO:
         """Generate PDF from elements"""
         buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer)
-        
-        # Add watermark if enabled
-        if customization.get('watermark'):
-            elements.insert(0, self._create_watermark(customization['watermark']))
+        doc = SimpleDocTemplate(buffer, **doc_options())
         
         # Add QR code if enabled
         if customization.get('qr_data'):
             elements.append(self._create_qr_code(customization['qr_data']))
         
-        doc.build(elements)
+        # Watermark behind each page
+        on_page = self._watermark_page(organization_data, customization)
+        doc.build(elements, onFirstPage=on_page, onLaterPages=on_page)
         return buffer
\ No newline at end of file
@@ -0,0 +1,320 @@
+# utils/marksheet_templates.py
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from io import BytesIO
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from reportlab.graphics import renderPDF
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import BaseDocTemplate, Flowable, Frame, PageBreak, PageTemplate, Spacer
+
+from services.asset_cache import AssetCache
+from services.render_cache import RenderCache
+from utils.marksheet_pdf import (
+    _create_attendance_section, _create_footer_section, _create_header_section,
+    _create_performance_analytics, _create_remarks_section, _create_results_table,
+    _create_student_info_card, _get_enhanced_styles
+)
+from utils.pdf_output import doc_options
+from utils.qr import verification_qr
+
+# Compiled marksheet templates.
+#
+# The header (logo, institute details), signature block and watermark of a
+# marksheet are the same for every student of a batch. A compiled template
+# lays them out once per customization, draws them into a PDF form XObject
+# the first time a document needs them and stamps that form on every page,
+# so a page only lays out the student's own flowables (plus the QR code,
+# drawn as an overlay). In a merged class PDF every page shares the one
+# form and its logo and watermark resources, and students' stories are
+# expanded one at a time as the document reaches them, so only the pages
+# being laid out are held as flowables.
+
+COMPILED_TEMPLATE_CACHE_SIZE = 32
+QR_SIZE = 60
+
+_compiled = OrderedDict()
+_compiled_lock = threading.Lock()
+
+class StudentMarker(Flowable):
+    """Zero-size flowable marking where a student's pages begin"""
+
+    def __init__(self, student_data: Dict[str, Any]):
+        super().__init__()
+        self.student_data = student_data
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        pass
+
+class StudentStories(Flowable):
+    """Placeholder for the stories of the students still to come
+
+    MarksheetDocTemplate replaces it with the next student's story (and a
+    page break) followed by itself, until the students run out.
+    """
+
+    def __init__(self, template: 'CompiledMarksheetTemplate', students: Iterable[Dict[str, Any]]):
+        super().__init__()
+        self.template = template
+        self.students = iter(students)
+        self.started = False
+
+    def expand(self) -> List[Flowable]:
+        """The next student's story followed by this placeholder, or nothing"""
+        student_data = next(self.students, None)
+        if student_data is None:
+            return []
+        story = [PageBreak()] if self.started else []
+        self.started = True
+        story.extend(self.template.story(student_data))
+        story.append(self)
+        return story
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        pass
+
+class MarksheetDocTemplate(BaseDocTemplate):
+    """Document whose pages carry a compiled template's static layer"""
+
+    def __init__(self, output, template: 'CompiledMarksheetTemplate', bookmarks: bool = False, **kwargs):
+        self.current_student = None
+        self.student_first_page = None
+        self.bookmarks = bookmarks
+        # (title, first page) of every student, in order
+        self.student_pages = []
+        super().__init__(
+            output,
+            pagesize=template.pagesize,
+            leftMargin=template.margin_x,
+            rightMargin=template.margin_x,
+            topMargin=template.margin_y,
+            bottomMargin=template.margin_y,
+            **kwargs
+        )
+        self.addPageTemplates([PageTemplate(
+            id='marksheet',
+            frames=[template.body_frame()],
+            onPage=template.draw_static,
+            onPageEnd=template.draw_overlay
+        )])
+
+    def handle_flowable(self, flowables):
+        if isinstance(flowables[0], StudentStories):
+            flowables[0:1] = flowables[0].expand()
+            if not flowables:
+                return
+        super().handle_flowable(flowables)
+
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, StudentMarker):
+            student_data = flowable.student_data
+            self.current_student = student_data
+            self.student_first_page = self.page
+            title = f"{student_data.get('roll_no', '')} - {student_data.get('name', '')}"
+            self.student_pages.append((title, self.page))
+            if self.bookmarks:
+                key = f"student{len(self.student_pages)}"
+                self.canv.bookmarkPage(key)
+                self.canv.addOutlineEntry(title, key, level=0)
+                if len(self.student_pages) == 1:
+                    self.canv.showOutline()
+
+    def page_ranges(self) -> List[Tuple[str, int, int]]:
+        """(title, first page, last page) of every student laid out so far"""
+        ends = [first - 1 for _, first in self.student_pages[1:]] + [self.page]
+        return [(title, first, last) for (title, first), last in zip(self.student_pages, ends)]
+
+class CompiledMarksheetTemplate:
+    """Static layer of the modern marksheet, laid out once per customization"""
+
+    def __init__(self, customization_data: Optional[Dict[str, Any]] = None, pagesize=A4,
+                 margin_x: float = 20, margin_y: float = 30):
+        """Lay out the static layer
+
+        Args:
+            customization_data (dict, optional): Customization shared by the batch
+            pagesize (tuple): Page size
+            margin_x (float): Left and right margin
+            margin_y (float): Top and bottom margin
+        """
+        self.customization = dict(customization_data or {})
+        self.pagesize = pagesize
+        self.margin_x = margin_x
+        self.margin_y = margin_y
+        self.include_qr = self.customization.get('include_qr', True)
+        self.include_analytics = self.customization.get('include_analytics', True)
+        self.styles = _get_enhanced_styles(self.customization)
+        self.form_name = f"MarksheetStatic{id(self):x}"
+        self._lock = threading.Lock()
+
+        width, height = pagesize
+        self.content_width = width - 2 * margin_x
+
+        # The QR slot of the header stays empty; it is drawn per student
+        self.header = _create_header_section({}, {**self.customization, 'include_qr': False}, self.styles)
+        self.footer = _create_footer_section({}, self.customization, self.styles)
+        self.header_height = sum(f.wrap(self.content_width, height)[1] for f in self.header)
+        self.footer_height = sum(f.wrap(self.content_width, height)[1] for f in self.footer)
+
+        watermark = self.customization.get('watermark')
+        self.watermark = AssetCache.shared().watermark(watermark, self.customization.get('organization_id')) if watermark else None
+
+        # Header table is [80, 350, 80] wide and centered
+        header_table = self.header[0]
+        self._header_x = margin_x + (self.content_width - header_table._width) / 2
+        self._qr_x = self._header_x + header_table._width - 80 + (80 - QR_SIZE) / 2
+        self._qr_y = height - margin_y - header_table._height + (header_table._height - QR_SIZE) / 2
+
+    def body_frame(self) -> Frame:
+        """Frame between the header and the signature block"""
+        width, height = self.pagesize
+        bottom = self.margin_y + self.footer_height
+        top = height - self.margin_y - self.header_height - 20
+        return Frame(self.margin_x, bottom, self.content_width, top - bottom, id='body')
+
+    def _draw_flowables(self, canv, flowables: List[Flowable], top: float) -> None:
+        y = top
+        for flowable in flowables:
+            w, h = flowable.wrap(self.content_width, y)
+            y -= h
+            x = self.margin_x + (self.content_width - w) / 2
+            flowable.drawOn(canv, x, y)
+
+    def draw_static(self, canv, doc) -> None:
+        """Stamp the static layer, drawing it into a form the first time"""
+        if not canv.hasForm(self.form_name):
+            # Flowables are annotated while drawn, so one document at a time
+            with self._lock:
+                canv.beginForm(self.form_name)
+                if self.watermark is not None:
+                    renderPDF.draw(self.watermark, canv, 0, 0)
+                self._draw_flowables(canv, self.header, self.pagesize[1] - self.margin_y)
+                self._draw_flowables(canv, self.footer, self.margin_y + self.footer_height)
+                canv.endForm()
+        canv.doForm(self.form_name)
+
+    def draw_overlay(self, canv, doc) -> None:
+        """Draw the variable parts of the header on a student's first page"""
+        student_data = getattr(doc, 'current_student', None)
+        if self.include_qr and student_data and doc.page == doc.student_first_page:
+            verification_qr(
+                student_data, QR_SIZE, base_url=self.customization.get('verification_base_url')
+            ).drawOn(canv, self._qr_x, self._qr_y)
+
+    def story(self, student_data: Dict[str, Any]) -> List[Flowable]:
+        """The flowables that vary per student
+
+        Args:
+            student_data (dict): Student data in the generate_result_pdf format
+
+        Returns:
+            list: Flowables for the body frame
+        """
+        story = [StudentMarker(student_data)]
+        story.extend(_create_student_info_card(student_data, self.customization, self.styles))
+        story.append(Spacer(1, 20))
+        story.extend(_create_results_table(student_data, self.customization, self.styles))
+        story.append(Spacer(1, 20))
+        if self.include_analytics:
+            story.extend(_create_performance_analytics(student_data, self.customization, self.styles))
+            story.append(Spacer(1, 20))
+        story.extend(_create_attendance_section(student_data, self.customization, self.styles))
+        story.append(Spacer(1, 20))
+        story.extend(_create_remarks_section(student_data, self.customization, self.styles))
+        return story
+
+    def doc_template(self, output, **kwargs) -> MarksheetDocTemplate:
+        """Create a document using this template's pages
+
+        Args:
+            output (str or file): Destination of the PDF
+            **kwargs: Passed to BaseDocTemplate
+
+        Returns:
+            MarksheetDocTemplate: The document
+        """
+        return MarksheetDocTemplate(output, self, **doc_options(**kwargs))
+
+    def render_merged(self, students: Iterable[Dict[str, Any]], output, **kwargs) -> Dict[str, Any]:
+        """Render many students' marksheets into one bookmarked PDF
+
+        Args:
+            students (iterable): Student data dicts; consumed one at a time
+            output (str or file): Destination of the PDF
+            **kwargs: Passed to BaseDocTemplate (e.g. title)
+
+        Returns:
+            dict: Number of students and pages, and (title, first page, last page) per student
+        """
+        doc = self.doc_template(output, bookmarks=True, **kwargs)
+        doc.build([StudentStories(self, students)])
+        page_ranges = doc.page_ranges()
+        return {'students': len(page_ranges), 'pages': doc.page, 'page_ranges': page_ranges}
+
+    def render(self, student_data: Dict[str, Any]) -> bytes:
+        """Render one student's marksheet
+
+        Args:
+            student_data (dict): Student data in the generate_result_pdf format
+
+        Returns:
+            bytes: The PDF
+        """
+        buffer = BytesIO()
+        self.doc_template(buffer).build(self.story(student_data))
+        return buffer.getvalue()
+
+def get_compiled_template(customization_data: Optional[Dict[str, Any]] = None) -> CompiledMarksheetTemplate:
+    """Get the compiled modern template for a customization, compiling it on first use
+
+    Templates are keyed by the customization (including the files it points
+    at) and the year printed in the header, and the most recently used ones
+    are kept.
+
+    Args:
+        customization_data (dict, optional): Customization shared by the batch
+
+    Returns:
+        CompiledMarksheetTemplate: The shared template
+    """
+    key = RenderCache.key('marksheet_template', datetime.now().year, customization_data, 'modern')
+    with _compiled_lock:
+        template = _compiled.get(key)
+        if template is not None:
+            _compiled.move_to_end(key)
+            return template
+
+    template = CompiledMarksheetTemplate(customization_data)
+    with _compiled_lock:
+        _compiled[key] = template
+        while len(_compiled) > COMPILED_TEMPLATE_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return template
+
+def render_class_marksheets(students: Iterable[Dict[str, Any]], customization_data: Optional[Dict[str, Any]],
+                            output, **kwargs) -> Dict[str, Any]:
+    """Render a class's marksheets into one merged PDF on the compiled modern template
+
+    Args:
+        students (iterable): Student data dicts in the generate_result_pdf format
+        customization_data (dict, optional): Customization shared by the class
+        output (str or file): Destination of the PDF
+        **kwargs: Passed to BaseDocTemplate (e.g. title)
+
+    Returns:
+        dict: Number of students and pages, and (title, first page, last page) per student
+    """
+    template = get_compiled_template({**(customization_data or {}), 'compiled': True})
+    return template.render_merged(students, output, **kwargs)
+
+def clear_compiled_templates() -> None:
+    """Drop every compiled template"""
+    with _compiled_lock:
+        _compiled.clear()
@@ -0,0 +1,80 @@
+# utils/pdf_output.py
+import threading
+from typing import Any, Dict, Optional
+
+from reportlab import rl_config
+
+from utils.config import config_value
+
+# PDF output optimization.
+#
+# Every document the app renders is built by a doc template created with
+# doc_options(), so the output stage is configured in one place:
+#
+# - Page content and forms are Flate compressed. With PDF_OPTIMIZE (the
+#   default) compressed streams are also written as binary instead of
+#   ASCII85 text, which otherwise adds a quarter to every stream. The
+#   encoding is a ReportLab process setting read while a document is
+#   written, so it is applied once per process, not per document.
+# - Raster images (logos, signatures, student photos) go through AssetCache,
+#   which downsamples them to PDF_ASSET_DPI at their printed size and
+#   re-encodes opaque ones as JPEG at PDF_IMAGE_QUALITY. Identical images
+#   share one reader, and ReportLab writes each distinct image once per
+#   document however often it is drawn.
+# - Fonts: the templates use the standard Type 1 fonts, which viewers
+#   provide and are never embedded; TrueType fonts registered with
+#   ReportLab are embedded as subsets of the glyphs used already.
+
+DEFAULT_IMAGE_QUALITY = 85
+
+_settings = None
+_settings_lock = threading.Lock()
+
+def _read_settings() -> Dict[str, Any]:
+    optimize = config_value('PDF_OPTIMIZE', True)
+    quality = config_value('PDF_IMAGE_QUALITY', DEFAULT_IMAGE_QUALITY)
+    return {'optimize': bool(optimize), 'image_quality': int(quality)}
+
+def configure(optimize: Optional[bool] = None, image_quality: Optional[int] = None) -> Dict[str, Any]:
+    """Apply the output settings to this process
+
+    Without arguments the settings are read from the app config (or the
+    environment); arguments override them, e.g. to compare output sizes.
+
+    Args:
+        optimize (bool, optional): Write binary streams and optimize images
+        image_quality (int, optional): JPEG quality of re-encoded images
+
+    Returns:
+        dict: The applied settings (optimize, image_quality)
+    """
+    global _settings
+    settings = _read_settings()
+    if optimize is not None:
+        settings['optimize'] = optimize
+    if image_quality is not None:
+        settings['image_quality'] = image_quality
+
+    with _settings_lock:
+        rl_config.useA85 = 0 if settings['optimize'] else 1
+        _settings = settings
+    return settings
+
+def output_settings() -> Dict[str, Any]:
+    """Get the settings applied to this process, applying the configured ones on first use"""
+    settings = _settings
+    if settings is None:
+        settings = configure()
+    return settings
+
+def doc_options(**kwargs) -> Dict[str, Any]:
+    """Keyword arguments for a doc template producing optimized output
+
+    Args:
+        **kwargs: Other doc template arguments (pagesize, margins, ...)
+
+    Returns:
+        dict: kwargs with page compression enforced
+    """
+    output_settings()
+    return {**kwargs, 'pageCompression': 1}
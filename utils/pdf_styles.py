@@ -0,0 +1,112 @@
+# utils/pdf_styles.py
+from typing import Any, Callable, Dict, Optional, Tuple
+from functools import lru_cache
+
+from reportlab.lib.styles import StyleSheet1, getSampleStyleSheet
+from reportlab.platypus import TableStyle
+
+# Process-wide registry of ReportLab paragraph and table styles.
+#
+# Building a stylesheet (getSampleStyleSheet plus custom styles) and table
+# style command lists is pure overhead when repeated for every marksheet in a
+# bulk run. Themes and table styles are registered once with the
+# customization fields they depend on, built on first use for each distinct
+# combination of those fields and shared, read-only, from then on.
+
+_themes: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {}
+_table_styles: Dict[str, Tuple[Callable, Tuple[str, ...]]] = {}
+
+class FrozenStyleSheet(StyleSheet1):
+    """Stylesheet that rejects new styles once built so it can be shared"""
+
+    def __init__(self):
+        super().__init__()
+        self._frozen = False
+
+    def freeze(self) -> 'FrozenStyleSheet':
+        self._frozen = True
+        return self
+
+    def add(self, style, alias=None):
+        if self._frozen:
+            raise TypeError(f"Cannot add '{style.name}' to a shared stylesheet; create a ParagraphStyle with it as parent instead")
+        super().add(style, alias)
+
+def register_theme(name: str, fields: Tuple[str, ...] = ()):
+    """Register a stylesheet builder
+
+    The builder is called as builder(styles, options) with a sample stylesheet
+    to add to and a dict of the listed customization fields.
+
+    Args:
+        name (str): Theme name
+        fields (tuple): Customization keys the builder reads
+    """
+    def decorator(builder):
+        _themes[name] = (builder, tuple(fields))
+        return builder
+    return decorator
+
+def register_table_style(name: str, fields: Tuple[str, ...] = ()):
+    """Register a table style builder returning a list of TableStyle commands
+
+    Args:
+        name (str): Table style name
+        fields (tuple): Customization keys the builder reads
+    """
+    def decorator(builder):
+        _table_styles[name] = (builder, tuple(fields))
+        return builder
+    return decorator
+
+def _options_key(fields: Tuple[str, ...], customization: Optional[Dict[str, Any]]) -> Optional[tuple]:
+    """Reduce a customization dict to the hashable subset a style depends on"""
+    if not customization or not fields:
+        return None
+    return tuple((field, customization.get(field)) for field in fields)
+
+@lru_cache(maxsize=256)
+def _build_stylesheet(theme: str, options: Optional[tuple]) -> FrozenStyleSheet:
+    builder, _ = _themes[theme]
+    sample = getSampleStyleSheet()
+    styles = FrozenStyleSheet()
+    styles.byName.update(sample.byName)
+    styles.byAlias.update(sample.byAlias)
+    builder(styles, dict(options) if options is not None else None)
+    return styles.freeze()
+
+@lru_cache(maxsize=256)
+def _build_table_style(name: str, options: Optional[tuple]) -> TableStyle:
+    builder, _ = _table_styles[name]
+    return TableStyle(builder(dict(options) if options is not None else None))
+
+def get_stylesheet(theme: str, customization: Optional[Dict[str, Any]] = None) -> FrozenStyleSheet:
+    """Get the shared stylesheet for a theme and customization
+
+    Args:
+        theme (str): Registered theme name
+        customization (dict, optional): Customization data; only the theme's fields are used
+
+    Returns:
+        FrozenStyleSheet: Read-only stylesheet shared across renders
+    """
+    _, fields = _themes[theme]
+    return _build_stylesheet(theme, _options_key(fields, customization))
+
+def get_table_style(name: str, customization: Optional[Dict[str, Any]] = None) -> TableStyle:
+    """Get the shared TableStyle for a name and customization
+
+    Args:
+        name (str): Registered table style name
+        customization (dict, optional): Customization data; only the style's fields are used
+
+    Returns:
+        TableStyle: TableStyle shared across tables (Table.setStyle only reads it)
+    """
+    _, fields = _table_styles[name]
+    return _build_table_style(name, _options_key(fields, customization))
+
+def clear_style_cache() -> None:
+    """Drop every built stylesheet and table style"""
+    _build_stylesheet.cache_clear()
+    _build_table_style.cache_clear()
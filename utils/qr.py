@@ -0,0 +1,257 @@
+# utils/qr.py
+import base64
+import hashlib
+import hmac
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
+
+import qrcode
+from flask import has_request_context, request
+from reportlab.lib import colors
+from reportlab.platypus import Flowable
+
+from utils.config import config_value
+
+# QR codes drawn as vector shapes with compact, signed verification tokens.
+#
+# Rasterizing a QR code through PIL, encoding it to PNG and having ReportLab
+# decode it again is one of the most expensive steps of a page. Instead the
+# QR matrix is drawn as a single filled path of rectangles (one per
+# horizontal run of dark modules), which is smaller in the PDF and sharp at
+# any size. The encoding of a payload is computed once and shared by every
+# document showing it.
+#
+# Verification QR codes hold a link to the /V/<token> page, which checks the
+# token's signature and shows the claims it carries. The scheme and host of
+# the link are upper case (they are case-insensitive) so that, like the
+# token, the whole link fits the QR alphanumeric mode.
+
+TOKEN_VERSION = 'V1'
+SIGNATURE_BYTES = 8
+QR_MASK_PATTERN = 0
+
+# Positional claims of a marksheet token, in order
+STUDENT_CLAIMS = ('name', 'roll_no', 'cls', 'section', 'overall_grade', 'overall_percentage', 'position')
+# Path of the verification page, see routes/main_routes.py
+VERIFY_PATH = '/V/'
+
+CLAIM_LABELS = {
+    'name': 'Name', 'roll_no': 'Roll No', 'cls': 'Class', 'section': 'Section', 'overall_grade': 'Grade',
+    'overall_percentage': 'Percentage', 'position': 'Position', 'certificate_number': 'Certificate No',
+    'recipient_name': 'Recipient', 'type': 'Type', 'date': 'Date'
+}
+
+# Tokens use upper case base32 so the QR code is encoded in alphanumeric
+# mode, which packs 5.5 bits per character instead of 8
+def _b32(data: bytes) -> str:
+    return base64.b32encode(data).rstrip(b'=').decode('ascii')
+
+def _unb32(text: str) -> bytes:
+    return base64.b32decode(text + '=' * (-len(text) % 8))
+
+def _secret() -> bytes:
+    """Get the signing secret from the app (or the environment in workers)"""
+    secret = config_value('SECRET_KEY', 'dev-secret-key-change-in-production')
+    return str(secret).encode('utf-8')
+
+def _sign(body: str, secret: Optional[bytes]) -> bytes:
+    return hmac.new(secret or _secret(), body.encode('ascii'), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+def verification_claims(data: Any) -> Union[List[Any], Dict[str, Any], str]:
+    """Reduce document data to the claims a verification token carries
+
+    Marksheet data becomes a list of the STUDENT_CLAIMS values; other dicts
+    keep their scalar values. Subject lists and other nested data are left
+    out so the token stays short.
+
+    Args:
+        data: Student data, a dict of claims or a plain string
+
+    Returns:
+        list, dict or str: Compact claims
+    """
+    if not isinstance(data, dict):
+        return str(data)
+
+    if 'roll_no' in data:
+        overall = data.get('overall_result') or {}
+        claims = [overall.get(field, data.get(field)) for field in STUDENT_CLAIMS]
+        return [round(value, 2) if isinstance(value, float) else value for value in claims]
+
+    return {
+        key: value for key, value in data.items()
+        if isinstance(value, (str, int, float, bool)) and value is not None
+    }
+
+def verification_token(data: Any, secret: Optional[bytes] = None) -> str:
+    """Create a compact signed token identifying a document
+
+    Args:
+        data: Student data, a dict of claims or a plain string
+        secret (bytes, optional): Signing secret. Defaults to the app SECRET_KEY.
+
+    Returns:
+        str: "V1.<claims>.<signature>" in upper case letters and digits
+    """
+    claims = json.dumps(verification_claims(data), sort_keys=True, separators=(',', ':'), default=str)
+    body = f"{TOKEN_VERSION}.{_b32(claims.encode('utf-8'))}"
+    return f"{body}.{_b32(_sign(body, secret))}"
+
+def verify_token(token: str, secret: Optional[bytes] = None) -> Optional[Union[List[Any], Dict[str, Any], str]]:
+    """Check a verification token
+
+    Args:
+        token (str): Token read from a QR code
+        secret (bytes, optional): Signing secret. Defaults to the app SECRET_KEY.
+
+    Returns:
+        list, dict or str: The claims if the token is genuine, otherwise None
+    """
+    try:
+        version, claims, signature = token.split('.')
+        if version != TOKEN_VERSION:
+            return None
+        if not hmac.compare_digest(_sign(f"{version}.{claims}", secret), _unb32(signature)):
+            return None
+        return json.loads(_unb32(claims))
+    except (ValueError, TypeError):
+        return None
+
+def verification_base_url() -> str:
+    """Base URL of verification links: VERIFICATION_BASE_URL, else the current request's host"""
+    base = config_value('VERIFICATION_BASE_URL')
+    if not base and has_request_context():
+        base = request.host_url
+    return (base or '').rstrip('/')
+
+def verification_url(token: str, base_url: Optional[str] = None) -> str:
+    """Link to the verification page of a token
+
+    Args:
+        token (str): Token from verification_token
+        base_url (str, optional): Site URL. Defaults to verification_base_url().
+
+    Returns:
+        str: The link, or the bare token when no base URL is known
+    """
+    base = (verification_base_url() if base_url is None else base_url).rstrip('/')
+    if not base:
+        return token
+    parts = urlsplit(base)
+    base = urlunsplit((parts.scheme.upper(), parts.netloc.upper(), parts.path, '', ''))
+    return f"{base}{VERIFY_PATH}{token}"
+
+def describe_claims(claims: Union[List[Any], Dict[str, Any], str]) -> List[Tuple[str, Any]]:
+    """Label the claims of a verified token for display
+
+    Args:
+        claims: Claims returned by verify_token
+
+    Returns:
+        list: (label, value) pairs
+    """
+    if isinstance(claims, list):
+        pairs = zip(STUDENT_CLAIMS, claims)
+    elif isinstance(claims, dict):
+        pairs = sorted(claims.items())
+    else:
+        return [('Reference', claims)]
+    return [
+        (CLAIM_LABELS.get(key, key.replace('_', ' ').title()), value)
+        for key, value in pairs if value is not None
+    ]
+
+@lru_cache(maxsize=1024)
+def _qr_runs(payload: str, border: int) -> Tuple[int, Tuple[Tuple[int, int, int], ...]]:
+    """Encode a payload into horizontal runs of dark modules
+
+    Returns:
+        tuple: Modules per side (including the border) and (x, y, length)
+        runs in module units with y growing upwards
+    """
+    # Any mask is a valid QR code; a fixed one skips evaluating all eight
+    qr = qrcode.QRCode(border=border, error_correction=qrcode.constants.ERROR_CORRECT_M, mask_pattern=QR_MASK_PATTERN)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    modules = len(matrix)
+
+    runs = []
+    for row, cells in enumerate(matrix):
+        # PDF y grows upwards, QR rows go down
+        y = modules - row - 1
+        col = 0
+        while col < modules:
+            if not cells[col]:
+                col += 1
+                continue
+            start = col
+            while col < modules and cells[col]:
+                col += 1
+            runs.append((start, y, col - start))
+
+    return modules, tuple(runs)
+
+class QRCodeFlowable(Flowable):
+    """QR code drawn as one filled vector path"""
+
+    def __init__(self, payload: str, size: float, border: int = 1, hAlign: str = 'CENTER'):
+        """Initialize the QR code
+
+        Args:
+            payload (str): Data to encode
+            size (float): Width and height in points
+            border (int): Quiet zone in modules
+            hAlign (str): Horizontal alignment in a frame
+        """
+        super().__init__()
+        self.modules, self.runs = _qr_runs(payload, border)
+        self.width = self.height = size
+        self.hAlign = hAlign
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        scale = self.width / self.modules
+        self.canv.saveState()
+        self.canv.scale(scale, scale)
+        self.canv.setFillColor(colors.black)
+        path = self.canv.beginPath()
+        for x, y, length in self.runs:
+            path.rect(x, y, length, 1)
+        self.canv.drawPath(path, stroke=0, fill=1)
+        self.canv.restoreState()
+
+def qr_code(payload: str, size: float, border: int = 1) -> QRCodeFlowable:
+    """Draw a QR code as vector shapes
+
+    Args:
+        payload (str): Data to encode
+        size (float): Width and height in points
+        border (int): Quiet zone in modules
+
+    Returns:
+        QRCodeFlowable: New flowable sharing the memoized encoding of the payload
+    """
+    return QRCodeFlowable(payload, size, border)
+
+def verification_qr(data: Any, size: float, border: int = 1, base_url: Optional[str] = None) -> QRCodeFlowable:
+    """Draw the verification QR code of a document, a link to its verification page
+
+    Args:
+        data: Student data, a dict of claims or a plain string
+        size (float): Width and height in points
+        border (int): Quiet zone in modules
+        base_url (str, optional): Site URL. Defaults to verification_base_url().
+
+    Returns:
+        QRCodeFlowable: The QR code
+    """
+    return qr_code(verification_url(verification_token(data), base_url), size, border)
+
+def clear_qr_cache() -> None:
+    """Drop every memoized QR code"""
+    _qr_runs.cache_clear()
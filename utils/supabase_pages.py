@@ -0,0 +1,31 @@
+# utils/supabase_pages.py
+from typing import Any, Callable, Dict, Iterator
+
+# Paging through PostgREST (supabase) queries.
+#
+# postgrest-py request builders are mutable: range() adds offset and limit
+# parameters to the builder it is called on rather than returning a copy, so
+# calling it once per page on the same builder piles up offset=0&offset=1000
+# and the pages repeat or fail. Each page is therefore requested from a
+# fresh builder, made by a factory that applies the filters and ordering.
+
+DEFAULT_PAGE_SIZE = 1000
+
+def paged_rows(make_query: Callable[[], Any], page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+    """Yield every row of a query, a page at a time
+
+    Args:
+        make_query (callable): Returns a new filtered and ordered request
+            builder each time it is called
+        page_size (int): Rows requested per page
+
+    Yields:
+        dict: The rows, in the query's order
+    """
+    offset = 0
+    while True:
+        page = make_query().range(offset, offset + page_size - 1).execute().data or []
+        yield from page
+        if len(page) < page_size:
+            return
+        offset += page_size
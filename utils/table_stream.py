@@ -0,0 +1,140 @@
+# utils/table_stream.py
+import csv
+import io
+import json
+import os
+import tempfile
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, Sequence, Tuple
+
+# Streaming tabular exports.
+#
+# stream_table turns an iterator of rows into the bytes of a CSV, XLSX or
+# NDJSON file as it is consumed, so an export of any size holds one batch of
+# rows in memory and the response can start before the query finishes:
+#
+# - CSV and NDJSON are written into a small buffer and flushed every
+#   FLUSH_BYTES.
+# - XLSX uses openpyxl's write-only mode, which streams rows into a
+#   temporary sheet file instead of building the worksheet in memory. A ZIP
+#   package can only be finished once every row is in, so the file is
+#   yielded from disk after the last row.
+#
+# Columns are (key, header) pairs: CSV and XLSX get the headers, NDJSON
+# objects are keyed by the keys.
+
+FLUSH_BYTES = 64 * 1024
+FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
+    'ndjson': ('application/x-ndjson', '.ndjson')
+}
+
+Columns = Sequence[Tuple[str, str]]
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+def _cell_value(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return ', '.join(map(str, value))
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+def _csv_value(value: Any) -> Any:
+    return ', '.join(map(str, value)) if isinstance(value, (list, tuple)) else value
+
+def stream_csv(columns: Columns, rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    """CSV bytes (UTF-8 with BOM, so Excel detects the encoding) of a header and rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow([header for key, header in columns])
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def stream_ndjson(columns: Columns, rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    """One JSON object per row and line"""
+    keys = [key for key, header in columns]
+    chunk = []
+    size = 0
+    for row in rows:
+        line = json.dumps({key: _json_value(value) for key, value in zip(keys, row)}, default=str) + '\n'
+        chunk.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield ''.join(chunk).encode('utf-8')
+            chunk.clear()
+            size = 0
+    yield ''.join(chunk).encode('utf-8')
+
+def stream_xlsx(columns: Columns, rows: Iterable[Sequence[Any]], title: str = 'Export') -> Iterator[bytes]:
+    """XLSX bytes of a header and rows, built with a write-only workbook"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    sheet.append([header for key, header in columns])
+    for row in rows:
+        sheet.append([_cell_value(value) for value in row])
+
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(handle)
+    try:
+        workbook.save(path)
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(FLUSH_BYTES)
+                if not data:
+                    break
+                yield data
+    finally:
+        os.remove(path)
+
+def stream_table(columns: Columns, rows: Iterable[Sequence[Any]], fmt: str = 'csv', title: str = 'Export') -> Iterator[bytes]:
+    """Stream rows as a file
+
+    Args:
+        columns (list): (key, header) pairs
+        rows (iterable): Row value sequences in column order, e.g. from a
+            yield_per query
+        fmt (str): csv, xlsx or ndjson
+        title (str): XLSX sheet name
+
+    Yields:
+        bytes: Consecutive chunks of the file
+    """
+    if fmt == 'xlsx':
+        return stream_xlsx(columns, rows, title)
+    if fmt == 'ndjson':
+        return stream_ndjson(columns, rows)
+    return stream_csv(columns, rows)
+
+def export_format(fmt: str) -> Tuple[str, str, str]:
+    """Normalize a requested format
+
+    Args:
+        fmt (str): Requested format; unknown ones fall back to csv
+
+    Returns:
+        tuple: (format, mimetype, file extension)
+    """
+    fmt = (fmt or 'csv').lower()
+    if fmt not in FORMATS:
+        fmt = 'csv'
+    mimetype, extension = FORMATS[fmt]
+    return fmt, mimetype, extension
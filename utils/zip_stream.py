@@ -0,0 +1,100 @@
+# utils/zip_stream.py
+import io
+import os
+import uuid
+import zipfile
+from typing import Iterable, Iterator, Tuple
+
+class _StreamSink(io.RawIOBase):
+    """Unseekable sink that collects what zipfile writes until it is drained"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def stream_zip(files: Iterable[Tuple[str, bytes]], compression: int = zipfile.ZIP_STORED) -> Iterator[bytes]:
+    """Build a ZIP archive incrementally, yielding its bytes file by file
+
+    Each file is emitted as soon as it is added (sizes go into data
+    descriptors since the output is never seeked), so only one file is held
+    in memory at a time and the first bytes are available immediately.
+
+    Args:
+        files (iterable): (name, data) pairs, e.g. rendered PDFs as they complete
+        compression (int): zipfile compression method. PDFs are already compressed.
+
+    Yields:
+        bytes: Consecutive chunks of the archive
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, 'w', compression=compression) as archive:
+        for name, data in files:
+            archive.writestr(name, data)
+            yield sink.drain()
+    # Central directory
+    yield sink.drain()
+
+def partial_path(path: str) -> str:
+    """Unique name to write an artifact under until it is complete
+
+    Concurrent writers of the same artifact (e.g. two downloads of one
+    class) each get their own file; the last to finish replaces the others.
+    """
+    return f"{path}.{os.getpid()}.{uuid.uuid4().hex}.part"
+
+def tee_to_file(chunks: Iterable[bytes], path: str) -> Iterator[bytes]:
+    """Pass chunks through while also writing them to a file
+
+    The file is written under a partial_path and only renamed into place
+    once the stream completes, so a file at path is always a complete artifact.
+    An aborted stream (e.g. client disconnect) removes the partial file.
+
+    Args:
+        chunks (iterable): Chunks to pass through
+        path (str): Final artifact path
+
+    Yields:
+        bytes: The same chunks
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    part_path = partial_path(path)
+    try:
+        with open(part_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        os.replace(part_path, path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+def write_stream(chunks: Iterable[bytes], path: str) -> str:
+    """Write a chunk stream to an artifact file
+
+    Args:
+        chunks (iterable): Chunks to write
+        path (str): Final artifact path
+
+    Returns:
+        str: The artifact path
+    """
+    for _ in tee_to_file(chunks, path):
+        pass
+    return path